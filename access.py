@@ -0,0 +1,177 @@
+"""
+Кэш доступа родителей к участникам.
+
+Для каждого пользователя в памяти процесса хранится карта participant_id ->
+основные поля участника, к которому пользователь получил доступ по коду
+авторизации. Карта загружается одним запросом и живет ACCESS_CACHE_TTL
+секунд; число пользователей в кэше ограничено (вытесняются давно не
+использованные). Подтверждение кода, изменение и удаление участника
+увеличивают счетчик версии в AppState: этот процесс сбрасывает кэш сразу
+после коммита, остальные воркеры - при проверке версии (не чаще раза в
+ACCESS_VERSION_CHECK_INTERVAL секунд), как и кэш каталога (catalog.py).
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date, datetime
+from functools import wraps
+
+from flask import current_app, session, jsonify
+from sqlalchemy import select, update, cast, Integer, Text, event
+from sqlalchemy.orm import Session
+
+from models import db, AppState, AuthorizationCode, Participant
+
+ACCESS_VERSION_KEY = 'access_version'
+
+
+@dataclass(frozen=True)
+class ParticipantAccess:
+    """Участник, доступный пользователю, с основными полями"""
+    id: int
+    full_name: str
+    parent_phone: str
+    birth_date: date
+    medical_certificate: bool
+    discount_type: str
+    discount_percent: int
+    authorized_at: datetime
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'full_name': self.full_name,
+            'parent_phone': self.parent_phone,
+            'birth_date': self.birth_date,
+            'medical_certificate': self.medical_certificate,
+            'discount_type': self.discount_type,
+            'discount_percent': self.discount_percent
+        }
+
+
+def load_user_access(user_id):
+    """Участники, к которым пользователь получил доступ: participant_id -> ParticipantAccess"""
+    rows = db.session.execute(select(
+        Participant.id, Participant.full_name, Participant.parent_phone, Participant.birth_date,
+        Participant.medical_certificate, Participant.discount_type, Participant.discount_percent,
+        AuthorizationCode.used_at
+    ).join(AuthorizationCode, AuthorizationCode.participant_id == Participant.id).where(
+        AuthorizationCode.used_by_user_id == user_id,
+        AuthorizationCode.is_used == True
+    ).order_by(AuthorizationCode.id))
+    return {row[0]: ParticipantAccess(*row) for row in rows}
+
+
+def read_access_version():
+    return int(db.session.execute(select(AppState.value).where(AppState.key == ACCESS_VERSION_KEY)).scalar() or 0)
+
+
+def bump_access_version():
+    """
+    Увеличивает версию доступа в текущей транзакции (коммит - за вызывающим
+    кодом); кэш этого процесса сбрасывается после коммита.
+    """
+    now = datetime.utcnow()
+    result = db.session.execute(
+        update(AppState).where(AppState.key == ACCESS_VERSION_KEY).values(
+            value=cast(cast(AppState.value, Integer) + 1, Text),
+            updated_at=now
+        ).execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        db.session.add(AppState(key=ACCESS_VERSION_KEY, value='1', updated_at=now))
+    db.session.info['access_changed'] = True
+
+
+def _invalidate_after_commit(session):
+    if session.info.pop('access_changed', False):
+        cache = current_app.extensions.get('access_cache')
+        if cache is not None:
+            cache.invalidate()
+
+
+def _discard_after_rollback(session, previous_transaction):
+    session.info.pop('access_changed', None)
+
+
+class AccessCache:
+    """Карты доступа пользователей с TTL и вытеснением давно не использованных (LRU)"""
+
+    def __init__(self, ttl=60.0, max_users=10000, check_interval=2.0):
+        self.ttl = ttl
+        self.max_users = max_users
+        self.check_interval = check_interval
+        self._entries = OrderedDict()  # user_id -> (loaded_at, access)
+        self._version = None
+        self._checked_at = 0.0
+        self._generation = 0  # Растет при каждом сбросе: карта, загруженная до сброса, не сохраняется
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_interval:
+            version = read_access_version()
+            with self._lock:
+                if version != self._version:
+                    self._entries.clear()
+                    self._generation += 1
+                    self._version = version
+                self._checked_at = now
+
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and now - entry[0] < self.ttl:
+                self._entries.move_to_end(user_id)
+                return entry[1]
+            generation = self._generation
+
+        access = load_user_access(user_id)
+        with self._lock:
+            if generation != self._generation:
+                return access
+            self._entries[user_id] = (now, access)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+        return access
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+            self._checked_at = 0.0
+
+
+def init_access_cache(app):
+    """Регистрирует кэш доступа в приложении"""
+    cache = AccessCache(
+        ttl=app.config.get('ACCESS_CACHE_TTL', 60.0),
+        max_users=app.config.get('ACCESS_CACHE_MAX_USERS', 10000),
+        check_interval=app.config.get('ACCESS_VERSION_CHECK_INTERVAL', 2.0)
+    )
+    app.extensions['access_cache'] = cache
+    if not event.contains(Session, 'after_commit', _invalidate_after_commit):
+        event.listen(Session, 'after_commit', _invalidate_after_commit)
+        event.listen(Session, 'after_soft_rollback', _discard_after_rollback)
+    return cache
+
+
+def get_user_access(user_id):
+    """Карта доступа пользователя из кэша текущего приложения"""
+    return current_app.extensions['access_cache'].get(user_id)
+
+
+def parent_access(view):
+    """
+    Декоратор родительских маршрутов: без user_id в сессии отвечает 403,
+    иначе передает в обработчик карту доступа именованным аргументом access.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        user_id = session.get('user_id')
+        if not user_id:
+            return jsonify({'success': False, 'error': 'Unauthorized'}), 403
+        return view(*args, access=get_user_access(user_id), **kwargs)
+    return wrapper
@@ -1,390 +1,168 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, stream_with_context
 from flask_cors import CORS
-from models import db, User, Participant, SportGroup, Schedule, Subscription, Payment, Discount, LessonTransfer, Attendance, AttendanceRecord, AuthorizationCode
+from models import db, User, Participant, SportGroup, Schedule, Subscription, Payment, Discount, LessonTransfer, Attendance, AttendanceRecord, AuthorizationCode, SubscriptionLedgerEntry, LowBalanceNotice
 from config import Config
+from database import init_database
+from json_provider import init_json
+from replica import init_replica, read_replica
+from access import init_access_cache, parent_access, bump_access_version
+from roster import build_students_roster, build_group_roster
+from notifications import init_outbox
+from metrics import init_metrics, metrics_snapshot
+from profiler import init_profiler, get_profiler
+from auth_codes import create_authorization_codes
+from attendance import save_attendance
+from attendance_digest import compose_attendance_digest
+from attendance_stats import load_group_lesson_stats, load_participant_monthly_stats, refresh_lesson_stats, remove_participant_stats, rebuild_attendance_stats
+from seeding import create_sport_groups, update_sport_groups, seed_sport_groups
+from catalog import init_catalog, get_catalog, bump_catalog_version, DAY_NAMES
+from lesson_calendar import parse_window, build_lesson_calendar
+from payments import parse_payment_filters, parse_page_size, load_payments_page, serialize_payments
+from participant_import import detect_format, iter_rows, import_participants, default_import_user_id
+from exports import EXPORT_FORMATS, build_export, export_chunks, export_mimetype
+from ledger import settle_payment, adjust_balance, load_ledger, find_balance_mismatches, rebuild_balances
+from scheduler import init_scheduler, get_scheduler
+from compression import init_compression
+from asset_manifest import init_assets, build_assets
+from logging_setup import configure_logging, LogSampler
 import json
+import click
 from datetime import datetime, timedelta, date
 import logging
-import re
+import time
 
-# Настройка логирования
-logging.basicConfig(level=logging.INFO)
+# Настройка логирования: запись в поток вывода идет из отдельного потока
+configure_logging(Config)
 logger = logging.getLogger(__name__)
+# Сообщения о постановке уведомлений в очередь пишутся выборочно: их по одному на получателя
+notification_log = LogSampler(logger, Config.LOG_SAMPLE_EVERY)
 
 
-def format_schedule_for_display(schedules):
-    """Форматирует расписание для отображения в читаемом виде"""
-    if not schedules:
-        return "Расписания пока нет"
-
-    days = ['Понедельник', 'Вторник', 'Среда', 'Четверг', 'Пятница', 'Суббота', 'Воскресенье']
-
-    # Группируем по дням недели
-    schedule_by_day = {}
-    for schedule in schedules:
-        # Добавляем проверку на корректность day_of_week
-        if 0 <= schedule.day_of_week < len(days):
-            day_name = days[schedule.day_of_week]
-            if day_name not in schedule_by_day:
-                schedule_by_day[day_name] = []
-            schedule_by_day[day_name].append({
-                'start': schedule.start_time.strftime('%H:%M'),
-                'end': schedule.end_time.strftime('%H:%M')
-            })
-        else:
-            logger.warning(f"Invalid day_of_week value: {schedule.day_of_week}")
-
-    # Формируем читаемый текст
-    schedule_texts = []
-    for day_name in days:
-        if day_name in schedule_by_day:
-            times = schedule_by_day[day_name]
-            time_texts = [f"{time['start']}-{time['end']}" for time in times]
-            schedule_texts.append(f"{day_name} {', '.join(time_texts)}")
-
-    return ", ".join(schedule_texts) if schedule_texts else "Расписания пока нет"
-
 def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
+    init_json(app)
     
     # Инициализация расширений
     db.init_app(app)
+    init_database(app)
+    init_replica(app)
     CORS(app)
+    init_outbox(app)
+    init_catalog(app)
+    init_access_cache(app)
+    init_metrics(app)
+    init_profiler(app)
+    init_scheduler(app)
+    init_assets(app)
+    init_compression(app)
     
-    # Создание таблиц базы данных
+    # Создание таблиц базы данных (без записи, если схема уже создана).
+    # Начальные данные групп загружаются командой `flask --app app seed-groups`
     with app.app_context():
-        db.create_all()
-        # Инициализация спортивных групп
-        init_sport_groups()
+        db.create_all(bind_key=None)  # Только основная база: реплика получает схему репликацией
     
     return app
 
-def init_sport_groups():
-    """Инициализация спортивных групп при первом запуске"""
-    if SportGroup.query.count() == 0:
-        create_sport_groups()
+app = create_app()
+
+
+@app.cli.command('seed-groups')
+@click.option('--force', is_flag=True, help='Перезаписать группы, даже если данные не менялись')
+def seed_groups_command(force):
+    """Загрузить или обновить спортивные группы и расписание"""
+    result = seed_sport_groups(force=force)
+    if result == 'unchanged':
+        click.echo('Данные групп не изменились, загрузка пропущена')
     else:
-        update_sport_groups()
+        click.echo(f'Спортивные группы загружены ({result})')
 
-def create_schedule_from_text(sport_group_id, schedule_text):
-    """Создает записи расписания на основе текстового описания"""
-    try:
-        # Парсим текстовое расписание и создаем записи в таблице Schedule
-        schedule_mapping = {
-            'Понедельник': 0,
-            'Вторник': 1,
-            'Среда': 2,
-            'Четверг': 3,
-            'Пятница': 4,
-            'Суббота': 5,
-            'Воскресенье': 6
-        }
-        
-        # Простой парсинг времени (формат: "19:30 до 20:20")
-        import re
-        time_pattern = r'(\d{1,2}):(\d{2})\s+до\s+(\d{1,2}):(\d{2})'
-        
-        # Разбиваем по дням недели
-        for day_name, day_number in schedule_mapping.items():
-            if day_name in schedule_text:
-                # Ищем время для этого дня
-                times = re.findall(time_pattern, schedule_text)
-                for time_match in times:
-                    start_hour, start_minute, end_hour, end_minute = map(int, time_match)
-                    
-                    # Создаем запись расписания
-                    schedule = Schedule(
-                        sport_group_id=sport_group_id,
-                        day_of_week=day_number,
-                        start_time=datetime.strptime(f"{start_hour:02d}:{start_minute:02d}", "%H:%M").time(),
-                        end_time=datetime.strptime(f"{end_hour:02d}:{end_minute:02d}", "%H:%M").time()
-                    )
-                    db.session.add(schedule)
-        
-        db.session.commit()
-        print(f"Расписание создано для группы {sport_group_id}")
-        
-    except Exception as e:
-        print(f"Ошибка создания расписания для группы {sport_group_id}: {e}")
-        db.session.rollback()
 
-def create_sport_groups():
-    """Создание новых спортивных групп"""
-    groups = [
-        {
-            'name': 'Дзюдо младшая группа А',
-            'description': 'Группа для детей 4-6 лет',
-            'detailed_description': 'Дзюдо для самых маленьких! Наши занятия направлены на развитие координации, гибкости и дисциплины у детей дошкольного возраста. В игровой форме дети изучают основы дзюдо, учатся работать в команде и развивают уверенность в себе. Продолжительность занятия 50 минут. Форма одежды кимано (если нет - шорты, футболка), с собой негазированную питьевую воду 0.5 л объёмом, сменная обувь. Занятия проходят босиком.',
-            'schedule': 'Понедельник, Среда, Пятница с 19:30 до 20:20',
-            'price_8': 4000, 
-            'price_12': 5000,
-            'price_single': 700,
-            'trainer_name': 'Галоян Пайлак Араратович',
-            'trainer_info': 'Является мастером спорта международного класса по дзюдо. Многократный призёр и чемпион чемпионатов России, 8 кратный медалист кубков Европы, бронзовый призер первенства Европы. Имеет педагогическое, юридическое образование. В основу ставит спортивную дисциплину, уважение к старшим. Опыт работы более 4 лет.',
-            'category': 'judo',
-            'age_group': '4-6 лет'
-        },
-        {
-            'name': 'Дзюдо младшая группа Б',
-            'description': 'Группа для детей 4-6 лет',
-            'detailed_description': 'Дзюдо для самых маленьких! Наши занятия направлены на развитие координации, гибкости и дисциплины у детей дошкольного возраста. В игровой форме дети изучают основы дзюдо, учатся работать в команде и развивают уверенность в себе. Продолжительность занятия 50 минут. Форма одежды кимано (если нет - шорты, футболка), с собой негазированную питьевую воду 0.5 л объёмом, сменная обувь. Занятия проходят босиком.',
-            'schedule': 'Вторник, Четверг с 18:30 до 19:20, Суббота с 10:00 до 10:50',
-            'price_8': 4000, 
-            'price_12': 5000,
-            'price_single': 700,
-            'trainer_name': 'Галоян Пайлак Араратович',
-            'trainer_info': 'Является мастером спорта международного класса по дзюдо. Многократный призёр и чемпион чемпионатов России, 8 кратный медалист кубков Европы, бронзовый призер первенства Европы. Имеет педагогическое, юридическое образование. В основу ставит спортивную дисциплину, уважение к старшим. Опыт работы более 4 лет.',
-            'category': 'judo',
-            'age_group': '4-6 лет'
-        },
-        {
-            'name': 'Дзюдо старшая группа А',
-            'description': 'Группа для детей 7 лет и старше',
-            'detailed_description': 'Серьезные тренировки по дзюдо для детей школьного возраста. Программа включает изучение техники, участие в соревнованиях, развитие физических качеств и спортивного характера. Продолжительность занятия 50 минут. Форма одежды кимано (если нет - шорты, футболка), с собой негазированную питьевую воду 0.5 л объёмом, сменная обувь. Занятия проходят босиком.',
-            'schedule': 'Понедельник, Среда, Пятница с 20:30 до 21:20',
-            'price_8': 4000,
-            'price_12': 5000,
-            'price_single': 700,
-            'trainer_name': 'Галоян Пайлак Араратович',
-            'trainer_info': 'Является мастером спорта международного класса по дзюдо. Многократный призёр и чемпион чемпионатов России, 8 кратный медалист кубков Европы, бронзовый призер первенства Европы. Имеет педагогическое, юридическое образование. В основу ставит спортивную дисциплину, уважение к старшим. Опыт работы более 4 лет.',
-            'category': 'judo',
-            'age_group': '7+ лет'
-        },
-        {
-            'name': 'Дзюдо старшая группа Б',
-            'description': 'Группа для детей 7 лет и старше',
-            'detailed_description': 'Серьезные тренировки по дзюдо для детей школьного возраста. Программа включает изучение техники, участие в соревнованиях, развитие физических качеств и спортивного характера. Продолжительность занятия 50 минут. Форма одежды кимано (если нет - шорты, футболка), с собой негазированную питьевую воду 0.5 л объёмом, сменная обувь. Занятия проходят босиком.',
-            'schedule': 'Понедельник, Среда, Пятница с 10:00 до 10:50',
-            'price_8': 4000,
-            'price_12': 5000,
-            'price_single': 700,
-            'trainer_name': 'Галоян Пайлак Араратович',
-            'trainer_info': 'Является мастером спорта международного класса по дзюдо. Многократный призёр и чемпион чемпионатов России, 8 кратный медалист кубков Европы, бронзовый призер первенства Европы. Имеет педагогическое, юридическое образование. В основу ставит спортивную дисциплину, уважение к старшим. Опыт работы более 4 лет.',
-            'category': 'judo',
-            'age_group': '7+ лет'
-        },
-        {
-            'name': 'Дзюдо старшая группа В',
-            'description': 'Группа для детей 7 лет и старше',
-            'detailed_description': 'Серьезные тренировки по дзюдо для детей школьного возраста. Программа включает изучение техники, участие в соревнованиях, развитие физических качеств и спортивного характера. Продолжительность занятия 50 минут. Форма одежды кимано (если нет - шорты, футболка), с собой негазированную питьевую воду 0.5 л объёмом, сменная обувь. Занятия проходят босиком.',
-            'schedule': 'Вторник, Четверг с 19:30 до 20:20, Суббота с 11:00 до 11:50',
-            'price_8': 4000,
-            'price_12': 5000,
-            'price_single': 700,
-            'trainer_name': 'Галоян Пайлак Араратович',
-            'trainer_info': 'Является мастером спорта международного класса по дзюдо. Многократный призёр и чемпион чемпионатов России, 8 кратный медалист кубков Европы, бронзовый призер первенства Европы. Имеет педагогическое, юридическое образование. В основу ставит спортивную дисциплину, уважение к старшим. Опыт работы более 4 лет.',
-            'category': 'judo',
-            'age_group': '7+ лет'
-        },
-        {
-            'name': 'Гимнастика',
-            'description': 'Гимнастика для детей от 3х до 5 лет',
-            'detailed_description': 'Гимнастика - отлично подойдёт для мальчиков и девочек, включающие в общеразвивающие упражнения, с уклоном на растяжку, координацию, статические упражнения. Весь тренировочный процесс контролируется спортивной дисциплиной. Занятия продолжительностью 50 минут, форма одежды (шорты, футболка), с собой теплую воду негазированную и сменную обувь.',
-            'schedule': 'Понедельник, Среда, Пятница с 18:30 до 19:20',
-            'price_8': 4000,
-            'price_12': 5000,
-            'price_single': 700,
-            'trainer_name': 'Галоян Пайлак Араратович',
-            'trainer_info': 'Является мастером спорта международного класса по дзюдо. Многократный призёр и чемпион чемпионатов России, 8 кратный медалист кубков Европы, бронзовый призер первенства Европы. Имеет педагогическое, юридическое образование. В основу ставит спортивную дисциплину, уважение к старшим. Опыт работы более 4 лет.',
-            'category': 'gymnastics',
-            'age_group': '3-5 лет'
-        },
-        {
-            'name': 'ММА',
-            'description': 'Смешанные единоборства для подростков от 14+ и взрослых',
-            'detailed_description': 'Отлично подойдёт для подростков, которые хотят научится самообороне, принимать участие в соревнованиях и прогрессировать с каждой тренировкой. Для взрослых отлично подойдут занятия для тех, кто всегда мечтал попробовать для себя что-то новое, тренировки в удовольствие, под присмотром грамотного тренерского состава, обучение техническому арсеналу единоборств, развитие выносливости, работа над физической формой.',
-            'schedule': 'Вторник, Четверг с 21:30 до 22:30',
-            'price_8': 4000,
-            'price_12': 5000,
-            'price_single': 900,
-            'trainer_name': 'Галоян Пайлак Араратович',
-            'trainer_info': 'Является мастером спорта международного класса по дзюдо. Многократный призёр и чемпион чемпионатов России, 8 кратный медалист кубков Европы, бронзовый призер первенства Европы. Имеет педагогическое, юридическое образование. В основу ставит спортивную дисциплину, уважение к старшим. Опыт работы более 4 лет.',
-            'category': 'mma',
-            'age_group': '14+ лет'
-        },
-        {
-            'name': 'Женский фитнес',
-            'description': 'Фитнес программы для женщин', 
-            'detailed_description': 'Специально разработанные программы фитнеса для женщин всех возрастов. Включают кардио-тренировки, силовые упражнения, растяжку и функциональный тренинг.',
-            'schedule': 'Расписание в проработке',
-            'price_8': 4000,
-            'price_single': 700,
-            'trainer_name': 'Анна Морозова',
-            'trainer_info': 'Сертифицированный тренер по фитнесу, специалист по женскому здоровью и питанию. Опыт работы в фитнес-индустрии 12 лет.',
-            'category': 'fitness',
-            'age_group': '18+ лет'
-        }
-    ]
-    
-    for group_data in groups:
-        group = SportGroup(**group_data)
-        db.session.add(group)
-        db.session.flush()  # Получаем ID группы
-        
-        # Создаем расписание для группы
-        if group_data['schedule'] != 'Расписание в проработке':
-            create_schedule_from_text(group.id, group_data['schedule'])
-    
+@app.cli.command('rebuild-attendance-stats')
+def rebuild_attendance_stats_command():
+    """Перестроить сводки посещаемости из отметок занятий"""
+    lessons, months = rebuild_attendance_stats()
     db.session.commit()
-    print("Спортивные группы созданы успешно!")
-
-def update_sport_groups():
-    """Обновление существующих спортивных групп"""
-    # Получаем все существующие группы
-    existing_groups = SportGroup.query.all()
-    
-    # Создаем словарь для быстрого поиска по имени
-    existing_groups_dict = {group.name: group for group in existing_groups}
-    
-    # Определяем новые/обновленные группы
-    updated_groups = [
-        {
-            'name': 'Дзюдо младшая группа А',
-            'description': 'Группа для детей 4-6 лет',
-            'detailed_description': 'Дзюдо для самых маленьких! Наши занятия направлены на развитие координации, гибкости и дисциплины у детей дошкольного возраста. В игровой форме дети изучают основы дзюдо, учатся работать в команде и развивают уверенность в себе. Продолжительность занятия 50 минут. Форма одежды кимано (если нет - шорты, футболка), с собой негазированную питьевую воду 0.5 л объёмом, сменная обувь. Занятия проходят босиком.',
-            'schedule': 'Понедельник, Среда, Пятница с 19:30 до 20:20',
-            'price_8': 4000, 
-            'price_12': 5000,
-            'price_single': 700,
-            'trainer_name': 'Галоян Пайлак Араратович',
-            'trainer_info': 'Является мастером спорта международного класса по дзюдо. Многократный призёр и чемпион чемпионатов России, 8 кратный медалист кубков Европы, бронзовый призер первенства Европы. Имеет педагогическое, юридическое образование. В основу ставит спортивную дисциплину, уважение к старшим. Опыт работы более 4 лет.',
-            'category': 'judo',
-            'age_group': '4-6 лет'
-        },
-        {
-            'name': 'Дзюдо младшая группа Б',
-            'description': 'Группа для детей 4-6 лет',
-            'detailed_description': 'Дзюдо для самых маленьких! Наши занятия направлены на развитие координации, гибкости и дисциплины у детей дошкольного возраста. В игровой форме дети изучают основы дзюдо, учатся работать в команде и развивают уверенность в себе. Продолжительность занятия 50 минут. Форма одежды кимано (если нет - шорты, футболка), с собой негазированную питьевую воду 0.5 л объёмом, сменная обувь. Занятия проходят босиком.',
-            'schedule': 'Вторник, Четверг с 18:30 до 19:20, Суббота с 10:00 до 10:50',
-            'price_8': 4000, 
-            'price_12': 5000,
-            'price_single': 700,
-            'trainer_name': 'Галоян Пайлак Араратович',
-            'trainer_info': 'Является мастером спорта международного класса по дзюдо. Многократный призёр и чемпион чемпионатов России, 8 кратный медалист кубков Европы, бронзовый призер первенства Европы. Имеет педагогическое, юридическое образование. В основу ставит спортивную дисциплину, уважение к старшим. Опыт работы более 4 лет.',
-            'category': 'judo',
-            'age_group': '4-6 лет'
-        },
-        {
-            'name': 'Дзюдо старшая группа А',
-            'description': 'Группа для детей 7 лет и старше',
-            'detailed_description': 'Серьезные тренировки по дзюдо для детей школьного возраста. Программа включает изучение техники, участие в соревнованиях, развитие физических качеств и спортивного характера. Продолжительность занятия 50 минут. Форма одежды кимано (если нет - шорты, футболка), с собой негазированную питьевую воду 0.5 л объёмом, сменная обувь. Занятия проходят босиком.',
-            'schedule': 'Понедельник, Среда, Пятница с 20:30 до 21:20',
-            'price_8': 4000,
-            'price_12': 5000,
-            'price_single': 700,
-            'trainer_name': 'Галоян Пайлак Араратович',
-            'trainer_info': 'Является мастером спорта международного класса по дзюдо. Многократный призёр и чемпион чемпионатов России, 8 кратный медалист кубков Европы, бронзовый призер первенства Европы. Имеет педагогическое, юридическое образование. В основу ставит спортивную дисциплину, уважение к старшим. Опыт работы более 4 лет.',
-            'category': 'judo',
-            'age_group': '7+ лет'
-        },
-        {
-            'name': 'Дзюдо старшая группа Б',
-            'description': 'Группа для детей 7 лет и старше',
-            'detailed_description': 'Серьезные тренировки по дзюдо для детей школьного возраста. Программа включает изучение техники, участие в соревнованиях, развитие физических качеств и спортивного характера. Продолжительность занятия 50 минут. Форма одежды кимано (если нет - шорты, футболка), с собой негазированную питьевую воду 0.5 л объёмом, сменная обувь. Занятия проходят босиком.',
-            'schedule': 'Понедельник, Среда, Пятница с 10:00 до 10:50',
-            'price_8': 4000,
-            'price_12': 5000,
-            'price_single': 700,
-            'trainer_name': 'Галоян Пайлак Араратович',
-            'trainer_info': 'Является мастером спорта международного класса по дзюдо. Многократный призёр и чемпион чемпионатов России, 8 кратный медалист кубков Европы, бронзовый призер первенства Европы. Имеет педагогическое, юридическое образование. В основу ставит спортивную дисциплину, уважение к старшим. Опыт работы более 4 лет.',
-            'category': 'judo',
-            'age_group': '7+ лет'
-        },
-        {
-            'name': 'Дзюдо старшая группа В',
-            'description': 'Группа для детей 7 лет и старше',
-            'detailed_description': 'Серьезные тренировки по дзюдо для детей школьного возраста. Программа включает изучение техники, участие в соревнованиях, развитие физических качеств и спортивного характера. Продолжительность занятия 50 минут. Форма одежды кимано (если нет - шорты, футболка), с собой негазированную питьевую воду 0.5 л объёмом, сменная обувь. Занятия проходят босиком.',
-            'schedule': 'Вторник, Четверг с 19:30 до 20:20, Суббота с 11:00 до 11:50',
-            'price_8': 4000,
-            'price_12': 5000,
-            'price_single': 700,
-            'trainer_name': 'Галоян Пайлак Араратович',
-            'trainer_info': 'Является мастером спорта международного класса по дзюдо. Многократный призёр и чемпион чемпионатов России, 8 кратный медалист кубков Европы, бронзовый призер первенства Европы. Имеет педагогическое, юридическое образование. В основу ставит спортивную дисциплину, уважение к старшим. Опыт работы более 4 лет.',
-            'category': 'judo',
-            'age_group': '7+ лет'
-        },
-        {
-            'name': 'Гимнастика',
-            'description': 'Гимнастика для детей от 3х до 5 лет',
-            'detailed_description': 'Гимнастика - отлично подойдёт для мальчиков и девочек, включающие в общеразвивающие упражнения, с уклоном на растяжку, координацию, статические упражнения. Весь тренировочный процесс контролируется спортивной дисциплиной. Занятия продолжительностью 50 минут, форма одежды (шорты, футболка), с собой теплую воду негазированную и сменную обувь.',
-            'schedule': 'Понедельник, Среда, Пятница с 18:30 до 19:20',
-            'price_8': 4000,
-            'price_12': 5000,
-            'price_single': 700,
-            'trainer_name': 'Галоян Пайлак Араратович',
-            'trainer_info': 'Является мастером спорта международного класса по дзюдо. Многократный призёр и чемпион чемпионатов России, 8 кратный медалист кубков Европы, бронзовый призер первенства Европы. Имеет педагогическое, юридическое образование. В основу ставит спортивную дисциплину, уважение к старшим. Опыт работы более 4 лет.',
-            'category': 'gymnastics',
-            'age_group': '3-5 лет'
-        },
-        {
-            'name': 'ММА',
-            'description': 'Смешанные единоборства для подростков от 14+ и взрослых',
-            'detailed_description': 'Отлично подойдёт для подростков, которые хотят научится самообороне, принимать участие в соревнованиях и прогрессировать с каждой тренировкой. Для взрослых отлично подойдут занятия для тех, кто всегда мечтал попробовать для себя что-то новое, тренировки в удовольствие, под присмотром грамотного тренерского состава, обучение техническому арсеналу единоборств, развитие выносливости, работа над физической формой.',
-            'schedule': 'Вторник, Четверг с 21:30 до 22:30',
-            'price_8': 4000,
-            'price_12': 5000,
-            'price_single': 900,
-            'trainer_name': 'Галоян Пайлак Араратович',
-            'trainer_info': 'Является мастером спорта международного класса по дзюдо. Многократный призёр и чемпион чемпионатов России, 8 кратный медалист кубков Европы, бронзовый призер первенства Европы. Имеет педагогическое, юридическое образование. В основу ставит спортивную дисциплину, уважение к старшим. Опыт работы более 4 лет.',
-            'category': 'mma',
-            'age_group': '14+ лет'
-        },
-        {
-            'name': 'Женский фитнес',
-            'description': 'Фитнес программы для женщин', 
-            'detailed_description': 'Специально разработанные программы фитнеса для женщин всех возрастов. Включают кардио-тренировки, силовые упражнения, растяжку и функциональный тренинг.',
-            'schedule': 'Расписание в проработке',
-            'price_8': 4000,
-            'price_single': 700,
-            'trainer_name': 'Анна Морозова',
-            'trainer_info': 'Сертифицированный тренер по фитнесу, специалист по женскому здоровью и питанию. Опыт работы в фитнес-индустрии 12 лет.',
-            'category': 'fitness',
-            'age_group': '18+ лет'
-        }
-    ]
-    
-    updated_count = 0
-    created_count = 0
-    
-    for group_data in updated_groups:
-        if group_data['name'] in existing_groups_dict:
-            # Обновляем существующую группу
-            group = existing_groups_dict[group_data['name']]
-            for key, value in group_data.items():
-                setattr(group, key, value)
-            
-            # Обновляем расписание
-            if group_data['schedule'] != 'Расписание в проработке':
-                # Удаляем старое расписание
-                Schedule.query.filter_by(sport_group_id=group.id).delete()
-                # Создаем новое расписание
-                create_schedule_from_text(group.id, group_data['schedule'])
-            
-            updated_count += 1
-        else:
-            # Создаем новую группу
-            group = SportGroup(**group_data)
-            db.session.add(group)
-            db.session.flush()  # Получаем ID группы
-            
-            # Создаем расписание для новой группы
-            if group_data['schedule'] != 'Расписание в проработке':
-                create_schedule_from_text(group.id, group_data['schedule'])
-            
-            created_count += 1
-    
+    click.echo(f'Сводки посещаемости перестроены: занятий {lessons}, месяцев по группам {months}')
+
+
+
+@app.cli.command('rebuild-balances')
+@click.option('--check', is_flag=True, help='Только показать расхождения, ничего не меняя')
+def rebuild_balances_command(check):
+    """Сверить балансы подписок с журналом и пересчитать их"""
+    if check:
+        mismatches = find_balance_mismatches()
+        for mismatch in mismatches:
+            click.echo(f"Подписка {mismatch['subscription_id']}: оплачено {mismatch['paid_total']} (по журналу {mismatch['ledger_paid_total']}), "
+                       f"занятий {mismatch['remaining_lessons']} (по журналу {mismatch['ledger_remaining_lessons']})")
+        click.echo(f'Расхождений: {len(mismatches)}')
+        return
+    mismatches, entries = rebuild_balances()
     db.session.commit()
-    print(f"Спортивные группы обновлены: {updated_count} обновлено, {created_count} создано!")
-
-app = create_app()
+    click.echo(f'Записей журнала добавлено: {entries}, балансов исправлено: {len(mismatches)}')
+
+
+@app.cli.command('import-participants')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--dry-run', is_flag=True, help='Только проверить строки, ничего не записывая')
+@click.option('--user-id', type=int, help='Владелец участников (по умолчанию первый администратор)')
+@click.option('--report', 'report_path', type=click.Path(dir_okay=False), help='Сохранить полный отчет (с кодами авторизации) в JSON')
+def import_participants_command(path, dry_run, user_id, report_path):
+    """Импортировать участников из CSV/XLSX"""
+    user_id = user_id or default_import_user_id()
+    if user_id is None:
+        raise click.ClickException('Нет администратора: укажите --user-id')
+    with open(path, 'rb') as stream:
+        try:
+            report = import_participants(iter_rows(stream, detect_format(path)), user_id, dry_run=dry_run)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+    for error in report.errors:
+        click.echo(f"Строка {error['row']}: {error['error']}")
+    if report_path:
+        with open(report_path, 'w', encoding='utf-8') as report_file:
+            json.dump(report.to_dict(), report_file, ensure_ascii=False, indent=2, default=str)
+    click.echo(f'Строк: {report.total_rows}, импортировано: {report.imported}, абонементов: {report.subscriptions}, '
+               f'ошибок: {len(report.errors)}' + (' (проверка без записи)' if dry_run else ''))
+    if report.stopped:
+        click.echo(f'Импорт остановлен: {report.stopped}')
+
+
+@app.cli.command('run-jobs')
+@click.option('--job', 'names', multiple=True, type=click.Choice(['expire_subscriptions', 'low_balance_notices']),
+              help='Запустить только указанные задачи')
+@click.option('--force', is_flag=True, help='Не ждать интервала с прошлого запуска')
+@click.option('--loop', is_flag=True, help='Работать постоянно, проверяя задачи раз в SCHEDULER_TICK секунд')
+def run_jobs_command(names, force, loop):
+    """Выполнить периодические задачи (истечение подписок, уведомления о низком балансе)"""
+    scheduler = get_scheduler(app)
+    while True:
+        results = scheduler.run_pending(names or None, force=force)
+        for name, state in results.items():
+            click.echo(f"{name}: {state['status']} за {state['duration_ms']} мс {state.get('result', state.get('error'))}")
+        if not loop:
+            if not results:
+                click.echo('Задачи уже выполнялись в пределах интервала (--force для запуска)')
+            break
+        time.sleep(scheduler.tick)
+    app.extensions['telegram_outbox'].stop(app.config.get('TELEGRAM_SHUTDOWN_TIMEOUT', 5.0))
+
+
+@app.cli.command('build-assets')
+def build_assets_command():
+    """Минифицировать JS/CSS и записать их с хэшем в имени в static/dist"""
+    report = build_assets(app.static_folder)
+    for filename, (built, size, minified) in report.items():
+        click.echo(f'{filename} -> {built}: {size} -> {minified} байт')
+    click.echo(f'Файлов в манифесте: {len(report)}; перезапустите приложение, чтобы он был прочитан')
 
 
 @app.route('/index')
 def admin_dashboard():
-    logger.info("Загрузка admin dashboard")
+    logger.debug("Загрузка admin dashboard")
     if session.get('role') != 'admin':
-        logger.info(f"Редирект на index, роль: {session.get('role')}")
+        logger.debug("Редирект на index, роль: %s", session.get('role'))
         return redirect(url_for('index'))
     try:
         # Получаем общую статистику
@@ -403,22 +181,21 @@ def admin_dashboard():
                               recent_payments=recent_payments,
                               low_balance_participants=low_balance_participants)
     except Exception as e:
-        logger.error(f"Ошибка при рендеринге index.html: {e}")
+        logger.error("Ошибка при рендеринге index.html: %s", e)
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
 @app.route('/')
 def index():
     """Главная страница приложения"""
-    logger.info(f"Попытка доступа к главной странице. Роль в сессии: {session.get('role')}")
-    logger.info(f"Полная сессия: {dict(session)}")
+    logger.debug("Попытка доступа к главной странице. Роль в сессии: %s", session.get('role'))
     
     # Если админ уже авторизован (сессия установлена), перенаправляем сразу в админ-панель
     if session.get('role') == 'admin':
-        logger.info("Админ авторизован, редирект на admin_dashboard")
+        logger.debug("Админ авторизован, редирект на admin_dashboard")
         return redirect(url_for('admin_dashboard'))
     
-    logger.info("Рендерим index.html")
+    logger.debug("Рендерим index.html")
     return render_template('index.html')
 
 @app.route('/group/<int:group_id>')
@@ -436,26 +213,25 @@ def admin_group_details(group_id):
 @app.route('/admin/groups')
 def admin_groups():
     """Список всех групп для админа"""
-    logger.info(f"Попытка доступа к /admin/groups. Роль в сессии: {session.get('role')}")
-    logger.info(f"Полная сессия: {dict(session)}")
+    logger.debug("Попытка доступа к /admin/groups. Роль в сессии: %s", session.get('role'))
     
     if session.get('role') != 'admin':
-        logger.warning(f"Доступ запрещен для роли: {session.get('role')}")
+        logger.warning("Доступ запрещен для роли: %s", session.get('role'))
         return redirect(url_for('index'))
     
-    logger.info("Доступ разрешен, рендерим admin/groups.html")
+    logger.debug("Доступ разрешен, рендерим admin/groups.html")
     return render_template('admin/groups.html')
 
 @app.route('/admin/students')
 def admin_students():
     """Страница управления учениками для админа"""
-    logger.info(f"Попытка доступа к /admin/students. Роль в сессии: {session.get('role')}")
+    logger.debug("Попытка доступа к /admin/students. Роль в сессии: %s", session.get('role'))
     
     if session.get('role') != 'admin':
-        logger.warning(f"Доступ запрещен для роли: {session.get('role')}")
+        logger.warning("Доступ запрещен для роли: %s", session.get('role'))
         return redirect(url_for('index'))
     
-    logger.info("Доступ разрешен, рендерим admin/students.html")
+    logger.debug("Доступ разрешен, рендерим admin/students.html")
     return render_template('admin/students.html')
 
 
@@ -467,68 +243,8 @@ def admin_students_api():
         if session.get('role') != 'admin':
             return jsonify({'success': False, 'error': 'Access denied'}), 403
 
-        # Получаем всех участников
-        participants = Participant.query.all()
-
-        students_data = []
-        for participant in participants:
-            # Получаем активные подписки участника
-            subscriptions = Subscription.query.filter_by(
-                participant_id=participant.id,
-                is_active=True
-            ).all()
-
-            participant_subscriptions = []
-            total_paid_all = 0
-            total_remaining_all = 0
-
-            for subscription in subscriptions:
-                # Получаем все платежи для этой подписки
-                payments = Payment.query.filter_by(subscription_id=subscription.id).all()
-                total_paid = sum(payment.amount for payment in payments if payment.status == 'approved')
-
-                total_paid_all += total_paid
-                total_remaining_all += subscription.remaining_lessons
-
-                participant_subscriptions.append({
-                    'subscription_id': subscription.id,
-                    'sport_group_name': subscription.sport_group.name,
-                    'subscription_type': subscription.subscription_type,
-                    'total_lessons': subscription.total_lessons,
-                    'remaining_lessons': subscription.remaining_lessons,
-                    'total_paid': total_paid,
-                    'start_date': subscription.start_date.strftime('%Y-%m-%d'),
-                    'end_date': subscription.end_date.strftime('%Y-%m-%d')
-                })
-
-            # Вычисляем возраст
-            today = date.today()
-            age = today.year - participant.birth_date.year - ((today.month, today.day) < (participant.birth_date.month, participant.birth_date.day))
-
-            # Берем последний код авторизации
-            latest_auth_code = AuthorizationCode.query.filter_by(participant_id=participant.id).order_by(AuthorizationCode.created_at.desc()).first()
-            auth_code_value = latest_auth_code.code if latest_auth_code else None
-
-            # Добавляем всех участников, независимо от наличия оплаченных подписок
-            students_data.append({
-                'participant_id': participant.id,
-                'participant_name': participant.full_name,
-                'parent_phone': participant.parent_phone,
-                'birth_date': participant.birth_date.strftime('%Y-%m-%d'),
-                'age': age,
-                'medical_certificate': participant.medical_certificate,
-                'discount_type': participant.discount_type,
-                'discount_percent': participant.discount_percent,
-                'authorization_code': auth_code_value,
-                'subscriptions': participant_subscriptions,
-                'total_paid_all': total_paid_all,
-                'total_remaining_all': total_remaining_all,
-                'subscription_count': len(participant_subscriptions),
-                'has_payments': total_paid_all > 0
-            })
-
-        # Сортируем по имени участника
-        students_data.sort(key=lambda x: x['participant_name'])
+        # Собираем список учеников фиксированным числом запросов
+        students_data = build_students_roster()
 
         return jsonify({
             'success': True,
@@ -536,7 +252,7 @@ def admin_students_api():
         })
 
     except Exception as e:
-        logger.error(f"Error in admin_students_api: {e}")
+        logger.error("Error in admin_students_api: %s", e)
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/init', methods=['POST'])
@@ -583,45 +299,42 @@ def init_user():
         })
     
     except Exception as e:
-        logger.error(f"Error in init_user: {e}")
+        logger.error("Error in init_user: %s", e)
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def catalog_response(etag, last_modified, build_response):
+    """Ответ с ETag/Last-Modified; при совпадении версии клиента - 304 без сборки тела"""
+    response = app.response_class()
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    response.cache_control.no_cache = True
+    response.cache_control.public = True
+    response.make_conditional(request)
+    if response.status_code == 304:
+        return response
+    
+    full_response = build_response()
+    full_response.headers.update({key: value for key, value in response.headers.items() if key in ('ETag', 'Last-Modified', 'Cache-Control')})
+    return full_response
+
 @app.route('/api/sport-groups')
+@read_replica
 def get_sport_groups():
     """Получение списка спортивных групп"""
     try:
-        groups = SportGroup.query.all()
-        groups_data = []
-        
-        for group in groups:
-            # Получаем реальное расписание из БД
-            schedules = Schedule.query.filter_by(sport_group_id=group.id).all()
-            formatted_schedule = format_schedule_for_display(schedules)
-            
-            groups_data.append({
-                'id': group.id,
-                'name': group.name,
-                'description': group.description,
-                'detailed_description': group.detailed_description,
-                'trainer_name': group.trainer_name,
-                'trainer_info': group.trainer_info,
-                'price_8': group.price_8,
-                'price_12': group.price_12,
-                'price_single': group.price_single,
-                'category': group.category,
-                'age_group': group.age_group,
-                'schedule': formatted_schedule
-            })
-        
-        return jsonify({
-            'success': True,
-            'groups': groups_data
-        })
+        # Каталог кэшируется и пересобирается только при изменении групп/расписания
+        catalog = get_catalog()
+        return catalog_response(
+            catalog.groups_etag,
+            catalog.last_modified,
+            lambda: app.response_class(catalog.groups_json, mimetype='application/json')
+        )
     except Exception as e:
-        logger.error(f"Error in get_sport_groups: {e}")
+        logger.error("Error in get_sport_groups: %s", e)
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/sport-group/<int:group_id>')
+@read_replica
 def get_sport_group_details(group_id):
     """Получение подробной информации о спортивной группе"""
     try:
@@ -647,13 +360,13 @@ def get_sport_group_details(group_id):
                 'schedule': [{
                     'id': schedule.id,
                     'day': days[schedule.day_of_week],
-                    'start_time': schedule.start_time.strftime('%H:%M'),
-                    'end_time': schedule.end_time.strftime('%H:%M')
+                    'start_time': schedule.start_time,
+                    'end_time': schedule.end_time
                 } for schedule in schedules]
             }
         })
     except Exception as e:
-        logger.error(f"Error in get_sport_group_details: {e}")
+        logger.error("Error in get_sport_group_details: %s", e)
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
@@ -661,28 +374,20 @@ def get_sport_group_details(group_id):
 def schedule_page():
     """Страница с расписанием всех групп"""
     try:
-        # Получаем все группы с их расписанием
-        groups = SportGroup.query.all()
-        groups_with_schedule = []
-
-        for group in groups:
-            schedules = Schedule.query.filter_by(sport_group_id=group.id).all()
-            formatted_schedule = format_schedule_for_display(schedules)
-
-            groups_with_schedule.append({
-                'id': group.id,
-                'name': group.name,
-                'schedule': formatted_schedule,
-                'trainer': group.trainer_name
-            })
-
-        return render_template('schedule.html', groups=groups_with_schedule)
+        # Получаем все группы с их расписанием из кэша каталога
+        catalog = get_catalog()
+        return catalog_response(
+            catalog.schedule_etag,
+            catalog.last_modified,
+            lambda: app.make_response(render_template('schedule.html', groups=catalog.schedule_groups))
+        )
     except Exception as e:
-        logger.error(f"Error in schedule_page: {e}")
+        logger.error("Error in schedule_page: %s", e)
         return render_template('schedule.html', groups=[], error=str(e))
 
 
 @app.route('/api/schedule/<int:group_id>')
+@read_replica
 def get_schedule(group_id):
     """Получение расписания для конкретной группы"""
     try:
@@ -695,18 +400,18 @@ def get_schedule(group_id):
                 schedule_data.append({
                     'id': schedule.id,
                     'day': days[schedule.day_of_week],
-                    'start_time': schedule.start_time.strftime('%H:%M'),
-                    'end_time': schedule.end_time.strftime('%H:%M')
+                    'start_time': schedule.start_time,
+                    'end_time': schedule.end_time
                 })
             else:
-                logger.warning(f"Invalid day_of_week {schedule.day_of_week} for schedule {schedule.id}")
+                logger.warning("Invalid day_of_week %s for schedule %s", schedule.day_of_week, schedule.id)
 
         return jsonify({
             'success': True,
             'schedule': schedule_data
         })
     except Exception as e:
-        logger.error(f"Error in get_schedule: {e}")
+        logger.error("Error in get_schedule: %s", e)
         return jsonify({'success': False, 'error': str(e)}), 500
 
 # Административные маршруты
@@ -725,14 +430,14 @@ def admin_participants():
                     'id': p.id,
                     'full_name': p.full_name,
                     'parent_phone': p.parent_phone,
-                    'birth_date': p.birth_date.strftime('%Y-%m-%d'),
+                    'birth_date': p.birth_date,
                     'medical_certificate': p.medical_certificate,
                     'discount_type': p.discount_type,
                     'discount_percent': p.discount_percent
                 } for p in participants]
             })
         except Exception as e:
-            logger.error(f"Error in admin_participants GET: {e}")
+            logger.error("Error in admin_participants GET: %s", e)
             return jsonify({'success': False, 'error': str(e)}), 500
     
     elif request.method == 'POST':
@@ -781,22 +486,39 @@ def admin_participants():
                     db.session.commit()
             
             # Генерируем код авторизации для родителя
-            auth_code = AuthorizationCode(
-                participant_id=participant.id,
-                code=AuthorizationCode.generate_code()
-            )
-            db.session.add(auth_code)
+            codes = create_authorization_codes([participant.id])
             db.session.commit()
             
             return jsonify({
                 'success': True, 
                 'participant_id': participant.id,
-                'authorization_code': auth_code.code
+                'authorization_code': codes[participant.id]
             })
         except Exception as e:
-            logger.error(f"Error in admin_participants POST: {e}")
+            logger.error("Error in admin_participants POST: %s", e)
             return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/admin/participants/import', methods=['POST'])
+def admin_participants_import():
+    """Массовый импорт участников из CSV/XLSX (поле формы file; ?dry_run=1 - только проверка)"""
+    if session.get('role') != 'admin':
+        return jsonify({'success': False, 'error': 'Access denied'}), 403
+    
+    try:
+        upload = request.files.get('file')
+        if upload is None:
+            return jsonify({'success': False, 'error': 'Missing file'}), 400
+        dry_run = request.args.get('dry_run', '').lower() in ('1', 'true')
+        rows = iter_rows(upload.stream, detect_format(upload.filename, upload.mimetype))
+        report = import_participants(rows, session.get('user_id'), dry_run=dry_run)
+        return jsonify({'success': True, **report.to_dict()})
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        logger.error("Error in admin_participants_import: %s", e)
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/api/admin/participants/<int:participant_id>', methods=['GET', 'PUT', 'DELETE'])
 def admin_participant_manage(participant_id):
     """Управление конкретным участником (получение, обновление и удаление)"""
@@ -828,7 +550,7 @@ def admin_participant_manage(participant_id):
                     'id': participant.id,
                     'full_name': participant.full_name,
                     'parent_phone': participant.parent_phone,
-                    'birth_date': participant.birth_date.strftime('%Y-%m-%d'),
+                    'birth_date': participant.birth_date,
                     'medical_certificate': participant.medical_certificate,
                     'discount_type': participant.discount_type,
                     'discount_percent': participant.discount_percent,
@@ -839,12 +561,18 @@ def admin_participant_manage(participant_id):
         elif request.method == 'DELETE':
             # Удаляем связанные записи
             AuthorizationCode.query.filter_by(participant_id=participant_id).delete()
-            Payment.query.join(Subscription).filter(Subscription.participant_id == participant_id).delete()
+            subscription_ids = db.session.query(Subscription.id).filter(Subscription.participant_id == participant_id)
+            SubscriptionLedgerEntry.query.filter(SubscriptionLedgerEntry.subscription_id.in_(subscription_ids)).delete(synchronize_session=False)
+            LowBalanceNotice.query.filter(LowBalanceNotice.subscription_id.in_(subscription_ids)).delete(synchronize_session=False)
+            Payment.query.filter(Payment.subscription_id.in_(subscription_ids)).delete(synchronize_session=False)
             Subscription.query.filter_by(participant_id=participant_id).delete()
-            AttendanceRecord.query.join(Attendance).join(SportGroup).filter(Attendance.sport_group_id.in_([s.id for s in participant.subscriptions])).delete()
+            attendance_ids = [attendance_id for (attendance_id,) in db.session.query(AttendanceRecord.attendance_id).filter_by(participant_id=participant_id)]
+            AttendanceRecord.query.filter_by(participant_id=participant_id).delete()
+            remove_participant_stats(participant_id, attendance_ids)
             
-            # Удаляем участника
+            # Удаляем участника; карты доступа родителей сбрасываются после коммита
             db.session.delete(participant)
+            bump_access_version()
             db.session.commit()
             
             return jsonify({'success': True, 'message': 'Участник успешно удален'})
@@ -866,12 +594,15 @@ def admin_participant_manage(participant_id):
             if 'discount_percent' in data:
                 participant.discount_percent = data['discount_percent']
             
+            # Поля участника хранятся в картах доступа родителей
+            if db.session.is_modified(participant):
+                bump_access_version()
             db.session.commit()
             
             return jsonify({'success': True, 'message': 'Участник успешно обновлен'})
     
     except Exception as e:
-        logger.error(f"Error in admin_participant_manage: {e}")
+        logger.error("Error in admin_participant_manage: %s", e)
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/admin/schedule', methods=['GET', 'POST'])
@@ -891,8 +622,8 @@ def admin_schedule():
                     schedule_data.append({
                         'id': schedule.id,
                         'day_of_week': schedule.day_of_week,
-                        'start_time': schedule.start_time.strftime('%H:%M'),
-                        'end_time': schedule.end_time.strftime('%H:%M')
+                        'start_time': schedule.start_time,
+                        'end_time': schedule.end_time
                     })
                 return jsonify({'success': True, 'schedule': schedule_data})
             else:
@@ -904,12 +635,12 @@ def admin_schedule():
                         'id': s.id,
                         'sport_group_name': s.sport_group.name,
                         'day_of_week': s.day_of_week,
-                        'start_time': s.start_time.strftime('%H:%M'),
-                        'end_time': s.end_time.strftime('%H:%M')
+                        'start_time': s.start_time,
+                        'end_time': s.end_time
                     } for s in schedules]
                 })
         except Exception as e:
-            logger.error(f"Error in admin_schedule GET: {e}")
+            logger.error("Error in admin_schedule GET: %s", e)
             return jsonify({'success': False, 'error': str(e)}), 500
     
     elif request.method == 'POST':
@@ -933,6 +664,7 @@ def admin_schedule():
                 # Обновляем существующее расписание
                 existing_schedule.start_time = datetime.strptime(start_time, '%H:%M').time()
                 existing_schedule.end_time = datetime.strptime(end_time, '%H:%M').time()
+                bump_catalog_version()
                 db.session.commit()
                 return jsonify({'success': True, 'message': 'Расписание обновлено'})
             else:
@@ -944,11 +676,12 @@ def admin_schedule():
                     end_time=datetime.strptime(end_time, '%H:%M').time()
                 )
                 db.session.add(new_schedule)
+                bump_catalog_version()
                 db.session.commit()
                 return jsonify({'success': True, 'message': 'Расписание создано'})
                 
         except Exception as e:
-            logger.error(f"Error in admin_schedule POST: {e}")
+            logger.error("Error in admin_schedule POST: %s", e)
             return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/admin/schedule/<int:schedule_id>', methods=['PUT', 'DELETE'])
@@ -964,6 +697,7 @@ def manage_schedule(schedule_id):
         
         if request.method == 'DELETE':
             db.session.delete(schedule)
+            bump_catalog_version()
             db.session.commit()
             return jsonify({'success': True, 'message': 'Расписание удалено'})
         
@@ -978,40 +712,58 @@ def manage_schedule(schedule_id):
             if 'end_time' in data and data['end_time'] is not None:
                 schedule.end_time = datetime.strptime(data['end_time'], '%H:%M').time()
             
+            bump_catalog_version()
             db.session.commit()
             return jsonify({'success': True, 'message': 'Расписание обновлено'})
         
     except Exception as e:
-        logger.error(f"Error in manage_schedule: {e}")
+        logger.error("Error in manage_schedule: %s", e)
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/admin/payments')
 def admin_payments():
-    """Просмотр платежей (только для администратора)"""
+    """
+    Просмотр платежей (только для администратора).
+    Параметры: status, group_id, participant_id, date_from, date_to (YYYY-MM-DD),
+    limit и cursor - значение next_cursor из предыдущего ответа.
+    """
     if session.get('role') != 'admin':
         return jsonify({'success': False, 'error': 'Access denied'}), 403
     
     try:
-        payments = Payment.query.join(Subscription).join(Participant).join(SportGroup).all()
+        filters = parse_payment_filters(request.args)
+        limit = parse_page_size(request.args)
+        rows, next_cursor = load_payments_page(filters, request.args.get('cursor'), limit)
         return jsonify({
             'success': True,
-            'payments': [{
-                'id': p.id,
-                'participant_name': p.subscription.participant.full_name,
-                'participant_phone': p.subscription.participant.parent_phone,
-                'sport_group': p.subscription.sport_group.name,
-                'subscription_type': p.subscription.subscription_type,
-                'amount': p.amount,
-                'payment_method': p.payment_method,
-                'status': p.status,
-                'is_paid': p.is_paid,
-                'payment_date': p.payment_date.strftime('%Y-%m-%d %H:%M') if p.payment_date else None,
-                'created_at': p.created_at.strftime('%Y-%m-%d %H:%M'),
-                'admin_notes': p.admin_notes
-            } for p in payments]
+            'payments': serialize_payments(rows),
+            'next_cursor': next_cursor
         })
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
-        logger.error(f"Error in admin_payments: {e}")
+        logger.error("Error in admin_payments: %s", e)
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/admin/export/<dataset>')
+def admin_export(dataset):
+    """Потоковая выгрузка payments, students или attendance в CSV или XLSX (?format=xlsx)"""
+    if session.get('role') != 'admin':
+        return jsonify({'success': False, 'error': 'Access denied'}), 403
+    
+    try:
+        export_format = request.args.get('format', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f'Неизвестный формат: {export_format}')
+        export = build_export(dataset, request.args)
+        response = app.response_class(stream_with_context(export_chunks(export, export_format)),
+                                      mimetype=export_mimetype(export_format))
+        response.headers['Content-Disposition'] = f"attachment; filename={export.name}-{date.today().strftime('%Y%m%d')}.{export_format}"
+        return response
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        logger.error("Error in admin_export: %s", e)
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/admin/payments/<int:payment_id>/approve', methods=['POST'])
@@ -1028,15 +780,10 @@ def approve_payment(payment_id):
         if not payment:
             return jsonify({'success': False, 'error': 'Платеж не найден'}), 404
         
-        if payment.status != 'pending':
+        # Подтверждаем платеж и зачисляем сумму на баланс подписки
+        if not settle_payment(payment, 'approved', admin_notes, session.get('user_id')):
             return jsonify({'success': False, 'error': 'Платеж уже обработан'}), 400
         
-        # Подтверждаем платеж
-        payment.status = 'approved'
-        payment.is_paid = True
-        payment.payment_date = datetime.utcnow()
-        payment.admin_notes = admin_notes
-        
         db.session.commit()
         
         # Отправляем уведомление пользователю
@@ -1044,7 +791,7 @@ def approve_payment(payment_id):
         
         return jsonify({'success': True, 'message': 'Платеж подтвержден'})
     except Exception as e:
-        logger.error(f"Error in approve_payment: {e}")
+        logger.error("Error in approve_payment: %s", e)
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/admin/payments/<int:payment_id>/reject', methods=['POST'])
@@ -1061,14 +808,10 @@ def reject_payment(payment_id):
         if not payment:
             return jsonify({'success': False, 'error': 'Платеж не найден'}), 404
         
-        if payment.status != 'pending':
+        # Отклоняем платеж (баланс подписки не меняется)
+        if not settle_payment(payment, 'rejected', admin_notes, session.get('user_id')):
             return jsonify({'success': False, 'error': 'Платеж уже обработан'}), 400
         
-        # Отклоняем платеж
-        payment.status = 'rejected'
-        payment.is_paid = False
-        payment.admin_notes = admin_notes
-        
         db.session.commit()
         
         # Отправляем уведомление пользователю
@@ -1076,7 +819,7 @@ def reject_payment(payment_id):
         
         return jsonify({'success': True, 'message': 'Платеж отклонен'})
     except Exception as e:
-        logger.error(f"Error in reject_payment: {e}")
+        logger.error("Error in reject_payment: %s", e)
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
@@ -1088,49 +831,7 @@ def admin_group_students(group_id):
             return jsonify({'success': False, 'error': 'Access denied'}), 403
         
         # Получаем всех участников с активными подписками в данной группе
-        subscriptions = Subscription.query.filter_by(
-            sport_group_id=group_id,
-            is_active=True
-        ).all()
-        
-        students_data = []
-        for subscription in subscriptions:
-            participant = subscription.participant
-            
-            # Получаем информацию о платежах (если есть)
-            payments = Payment.query.filter_by(subscription_id=subscription.id).all()
-            total_paid = sum(payment.amount for payment in payments if payment.status == 'approved')
-            
-            # Получаем код авторизации
-            latest_auth_code = AuthorizationCode.query.filter_by(participant_id=participant.id).order_by(AuthorizationCode.created_at.desc()).first()
-            auth_code_value = latest_auth_code.code if latest_auth_code else None
-            
-            # Вычисляем возраст
-            today = date.today()
-            age = today.year - participant.birth_date.year - ((today.month, today.day) < (participant.birth_date.month, participant.birth_date.day))
-            
-            students_data.append({
-                'participant_id': participant.id,
-                'participant_name': participant.full_name,
-                'parent_phone': participant.parent_phone,
-                'birth_date': participant.birth_date.strftime('%Y-%m-%d'),
-                'age': age,
-                'medical_certificate': participant.medical_certificate,
-                'discount_type': participant.discount_type,
-                'discount_percent': participant.discount_percent,
-                'authorization_code': auth_code_value,
-                'subscription_id': subscription.id,
-                'subscription_type': subscription.subscription_type,
-                'total_lessons': subscription.total_lessons,
-                'remaining_lessons': subscription.remaining_lessons,
-                'total_paid': total_paid,
-                'start_date': subscription.start_date.strftime('%Y-%m-%d'),
-                'end_date': subscription.end_date.strftime('%Y-%m-%d'),
-                'has_payments': total_paid > 0
-            })
-        
-        # Сортируем по имени участника
-        students_data.sort(key=lambda x: x['participant_name'])
+        students_data = build_group_roster(group_id)
         
         return jsonify({
             'success': True,
@@ -1138,7 +839,7 @@ def admin_group_students(group_id):
         })
         
     except Exception as e:
-        logger.error(f"Error in admin_group_students: {e}")
+        logger.error("Error in admin_group_students: %s", e)
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/admin/subscription/<int:subscription_id>/delete', methods=['DELETE'])
@@ -1157,7 +858,9 @@ def delete_subscription(subscription_id):
         sport_group = subscription.sport_group
         user = participant.user
         
-        # Удаляем связанные платежи
+        # Удаляем журнал баланса, отметки уведомлений и связанные платежи
+        SubscriptionLedgerEntry.query.filter_by(subscription_id=subscription_id).delete()
+        LowBalanceNotice.query.filter_by(subscription_id=subscription_id).delete()
         payments = Payment.query.filter_by(subscription_id=subscription_id).all()
         for payment in payments:
             db.session.delete(payment)
@@ -1173,11 +876,50 @@ def delete_subscription(subscription_id):
         
         return jsonify({'success': True, 'message': 'Подписка успешно удалена'})
     except Exception as e:
-        logger.error(f"Error in delete_subscription: {e}")
+        logger.error("Error in delete_subscription: %s", e)
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/admin/subscription/<int:subscription_id>/ledger', methods=['GET', 'POST'])
+def subscription_ledger(subscription_id):
+    """Журнал баланса подписки; POST - ручная корректировка {amount, lessons, note}"""
+    if session.get('role') != 'admin':
+        return jsonify({'success': False, 'error': 'Access denied'}), 403
+    
+    try:
+        subscription = Subscription.query.get(subscription_id)
+        if not subscription:
+            return jsonify({'success': False, 'error': 'Подписка не найдена'}), 404
+        
+        if request.method == 'POST':
+            data = request.get_json() or {}
+            try:
+                amount = int(data.get('amount') or 0)
+                lessons = int(data.get('lessons') or 0)
+            except (TypeError, ValueError):
+                raise ValueError('amount и lessons должны быть целыми числами')
+            if subscription.remaining_lessons + lessons < 0:
+                raise ValueError('Остаток занятий не может стать отрицательным')
+            adjust_balance(subscription.id, amount, lessons, data.get('note'), session.get('user_id'))
+            db.session.commit()
+        
+        return jsonify({
+            'success': True,
+            'subscription_id': subscription.id,
+            'paid_total': subscription.paid_total,
+            'remaining_lessons': subscription.remaining_lessons,
+            'entries': load_ledger(subscription.id)
+        })
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        logger.error("Error in subscription_ledger: %s", e)
         return jsonify({'success': False, 'error': str(e)}), 500
 
 # Скидки и акции - публичный список для всех пользователей
 @app.route('/api/discounts', methods=['GET'])
+@read_replica
 def list_discounts():
     try:
         # Только активные скидки для обычных пользователей
@@ -1190,13 +932,13 @@ def list_discounts():
                 'description': d.description,
                 'discount_type': d.discount_type,
                 'discount_percent': d.discount_percent,
-                'start_date': d.start_date.strftime('%Y-%m-%d') if d.start_date else None,
-                'end_date': d.end_date.strftime('%Y-%m-%d') if d.end_date else None,
+                'start_date': d.start_date,
+                'end_date': d.end_date,
                 'is_active': d.is_active
             } for d in discounts]
         })
     except Exception as e:
-        logger.error(f"Error in list_discounts: {e}")
+        logger.error("Error in list_discounts: %s", e)
         return jsonify({'success': False, 'error': str(e)}), 500
 
 # Админ: управление скидками
@@ -1215,13 +957,13 @@ def admin_discounts():
                     'description': d.description,
                     'discount_type': d.discount_type,
                     'discount_percent': d.discount_percent,
-                    'start_date': d.start_date.strftime('%Y-%m-%d') if d.start_date else None,
-                    'end_date': d.end_date.strftime('%Y-%m-%d') if d.end_date else None,
+                    'start_date': d.start_date,
+                    'end_date': d.end_date,
                     'is_active': d.is_active
                 } for d in discounts]
             })
         except Exception as e:
-            logger.error(f"Error in admin_discounts GET: {e}")
+            logger.error("Error in admin_discounts GET: %s", e)
             return jsonify({'success': False, 'error': str(e)}), 500
     else:
         try:
@@ -1239,7 +981,7 @@ def admin_discounts():
             db.session.commit()
             return jsonify({'success': True, 'discount_id': discount.id})
         except Exception as e:
-            logger.error(f"Error in admin_discounts POST: {e}")
+            logger.error("Error in admin_discounts POST: %s", e)
             return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/admin/discounts/<int:discount_id>', methods=['PUT', 'DELETE'])
@@ -1271,7 +1013,7 @@ def admin_discounts_update(discount_id):
         db.session.commit()
         return jsonify({'success': True})
     except Exception as e:
-        logger.error(f"Error in admin_discounts_update: {e}")
+        logger.error("Error in admin_discounts_update: %s", e)
         return jsonify({'success': False, 'error': str(e)}), 500
 
 # Маршруты для родителей
@@ -1286,66 +1028,35 @@ def parent_contact():
         }
         return jsonify({'success': True, 'contact_info': contact})
     except Exception as e:
-        logger.error(f"Error in parent_contact: {e}")
+        logger.error("Error in parent_contact: %s", e)
         return jsonify({'success': False, 'error': 'Failed to load contact info'}), 500
 
 @app.route('/api/participants')
-def get_participants():
+@read_replica
+@parent_access
+def get_participants(access):
     """Получить список участников пользователя"""
     try:
-        user_id = session.get('user_id')
-        if not user_id:
-            return jsonify({'success': False, 'error': 'Unauthorized'}), 403
-        
-        # Получаем авторизованных участников пользователя
-        auth_codes = AuthorizationCode.query.filter_by(
-            used_by_user_id=user_id,
-            is_used=True
-        ).all()
-        
-        participants = [auth_code.participant for auth_code in auth_codes]
-        
+        # Авторизованные участники пользователя из кэша доступа
         return jsonify({
             'success': True,
-            'participants': [{
-                'id': participant.id,
-                'full_name': participant.full_name,
-                'parent_phone': participant.parent_phone,
-                'birth_date': participant.birth_date.strftime('%Y-%m-%d'),
-                'medical_certificate': participant.medical_certificate,
-                'discount_type': participant.discount_type,
-                'discount_percent': participant.discount_percent
-            } for participant in participants]
+            'participants': [participant.to_dict() for participant in access.values()]
         })
     except Exception as e:
-        logger.error(f"Error in get_participants: {e}")
+        logger.error("Error in get_participants: %s", e)
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/parent/payment', methods=['POST'])
-def parent_payment():
+@parent_access
+def parent_payment(access):
     """Оплата занятий"""
     try:
         data = request.get_json()
-        user_id = session.get('user_id')
-        
-        if not user_id:
-            return jsonify({'success': False, 'error': 'Unauthorized'}), 403
-        
-        # Проверяем, что пользователь имеет доступ к участнику
-        auth_code = AuthorizationCode.query.filter_by(
-            participant_id=data['participant_id'],
-            used_by_user_id=user_id,
-            is_used=True
-        ).first()
         
-        if not auth_code:
+        # Проверяем, что пользователь имеет доступ к участнику (удаленные участники из карты доступа исключаются)
+        if int(data['participant_id']) not in access:
             return jsonify({'success': False, 'error': 'Нет доступа к указанному участнику'}), 403
         
-        # Проверяем, что участник существует
-        participant = Participant.query.get(data['participant_id'])
-        if not participant:
-            return jsonify({'success': False, 'error': 'Участник не найден'}), 404
-        
         # Создаем подписку
         subscription = Subscription(
             participant_id=data['participant_id'],
@@ -1377,7 +1088,7 @@ def parent_payment():
         
         return jsonify({'success': True, 'payment_id': payment.id, 'message': 'Платеж создан и ожидает подтверждения администратора'})
     except Exception as e:
-        logger.error(f"Error in parent_payment: {e}")
+        logger.error("Error in parent_payment: %s", e)
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/parent/transfer', methods=['POST'])
@@ -1398,7 +1109,7 @@ def parent_transfer():
         
         return jsonify({'success': True, 'transfer_id': transfer.id})
     except Exception as e:
-        logger.error(f"Error in parent_transfer: {e}")
+        logger.error("Error in parent_transfer: %s", e)
         return jsonify({'success': False, 'error': str(e)}), 500
 
 # API endpoints для системы посещаемости
@@ -1420,56 +1131,30 @@ def admin_attendance_groups():
             } for group in groups]
         })
     except Exception as e:
-        logger.error(f"Error in admin_attendance_groups: {e}")
+        logger.error("Error in admin_attendance_groups: %s", e)
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/admin/attendance/schedule/<int:group_id>')
 def admin_attendance_schedule(group_id):
-    """Получить расписание группы для учета посещаемости"""
+    """Получить календарь занятий группы для учета посещаемости (параметры from/to)"""
     try:
         if session.get('role') != 'admin':
             return jsonify({'success': False, 'error': 'Access denied'}), 403
         
-        # Получаем расписание группы
-        schedules = Schedule.query.filter_by(sport_group_id=group_id).all()
-        
-        # Генерируем даты на ближайшие 4 недели
-        today = date.today()
-        dates = []
-        day_names = ['Понедельник', 'Вторник', 'Среда', 'Четверг', 'Пятница', 'Суббота', 'Воскресенье']
-        
-        for i in range(28):  # 4 недели
-            current_date = today + timedelta(days=i)
-            day_of_week = current_date.weekday()
-            
-            # Проверяем, есть ли занятия в этот день недели
-            for schedule in schedules:
-                if schedule.day_of_week == day_of_week:
-                    # Проверяем, создана ли уже запись посещаемости
-                    existing_attendance = Attendance.query.filter_by(
-                        sport_group_id=group_id,
-                        lesson_date=current_date
-                    ).first()
-                    
-                    dates.append({
-                        'date': current_date.strftime('%Y-%m-%d'),
-                        'day_name': day_names[day_of_week],
-                        'day_number': current_date.day,
-                        'month': current_date.strftime('%B'),
-                        'year': current_date.year,
-                        'start_time': schedule.start_time.strftime('%H:%M'),
-                        'end_time': schedule.end_time.strftime('%H:%M'),
-                        'has_attendance': existing_attendance is not None,
-                        'is_completed': existing_attendance.is_completed if existing_attendance else False
-                    })
-                    break
+        # Окно календаря: from/to (YYYY-MM-DD), по умолчанию 4 недели с сегодняшнего дня
+        start, end = parse_window(request.args)
+        lessons = build_lesson_calendar(group_id, start, end)
         
         return jsonify({
             'success': True,
-            'dates': dates
+            'from': start,
+            'to': end,
+            'dates': [lesson.to_dict() for lesson in lessons]
         })
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
-        logger.error(f"Error in admin_attendance_schedule: {e}")
+        logger.error("Error in admin_attendance_schedule: %s", e)
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/admin/attendance/participants/<int:group_id>/<date>')
@@ -1515,6 +1200,9 @@ def admin_attendance_participants(group_id, date):
                 end_time=schedule.end_time
             )
             db.session.add(attendance)
+            db.session.flush()
+            # Занятие попадает в статистику группы сразу, с нулевыми счетчиками
+            refresh_lesson_stats([attendance.id])
             db.session.commit()
         
         # Получаем записи посещаемости
@@ -1534,7 +1222,7 @@ def admin_attendance_participants(group_id, date):
             'is_completed': attendance.is_completed
         })
     except Exception as e:
-        logger.error(f"Error in admin_attendance_participants: {e}")
+        logger.error("Error in admin_attendance_participants: %s", e)
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/admin/attendance/save', methods=['POST'])
@@ -1548,185 +1236,28 @@ def admin_attendance_save():
         attendance_id = data['attendance_id']
         participants_data = data['participants']
         
-        # Обновляем записи посещаемости
-        for participant_data in participants_data:
-            participant_id = participant_data['id']
-            is_present = participant_data['is_present']
-            absence_reason = participant_data.get('absence_reason', 'unexcused') if not is_present else None
-            
-            # Находим или создаем запись
-            record = AttendanceRecord.query.filter_by(
-                attendance_id=attendance_id,
-                participant_id=participant_id
-            ).first()
-            
-            if not record:
-                record = AttendanceRecord(
-                    attendance_id=attendance_id,
-                    participant_id=participant_id,
-                    is_present=is_present,
-                    absence_reason=absence_reason
-                )
-                db.session.add(record)
-            else:
-                record.is_present = is_present
-                record.absence_reason = absence_reason
-        
-        # Отмечаем занятие как завершенное
         attendance = Attendance.query.get(attendance_id)
-        attendance.is_completed = True
-        
-        # Уменьшаем количество оставшихся занятий у участников
-        for participant_data in participants_data:
-            participant_id = participant_data['id']
-            is_present = participant_data['is_present']
-            
-            # Находим активную подписку участника в этой группе
-            subscription = Subscription.query.filter_by(
-                participant_id=participant_id,
-                sport_group_id=attendance.sport_group_id,
-                is_active=True
-            ).first()
-            
-            # Логируем для отладки
-            participant = Participant.query.get(participant_id)
-            logger.info(f"Processing attendance for participant {participant.full_name if participant else participant_id}, present: {is_present}, subscription found: {subscription is not None}")
-            
-            if subscription and subscription.remaining_lessons > 0:
-                logger.info(f"Processing subscription for {participant.full_name}, remaining lessons: {subscription.remaining_lessons}")
-                logger.info(f"Subscription ID: {subscription.id}, Group: {subscription.sport_group.name}")
-            else:
-                if not subscription:
-                    logger.warning(f"No active subscription found for {participant.full_name} in group {attendance.sport_group_id}")
-                    continue
-                elif subscription.remaining_lessons <= 0:
-                    logger.warning(f"No remaining lessons for {participant.full_name}, current: {subscription.remaining_lessons}")
-                    continue
-                # Уменьшаем количество занятий для присутствующих участников
-                if is_present:
-                    old_remaining = subscription.remaining_lessons
-                    subscription.remaining_lessons -= 1
-                    logger.info(f"Decreased lessons for {participant.full_name}: {old_remaining} -> {subscription.remaining_lessons}")
-                    
-                    # Принудительно обновляем объект в сессии
-                    db.session.add(subscription)
-                    db.session.flush()
-                    
-                    participant = subscription.participant
-                    
-                    # Находим пользователя через коды авторизации
-                    auth_code = AuthorizationCode.query.filter_by(
-                        participant_id=participant.id,
-                        is_used=True
-                    ).first()
-                    
-                    logger.info(f"Looking for auth code for participant {participant.full_name} (ID: {participant.id})")
-                    logger.info(f"Found auth code: {auth_code is not None}")
-                    
-                    if auth_code:
-                        logger.info(f"Auth code used by user ID: {auth_code.used_by_user_id}")
-                        logger.info(f"Used by user: {auth_code.used_by_user is not None}")
-                        if auth_code.used_by_user:
-                            logger.info(f"User telegram ID: {auth_code.used_by_user.telegram_id}")
-                    
-                    if auth_code and auth_code.used_by_user and auth_code.used_by_user.telegram_id:
-                        user = auth_code.used_by_user
-                        logger.info(f"Sending notification to user {user.id} with telegram_id {user.telegram_id}")
-                        logger.info(f"User username: {user.username}, role: {user.role}")
-                        
-                        # Уведомление о посещении занятия
-                        present_message = f"✅ {participant.full_name} посетил тренировку {attendance.lesson_date.strftime('%d.%m.%Y')} в группе '{attendance.sport_group.name}'. Осталось: {subscription.remaining_lessons} занятий."
-                        logger.info(f"Sending message: {present_message}")
-                        send_telegram_notification(user.telegram_id, present_message)
-                        
-                        # Если осталось 1 занятие или меньше, отправляем дополнительное уведомление
-                        if subscription.remaining_lessons <= 1:
-                            parent_message = f"⚠️ Внимание! У {participant.full_name} осталось {subscription.remaining_lessons} оплаченных занятий в группе '{attendance.sport_group.name}'. Пожалуйста, пополните баланс."
-                            send_telegram_notification(user.telegram_id, parent_message)
-                    else:
-                        logger.warning(f"No authorized user found for participant {participant.full_name}")
-                        if auth_code:
-                            logger.warning(f"Auth code exists but no user or telegram_id")
-                        else:
-                            logger.warning(f"No auth code found for participant {participant.id}")
-                
-                # Для отсутствующих участников списываем занятие только при неуважительной причине
-                elif not is_present and absence_reason == 'unexcused':
-                    old_remaining = subscription.remaining_lessons
-                    subscription.remaining_lessons -= 1
-                    logger.info(f"Decreased lessons for absent {participant.full_name}: {old_remaining} -> {subscription.remaining_lessons}")
-                    
-                    # Принудительно обновляем объект в сессии
-                    db.session.add(subscription)
-                    db.session.flush()
-                    
-                    participant = subscription.participant
-                    
-                    # Находим пользователя через коды авторизации
-                    auth_code = AuthorizationCode.query.filter_by(
-                        participant_id=participant.id,
-                        is_used=True
-                    ).first()
-                    
-                    if auth_code and auth_code.used_by_user and auth_code.used_by_user.telegram_id:
-                        user = auth_code.used_by_user
-                        
-                        # Уведомление о прогуле и списании занятия
-                        absence_message = f"❌ {participant.full_name} отсутствовал на занятии {attendance.lesson_date.strftime('%d.%m.%Y')} в группе '{attendance.sport_group.name}' без уважительной причины. Занятие списано. Осталось: {subscription.remaining_lessons} занятий."
-                        send_telegram_notification(user.telegram_id, absence_message)
-                        
-                        # Если осталось 1 занятие или меньше, отправляем дополнительное уведомление
-                        if subscription.remaining_lessons <= 1:
-                            parent_message = f"⚠️ Внимание! У {participant.full_name} осталось {subscription.remaining_lessons} оплаченных занятий в группе '{attendance.sport_group.name}'. Пожалуйста, пополните баланс."
-                            send_telegram_notification(user.telegram_id, parent_message)
-                    else:
-                        logger.warning(f"No authorized user found for participant {participant.full_name}")
-                
-                # Для отсутствующих с уважительной причиной отправляем уведомление без списания
-                elif not is_present and absence_reason == 'excused':
-                    participant = subscription.participant
-                    
-                    # Находим пользователя через коды авторизации
-                    auth_code = AuthorizationCode.query.filter_by(
-                        participant_id=participant.id,
-                        is_used=True
-                    ).first()
-                    
-                    if auth_code and auth_code.used_by_user and auth_code.used_by_user.telegram_id:
-                        user = auth_code.used_by_user
-                        
-                        # Уведомление об отсутствии с уважительной причиной
-                        absence_message = f"ℹ️ {participant.full_name} отсутствовал на занятии {attendance.lesson_date.strftime('%d.%m.%Y')} в группе '{attendance.sport_group.name}' по уважительной причине. Занятие не списано. Осталось: {subscription.remaining_lessons} занятий."
-                        send_telegram_notification(user.telegram_id, absence_message)
-                    else:
-                        logger.warning(f"No authorized user found for participant {participant.full_name}")
+        if not attendance:
+            return jsonify({'success': False, 'error': 'Занятие не найдено'}), 404
         
-        db.session.commit()
+        # Отметки, списание и возврат занятий - одной транзакцией
+        try:
+            events = save_attendance(attendance, participants_data)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
         
-        # Проверяем, что изменения сохранились
-        for participant_data in participants_data:
-            participant_id = participant_data['id']
-            is_present = participant_data['is_present']
-            
-            # Принудительно обновляем из базы данных
-            db.session.expire_all()
-            
-            subscription = Subscription.query.filter_by(
-                participant_id=participant_id,
-                sport_group_id=attendance.sport_group_id,
-                is_active=True
-            ).first()
-            
-            if subscription:
-                participant = Participant.query.get(participant_id)
-                logger.info(f"After commit: {participant.full_name} has {subscription.remaining_lessons} lessons remaining")
+        charged_count = sum(1 for event in events if event.charged)
+        refunded_count = sum(1 for event in events if event.refunded)
+        logger.info("Attendance %s saved: %s records, %s lessons charged, %s refunded", attendance_id, len(events), charged_count, refunded_count)
         
-        # Отправляем уведомления родителям о посещаемости
-        send_attendance_notifications(attendance_id)
+        # Уведомления родителям: одно сообщение на чат по всем детям
+        send_attendance_digest(attendance, events)
         
         return jsonify({'success': True})
     except Exception as e:
-        logger.error(f"Error in admin_attendance_save: {e}")
+        logger.error("Error in admin_attendance_save: %s", e)
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/admin/attendance/stats/<int:group_id>')
@@ -1736,76 +1267,57 @@ def admin_attendance_stats(group_id):
         if session.get('role') != 'admin':
             return jsonify({'success': False, 'error': 'Access denied'}), 403
         
-        # Получаем все записи посещаемости группы
-        attendances = Attendance.query.filter_by(sport_group_id=group_id).all()
-        
-        stats = {}
-        for attendance in attendances:
-            date_str = attendance.lesson_date.strftime('%Y-%m-%d')
-            total_participants = len(attendance.records)
-            present_count = sum(1 for record in attendance.records if record.is_present)
-            
-            stats[date_str] = {
-                'date': date_str,
-                'day_name': ['Понедельник', 'Вторник', 'Среда', 'Четверг', 'Пятница', 'Суббота', 'Воскресенье'][attendance.day_of_week],
-                'total': total_participants,
-                'present': present_count,
-                'absent': total_participants - present_count,
-                'percentage': round((present_count / total_participants * 100) if total_participants > 0 else 0, 1)
-            }
-        
+        # Статистика из сводки по занятиям (attendance_stats.py)
         return jsonify({
             'success': True,
-            'stats': list(stats.values())
+            'stats': load_group_lesson_stats(group_id)
         })
     except Exception as e:
-        logger.error(f"Error in admin_attendance_stats: {e}")
+        logger.error("Error in admin_attendance_stats: %s", e)
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/parent/attendance/<int:participant_id>')
-def parent_attendance(participant_id):
+@read_replica
+@parent_access
+def parent_attendance(participant_id, access):
     """Получить статистику посещаемости для родителя"""
     try:
-        user_id = session.get('user_id')
-        if not user_id:
-            return jsonify({'success': False, 'error': 'Unauthorized'}), 403
-        
         # Проверяем, что у пользователя есть доступ к участнику через авторизацию
-        auth_code = AuthorizationCode.query.filter_by(
-            participant_id=participant_id,
-            used_by_user_id=user_id,
-            is_used=True
-        ).first()
-        
-        if not auth_code:
+        participant = access.get(participant_id)
+        if participant is None:
             return jsonify({'success': False, 'error': 'Нет доступа к участнику'}), 403
         
-        participant = auth_code.participant
-        
-        # Получаем записи посещаемости участника
-        records = AttendanceRecord.query.filter_by(participant_id=participant_id).all()
+        # Отметки участника одним запросом с данными занятия и группы
+        records = db.session.query(
+            Attendance.lesson_date,
+            Attendance.day_of_week,
+            Attendance.start_time,
+            Attendance.end_time,
+            SportGroup.name,
+            AttendanceRecord.is_present
+        ).join(Attendance, Attendance.id == AttendanceRecord.attendance_id).join(
+            SportGroup, SportGroup.id == Attendance.sport_group_id
+        ).filter(AttendanceRecord.participant_id == participant_id).order_by(Attendance.lesson_date)
         
         stats = {}
-        for record in records:
-            attendance = record.attendance
-            date_str = attendance.lesson_date.strftime('%Y-%m-%d')
-            
-            stats[date_str] = {
-                'date': date_str,
-                'day_name': ['Понедельник', 'Вторник', 'Среда', 'Четверг', 'Пятница', 'Суббота', 'Воскресенье'][attendance.day_of_week],
-                'sport_group': attendance.sport_group.name,
-                'is_present': record.is_present,
-                'start_time': attendance.start_time.strftime('%H:%M'),
-                'end_time': attendance.end_time.strftime('%H:%M')
+        for lesson_date, day_of_week, start_time, end_time, group_name, is_present in records:
+            stats[lesson_date] = {
+                'date': lesson_date,
+                'day_name': DAY_NAMES[day_of_week],
+                'sport_group': group_name,
+                'is_present': is_present,
+                'start_time': start_time,
+                'end_time': end_time
             }
         
         return jsonify({
             'success': True,
             'participant_name': participant.full_name,
-            'stats': list(stats.values())
+            'stats': list(stats.values()),
+            'monthly': load_participant_monthly_stats(participant_id)
         })
     except Exception as e:
-        logger.error(f"Error in parent_attendance: {e}")
+        logger.error("Error in parent_attendance: %s", e)
         return jsonify({'success': False, 'error': str(e)}), 500
 
 # API endpoints для учета финансов
@@ -1817,46 +1329,42 @@ def admin_group_participants(group_id):
         if session.get('role') != 'admin':
             return jsonify({'success': False, 'error': 'Access denied'}), 403
         
-        # Получаем участников группы с их подписками
-        participants = Participant.query.join(Subscription).filter(
+        # Участники группы вместе с активной подпиской одним запросом;
+        # сумма оплат хранится в подписке (журнал баланса, ledger.py)
+        rows = db.session.query(Participant, Subscription).join(
+            Subscription, Subscription.participant_id == Participant.id
+        ).filter(
             Subscription.sport_group_id == group_id,
             Subscription.is_active == True
-        ).all()
+        ).order_by(Subscription.id).all()
         
         participants_data = []
-        for participant in participants:
-            # Получаем активную подписку участника
-            subscription = Subscription.query.filter_by(
-                participant_id=participant.id,
-                sport_group_id=group_id,
-                is_active=True
-            ).first()
+        seen = set()
+        today = date.today()
+        for participant, subscription in rows:
+            # Берем первую активную подписку участника в группе
+            if participant.id in seen:
+                continue
+            seen.add(participant.id)
+            total_paid = subscription.paid_total
+            age = today.year - participant.birth_date.year - ((today.month, today.day) < (participant.birth_date.month, participant.birth_date.day))
             
-            if subscription:
-                # Получаем информацию о платежах
-                payments = Payment.query.filter_by(subscription_id=subscription.id).all()
-                total_paid = sum(payment.amount for payment in payments if payment.status == 'approved')
-                
-                # Вычисляем возраст
-                today = date.today()
-                age = today.year - participant.birth_date.year - ((today.month, today.day) < (participant.birth_date.month, participant.birth_date.day))
-                
-                participants_data.append({
-                    'id': participant.id,
-                    'full_name': participant.full_name,
-                    'parent_phone': participant.parent_phone,
-                    'birth_date': participant.birth_date.strftime('%Y-%m-%d'),
-                    'age': age,
-                    'subscription_type': subscription.subscription_type,
-                    'total_lessons': subscription.total_lessons,
-                    'remaining_lessons': subscription.remaining_lessons,
-                    'total_paid': total_paid,
-                    'start_date': subscription.start_date.strftime('%Y-%m-%d'),
-                    'end_date': subscription.end_date.strftime('%Y-%m-%d'),
-                    'is_active': subscription.is_active,
-                    'needs_notification': subscription.remaining_lessons <= 1,
-                    'has_payments': total_paid > 0
-                })
+            participants_data.append({
+                'id': participant.id,
+                'full_name': participant.full_name,
+                'parent_phone': participant.parent_phone,
+                'birth_date': participant.birth_date,
+                'age': age,
+                'subscription_type': subscription.subscription_type,
+                'total_lessons': subscription.total_lessons,
+                'remaining_lessons': subscription.remaining_lessons,
+                'total_paid': total_paid,
+                'start_date': subscription.start_date,
+                'end_date': subscription.end_date,
+                'is_active': subscription.is_active,
+                'needs_notification': subscription.remaining_lessons <= 1,
+                'has_payments': total_paid > 0
+            })
         
         return jsonify({
             'success': True,
@@ -1864,48 +1372,42 @@ def admin_group_participants(group_id):
         })
         
     except Exception as e:
-        logger.error(f"Error in admin_group_participants: {e}")
+        logger.error("Error in admin_group_participants: %s", e)
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/parent/financial-info')
-def parent_financial_info():
+@read_replica
+@parent_access
+def parent_financial_info(access):
     """Получить финансовую информацию для родителя"""
     try:
-        user_id = session.get('user_id')
-        if not user_id:
-            return jsonify({'success': False, 'error': 'Unauthorized'}), 403
-        
-        # Получаем авторизованных участников пользователя
-        auth_codes = AuthorizationCode.query.filter_by(
-            used_by_user_id=user_id,
-            is_used=True
-        ).all()
+        # Активные подписки всех авторизованных участников одним запросом
+        subscriptions_by_participant = {}
+        if access:
+            rows = db.session.query(Subscription, SportGroup.name).join(
+                SportGroup, SportGroup.id == Subscription.sport_group_id
+            ).filter(
+                Subscription.participant_id.in_(list(access)),
+                Subscription.is_active == True
+            ).order_by(Subscription.id)
+            for subscription, group_name in rows:
+                subscriptions_by_participant.setdefault(subscription.participant_id, []).append((subscription, group_name))
         
         financial_data = []
-        for auth_code in auth_codes:
-            participant = auth_code.participant
-            
-            # Получаем активные подписки участника
-            subscriptions = Subscription.query.filter_by(
-                participant_id=participant.id,
-                is_active=True
-            ).all()
-            
+        for participant in access.values():
             participant_subscriptions = []
-            for subscription in subscriptions:
-                # Получаем информацию о подтвержденных платежах
-                payments = Payment.query.filter_by(subscription_id=subscription.id, status='approved').all()
-                total_paid = sum(payment.amount for payment in payments)
+            for subscription, group_name in subscriptions_by_participant.get(participant.id, []):
+                total_paid = subscription.paid_total
                 
                 participant_subscriptions.append({
                     'subscription_id': subscription.id,
-                    'sport_group_name': subscription.sport_group.name,
+                    'sport_group_name': group_name,
                     'subscription_type': subscription.subscription_type,
                     'total_lessons': subscription.total_lessons,
                     'remaining_lessons': subscription.remaining_lessons,
                     'total_paid': total_paid,
-                    'start_date': subscription.start_date.strftime('%Y-%m-%d'),
-                    'end_date': subscription.end_date.strftime('%Y-%m-%d'),
+                    'start_date': subscription.start_date,
+                    'end_date': subscription.end_date,
                     'needs_notification': subscription.remaining_lessons <= 1
                 })
             
@@ -1921,45 +1423,109 @@ def parent_financial_info():
         })
         
     except Exception as e:
-        logger.error(f"Error in parent_financial_info: {e}")
+        logger.error("Error in parent_financial_info: %s", e)
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/admin/metrics', methods=['GET', 'DELETE'])
+def admin_metrics():
+    """
+    Метрики маршрутов: запросы, время обработки и SQL (только для администратора).
+    DELETE возвращает накопленный снимок и сбрасывает счетчики.
+    """
+    if session.get('role') != 'admin':
+        return jsonify({'success': False, 'error': 'Access denied'}), 403
+    
+    return jsonify({'success': True, 'metrics': metrics_snapshot(app, reset=request.method == 'DELETE')})
+
+@app.route('/api/admin/profiler', methods=['GET', 'POST', 'DELETE'])
+def admin_profiler():
+    """
+    Сэмплирующий профайлер воркера (только для администратора).
+    POST {pattern, requests, seconds, interval_ms} - включить для путей по шаблону
+    (fnmatch, например /api/admin/*), GET - состояние, DELETE - остановить.
+    """
+    if session.get('role') != 'admin':
+        return jsonify({'success': False, 'error': 'Access denied'}), 403
+    
+    profiler = get_profiler(app)
+    try:
+        if request.method == 'POST':
+            data = request.get_json() or {}
+            profiler.start(
+                pattern=data.get('pattern') or '*',
+                max_requests=int(data['requests']) if data.get('requests') else None,
+                seconds=float(data['seconds']) if data.get('seconds') else None,
+                interval_ms=float(data.get('interval_ms') or 10)
+            )
+        elif request.method == 'DELETE':
+            profiler.stop()
+        return jsonify({'success': True, 'profiler': profiler.status()})
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        logger.error("Error in admin_profiler: %s", e)
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/admin/profiler/profile.folded')
+def admin_profiler_download():
+    """Скачать профиль в формате collapsed stacks (flamegraph.pl, speedscope)"""
+    if session.get('role') != 'admin':
+        return jsonify({'success': False, 'error': 'Access denied'}), 403
+    
+    response = app.response_class(get_profiler(app).collapsed(), mimetype='text/plain')
+    response.headers['Content-Disposition'] = f"attachment; filename=profile-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}.folded"
+    return response
+
 @app.route('/api/admin/check-low-balance')
 def admin_check_low_balance():
-    """Проверить участников с низким балансом и отправить уведомления"""
+    """
+    Запустить проверку низкого баланса сейчас. Уведомления ставятся в очередь
+    доставки; подписки, уже получившие уведомление на своем пороге, пропускаются
+    """
     try:
         if session.get('role') != 'admin':
             return jsonify({'success': False, 'error': 'Access denied'}), 403
         
-        # Получаем всех участников с остатком 1 занятие или меньше
-        low_balance_subscriptions = Subscription.query.filter(
-            Subscription.remaining_lessons <= 1,
-            Subscription.is_active == True
-        ).all()
+        state = get_scheduler(app).run_pending(['low_balance_notices'], force=True)['low_balance_notices']
+        if state['status'] != 'ok':
+            return jsonify({'success': False, 'error': state['error']}), 500
         
-        notifications_sent = 0
-        for subscription in low_balance_subscriptions:
-            participant = subscription.participant
-            user = participant.user
-            
-            # Отправляем уведомление родителю
-            message = f"⚠️ Внимание! У {participant.full_name} осталось {subscription.remaining_lessons} оплаченных занятий в группе '{subscription.sport_group.name}'. Пожалуйста, пополните баланс."
-            send_telegram_notification(user.telegram_id, message)
-            
-            # Отправляем уведомление администратору
-            admin_message = f"💰 Участник {participant.full_name} (тел: {participant.parent_phone}) имеет низкий баланс: {subscription.remaining_lessons} занятий в группе '{subscription.sport_group.name}'"
-            # Здесь можно добавить отправку администратору, если нужно
-            
-            notifications_sent += 1
+        low_balance_count = Subscription.query.filter(
+            Subscription.remaining_lessons <= max(app.config['LOW_BALANCE_THRESHOLDS'], default=1),
+            Subscription.is_active == True
+        ).count()
         
         return jsonify({
             'success': True,
-            'notifications_sent': notifications_sent,
-            'low_balance_count': len(low_balance_subscriptions)
+            'notifications_sent': state['result']['messages'],
+            'subscriptions_notified': state['result']['notices'],
+            'low_balance_count': low_balance_count
         })
         
     except Exception as e:
-        logger.error(f"Error in admin_check_low_balance: {e}")
+        logger.error("Error in admin_check_low_balance: %s", e)
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/admin/jobs', methods=['GET', 'POST'])
+def admin_jobs():
+    """Состояние фоновых задач; POST {"job": name} запускает задачу сейчас"""
+    if session.get('role') != 'admin':
+        return jsonify({'success': False, 'error': 'Access denied'}), 403
+    
+    try:
+        scheduler = get_scheduler(app)
+        if request.method == 'POST':
+            name = (request.get_json() or {}).get('job')
+            if name not in scheduler.jobs:
+                return jsonify({'success': False, 'error': f'Неизвестная задача: {name}'}), 400
+            scheduler.run_pending([name], force=True)
+        return jsonify({
+            'success': True,
+            'scheduler_running': scheduler.running,
+            'jobs': scheduler.states()
+        })
+    except Exception as e:
+        logger.error("Error in admin_jobs: %s", e)
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/admin/update-sport-groups', methods=['POST'])
@@ -1979,7 +1545,7 @@ def update_sport_groups_api():
         })
         
     except Exception as e:
-        logger.error(f"Ошибка при обновлении спортивных групп: {e}")
+        logger.error("Ошибка при обновлении спортивных групп: %s", e)
         return jsonify({
             'success': False, 
             'error': f'Ошибка при обновлении: {str(e)}'
@@ -1999,6 +1565,7 @@ def reset_sport_groups_api():
         
         # Удаляем все существующие группы
         SportGroup.query.delete()
+        bump_catalog_version()
         db.session.commit()
         
         # Создаем новые группы
@@ -2010,7 +1577,7 @@ def reset_sport_groups_api():
         })
         
     except Exception as e:
-        logger.error(f"Ошибка при сбросе спортивных групп: {e}")
+        logger.error("Ошибка при сбросе спортивных групп: %s", e)
         return jsonify({
             'success': False, 
             'error': f'Ошибка при сбросе: {str(e)}'
@@ -2041,10 +1608,11 @@ def verify_authorization_code():
         if auth_code.is_used:
             return jsonify({'success': False, 'error': 'Код уже использован'}), 400
         
-        # Отмечаем код как использованный
+        # Отмечаем код как использованный; кэш доступа сбрасывается после коммита
         auth_code.is_used = True
         auth_code.used_by_user_id = user_id
         auth_code.used_at = datetime.utcnow()
+        bump_access_version()
         
         db.session.commit()
         
@@ -2054,36 +1622,18 @@ def verify_authorization_code():
         })
         
     except Exception as e:
-        logger.error(f"Error in verify_authorization_code: {e}")
+        logger.error("Error in verify_authorization_code: %s", e)
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/auth/participants')
-def get_authorized_participants():
+@read_replica
+@parent_access
+def get_authorized_participants(access):
     """Получить список авторизованных участников пользователя"""
     try:
-        user_id = session.get('user_id')
-        if not user_id:
-            return jsonify({'success': False, 'error': 'Unauthorized'}), 403
-        
-        # Получаем участников, к которым у пользователя есть доступ через коды авторизации
-        auth_codes = AuthorizationCode.query.filter_by(
-            used_by_user_id=user_id,
-            is_used=True
-        ).all()
-        
-        participants = []
-        for auth_code in auth_codes:
-            participant = auth_code.participant
-            participants.append({
-                'id': participant.id,
-                'full_name': participant.full_name,
-                'parent_phone': participant.parent_phone,
-                'birth_date': participant.birth_date.strftime('%Y-%m-%d'),
-                'medical_certificate': participant.medical_certificate,
-                'discount_type': participant.discount_type,
-                'discount_percent': participant.discount_percent,
-                'authorized_at': auth_code.used_at.strftime('%Y-%m-%d %H:%M')
-            })
+        # Участники, к которым у пользователя есть доступ через коды авторизации (из кэша доступа)
+        participants = [dict(participant.to_dict(), authorized_at=participant.authorized_at)
+                        for participant in access.values()]
         
         return jsonify({
             'success': True,
@@ -2091,31 +1641,17 @@ def get_authorized_participants():
         })
         
     except Exception as e:
-        logger.error(f"Error in get_authorized_participants: {e}")
+        logger.error("Error in get_authorized_participants: %s", e)
         return jsonify({'success': False, 'error': str(e)}), 500
 
-def send_attendance_notifications(attendance_id):
-    """Отправить уведомления родителям о посещаемости"""
+def send_attendance_digest(attendance, events):
+    """Отправить родителям сводку по сохранению занятия: одно сообщение на чат"""
     try:
-        attendance = Attendance.query.get(attendance_id)
-        if not attendance:
-            return
-        
-        for record in attendance.records:
-            participant = record.participant
-            user = participant.user
-            
-            # Формируем сообщение
-            if record.is_present:
-                message = f"✅ {participant.full_name} посетил тренировку {attendance.lesson_date.strftime('%d.%m.%Y')} в группе '{attendance.sport_group.name}'"
-            else:
-                message = f"❌ {participant.full_name} пропустил тренировку {attendance.lesson_date.strftime('%d.%m.%Y')} в группе '{attendance.sport_group.name}'"
-            
-            # Отправляем уведомление через Telegram Bot API
-            send_telegram_notification(user.telegram_id, message)
-            
+        messages = compose_attendance_digest(attendance, events)
+        notification_log.debug("Queueing attendance digest: %s messages for attendance %s", len(messages), attendance.id)
+        app.extensions['telegram_outbox'].enqueue_many(messages)
     except Exception as e:
-        logger.error(f"Error sending attendance notifications: {e}")
+        logger.error("Error sending attendance digest: %s", e)
 
 def send_payment_notification_to_admin(payment):
     """Отправить уведомление администратору о новом платеже"""
@@ -2147,7 +1683,7 @@ def send_payment_notification_to_admin(payment):
                 send_telegram_notification(admin.telegram_id, message)
                 
     except Exception as e:
-        logger.error(f"Error sending payment notification to admin: {e}")
+        logger.error("Error sending payment notification to admin: %s", e)
 
 def send_payment_confirmation_to_user(payment, status):
     """Отправить уведомление пользователю о статусе платежа"""
@@ -2187,40 +1723,22 @@ def send_payment_confirmation_to_user(payment, status):
             send_telegram_notification(user.telegram_id, message)
             
     except Exception as e:
-        logger.error(f"Error sending payment confirmation to user: {e}")
+        logger.error("Error sending payment confirmation to user: %s", e)
 
 def send_telegram_notification(telegram_id, message):
-    """Отправить уведомление через Telegram Bot API"""
+    """Поставить уведомление в очередь доставки Telegram Bot API"""
     try:
-        import requests
-        from config import Config
+        notification_log.debug("Queueing Telegram notification to %s", telegram_id)
         
-        logger.info(f"Attempting to send Telegram notification to {telegram_id}")
-        logger.info(f"Message: {message}")
-        
-        bot_token = Config.TELEGRAM_BOT_TOKEN
-        if not bot_token:
-            logger.warning("Telegram bot token not configured")
+        if not app.config.get('TELEGRAM_BOT_TOKEN'):
+            notification_log.warning("Telegram bot token not configured")
             return
         
-        url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
-        data = {
-            'chat_id': telegram_id,
-            'text': message,
-            'parse_mode': 'HTML'
-        }
-        
-        logger.info(f"Sending request to Telegram API: {url}")
-        response = requests.post(url, json=data)
-        logger.info(f"Telegram API response status: {response.status_code}")
-        
-        if response.status_code != 200:
-            logger.error(f"Failed to send Telegram notification: {response.text}")
-        else:
-            logger.info(f"Telegram notification sent successfully to {telegram_id}")
+        # Отправка выполняется фоновыми потоками, обработчик запроса не ждет ответа API
+        app.extensions['telegram_outbox'].enqueue(telegram_id, message)
             
     except Exception as e:
-        logger.error(f"Error sending Telegram notification: {e}")
+        logger.error("Error queueing Telegram notification: %s", e)
 
 @app.route('/api/enroll-request', methods=['POST'])
 def enroll_request():
@@ -2257,8 +1775,11 @@ def enroll_request():
             pass
         return jsonify({'success': True})
     except Exception as e:
-        logger.error(f"Error in enroll_request: {e}")
+        logger.error("Error in enroll_request: %s", e)
         return jsonify({'success': False, 'error': str(e)}), 500
 
 if __name__ == '__main__':
+    # Для локального запуска загружаем группы сразу (пропускается, если данные не менялись)
+    with app.app_context():
+        seed_sport_groups()
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,244 @@
+"""
+Сборка статики: минификация и имена файлов с хэшем содержимого.
+
+Команда `flask --app app build-assets` минифицирует все .js и .css из
+папки static (без Node.js: простые минификаторы ниже удаляют комментарии
+и лишние пробелы, сохраняя переводы строк, от которых зависит
+автоматическая вставка точек с запятой в JS) и записывает их в
+static/dist под именами вида js/app.<хэш>.js. Соответствие исходных имен
+собранным сохраняется в static/dist/manifest.json.
+
+Манифест читается один раз при старте; в шаблонах адреса берутся
+функцией asset_url('js/app.js'). Без манифеста (сборка не выполнялась) и в
+режиме отладки asset_url отдает исходный файл.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+
+from flask import url_for
+
+logger = logging.getLogger(__name__)
+
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+
+# Символы и слова, после которых / начинает регулярное выражение, а не деление
+REGEX_PRECEDERS = set('(,=:[!&|?{};+-*%<>~^')
+REGEX_KEYWORD = re.compile(r'(?:^|[^\w$])(?:return|typeof|case|do|else|in|of|new|delete|void|throw|instanceof|yield|await)$')
+
+
+def _regex_allowed(out):
+    """Может ли / в текущей позиции начинать регулярное выражение"""
+    text = ''.join(out[-20:]).rstrip()
+    return not text or text[-1] in REGEX_PRECEDERS or REGEX_KEYWORD.search(text) is not None
+
+
+# Пробел рядом с этими символами не нужен; + - / . не входят: «a - -b», «a / /re/»
+JS_PUNCTUATION = set('{}()[];,:=<>?&|!*%^~')
+# После этих символов перевод строки не влияет на автоматическую вставку точки с запятой
+JS_CONTINUATION = ('{', ';', ',', '(', '[')
+
+
+def _newline(out):
+    """Перевод строки без пустых строк и пробелов в конце строки"""
+    while out and out[-1] == ' ':
+        out.pop()
+    if out and out[-1] != '\n' and out[-1] not in JS_CONTINUATION:
+        out.append('\n')
+
+
+def _space(out, space, chunk):
+    """Пробел перед chunk, если он отделяет слова"""
+    if space and out and out[-1] != '\n' and out[-1][-1] not in JS_PUNCTUATION and chunk[0] not in JS_PUNCTUATION:
+        out.append(' ')
+
+
+def minify_js(source):
+    """
+    Удаляет комментарии, отступы, пустые строки и пробелы, не разделяющие
+    слова. Строки, шаблонные строки и регулярные выражения копируются как есть.
+    """
+    out = []
+    templates = []  # Глубина фигурных скобок в каждом открытом ${...}
+    i, n = 0, len(source)
+    in_template = space = False
+    while i < n:
+        char = source[i]
+        if in_template:
+            if char == '\\':
+                out.append(source[i:i + 2])
+                i += 2
+                continue
+            if char == '`':
+                in_template = False
+            elif source.startswith('${', i):
+                templates.append(0)
+                in_template = False
+                out.append('${')
+                i += 2
+                continue
+            out.append(char)
+            i += 1
+            continue
+
+        nxt = source[i + 1] if i + 1 < n else ''
+        if char == '/' and nxt == '/':
+            end = source.find('\n', i)
+            i = n if end == -1 else end
+            continue
+        if char == '/' and nxt == '*':
+            end = source.find('*/', i + 2)
+            comment = source[i:n if end == -1 else end + 2]
+            i = n if end == -1 else end + 2
+            if '\n' in comment:
+                _newline(out)
+                space = False
+            else:
+                space = True
+            continue
+        if char == '\n':
+            _newline(out)
+            space = False
+            i += 1
+            continue
+        if char in (' ', '\t', '\r'):
+            space = True
+            i += 1
+            continue
+
+        if char in ('"', "'"):
+            end = i + 1
+            while end < n and source[end] != char and source[end] != '\n':
+                end += 2 if source[end] == '\\' else 1
+            chunk = source[i:end + 1]
+        elif char == '/' and _regex_allowed(out):
+            end, in_class = i + 1, False
+            while end < n and source[end] != '\n':
+                if source[end] == '\\':
+                    end += 2
+                    continue
+                if source[end] == '[':
+                    in_class = True
+                elif source[end] == ']':
+                    in_class = False
+                elif source[end] == '/' and not in_class:
+                    break
+                end += 1
+            chunk = source[i:end + 1]
+        else:
+            chunk = char
+            if char == '`':
+                in_template = True
+            elif templates and char == '{':
+                templates[-1] += 1
+            elif templates and char == '}':
+                if templates[-1] == 0:
+                    templates.pop()
+                    in_template = True
+                else:
+                    templates[-1] -= 1
+        _space(out, space, chunk)
+        space = False
+        out.append(chunk)
+        i += len(chunk)
+    _newline(out)
+    return ''.join(out).lstrip('\n')
+
+
+def minify_css(source):
+    """Удаляет комментарии и пробелы вокруг { } ; , > и после :"""
+    out = []
+    i, n = 0, len(source)
+    space = False
+    while i < n:
+        char = source[i]
+        if char in ('"', "'"):
+            end = i + 1
+            while end < n and source[end] != char:
+                end += 2 if source[end] == '\\' else 1
+            chunk = source[i:end + 1]
+            i = end + 1
+        elif source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            i = n if end == -1 else end + 2
+            continue
+        elif char.isspace():
+            space = True
+            i += 1
+            continue
+        else:
+            chunk = char
+            i += 1
+        if space and out and out[-1][-1] not in '{};,>:(' and chunk[0] not in '{};,>)':
+            out.append(' ')
+        space = False
+        if chunk == '}' and out and out[-1] == ';':
+            out.pop()
+        out.append(chunk)
+    return ''.join(out)
+
+
+MINIFIERS = {'.js': minify_js, '.css': minify_css}
+
+
+def build_assets(static_folder):
+    """
+    Минифицирует .js и .css из static_folder в static/dist с хэшем в имени,
+    удаляет прежнюю сборку и записывает манифест. Возвращает манифест:
+    исходное имя -> (собранное имя, размер до, размер после).
+    """
+    dist = os.path.join(static_folder, DIST_DIR)
+    if os.path.isdir(dist):
+        shutil.rmtree(dist)
+
+    report = {}
+    for directory, subdirs, files in os.walk(static_folder):
+        subdirs[:] = sorted(subdir for subdir in subdirs if os.path.join(directory, subdir) != dist)
+        for name in sorted(files):
+            base, ext = os.path.splitext(name)
+            if ext not in MINIFIERS:
+                continue
+            path = os.path.join(directory, name)
+            filename = os.path.relpath(path, static_folder).replace(os.sep, '/')
+            with open(path, encoding='utf-8') as f:
+                source = f.read()
+            minified = MINIFIERS[ext](source).encode('utf-8')
+            digest = hashlib.sha256(minified).hexdigest()[:12]
+            built = f"{DIST_DIR}/{os.path.dirname(filename) + '/' if os.path.dirname(filename) else ''}{base}.{digest}{ext}"
+            os.makedirs(os.path.dirname(os.path.join(static_folder, built)), exist_ok=True)
+            with open(os.path.join(static_folder, built), 'wb') as f:
+                f.write(minified)
+            report[filename] = (built, len(source.encode('utf-8')), len(minified))
+
+    with open(os.path.join(dist, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump({filename: built for filename, (built, _, _) in report.items()}, f, indent=2, sort_keys=True)
+    return report
+
+
+def load_manifest(static_folder):
+    """Манифест сборки или пустой словарь, если сборка не выполнялась"""
+    path = os.path.join(static_folder, DIST_DIR, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def init_assets(app):
+    """Читает манифест и регистрирует в шаблонах функцию asset_url"""
+    manifest = {} if app.debug or not app.has_static_folder else load_manifest(app.static_folder)
+    app.extensions['asset_manifest'] = manifest
+    if manifest:
+        logger.info("Asset manifest loaded: %s files", len(manifest))
+
+    def asset_url(filename):
+        """Адрес собранного файла из манифеста или исходного файла"""
+        return url_for('static', filename=manifest.get(filename, filename))
+
+    app.add_template_global(asset_url)
+    return manifest
@@ -0,0 +1,290 @@
+"""
+Сохранение посещаемости занятия.
+
+Все отметки занятия сохраняются одним пакетным upsert, а списание
+занятий выполняется условными UPDATE над набором подписок
+(remaining_lessons = remaining_lessons - 1 WHERE remaining_lessons > 0).
+Флаг AttendanceRecord.is_charged делает повторное сохранение того же
+занятия идемпотентным: занятие списывается не больше одного раза, а при
+смене отметки на «не списывать» возвращается на ту подписку, с которой
+было списано (по записи журнала для этого занятия). Сводки
+посещаемости (attendance_stats.py) и журнал баланса подписок (ledger.py)
+обновляются в той же транзакции.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+
+from sqlalchemy import select, update, func, or_, not_
+
+from models import db, Attendance, AttendanceRecord, Subscription, SubscriptionLedgerEntry, AuthorizationCode, User
+from attendance_stats import refresh_attendance_stats
+from ledger import record_lesson_entries, ENTRY_LESSON_DEBITED, ENTRY_LESSON_REFUNDED
+
+
+@dataclass
+class AttendanceEvent:
+    """Результат сохранения отметки одного участника"""
+    participant_id: int
+    is_present: bool
+    absence_reason: str
+    changed: bool  # Отметка новая или отличается от сохраненной ранее
+    charged: bool  # Занятие списано этим сохранением
+    refunded: bool  # Ранее списанное занятие возвращено
+    remaining_lessons: int = None  # Остаток по активной подписке (None, если подписки нет)
+
+
+def is_chargeable():
+    """Условие списания: присутствовал или отсутствовал без уважительной причины"""
+    return or_(AttendanceRecord.is_present == True, AttendanceRecord.absence_reason == 'unexcused')
+
+
+def normalize_marks(participants_data):
+    """Отметки из запроса: participant_id -> (is_present, absence_reason)"""
+    marks = {}
+    for participant_data in participants_data:
+        is_present = bool(participant_data['is_present'])
+        absence_reason = (participant_data.get('absence_reason') or 'unexcused') if not is_present else None
+        marks[int(participant_data['id'])] = (is_present, absence_reason)
+    return marks
+
+
+def upsert_attendance_records(attendance_id, marks):
+    """Вставляет или обновляет все отметки занятия одним пакетным запросом"""
+    if not marks:
+        return
+    now = datetime.utcnow()
+    rows = [{
+        'attendance_id': attendance_id,
+        'participant_id': participant_id,
+        'is_present': is_present,
+        'absence_reason': absence_reason,
+        'is_charged': False,
+        'created_at': now
+    } for participant_id, (is_present, absence_reason) in marks.items()]
+
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        insert = None
+
+    if insert is not None:
+        statement = insert(AttendanceRecord.__table__)
+        statement = statement.on_conflict_do_update(
+            index_elements=['attendance_id', 'participant_id'],
+            set_={
+                'is_present': statement.excluded.is_present,
+                'absence_reason': statement.excluded.absence_reason
+            }
+        )
+        db.session.execute(statement, rows)
+        return
+
+    # Общий путь для остальных СУБД
+    existing = {record.participant_id: record for record in AttendanceRecord.query.filter_by(attendance_id=attendance_id)}
+    for row in rows:
+        record = existing.get(row['participant_id'])
+        if record:
+            record.is_present = row['is_present']
+            record.absence_reason = row['absence_reason']
+        else:
+            db.session.add(AttendanceRecord(**row))
+    db.session.flush()
+
+
+def _update_returning(statement, columns, conditions):
+    """
+    Выполняет UPDATE и возвращает значения columns затронутых строк.
+    Использует RETURNING, если СУБД его поддерживает; иначе читает те же
+    строки перед обновлением (в SQLite транзакция уже держит блокировку записи).
+    """
+    statement = statement.execution_options(synchronize_session=False)
+    if db.session.get_bind().dialect.update_returning:
+        return db.session.execute(statement.returning(*columns)).all()
+    rows = db.session.execute(select(*columns).where(*conditions)).all()
+    db.session.execute(statement)
+    return rows
+
+
+def _update_participants(statement, participant_column, conditions):
+    """Выполняет UPDATE и возвращает множество затронутых участников"""
+    return {participant_id for (participant_id,) in _update_returning(statement, [participant_column], conditions)}
+
+
+def _first_active_subscriptions(attendance, participant_ids, *conditions):
+    """Подзапрос: первая активная подписка в группе занятия для каждого участника"""
+    return select(func.min(Subscription.id)).where(
+        Subscription.sport_group_id == attendance.sport_group_id,
+        Subscription.is_active == True,
+        Subscription.participant_id.in_(participant_ids),
+        *conditions
+    ).group_by(Subscription.participant_id)
+
+
+def charge_lessons(attendance):
+    """Списывает занятие у участников, отметки которых требуют списания и еще не списаны"""
+    # Сначала «захватываем» отметки: параллельное сохранение не спишет их повторно
+    claim_conditions = [
+        AttendanceRecord.attendance_id == attendance.id,
+        AttendanceRecord.is_charged == False,
+        is_chargeable()
+    ]
+    claimed = _update_participants(
+        update(AttendanceRecord).where(*claim_conditions).values(is_charged=True),
+        AttendanceRecord.participant_id,
+        claim_conditions
+    )
+    if not claimed:
+        return set()
+
+    debit_conditions = [
+        Subscription.id.in_(_first_active_subscriptions(attendance, claimed, Subscription.remaining_lessons > 0)),
+        Subscription.remaining_lessons > 0
+    ]
+    debited_rows = _update_returning(
+        update(Subscription).where(*debit_conditions).values(remaining_lessons=Subscription.remaining_lessons - 1),
+        [Subscription.participant_id, Subscription.id],
+        debit_conditions
+    )
+    debited = {participant_id for participant_id, _ in debited_rows}
+    record_lesson_entries(attendance.id, [subscription_id for _, subscription_id in debited_rows], ENTRY_LESSON_DEBITED, -1)
+
+    # Без подписки или без остатка занятие не списано: снимаем отметку
+    not_debited = claimed - debited
+    if not_debited:
+        db.session.execute(update(AttendanceRecord).where(
+            AttendanceRecord.attendance_id == attendance.id,
+            AttendanceRecord.participant_id.in_(not_debited)
+        ).values(is_charged=False).execution_options(synchronize_session=False))
+    return debited
+
+
+def _debited_subscriptions(attendance, participant_ids):
+    """Подписка, с которой занятие списано последним: participant_id -> subscription_id"""
+    rows = db.session.execute(select(Subscription.participant_id, SubscriptionLedgerEntry.subscription_id).join(
+        Subscription, Subscription.id == SubscriptionLedgerEntry.subscription_id
+    ).where(
+        SubscriptionLedgerEntry.attendance_id == attendance.id,
+        SubscriptionLedgerEntry.entry_type == ENTRY_LESSON_DEBITED,
+        Subscription.participant_id.in_(participant_ids)
+    ).order_by(SubscriptionLedgerEntry.id))
+    return dict(rows.all())
+
+
+def refund_lessons(attendance):
+    """
+    Возвращает занятие, если отметка изменилась на не требующую списания.
+    Занятие возвращается на подписку из записи журнала о списании; для
+    отметок, списанных до появления журнала, - на первую активную подписку
+    группы. Если вернуть некуда (подписка деактивирована или остаток уже
+    полный), отметка остается списанной и возврат не сообщается.
+    """
+    release_conditions = [
+        AttendanceRecord.attendance_id == attendance.id,
+        AttendanceRecord.is_charged == True,
+        not_(is_chargeable())
+    ]
+    released = _update_participants(
+        update(AttendanceRecord).where(*release_conditions).values(is_charged=False),
+        AttendanceRecord.participant_id,
+        release_conditions
+    )
+    if not released:
+        return set()
+
+    debited = _debited_subscriptions(attendance, released)
+    targets = [Subscription.id.in_(debited.values())] if debited else []
+    without_entries = released - set(debited)
+    if without_entries:
+        targets.append(Subscription.id.in_(_first_active_subscriptions(
+            attendance, without_entries, Subscription.remaining_lessons < Subscription.total_lessons)))
+    credit_conditions = [
+        or_(*targets),
+        Subscription.is_active == True,
+        Subscription.remaining_lessons < Subscription.total_lessons
+    ]
+    credited_rows = _update_returning(
+        update(Subscription).where(*credit_conditions).values(remaining_lessons=Subscription.remaining_lessons + 1),
+        [Subscription.participant_id, Subscription.id],
+        credit_conditions
+    )
+    credited = {participant_id for participant_id, _ in credited_rows}
+    record_lesson_entries(attendance.id, [subscription_id for _, subscription_id in credited_rows], ENTRY_LESSON_REFUNDED, 1)
+
+    # Занятие не вернулось на подписку: отметка остается списанной
+    not_credited = released - credited
+    if not_credited:
+        db.session.execute(update(AttendanceRecord).where(
+            AttendanceRecord.attendance_id == attendance.id,
+            AttendanceRecord.participant_id.in_(not_credited)
+        ).values(is_charged=True).execution_options(synchronize_session=False))
+    return credited
+
+
+def load_remaining_lessons(attendance, participant_ids):
+    """Остаток занятий по первой активной подписке участников в группе"""
+    if not participant_ids:
+        return {}
+    rows = db.session.execute(select(Subscription.participant_id, Subscription.remaining_lessons).where(
+        Subscription.id.in_(_first_active_subscriptions(attendance, participant_ids))
+    ))
+    return dict(rows.all())
+
+
+def save_attendance(attendance, participants_data):
+    """
+    Сохраняет отметки занятия и списывает занятия.
+    Коммит выполняет вызывающий код, все изменения идут одной транзакцией.
+    """
+    marks = normalize_marks(participants_data)
+    participant_ids = set(marks)
+
+    previous = {
+        participant_id: (is_present, absence_reason)
+        for participant_id, is_present, absence_reason in db.session.query(
+            AttendanceRecord.participant_id,
+            AttendanceRecord.is_present,
+            AttendanceRecord.absence_reason
+        ).filter(AttendanceRecord.attendance_id == attendance.id)
+    }
+
+    upsert_attendance_records(attendance.id, marks)
+    charged = charge_lessons(attendance)
+    refunded = refund_lessons(attendance)
+
+    db.session.execute(update(Attendance).where(Attendance.id == attendance.id).values(is_completed=True).execution_options(synchronize_session=False))
+    remaining = load_remaining_lessons(attendance, participant_ids)
+    refresh_attendance_stats(attendance, participant_ids)
+    # Объекты сессии могли устареть после UPDATE в обход ORM
+    db.session.expire_all()
+
+    return [AttendanceEvent(
+        participant_id=participant_id,
+        is_present=is_present,
+        absence_reason=absence_reason,
+        changed=previous.get(participant_id) != (is_present, absence_reason),
+        charged=participant_id in charged,
+        refunded=participant_id in refunded,
+        remaining_lessons=remaining.get(participant_id)
+    ) for participant_id, (is_present, absence_reason) in marks.items()]
+
+
+def load_parent_chat_ids(participant_ids):
+    """Telegram ID родителей, получивших доступ к участникам: participant_id -> [telegram_id]"""
+    if not participant_ids:
+        return {}
+    rows = db.session.query(AuthorizationCode.participant_id, User.telegram_id).join(
+        User, User.id == AuthorizationCode.used_by_user_id
+    ).filter(
+        AuthorizationCode.participant_id.in_(participant_ids),
+        AuthorizationCode.is_used == True,
+        User.telegram_id.isnot(None)
+    ).distinct()
+
+    chat_ids = {}
+    for participant_id, telegram_id in rows:
+        chat_ids.setdefault(participant_id, []).append(telegram_id)
+    return chat_ids
@@ -0,0 +1,86 @@
+"""
+Сводка для родителей по сохранению посещаемости.
+
+Все события одного сохранения занятия (отметка, списание или возврат
+занятия, малый остаток) собираются в одно сообщение на чат родителя:
+братья и сестры из одной семьи попадают в общее сообщение. Сообщения
+передаются в очередь доставки (notifications.py) одной пачкой. В сводку
+попадают только новые или измененные отметки, поэтому повторное
+сохранение занятия не дублирует уведомления.
+"""
+
+from html import escape
+
+from models import db, Participant
+from notifications import OutgoingMessage
+from attendance import load_parent_chat_ids
+
+LOW_BALANCE_LIMIT = 1  # Предупреждать, если после списания осталось столько занятий или меньше
+
+
+def is_reportable(event):
+    """Событие попадает в сводку: отметка новая или изменена, либо изменился остаток занятий"""
+    return event.changed or event.charged or event.refunded
+
+
+def participant_line(event, full_name):
+    """Строка сводки об одном участнике"""
+    if event.is_present:
+        line = f"✅ {full_name} посетил тренировку."
+    elif event.absence_reason == 'excused':
+        line = f"ℹ️ {full_name} отсутствовал по уважительной причине. Занятие не списано."
+    else:
+        line = f"❌ {full_name} отсутствовал без уважительной причины."
+    if event.charged and not event.is_present:
+        line += " Занятие списано."
+    if event.refunded:
+        line += " Занятие возвращено на абонемент."
+    if event.remaining_lessons is not None:
+        line += f" Осталось: {event.remaining_lessons} занятий."
+    return line
+
+
+def low_balance_line(event, full_name):
+    """Предупреждение о малом остатке или None"""
+    if event.charged and event.remaining_lessons is not None and event.remaining_lessons <= LOW_BALANCE_LIMIT:
+        return (f"⚠️ Внимание! У {full_name} осталось {event.remaining_lessons} оплаченных занятий. "
+                f"Пожалуйста, пополните баланс.")
+    return None
+
+
+def compose_attendance_digest(attendance, events):
+    """
+    Сообщения для родителей по событиям сохранения занятия: одно
+    OutgoingMessage на чат. Выполняет два запроса (имена участников и чаты
+    родителей) независимо от числа участников.
+    """
+    events = [event for event in events if is_reportable(event)]
+    if not events:
+        return []
+
+    participant_ids = [event.participant_id for event in events]
+    names = dict(db.session.query(Participant.id, Participant.full_name).filter(Participant.id.in_(participant_ids)))
+    chat_ids = load_parent_chat_ids(participant_ids)
+
+    # Чат -> события его детей в порядке имен
+    by_chat = {}
+    for event in sorted(events, key=lambda event: names.get(event.participant_id, '')):
+        for chat_id in chat_ids.get(event.participant_id, []):
+            by_chat.setdefault(chat_id, []).append(event)
+
+    header = (f"📋 Занятие {attendance.lesson_date.strftime('%d.%m.%Y')} "
+              f"в группе '{escape(attendance.sport_group.name)}'")
+    messages = []
+    for chat_id, chat_events in by_chat.items():
+        lines, warnings = [header], []
+        for event in chat_events:
+            full_name = escape(names.get(event.participant_id, ''))
+            lines.append(participant_line(event, full_name))
+            warning = low_balance_line(event, full_name)
+            if warning:
+                warnings.append(warning)
+        if warnings:
+            lines.append('')
+            lines.extend(warnings)
+        messages.append(OutgoingMessage(chat_id, '\n'.join(lines)))
+    return messages
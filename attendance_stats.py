@@ -0,0 +1,179 @@
+"""
+Сводные таблицы посещаемости.
+
+AttendanceLessonStats хранит счетчики по каждому занятию, а
+ParticipantMonthlyAttendance - по участнику, группе и месяцу. Сводки
+пересчитываются из AttendanceRecord для затронутого занятия и месяца в той
+же транзакции, что и сохранение отметок, поэтому эндпоинты статистики
+читают готовые строки одним запросом по индексу.
+"""
+
+from datetime import date, datetime
+
+from sqlalchemy import select, delete, insert, func, case, literal
+
+from models import db, Attendance, AttendanceRecord, AttendanceLessonStats, ParticipantMonthlyAttendance
+from catalog import DAY_NAMES
+
+
+def month_bounds(day):
+    """Первый день месяца и первый день следующего месяца"""
+    start = day.replace(day=1)
+    end = date(start.year + 1, 1, 1) if start.month == 12 else date(start.year, start.month + 1, 1)
+    return start, end
+
+
+def _counters():
+    """
+    Счетчики: присутствовал, отсутствовал по уважительной причине, без
+    уважительной причины. Пустая строка внешнего соединения (занятие без
+    отметок) не считается.
+    """
+    return (
+        func.coalesce(func.sum(case((AttendanceRecord.is_present == True, 1), else_=0)), 0),
+        func.coalesce(func.sum(case(
+            (AttendanceRecord.is_present == True, 0),
+            (AttendanceRecord.absence_reason == 'excused', 1),
+            else_=0
+        )), 0),
+        func.coalesce(func.sum(case(
+            (AttendanceRecord.id.is_(None), 0),
+            (AttendanceRecord.is_present == True, 0),
+            (AttendanceRecord.absence_reason == 'excused', 0),
+            else_=1
+        )), 0),
+    )
+
+
+def refresh_lesson_stats(attendance_ids):
+    """
+    Пересчитывает сводку по занятиям (DELETE + INSERT ... SELECT). Занятие
+    без отметок получает строку с нулевыми счетчиками.
+    """
+    attendance_ids = list(attendance_ids)
+    if not attendance_ids:
+        return
+    db.session.execute(delete(AttendanceLessonStats).where(AttendanceLessonStats.attendance_id.in_(attendance_ids)))
+    present, excused, unexcused = _counters()
+    source = select(
+        Attendance.id,
+        Attendance.sport_group_id,
+        Attendance.lesson_date,
+        Attendance.day_of_week,
+        present,
+        excused,
+        unexcused,
+        literal(datetime.utcnow())
+    ).select_from(Attendance).outerjoin(AttendanceRecord, AttendanceRecord.attendance_id == Attendance.id).where(
+        Attendance.id.in_(attendance_ids)
+    ).group_by(Attendance.id, Attendance.sport_group_id, Attendance.lesson_date, Attendance.day_of_week)
+    db.session.execute(insert(AttendanceLessonStats).from_select([
+        'attendance_id', 'sport_group_id', 'lesson_date', 'day_of_week',
+        'present_count', 'excused_count', 'unexcused_count', 'updated_at'
+    ], source))
+
+
+def refresh_monthly_stats(sport_group_id, month, participant_ids=None):
+    """
+    Пересчитывает помесячную сводку участников группы за месяц, в который
+    попадает дата month. Без participant_ids - для всех участников группы.
+    """
+    start, end = month_bounds(month)
+    conditions = [
+        ParticipantMonthlyAttendance.sport_group_id == sport_group_id,
+        ParticipantMonthlyAttendance.month == start
+    ]
+    record_conditions = [
+        Attendance.sport_group_id == sport_group_id,
+        Attendance.lesson_date >= start,
+        Attendance.lesson_date < end
+    ]
+    if participant_ids is not None:
+        participant_ids = list(participant_ids)
+        if not participant_ids:
+            return
+        conditions.append(ParticipantMonthlyAttendance.participant_id.in_(participant_ids))
+        record_conditions.append(AttendanceRecord.participant_id.in_(participant_ids))
+
+    db.session.execute(delete(ParticipantMonthlyAttendance).where(*conditions))
+    present, excused, unexcused = _counters()
+    source = select(
+        AttendanceRecord.participant_id,
+        literal(sport_group_id),
+        literal(start),
+        present,
+        excused,
+        unexcused,
+        literal(datetime.utcnow())
+    ).select_from(AttendanceRecord).join(Attendance, Attendance.id == AttendanceRecord.attendance_id).where(
+        *record_conditions
+    ).group_by(AttendanceRecord.participant_id)
+    db.session.execute(insert(ParticipantMonthlyAttendance).from_select([
+        'participant_id', 'sport_group_id', 'month',
+        'present_count', 'excused_count', 'unexcused_count', 'updated_at'
+    ], source))
+
+
+def refresh_attendance_stats(attendance, participant_ids):
+    """Обновляет обе сводки после сохранения отметок занятия"""
+    refresh_lesson_stats([attendance.id])
+    refresh_monthly_stats(attendance.sport_group_id, attendance.lesson_date, participant_ids)
+
+
+def remove_participant_stats(participant_id, attendance_ids):
+    """Убирает участника из сводок (после удаления его отметок)"""
+    db.session.execute(delete(ParticipantMonthlyAttendance).where(ParticipantMonthlyAttendance.participant_id == participant_id))
+    refresh_lesson_stats(attendance_ids)
+
+
+def rebuild_attendance_stats():
+    """Полностью перестраивает сводки из AttendanceRecord; возвращает (занятий, месяцев)"""
+    db.session.execute(delete(AttendanceLessonStats))
+    db.session.execute(delete(ParticipantMonthlyAttendance))
+
+    attendance_ids = [attendance_id for (attendance_id,) in db.session.execute(select(Attendance.id))]
+    refresh_lesson_stats(attendance_ids)
+
+    months = {
+        (sport_group_id, month_bounds(lesson_date)[0])
+        for sport_group_id, lesson_date in db.session.execute(
+            select(Attendance.sport_group_id, Attendance.lesson_date).distinct()
+        )
+    }
+    for sport_group_id, month in sorted(months):
+        refresh_monthly_stats(sport_group_id, month)
+    return len(attendance_ids), len(months)
+
+
+def load_group_lesson_stats(sport_group_id):
+    """Статистика занятий группы из сводки (один запрос по индексу)"""
+    rows = AttendanceLessonStats.query.filter_by(sport_group_id=sport_group_id).order_by(AttendanceLessonStats.lesson_date)
+    stats = []
+    for row in rows:
+        absent = row.excused_count + row.unexcused_count
+        total = row.present_count + absent
+        stats.append({
+            'date': row.lesson_date,
+            'day_name': DAY_NAMES[row.day_of_week],
+            'total': total,
+            'present': row.present_count,
+            'absent': absent,
+            'absent_excused': row.excused_count,
+            'absent_unexcused': row.unexcused_count,
+            'percentage': round((row.present_count / total * 100) if total > 0 else 0, 1)
+        })
+    return stats
+
+
+def load_participant_monthly_stats(participant_id):
+    """Помесячная статистика участника по группам из сводки"""
+    rows = ParticipantMonthlyAttendance.query.filter_by(participant_id=participant_id).order_by(
+        ParticipantMonthlyAttendance.month, ParticipantMonthlyAttendance.sport_group_id
+    )
+    return [{
+        'month': row.month.strftime('%Y-%m'),
+        'sport_group_id': row.sport_group_id,
+        'present': row.present_count,
+        'absent_excused': row.excused_count,
+        'absent_unexcused': row.unexcused_count
+    } for row in rows]
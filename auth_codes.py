@@ -0,0 +1,152 @@
+"""
+Выдача кодов авторизации родителей.
+
+Коды получаются из счетчика: каждое значение 0..999999 проходит через
+секретную перестановку (сеть Фейстеля над 1000 x 1000), поэтому разные
+значения счетчика всегда дают разные коды, а сами коды выглядят случайными.
+Блок значений резервируется одним атомарным UPDATE счетчика в AppState -
+без гонки между параллельными запросами. Совпасть код может только со
+случайным кодом, выданным до перехода на счетчик: такие коды находятся
+одним SELECT ... WHERE code IN (...) на блок и заменяются следующими
+значениями счетчика. Стоимость выдачи не зависит от заполненности таблицы.
+"""
+
+import hashlib
+import logging
+import secrets
+from datetime import datetime
+
+from sqlalchemy import update, select, cast, Integer, Text
+from sqlalchemy.exc import IntegrityError
+
+from models import db, AppState, AuthorizationCode
+
+logger = logging.getLogger(__name__)
+
+CODE_SPACE = 10 ** 6
+HALF_SPACE = 10 ** 3
+FEISTEL_ROUNDS = 8
+COUNTER_KEY = 'auth_code_counter'
+SECRET_KEY = 'auth_code_key'
+
+
+class CodesExhausted(RuntimeError):
+    """Все 10^6 значений счетчика уже выданы"""
+
+
+def permute(value, key):
+    """Биекция [0, 10^6) -> [0, 10^6): сбалансированная сеть Фейстеля по модулю 1000"""
+    left, right = divmod(value, HALF_SPACE)
+    for round_number in range(FEISTEL_ROUNDS):
+        digest = hashlib.blake2b(f'{round_number}:{right}'.encode(), key=key, digest_size=8).digest()
+        left, right = right, (left + int.from_bytes(digest, 'big')) % HALF_SPACE
+    return left * HALF_SPACE + right
+
+
+def format_code(value):
+    return f'{value:06d}'
+
+
+def _insert_state(key, value):
+    """Создает строку AppState; False, если ее уже создал параллельный запрос"""
+    try:
+        with db.session.begin_nested():
+            db.session.add(AppState(key=key, value=value, updated_at=datetime.utcnow()))
+        return True
+    except IntegrityError:
+        return False
+
+
+def load_secret():
+    """Ключ перестановки; создается один раз и хранится в AppState"""
+    value = db.session.execute(select(AppState.value).where(AppState.key == SECRET_KEY)).scalar()
+    if value is None:
+        value = secrets.token_hex(16)
+        if not _insert_state(SECRET_KEY, value):
+            value = db.session.execute(select(AppState.value).where(AppState.key == SECRET_KEY)).scalar()
+    return bytes.fromhex(value)
+
+
+def reserve_counter(count):
+    """
+    Резервирует count значений счетчика одним UPDATE и возвращает первое.
+    Строка счетчика остается заблокированной до конца транзакции.
+    """
+    statement = update(AppState).where(AppState.key == COUNTER_KEY).values(
+        value=cast(cast(AppState.value, Integer) + count, Text),
+        updated_at=datetime.utcnow()
+    ).execution_options(synchronize_session=False)
+
+    if db.session.get_bind().dialect.update_returning:
+        end = db.session.execute(statement.returning(AppState.value)).scalar()
+    else:
+        # Значение читается после записи, под блокировкой этой транзакции
+        end = db.session.execute(select(AppState.value).where(AppState.key == COUNTER_KEY)).scalar() \
+            if db.session.execute(statement).rowcount else None
+
+    if end is None:
+        if _insert_state(COUNTER_KEY, str(count)):
+            end = count
+        else:
+            return reserve_counter(count)
+
+    start = int(end) - count
+    if int(end) > CODE_SPACE:
+        raise CodesExhausted('Коды авторизации исчерпаны')
+    return start
+
+
+def reserve_codes(count):
+    """Список из count новых уникальных кодов"""
+    if count <= 0:
+        return []
+    start = reserve_counter(count)
+    key = load_secret()
+    return [format_code(permute(value, key)) for value in range(start, start + count)]
+
+
+def find_taken_codes(codes):
+    """Коды из списка, которые уже есть в таблице (выданы до перехода на счетчик)"""
+    if not codes:
+        return set()
+    return set(db.session.execute(select(AuthorizationCode.code).where(AuthorizationCode.code.in_(codes))).scalars())
+
+
+def reserve_free_codes(count):
+    """
+    count новых кодов, не совпадающих с уже выданными. Совпавшие со старыми
+    кодами заменяются новыми значениями счетчика, пока набор не станет чистым;
+    проверяются только замены.
+    """
+    codes = reserve_codes(count)
+    taken = find_taken_codes(codes)
+    while taken:
+        logger.warning("%s authorization codes collide with legacy codes, reserving replacements", len(taken))
+        replacements = reserve_codes(len(taken))
+        pending = iter(replacements)
+        codes = [next(pending) if code in taken else code for code in codes]
+        taken = find_taken_codes(replacements)
+    return codes
+
+
+def allocate_code():
+    """Один новый уникальный код"""
+    return reserve_free_codes(1)[0]
+
+
+def create_authorization_codes(participant_ids):
+    """
+    Создает по коду на каждого участника пакетной вставкой и возвращает
+    participant_id -> code. Коммит выполняет вызывающий код.
+    """
+    participant_ids = list(participant_ids)
+    if not participant_ids:
+        return {}
+
+    codes = reserve_free_codes(len(participant_ids))
+    now = datetime.utcnow()
+    db.session.execute(AuthorizationCode.__table__.insert(), [
+        {'participant_id': participant_id, 'code': code, 'is_used': False, 'created_at': now}
+        for participant_id, code in zip(participant_ids, codes)
+    ])
+    return dict(zip(participant_ids, codes))
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк выдачи кодов авторизации: прежний подбор случайного кода с
+проверкой SELECT и выдача через счетчик с перестановкой (auth_codes.py)
+при заполнении таблицы на 0%, 50% и 90%.
+
+Запуск: python bench_auth_codes.py --samples 500
+"""
+
+import argparse
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask
+from sqlalchemy import event
+
+from models import db, AuthorizationCode
+from auth_codes import CODE_SPACE, reserve_codes, allocate_code, create_authorization_codes
+from bench_data import insert_rows
+
+FILL_LEVELS = (0.0, 0.5, 0.9)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Стоимость выдачи кода авторизации в зависимости от заполненности')
+    parser.add_argument('--samples', type=int, default=500, help='Кодов на каждый замер')
+    parser.add_argument('--bulk', type=int, default=1000, help='Размер пакетной выдачи')
+    return parser.parse_args()
+
+
+def legacy_generate_code():
+    """Прежняя реализация AuthorizationCode.generate_code()"""
+    while True:
+        code = ''.join(random.choices(string.digits, k=6))
+        if not AuthorizationCode.query.filter_by(code=code).first():
+            return code
+
+
+def fill_to(level):
+    """Дозаполняет таблицу кодами до доли level от всех 10^6 кодов"""
+    current = AuthorizationCode.query.count()
+    missing = int(CODE_SPACE * level) - current
+    batch = 100000
+    while missing > 0:
+        count = min(batch, missing)
+        insert_rows(AuthorizationCode, [{'participant_id': 1, 'code': code, 'is_used': False} for code in reserve_codes(count)])
+        db.session.commit()
+        missing -= count
+
+
+def measure(callback, samples, counter):
+    """Среднее время (мкс) и число SQL-запросов на один код"""
+    counter[0] = 0
+    started = time.perf_counter()
+    for _ in range(samples):
+        callback()
+    elapsed = time.perf_counter() - started
+    db.session.rollback()
+    return elapsed / samples * 10 ** 6, counter[0] / samples
+
+
+def main():
+    args = parse_args()
+    workdir = tempfile.mkdtemp(prefix='sportclub-codes-')
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(workdir, 'codes.db')}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+
+    counter = [0]
+    with app.app_context():
+        db.create_all()
+
+        def count_statement(*_):
+            counter[0] += 1
+
+        event.listen(db.engine, 'before_cursor_execute', count_statement)
+
+        print(f"{'Заполнение':>10} {'прежний, мкс':>13} {'SQL/код':>8} {'счетчик, мкс':>13} {'SQL/код':>8} {'пакет, мкс/код':>15}")
+        for level in FILL_LEVELS:
+            fill_to(level)
+            legacy_us, legacy_queries = measure(legacy_generate_code, args.samples, counter)
+            allocator_us, allocator_queries = measure(allocate_code, args.samples, counter)
+
+            started = time.perf_counter()
+            create_authorization_codes([1] * args.bulk)
+            bulk_us = (time.perf_counter() - started) / args.bulk * 10 ** 6
+            db.session.rollback()
+
+            print(f"{level:>10.0%} {legacy_us:>13.1f} {legacy_queries:>8.2f} {allocator_us:>13.1f} {allocator_queries:>8.2f} {bulk_us:>15.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+"""
+Генератор синтетических данных для бенчмарков.
+
+Заполняет базу участниками, родителями, подписками, платежами, кодами
+авторизации и историей посещаемости заданного объема. Строки вставляются
+пакетами через executemany, поэтому набор на десятки тысяч участников
+создается за секунды.
+"""
+
+import random
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+
+from models import db, User, Participant, SportGroup, Schedule, Subscription, Payment, Attendance, AttendanceRecord, AuthorizationCode
+from ledger import rebuild_balances
+
+BATCH_SIZE = 5000
+
+
+@dataclass
+class DatasetSize:
+    """Объем генерируемых данных"""
+    groups: int = 8
+    participants: int = 1000
+    subscriptions_per_participant: int = 1
+    payments_per_subscription: int = 2
+    lessons_per_group: int = 8
+
+
+@dataclass
+class Dataset:
+    """Идентификаторы, полезные для построения запросов бенчмарка"""
+    admin_user_id: int
+    group_ids: list
+    parent_user_ids: list = field(default_factory=list)
+    participant_ids: list = field(default_factory=list)
+    lesson_dates: dict = field(default_factory=dict)  # group_id -> [date]
+
+
+def insert_rows(model, rows):
+    """Пакетная вставка строк через executemany"""
+    table = model.__table__
+    for start in range(0, len(rows), BATCH_SIZE):
+        db.session.execute(table.insert(), rows[start:start + BATCH_SIZE])
+
+
+def ensure_groups(count):
+    """Существующие группы или простые группы с расписанием Пн/Ср/Пт"""
+    group_ids = [group_id for (group_id,) in db.session.query(SportGroup.id).order_by(SportGroup.id)]
+    for index in range(len(group_ids), count):
+        group = SportGroup(name=f'Группа {index + 1}', price_8=4000, price_12=5000, price_single=700)
+        db.session.add(group)
+        db.session.flush()
+        for day in (0, 2, 4):
+            db.session.add(Schedule(sport_group_id=group.id, day_of_week=day, start_time=time(18, 0), end_time=time(19, 0)))
+        group_ids.append(group.id)
+    db.session.flush()
+    return group_ids[:count]
+
+
+def max_id(model):
+    return db.session.query(db.func.max(model.id)).scalar() or 0
+
+
+def generate_dataset(size=None, seed=42):
+    """Создает набор данных и возвращает Dataset с ключевыми идентификаторами"""
+    size = size or DatasetSize()
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    today = date.today()
+
+    admin = User(telegram_id=10 ** 12, username='bench_admin', role='admin')
+    db.session.add(admin)
+    db.session.flush()
+    group_ids = ensure_groups(size.groups)
+    dataset = Dataset(admin_user_id=admin.id, group_ids=group_ids)
+
+    # Родители и участники (по одному родителю на участника)
+    first_user_id = max_id(User) + 1
+    first_participant_id = max_id(Participant) + 1
+    users, participants = [], []
+    for index in range(size.participants):
+        users.append({'id': first_user_id + index, 'telegram_id': 10 ** 11 + first_user_id + index,
+                      'username': f'parent{index}', 'role': 'parent', 'created_at': now})
+        participants.append({
+            'id': first_participant_id + index,
+            'user_id': admin.id,
+            'full_name': f'Участник {index:06d}',
+            'parent_phone': f'+7900{index:07d}',
+            'birth_date': date(2008 + index % 12, 1 + index % 12, 1 + index % 28),
+            'medical_certificate': index % 3 == 0,
+            'discount_percent': 0,
+            'created_at': now
+        })
+    insert_rows(User, users)
+    insert_rows(Participant, participants)
+    dataset.parent_user_ids = [row['id'] for row in users]
+    dataset.participant_ids = [row['id'] for row in participants]
+
+    # Коды авторизации: большинство уже использованы родителями
+    first_code_id = max_id(AuthorizationCode) + 1
+    codes = [{
+        'id': first_code_id + index,
+        'participant_id': participant['id'],
+        'code': f'{(first_code_id + index) % 10 ** 6:06d}',
+        'is_used': index % 10 != 0,
+        'used_by_user_id': users[index]['id'] if index % 10 != 0 else None,
+        'created_at': now - timedelta(days=rng.randint(0, 365)),
+        'used_at': now if index % 10 != 0 else None
+    } for index, participant in enumerate(participants)]
+    insert_rows(AuthorizationCode, codes)
+
+    # Подписки и платежи
+    first_subscription_id = max_id(Subscription) + 1
+    subscriptions, payments = [], []
+    members = {group_id: [] for group_id in group_ids}
+    for index, participant in enumerate(participants):
+        for offset in range(size.subscriptions_per_participant):
+            group_id = group_ids[(index + offset) % len(group_ids)]
+            subscription_id = first_subscription_id + len(subscriptions)
+            total = rng.choice((8, 12))
+            subscriptions.append({
+                'id': subscription_id,
+                'participant_id': participant['id'],
+                'sport_group_id': group_id,
+                'subscription_type': f'{total} занятий',
+                'total_lessons': total,
+                'remaining_lessons': rng.randint(0, total),
+                'start_date': today - timedelta(days=15),
+                'end_date': today + timedelta(days=15),
+                'is_active': True,
+                'created_at': now
+            })
+            members[group_id].append(participant['id'])
+            for payment_index in range(size.payments_per_subscription):
+                status = rng.choice(('approved', 'approved', 'pending', 'rejected'))
+                payments.append({
+                    'user_id': users[index]['id'],
+                    'subscription_id': subscription_id,
+                    'amount': rng.choice((700, 4000, 5000)),
+                    'payment_method': 'cash',
+                    'status': status,
+                    'is_paid': status == 'approved',
+                    'payment_date': now if status == 'approved' else None,
+                    'created_at': now - timedelta(days=rng.randint(0, 365), minutes=payment_index)
+                })
+    insert_rows(Subscription, subscriptions)
+    insert_rows(Payment, payments)
+
+    # История посещаемости: прошедшие занятия каждой группы
+    first_attendance_id = max_id(Attendance) + 1
+    attendances, records = [], []
+    for group_id in group_ids:
+        lesson_date = today - timedelta(days=1)
+        dates = []
+        while len(dates) < size.lessons_per_group:
+            if lesson_date.weekday() in (0, 2, 4):
+                dates.append(lesson_date)
+            lesson_date -= timedelta(days=1)
+        dataset.lesson_dates[group_id] = dates
+        for lesson_date in dates:
+            attendance_id = first_attendance_id + len(attendances)
+            attendances.append({
+                'id': attendance_id,
+                'sport_group_id': group_id,
+                'lesson_date': lesson_date,
+                'day_of_week': lesson_date.weekday(),
+                'start_time': time(18, 0),
+                'end_time': time(19, 0),
+                'is_completed': True,
+                'created_at': now
+            })
+            for participant_id in members[group_id]:
+                is_present = rng.random() < 0.8
+                records.append({
+                    'attendance_id': attendance_id,
+                    'participant_id': participant_id,
+                    'is_present': is_present,
+                    'absence_reason': None if is_present else rng.choice(('excused', 'unexcused')),
+                    'is_charged': is_present,
+                    'created_at': now
+                })
+    insert_rows(Attendance, attendances)
+    insert_rows(AttendanceRecord, records)
+
+    # Журнал баланса и paid_total по сгенерированным платежам и остаткам
+    rebuild_balances()
+    db.session.commit()
+    return dataset
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк индексов: задержка основных админских и родительских эндпоинтов
+без индексов из models.py и с ними на сгенерированном наборе данных.
+
+Запуск: python bench_indexes.py --participants 50000
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Сравнение задержки эндпоинтов без индексов и с индексами')
+    parser.add_argument('--participants', type=int, default=50000)
+    parser.add_argument('--lessons', type=int, default=4, help='Прошедших занятий на группу')
+    parser.add_argument('--repeat', type=int, default=5, help='Повторов каждого запроса')
+    return parser.parse_args()
+
+
+def measure(client, url, repeat):
+    """Медиана времени ответа в миллисекундах"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.get(url)
+        timings.append((time.perf_counter() - started) * 1000)
+        assert response.status_code == 200, f"{url}: {response.status_code}"
+    return statistics.median(timings)
+
+
+def endpoint_plan(dataset):
+    """(роль, user_id, URL) для измеряемых эндпоинтов"""
+    group_id = dataset.group_ids[0]
+    parent_id = dataset.parent_user_ids[1]
+    participant_id = dataset.participant_ids[1]
+    lesson_date = dataset.lesson_dates[group_id][0].strftime('%Y-%m-%d')
+    return [
+        ('admin', dataset.admin_user_id, '/api/admin/students'),
+        ('admin', dataset.admin_user_id, f'/api/admin/group/{group_id}/students'),
+        ('admin', dataset.admin_user_id, f'/api/admin/group/{group_id}/participants'),
+        ('admin', dataset.admin_user_id, f'/api/admin/attendance/participants/{group_id}/{lesson_date}'),
+        ('admin', dataset.admin_user_id, f'/api/admin/attendance/stats/{group_id}'),
+        ('admin', dataset.admin_user_id, '/api/admin/payments'),
+        ('parent', parent_id, '/api/participants'),
+        ('parent', parent_id, '/api/auth/participants'),
+        ('parent', parent_id, '/api/parent/financial-info'),
+        ('parent', parent_id, f'/api/parent/attendance/{participant_id}'),
+        ('parent', parent_id, '/api/sport-groups'),
+    ]
+
+
+def run_plan(app, plan, repeat):
+    results = {}
+    for role, user_id, url in plan:
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['role'] = role
+            session['user_id'] = user_id
+        results[url] = measure(client, url, repeat)
+    return results
+
+
+def main():
+    args = parse_args()
+    workdir = tempfile.mkdtemp(prefix='sportclub-bench-')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+
+    # Импорт после настройки окружения: приложение создается при импорте
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import logging
+    from app import app
+    from models import db
+    from bench_data import DatasetSize, generate_dataset
+    from migrate_indexes import create_indexes, drop_indexes
+
+    logging.disable(logging.INFO)
+
+    with app.app_context():
+        started = time.perf_counter()
+        dataset = generate_dataset(DatasetSize(participants=args.participants, lessons_per_group=args.lessons))
+        print(f"Набор данных: {args.participants} участников, {time.perf_counter() - started:.1f} с")
+
+        plan = endpoint_plan(dataset)
+        drop_indexes(db.engine)
+        before = run_plan(app, plan, args.repeat)
+        create_indexes(db.engine)
+        after = run_plan(app, plan, args.repeat)
+
+    print(f"\n{'Эндпоинт':<55} {'без индексов, мс':>17} {'с индексами, мс':>16} {'ускорение':>10}")
+    for _, _, url in plan:
+        speedup = before[url] / after[url] if after[url] else float('inf')
+        print(f"{url:<55} {before[url]:>17.1f} {after[url]:>16.1f} {speedup:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
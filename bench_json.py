@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Микробенчмарк сериализации JSON-ответа на 10 тыс. строк платежей:
+прежний путь (словарь на строку со strftime и стандартный провайдер
+Flask), rows_to_dicts со стандартным json и rows_to_dicts с orjson
+(json_provider.py). Строки загружаются заранее, измеряется только
+построение словарей и кодирование ответа.
+
+Запуск: python bench_json.py --rows 10000 --repeat 5
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from models import db
+from bench_data import DatasetSize, generate_dataset
+from payments import payments_query, serialize_payments
+from json_provider import StdlibJSONProvider, OrjsonProvider, orjson
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Стоимость сериализации списка платежей в JSON')
+    parser.add_argument('--rows', type=int, default=10000, help='Строк в ответе')
+    parser.add_argument('--repeat', type=int, default=5, help='Повторов на каждый вариант')
+    return parser.parse_args()
+
+
+def legacy_serialize_payment(row):
+    """Прежний serialize_payment: словарь на строку и strftime для дат"""
+    return {
+        'id': row.id,
+        'participant_id': row.participant_id,
+        'participant_name': row.full_name,
+        'participant_phone': row.parent_phone,
+        'group_id': row.group_id,
+        'sport_group': row.group_name,
+        'subscription_type': row.subscription_type,
+        'amount': row.amount,
+        'payment_method': row.payment_method,
+        'status': row.status,
+        'is_paid': row.is_paid,
+        'payment_date': row.payment_date.strftime('%Y-%m-%d %H:%M') if row.payment_date else None,
+        'created_at': row.created_at.strftime('%Y-%m-%d %H:%M'),
+        'admin_notes': row.admin_notes
+    }
+
+
+def measure(app, provider_class, serialize, rows, repeat):
+    """Медианы (мс) построения словарей и кодирования ответа, размер тела"""
+    app.json = provider_class(app)
+    build_times, encode_times = [], []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        payload = {'success': True, 'payments': serialize(rows)}
+        built = time.perf_counter()
+        response = app.json.response(payload)
+        encode_times.append((time.perf_counter() - built) * 1000)
+        build_times.append((built - started) * 1000)
+    return statistics.median(build_times), statistics.median(encode_times), len(response.get_data())
+
+
+def main():
+    args = parse_args()
+    workdir = tempfile.mkdtemp(prefix='sportclub-json-')
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(workdir, 'json.db')}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        # Два платежа на подписку: участников вдвое меньше строк
+        generate_dataset(DatasetSize(participants=(args.rows + 1) // 2, lessons_per_group=1))
+        rows = payments_query().limit(args.rows).all()
+
+        variants = [
+            ('прежний (strftime, json)', DefaultJSONProvider, lambda rows: [legacy_serialize_payment(row) for row in rows]),
+            ('rows_to_dicts + json', StdlibJSONProvider, serialize_payments),
+        ]
+        if orjson is not None:
+            variants.append(('rows_to_dicts + orjson', OrjsonProvider, serialize_payments))
+        else:
+            print('orjson не установлен: вариант с orjson пропущен')
+
+        print(f"Строк: {len(rows)}, повторов: {args.repeat}")
+        print(f"{'Вариант':<28} {'словари, мс':>12} {'JSON, мс':>10} {'всего, мс':>10} {'КБ':>8}")
+        for name, provider_class, serialize in variants:
+            build_ms, encode_ms, size = measure(app, provider_class, serialize, rows, args.repeat)
+            print(f"{name:<28} {build_ms:>12.1f} {encode_ms:>10.1f} {build_ms + encode_ms:>10.1f} {size / 1024:>8.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк логирования на пути сохранения посещаемости
+(POST /api/admin/attendance/save).
+
+Режимы:
+  legacy  - прежняя настройка: logging.basicConfig(level=INFO) с синхронной
+            записью в файл, около десяти строк f-string на участника и строка
+            на каждое уведомление;
+  queue   - те же записи, но через QueueHandler/QueueListener (logging_setup.py);
+  default - новая настройка по умолчанию: ленивое форматирование, уровень INFO,
+            выборочные сообщения об уведомлениях.
+
+Запуск: python bench_logging.py --participants 2000 --repeat 20 [--fsync]
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+MODES = ('legacy', 'queue', 'default')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Время сохранения посещаемости при разной настройке логирования')
+    parser.add_argument('--participants', type=int, default=2000, help='Участников в наборе данных')
+    parser.add_argument('--groups', type=int, default=4, help='Групп в наборе данных')
+    parser.add_argument('--repeat', type=int, default=20, help='Сохранений на каждый режим')
+    parser.add_argument('--fsync', action='store_true', help='Сбрасывать файл лога на диск после каждой строки (медленный приемник)')
+    return parser.parse_args()
+
+
+class SyncedFile:
+    """Файл лога, который сбрасывается на диск после каждой записи"""
+
+    def __init__(self, file):
+        self.file = file
+
+    def write(self, text):
+        self.file.write(text)
+
+    def flush(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+
+def legacy_save_attendance(save_attendance, logger):
+    """save_attendance с построчными логами участников, как до перехода на ленивое форматирование"""
+    def wrapper(attendance, participants_data):
+        for data in participants_data:
+            participant_id = data['id']
+            logger.info(f"Processing participant {participant_id}")
+            logger.info(f"Participant data: {data}")
+            logger.info(f"is_present={data.get('is_present')} for participant {participant_id}")
+            logger.info(f"absence_reason={data.get('absence_reason')} for participant {participant_id}")
+            logger.info(f"Looking up record for attendance {attendance.id}, participant {participant_id}")
+            logger.info(f"Looking up subscription for participant {participant_id}")
+            logger.info(f"Charging decision for participant {participant_id}: {data.get('is_present')}")
+            logger.info(f"Updating remaining lessons for participant {participant_id}")
+            logger.info(f"Record saved for participant {participant_id}")
+            logger.info(f"Done with participant {participant_id}")
+        return save_attendance(attendance, participants_data)
+    return wrapper
+
+
+def configure_mode(mode, app_module, config, log_file):
+    """Переключает логирование приложения в режим mode; возвращает функцию восстановления"""
+    from logging_setup import configure_logging, stop_logging
+
+    sampler = app_module.notification_log
+    save_attendance = app_module.save_attendance
+    root = logging.getLogger()
+    if mode == 'legacy':
+        stop_logging()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        # basicConfig(level=INFO): каждое сообщение об уведомлении пишется сразу
+        handler = logging.StreamHandler(log_file)
+        handler.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+        root.addHandler(handler)
+        root.setLevel(logging.DEBUG)
+        sampler.every = 1
+        app_module.save_attendance = legacy_save_attendance(save_attendance, app_module.logger)
+    elif mode == 'queue':
+        config.LOG_LEVEL = 'DEBUG'
+        configure_logging(config, log_file)
+        sampler.every = 1
+        app_module.save_attendance = legacy_save_attendance(save_attendance, app_module.logger)
+    else:
+        config.LOG_LEVEL = 'INFO'
+        configure_logging(config, log_file)
+
+    def restore():
+        stop_logging()
+        sampler.every = config.LOG_SAMPLE_EVERY
+        app_module.save_attendance = save_attendance
+    return restore
+
+
+def main():
+    args = parse_args()
+    workdir = tempfile.mkdtemp(prefix='sportclub-logging-')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    # Без токена уведомления не отправляются, но каждое по-прежнему логируется
+    os.environ['TELEGRAM_BOT_TOKEN'] = ''
+
+    # Импорт после настройки окружения: приложение создается при импорте
+    sys.path.insert(0, BASE_DIR)
+    import app as app_module
+    from app import app
+    from config import Config
+    from models import db, Attendance, AttendanceRecord
+    from bench_data import DatasetSize, generate_dataset
+
+    with app.app_context():
+        dataset = generate_dataset(DatasetSize(groups=args.groups, participants=args.participants, lessons_per_group=2))
+        group_id = dataset.group_ids[0]
+        attendance_id = Attendance.query.filter_by(sport_group_id=group_id, lesson_date=dataset.lesson_dates[group_id][0]).one().id
+        participant_ids = [participant_id for (participant_id,) in
+                           db.session.query(AttendanceRecord.participant_id).filter_by(attendance_id=attendance_id)]
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = dataset.admin_user_id
+        session['role'] = 'admin'
+
+    print(f"Участников на занятии: {len(participant_ids)}, сохранений на режим: {args.repeat}")
+    print(f"{'Режим':<8} {'p50, мс':>9} {'среднее, мс':>12} {'строк лога':>11}")
+    for mode in MODES:
+        log_path = os.path.join(workdir, f'{mode}.log')
+        with open(log_path, 'w', encoding='utf-8') as log_file:
+            restore = configure_mode(mode, app_module, Config, SyncedFile(log_file) if args.fsync else log_file)
+            timings = []
+            try:
+                for iteration in range(args.repeat):
+                    # Чередование присутствия: каждое сохранение списывает или возвращает занятия
+                    payload = {'attendance_id': attendance_id, 'participants': [
+                        {'id': participant_id, 'is_present': iteration % 2 == 0,
+                         'absence_reason': None if iteration % 2 == 0 else 'unexcused'}
+                        for participant_id in participant_ids
+                    ]}
+                    started = time.perf_counter()
+                    response = client.post('/api/admin/attendance/save', json=payload)
+                    timings.append((time.perf_counter() - started) * 1000)
+                    assert response.status_code == 200, response.get_data(as_text=True)
+            finally:
+                restore()
+        with open(log_path, encoding='utf-8') as log_file:
+            lines = sum(1 for _ in log_file)
+        print(f"{mode:<8} {statistics.median(timings):>9.1f} {statistics.mean(timings):>12.1f} {lines:>11}")
+
+
+if __name__ == '__main__':
+    main()
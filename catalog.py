@@ -0,0 +1,200 @@
+"""
+Кэш публичного каталога групп и расписаний.
+
+Список групп с отформатированным расписанием собирается двумя запросами
+и хранится в памяти процесса вместе с готовым JSON и ETag. Актуальность
+проверяется по счетчику версии в AppState: изменения групп и расписания
+увеличивают его, и каждый воркер пересобирает каталог при следующем запросе.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+from flask import current_app
+from sqlalchemy import update, cast, Integer, Text, event
+from sqlalchemy.orm import Session
+
+from models import db, SportGroup, Schedule, AppState
+
+logger = logging.getLogger(__name__)
+
+CATALOG_VERSION_KEY = 'catalog_version'
+DAY_NAMES = ['Понедельник', 'Вторник', 'Среда', 'Четверг', 'Пятница', 'Суббота', 'Воскресенье']
+
+
+def format_schedule_for_display(schedules):
+    """Форматирует расписание для отображения в читаемом виде"""
+    if not schedules:
+        return "Расписания пока нет"
+
+    days = DAY_NAMES
+
+    # Группируем по дням недели
+    schedule_by_day = {}
+    for schedule in schedules:
+        # Добавляем проверку на корректность day_of_week
+        if 0 <= schedule.day_of_week < len(days):
+            day_name = days[schedule.day_of_week]
+            if day_name not in schedule_by_day:
+                schedule_by_day[day_name] = []
+            schedule_by_day[day_name].append({
+                'start': schedule.start_time.strftime('%H:%M'),
+                'end': schedule.end_time.strftime('%H:%M')
+            })
+        else:
+            logger.warning("Invalid day_of_week value: %s", schedule.day_of_week)
+
+    # Формируем читаемый текст
+    schedule_texts = []
+    for day_name in days:
+        if day_name in schedule_by_day:
+            times = schedule_by_day[day_name]
+            time_texts = [f"{time['start']}-{time['end']}" for time in times]
+            schedule_texts.append(f"{day_name} {', '.join(time_texts)}")
+
+    return ", ".join(schedule_texts) if schedule_texts else "Расписания пока нет"
+
+
+@dataclass
+class Catalog:
+    """Собранный каталог определенной версии"""
+    version: int
+    last_modified: datetime
+    groups: list
+    groups_json: bytes
+    groups_etag: str
+    schedule_groups: list
+    schedule_etag: str
+
+
+def read_catalog_version():
+    """Текущая версия каталога и время ее изменения"""
+    state = db.session.get(AppState, CATALOG_VERSION_KEY)
+    if state is None:
+        return 0, None
+    return int(state.value or 0), state.updated_at
+
+
+def bump_catalog_version():
+    """
+    Увеличивает версию каталога в текущей транзакции (коммит - за вызывающим
+    кодом) и сбрасывает кэш этого процесса.
+    """
+    now = datetime.utcnow()
+    result = db.session.execute(
+        update(AppState).where(AppState.key == CATALOG_VERSION_KEY).values(
+            value=cast(cast(AppState.value, Integer) + 1, Text),
+            updated_at=now
+        ).execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        db.session.add(AppState(key=CATALOG_VERSION_KEY, value='1', updated_at=now))
+
+    # Кэш сбрасывается после коммита, чтобы параллельный запрос не закэшировал старые данные
+    db.session.info['catalog_changed'] = True
+
+
+def _invalidate_after_commit(session):
+    if session.info.pop('catalog_changed', False):
+        cache = current_app.extensions.get('catalog_cache')
+        if cache is not None:
+            cache.invalidate()
+
+
+def _discard_after_rollback(session, previous_transaction):
+    session.info.pop('catalog_changed', None)
+
+
+def build_catalog(version, updated_at):
+    """Собирает каталог двумя запросами: группы и все расписания"""
+    groups = SportGroup.query.order_by(SportGroup.id).all()
+    schedules_by_group = {}
+    for schedule in Schedule.query.order_by(Schedule.id):
+        schedules_by_group.setdefault(schedule.sport_group_id, []).append(schedule)
+
+    groups_data = []
+    schedule_groups = []
+    for group in groups:
+        formatted_schedule = format_schedule_for_display(schedules_by_group.get(group.id, []))
+        groups_data.append({
+            'id': group.id,
+            'name': group.name,
+            'description': group.description,
+            'detailed_description': group.detailed_description,
+            'trainer_name': group.trainer_name,
+            'trainer_info': group.trainer_info,
+            'price_8': group.price_8,
+            'price_12': group.price_12,
+            'price_single': group.price_single,
+            'category': group.category,
+            'age_group': group.age_group,
+            'schedule': formatted_schedule
+        })
+        schedule_groups.append({
+            'id': group.id,
+            'name': group.name,
+            'schedule': formatted_schedule,
+            'trainer': group.trainer_name
+        })
+
+    groups_json = current_app.json.dumps({'success': True, 'groups': groups_data}).encode('utf-8')
+    schedule_json = current_app.json.dumps(schedule_groups).encode('utf-8')
+    return Catalog(
+        version=version,
+        last_modified=updated_at.replace(tzinfo=timezone.utc) if updated_at else None,
+        groups=groups_data,
+        groups_json=groups_json,
+        groups_etag=hashlib.sha1(groups_json).hexdigest(),
+        schedule_groups=schedule_groups,
+        schedule_etag='schedule-' + hashlib.sha1(schedule_json).hexdigest()
+    )
+
+
+class CatalogCache:
+    """
+    Каталог в памяти процесса. Версия в базе проверяется не чаще, чем раз
+    в check_interval секунд; изменения в этом же процессе видны сразу.
+    """
+
+    def __init__(self, check_interval=2.0):
+        self.check_interval = check_interval
+        self._catalog = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self):
+        now = time.monotonic()
+        catalog = self._catalog
+        if catalog is not None and now - self._checked_at < self.check_interval:
+            return catalog
+
+        with self._lock:
+            version, updated_at = read_catalog_version()
+            if self._catalog is None or self._catalog.version != version:
+                self._catalog = build_catalog(version, updated_at)
+            self._checked_at = now
+            return self._catalog
+
+    def invalidate(self):
+        with self._lock:
+            self._catalog = None
+            self._checked_at = 0.0
+
+
+def init_catalog(app):
+    """Регистрирует кэш каталога в приложении"""
+    cache = CatalogCache(check_interval=app.config.get('CATALOG_VERSION_CHECK_INTERVAL', 2.0))
+    app.extensions['catalog_cache'] = cache
+    if not event.contains(Session, 'after_commit', _invalidate_after_commit):
+        event.listen(Session, 'after_commit', _invalidate_after_commit)
+        event.listen(Session, 'after_soft_rollback', _discard_after_rollback)
+    return cache
+
+
+def get_catalog():
+    """Актуальный каталог текущего приложения"""
+    return current_app.extensions['catalog_cache'].get()
@@ -0,0 +1,193 @@
+"""
+Сжатие ответов и условные GET.
+
+Статические файлы читаются в память при старте вместе с заранее сжатыми
+вариантами (gzip и, если установлен пакет brotli, br). Их ETag - хэш
+содержимого; url_for('static', ...) добавляет его в адрес параметром v, и
+по такому адресу файл отдается с Cache-Control: immutable, а по адресу без
+отпечатка - с обязательной проверкой (no-cache), и повторная загрузка
+стоит ответа 304. Собранные файлы из static/dist (asset_manifest.py) уже
+содержат хэш в имени и всегда отдаются как immutable.
+
+Динамические ответы текстовых типов больше COMPRESS_MIN_SIZE байт сжимаются
+на лету. JSON-ответы на GET получают ETag по содержимому, поэтому
+повторный запрос с If-None-Match возвращает 304 без тела.
+"""
+
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+from flask import current_app, request
+
+from asset_manifest import DIST_DIR
+
+try:
+    import brotli
+except ImportError:  # br отдается, только если установлен пакет brotli
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE_MIMETYPES = frozenset({
+    'application/json', 'application/javascript', 'text/javascript', 'text/css',
+    'text/html', 'text/plain', 'text/csv', 'image/svg+xml'
+})
+
+
+def fingerprint(data):
+    """Короткий хэш содержимого для ETag и адресов статики"""
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+def available_encodings():
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def compress(data, encoding, level=6, brotli_quality=5):
+    if encoding == 'br':
+        return brotli.compress(data, quality=brotli_quality)
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def choose_encoding(encodings):
+    """Лучшее из encodings по заголовку Accept-Encoding запроса или None"""
+    if not encodings:
+        return None
+    return request.accept_encodings.best_match(encodings)
+
+
+@dataclass
+class StaticAsset:
+    """Статический файл в памяти со сжатыми вариантами"""
+    data: bytes
+    mimetype: str
+    etag: str
+    mtime: float
+    immutable: bool = False  # Собранный файл с хэшем в имени (asset_manifest.py)
+    encoded: dict = field(default_factory=dict)  # 'br'/'gzip' -> сжатое содержимое
+
+
+class StaticAssets:
+    """Статические файлы приложения, прочитанные и сжатые заранее"""
+
+    def __init__(self, folder, min_size=1024, level=9, brotli_quality=11, check_mtime=False):
+        self.folder = folder
+        self.min_size = min_size
+        self.level = level
+        self.brotli_quality = brotli_quality
+        self.check_mtime = check_mtime  # В режиме отладки измененные файлы перечитываются
+        self._assets = {}
+
+    def load(self):
+        """Читает все файлы папки статики; возвращает их число"""
+        for directory, _, files in os.walk(self.folder):
+            for name in files:
+                path = os.path.join(directory, name)
+                filename = os.path.relpath(path, self.folder).replace(os.sep, '/')
+                self._assets[filename] = self._read(path)
+        return len(self._assets)
+
+    def _read(self, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        filename = os.path.relpath(path, self.folder).replace(os.sep, '/')
+        asset = StaticAsset(data, mimetype, fingerprint(data), os.path.getmtime(path), filename.startswith(DIST_DIR + '/'))
+        if mimetype in COMPRESSIBLE_MIMETYPES and len(data) >= self.min_size:
+            for encoding in available_encodings():
+                encoded = compress(data, encoding, self.level, self.brotli_quality)
+                if len(encoded) < len(data):
+                    asset.encoded[encoding] = encoded
+        return asset
+
+    def get(self, filename):
+        asset = self._assets.get(filename)
+        if asset is not None and self.check_mtime:
+            path = os.path.join(self.folder, filename)
+            if not os.path.exists(path):
+                self._assets.pop(filename, None)
+                return None
+            if os.path.getmtime(path) != asset.mtime:
+                asset = self._assets[filename] = self._read(path)
+        return asset
+
+    @property
+    def total_size(self):
+        return sum(len(asset.data) for asset in self._assets.values())
+
+
+def serve_static(assets, fallback, filename):
+    """Отдает статический файл из памяти с учетом Accept-Encoding и If-None-Match"""
+    asset = assets.get(filename)
+    if asset is None:
+        return fallback(filename=filename)
+
+    encoding = choose_encoding(list(asset.encoded))
+    response = current_app.response_class(asset.encoded[encoding] if encoding else asset.data, mimetype=asset.mimetype)
+    response.set_etag(f'{asset.etag}-{encoding}' if encoding else asset.etag)
+    response.last_modified = datetime.fromtimestamp(asset.mtime, timezone.utc)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    if asset.encoded:
+        response.vary.add('Accept-Encoding')
+    if asset.immutable or request.args.get('v') == asset.etag:
+        # Адрес с отпечатком содержимого никогда не меняет ответ
+        response.headers['Cache-Control'] = f"public, max-age={current_app.config.get('STATIC_MAX_AGE', 31536000)}, immutable"
+    else:
+        response.headers['Cache-Control'] = 'public, no-cache'
+    return response.make_conditional(request)
+
+
+def process_response(response):
+    """ETag для JSON-ответов на GET и сжатие текстовых ответов"""
+    if (response.status_code != 200 or request.endpoint == 'static' or response.direct_passthrough or response.is_streamed
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES or 'Content-Encoding' in response.headers):
+        return response
+
+    config = current_app.config
+    data = response.get_data()
+    encoding = choose_encoding(available_encodings()) if len(data) >= config.get('COMPRESS_MIN_SIZE', 1024) else None
+
+    if request.method in ('GET', 'HEAD') and response.mimetype == 'application/json' and response.get_etag()[0] is None:
+        etag = fingerprint(data)
+        # Сжатый вариант - другое представление, у него свой ETag
+        response.set_etag(f'{etag}-{encoding}' if encoding else etag)
+        response.headers.setdefault('Cache-Control', 'private, no-cache')
+        response.vary.add('Accept-Encoding')
+        response.make_conditional(request)
+        if response.status_code == 304:
+            return response
+
+    if encoding:
+        response.set_data(compress(data, encoding, config.get('COMPRESS_LEVEL', 6), config.get('COMPRESS_BROTLI_QUALITY', 5)))
+        response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+    return response
+
+
+def init_compression(app):
+    """Подключает сжатие ответов и отдачу статики из памяти"""
+    assets = StaticAssets(app.static_folder, min_size=app.config.get('COMPRESS_MIN_SIZE', 1024),
+                          check_mtime=app.debug)
+    count = assets.load() if app.has_static_folder and os.path.isdir(app.static_folder) else 0
+    app.extensions['static_assets'] = assets
+    logger.info("Static assets loaded: %s files, %s bytes, encodings=%s", count, assets.total_size, ','.join(available_encodings()))
+
+    if app.has_static_folder:
+        fallback = app.view_functions['static']
+        app.view_functions['static'] = lambda filename: serve_static(assets, fallback, filename)
+
+    @app.url_defaults
+    def add_static_fingerprint(endpoint, values):
+        if endpoint == 'static' and 'v' not in values:
+            asset = assets.get(values.get('filename'))
+            if asset is not None and not asset.immutable:
+                values['v'] = asset.etag
+
+    app.after_request(process_response)
+    return assets
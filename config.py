@@ -1,20 +1,118 @@
 import os
 from dotenv import load_dotenv
 
+from logging_setup import parse_levels
+
 load_dotenv()
 
+
+def database_profile_name(uri, name=None):
+    """Профиль подключения: явно заданный или по типу базы (PostgreSQL / SQLite для разработки)"""
+    if name:
+        if name not in ('sqlite-dev', 'sqlite-prod', 'postgres'):
+            raise ValueError(f'Неизвестный DB_PROFILE: {name}')
+        return name
+    return 'postgres' if uri.startswith('postgres') else 'sqlite-dev'
+
+
+def database_engine_options(profile):
+    """Параметры create_engine для профиля: пул соединений для PostgreSQL"""
+    if profile != 'postgres':
+        return {}
+    return {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', '10')),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', '20')),
+        'pool_timeout': float(os.environ.get('DB_POOL_TIMEOUT', '30')),
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', '1800')),
+        'pool_pre_ping': True,
+    }
+
+
+def sqlite_pragmas(profile):
+    """PRAGMA, выполняемые при каждом новом соединении SQLite"""
+    busy_timeout = int(os.environ.get('SQLITE_BUSY_TIMEOUT', '5000'))
+    if profile == 'sqlite-dev':
+        return {'busy_timeout': busy_timeout}
+    if profile == 'sqlite-prod':
+        return {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'busy_timeout': busy_timeout,
+            'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024))),
+        }
+    return {}
+
+
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///sportclub.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # Профиль подключения к БД: sqlite-dev, sqlite-prod (WAL, synchronous=NORMAL, mmap) или postgres (пул соединений).
+    # По умолчанию выбирается по DATABASE_URL; применяется database.init_database
+    DB_PROFILE = database_profile_name(SQLALCHEMY_DATABASE_URI, os.environ.get('DB_PROFILE'))
+    SQLALCHEMY_ENGINE_OPTIONS = database_engine_options(DB_PROFILE)
+    SQLITE_PRAGMAS = sqlite_pragmas(DB_PROFILE)
+    
+    # Реплика для чтения (replica.py): GET-маршруты, отмеченные read_replica, читают с нее, записи идут в основную базу.
+    # После записи сессия пользователя READ_YOUR_WRITES_SECONDS секунд читает только основную базу
+    DATABASE_REPLICA_URL = os.environ.get('DATABASE_REPLICA_URL')
+    SQLALCHEMY_BINDS = {'replica': DATABASE_REPLICA_URL} if DATABASE_REPLICA_URL else {}
+    READ_YOUR_WRITES_SECONDS = float(os.environ.get('READ_YOUR_WRITES_SECONDS', '5'))
+    
+    # Логирование (logging_setup.py): общий уровень, уровни модулей ('sqlalchemy.engine=WARNING,notifications=DEBUG'),
+    # частота выборочных записей в горячих циклах
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+    LOG_LEVELS = parse_levels(os.environ.get('LOG_LEVELS', ''))
+    LOG_FORMAT = os.environ.get('LOG_FORMAT', '%(asctime)s %(levelname)s %(name)s: %(message)s')
+    LOG_SAMPLE_EVERY = int(os.environ.get('LOG_SAMPLE_EVERY', '100'))
+    
     # Telegram Bot settings
     TELEGRAM_BOT_TOKEN = os.environ.get('TELEGRAM_BOT_TOKEN')
     TELEGRAM_WEBAPP_URL = os.environ.get('TELEGRAM_WEBAPP_URL') or 'https://your-domain.ngrok.io'
     
+    # Очередь доставки уведомлений (лимиты Bot API: ~30 сообщений/с, 1 сообщение/с в чат)
+    TELEGRAM_API_URL = os.environ.get('TELEGRAM_API_URL') or 'https://api.telegram.org'
+    TELEGRAM_WORKERS = int(os.environ.get('TELEGRAM_WORKERS', '4'))
+    TELEGRAM_GLOBAL_RATE = float(os.environ.get('TELEGRAM_GLOBAL_RATE', '30'))
+    TELEGRAM_CHAT_INTERVAL = float(os.environ.get('TELEGRAM_CHAT_INTERVAL', '1.0'))
+    TELEGRAM_MAX_RETRIES = int(os.environ.get('TELEGRAM_MAX_RETRIES', '5'))
+    TELEGRAM_TIMEOUT = float(os.environ.get('TELEGRAM_TIMEOUT', '10'))
+    
     # Admin Telegram ID (замените на реальный ID администратора)
     ADMIN_TELEGRAM_ID = int(os.environ.get('ADMIN_TELEGRAM_ID', '123456789'))
     
+    # Как часто воркер сверяет версию кэша каталога групп с базой (секунды)
+    CATALOG_VERSION_CHECK_INTERVAL = float(os.environ.get('CATALOG_VERSION_CHECK_INTERVAL', '2'))
+    
+    # Кэш доступа родителей к участникам (access.py): время жизни карты, число пользователей, проверка версии (секунды)
+    ACCESS_CACHE_TTL = float(os.environ.get('ACCESS_CACHE_TTL', '60'))
+    ACCESS_CACHE_MAX_USERS = int(os.environ.get('ACCESS_CACHE_MAX_USERS', '10000'))
+    ACCESS_VERSION_CHECK_INTERVAL = float(os.environ.get('ACCESS_VERSION_CHECK_INTERVAL', '2'))
+    
+    # Метрики запросов: число SQL-запросов и время по маршрутам, заголовок Server-Timing
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+    METRICS_SERVER_TIMING = os.environ.get('METRICS_SERVER_TIMING', 'true').lower() == 'true'
+    
+    # Провайдер JSON-ответов (json_provider.py): auto (orjson, если установлен), orjson или stdlib
+    JSON_PROVIDER = os.environ.get('JSON_PROVIDER', 'auto').lower()
+    
+    # Сжатие ответов и кэширование (compression.py): минимальный размер для сжатия (байт), уровень gzip,
+    # качество brotli для динамических ответов, max-age статики по адресам с отпечатком (секунды)
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', '1024'))
+    COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', '6'))
+    COMPRESS_BROTLI_QUALITY = int(os.environ.get('COMPRESS_BROTLI_QUALITY', '5'))
+    STATIC_MAX_AGE = int(os.environ.get('STATIC_MAX_AGE', '31536000'))
+    
+    # Фоновые задачи (scheduler.py): истечение подписок и уведомления о низком балансе.
+    # Поток планировщика в воркере включается SCHEDULER_ENABLED, иначе запускайте `flask --app app run-jobs`
+    SCHEDULER_ENABLED = os.environ.get('SCHEDULER_ENABLED', 'false').lower() == 'true'
+    SCHEDULER_TICK = float(os.environ.get('SCHEDULER_TICK', '30'))
+    EXPIRY_SWEEP_INTERVAL = float(os.environ.get('EXPIRY_SWEEP_INTERVAL', '3600'))
+    LOW_BALANCE_INTERVAL = float(os.environ.get('LOW_BALANCE_INTERVAL', '3600'))
+    LOW_BALANCE_THRESHOLDS = [int(value) for value in os.environ.get('LOW_BALANCE_THRESHOLDS', '1').split(',') if value.strip()]
+    JOBS_BATCH_SIZE = int(os.environ.get('JOBS_BATCH_SIZE', '500'))
+    
     # Sport groups
     SPORT_GROUPS = [
         'Дзюдо младшая группа',
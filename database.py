@@ -0,0 +1,67 @@
+"""
+Настройка движка базы данных.
+
+Параметры пула соединений задаются профилем в config.py
+(SQLALCHEMY_ENGINE_OPTIONS); здесь к движку SQLite подключаются PRAGMA,
+которые выполняются при каждом новом соединении, и при старте в лог
+выводятся действующие настройки.
+"""
+
+import logging
+
+from sqlalchemy import event
+
+from models import db
+from replica import REPLICA_BIND
+
+logger = logging.getLogger(__name__)
+
+
+def apply_sqlite_pragmas(engine, pragmas):
+    """Выполняет PRAGMA на каждом новом соединении движка"""
+    if not pragmas or engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
+
+
+def effective_settings(engine, profile, pragmas):
+    """Действующие настройки: пул соединений или значения PRAGMA, прочитанные из базы"""
+    settings = {'profile': profile, 'url': engine.url.render_as_string(hide_password=True)}
+    if engine.dialect.name == 'sqlite' and pragmas:
+        with engine.connect() as conn:
+            for name in pragmas:
+                settings[name] = conn.exec_driver_sql(f'PRAGMA {name}').scalar()
+    else:
+        pool = engine.pool
+        settings.update({
+            'pool': type(pool).__name__,
+            'pool_size': pool.size() if hasattr(pool, 'size') else None,
+            'max_overflow': getattr(pool, '_max_overflow', None),
+            'pool_timeout': getattr(pool, '_timeout', None),
+            'pool_recycle': pool._recycle,
+            'pool_pre_ping': pool._pre_ping,
+        })
+    return settings
+
+
+def init_database(app):
+    """Подключает PRAGMA профиля к движкам приложения и пишет в лог действующие настройки"""
+    profile = app.config.get('DB_PROFILE')
+    pragmas = app.config.get('SQLITE_PRAGMAS') or {}
+    with app.app_context():
+        for engine in db.engines.values():
+            apply_sqlite_pragmas(engine, pragmas)
+        settings = effective_settings(db.engine, profile, pragmas)
+        replica = db.engines.get(REPLICA_BIND)
+        if replica is not None:
+            settings['replica_url'] = replica.url.render_as_string(hide_password=True)
+    logger.info('Database settings: ' + ', '.join(f'{key}={value}' for key, value in settings.items()))
+    return settings
@@ -0,0 +1,334 @@
+"""
+Потоковая выгрузка платежей, учеников и посещаемости в CSV и XLSX.
+
+Строки читаются из базы пакетами (yield_per, в PostgreSQL - серверный
+курсор) и сразу превращаются в куски ответа, поэтому расход памяти не
+зависит от объема выгрузки. XLSX пишется потоково без сторонних пакетов:
+лист со строками inlineStr упаковывается в zip, который отдается по мере
+записи.
+"""
+
+import csv
+import io
+import re
+import zipfile
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from xml.sax.saxutils import escape, quoteattr
+
+from sqlalchemy import case
+
+from models import db, Payment, Subscription, Participant, SportGroup, Attendance, AttendanceRecord
+from payments import payments_query, parse_payment_filters
+
+EXPORT_BATCH_SIZE = 1000  # строк на один fetch из базы
+CHUNK_ROWS = 500  # строк на один кусок ответа
+CSV_DELIMITER = ';'  # Excel с русской локалью ожидает «;»
+EXPORT_FORMATS = ('csv', 'xlsx')
+EXPORT_DATASETS = ('payments', 'students', 'attendance')
+
+CSV_MIMETYPE = 'text/csv; charset=utf-8'
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+ATTENDANCE_STATUS_LABELS = {
+    'present': 'Присутствовал',
+    'excused': 'Уважительная причина',
+    'unexcused': 'Неуважительная причина',
+    'absent': 'Отсутствовал'
+}
+
+
+@dataclass
+class Export:
+    """Выгрузка: имя файла без расширения, заголовки колонок и поток строк"""
+    name: str
+    columns: list
+    rows: object  # итератор кортежей значений
+
+
+def _yes_no(value):
+    return 'да' if value else 'нет'
+
+
+def export_payments(filters=None):
+    """Платежи с теми же фильтрами, что и список в админ-панели"""
+    query = payments_query(filters).order_by(Payment.created_at.desc(), Payment.id.desc())
+    rows = ((
+        row.id, row.created_at, row.full_name, row.parent_phone, row.group_name, row.subscription_type,
+        row.amount, row.payment_method, row.status, _yes_no(row.is_paid), row.payment_date, row.admin_notes
+    ) for row in query.yield_per(EXPORT_BATCH_SIZE))
+    return Export('payments', [
+        'ID', 'Создан', 'Участник', 'Телефон родителя', 'Группа', 'Абонемент',
+        'Сумма', 'Способ оплаты', 'Статус', 'Оплачен', 'Дата оплаты', 'Комментарий'
+    ], rows)
+
+
+def export_students(sport_group_id=None, active_only=False):
+    """Ученики с подписками (строка на подписку; без подписок - одна строка) и суммой оплат по журналу"""
+    subscription_filter = Subscription.participant_id == Participant.id
+    if active_only:
+        subscription_filter &= Subscription.is_active == True
+    query = db.session.query(
+        Participant.id, Participant.full_name, Participant.birth_date, Participant.parent_phone,
+        Participant.medical_certificate, Participant.discount_type, Participant.discount_percent,
+        SportGroup.name.label('group_name'), Subscription.subscription_type, Subscription.total_lessons,
+        Subscription.remaining_lessons, Subscription.start_date, Subscription.end_date, Subscription.is_active,
+        Subscription.paid_total
+    ).outerjoin(Subscription, subscription_filter) \
+        .outerjoin(SportGroup, SportGroup.id == Subscription.sport_group_id)
+    if sport_group_id is not None:
+        query = query.filter(Subscription.sport_group_id == sport_group_id)
+
+    rows = ((
+        row.id, row.full_name, row.birth_date, row.parent_phone, _yes_no(row.medical_certificate),
+        row.discount_type, row.discount_percent, row.group_name, row.subscription_type, row.total_lessons,
+        row.remaining_lessons, row.start_date, row.end_date,
+        _yes_no(row.is_active) if row.group_name else None, row.paid_total or 0
+    ) for row in query.order_by(Participant.full_name, Participant.id, Subscription.id).yield_per(EXPORT_BATCH_SIZE))
+    return Export('students', [
+        'ID', 'Участник', 'Дата рождения', 'Телефон родителя', 'Справка', 'Скидка', 'Скидка, %',
+        'Группа', 'Абонемент', 'Занятий', 'Осталось', 'Начало', 'Окончание', 'Активен', 'Оплачено'
+    ], rows)
+
+
+def export_attendance(sport_group_id=None, date_from=None, date_to=None):
+    """Отметки посещаемости по занятиям с date_from включительно по date_to не включительно"""
+    status = case(
+        (AttendanceRecord.is_present == True, 'present'),
+        (AttendanceRecord.absence_reason == 'excused', 'excused'),
+        (AttendanceRecord.absence_reason == 'unexcused', 'unexcused'),
+        else_='absent'
+    )
+    query = db.session.query(
+        Attendance.lesson_date, Attendance.start_time, SportGroup.name.label('group_name'),
+        Participant.id.label('participant_id'), Participant.full_name, status.label('status'),
+        AttendanceRecord.is_charged
+    ).join(Attendance, Attendance.id == AttendanceRecord.attendance_id) \
+        .join(SportGroup, SportGroup.id == Attendance.sport_group_id) \
+        .join(Participant, Participant.id == AttendanceRecord.participant_id)
+    if sport_group_id is not None:
+        query = query.filter(Attendance.sport_group_id == sport_group_id)
+    if date_from:
+        query = query.filter(Attendance.lesson_date >= date_from)
+    if date_to:
+        query = query.filter(Attendance.lesson_date < date_to)
+
+    rows = ((
+        row.lesson_date, row.start_time, row.group_name, row.participant_id, row.full_name,
+        ATTENDANCE_STATUS_LABELS[row.status], _yes_no(row.is_charged)
+    ) for row in query.order_by(Attendance.lesson_date, SportGroup.name, Participant.full_name,
+                                AttendanceRecord.id).yield_per(EXPORT_BATCH_SIZE))
+    return Export('attendance', [
+        'Дата', 'Начало', 'Группа', 'ID участника', 'Участник', 'Отметка', 'Списано'
+    ], rows)
+
+
+
+def build_export(dataset, args):
+    """
+    Выгрузка по имени и параметрам запроса. group_id, date_from и date_to
+    (YYYY-MM-DD, включительно) разбираются так же, как в списке платежей;
+    для платежей действует и status, для учеников - active=1.
+    """
+    if dataset not in EXPORT_DATASETS:
+        raise ValueError(f'Неизвестная выгрузка: {dataset}')
+    filters = parse_payment_filters(args)
+    if dataset == 'payments':
+        return export_payments(filters)
+    if dataset == 'students':
+        return export_students(filters.sport_group_id, args.get('active', '').lower() in ('1', 'true'))
+    return export_attendance(
+        filters.sport_group_id,
+        filters.date_from.date() if filters.date_from else None,
+        filters.date_to.date() if filters.date_to else None
+    )
+
+
+# ===== CSV =====
+
+def _looks_like_formula(value):
+    """Текст, который Excel принял бы за формулу (телефоны вида +7... - не формула)"""
+    if value[:1] in ('=', '@', '\t', '\r'):
+        return True
+    return value[:1] in ('+', '-') and not value[1:2].isdigit()
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M')
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, time):
+        return value.strftime('%H:%M')
+    if isinstance(value, str) and _looks_like_formula(value):
+        return "'" + value
+    return value
+
+
+def iter_csv(export):
+    """Куски CSV в UTF-8 с BOM (чтобы Excel определил кодировку)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=CSV_DELIMITER)
+    buffer.write('﻿')
+    writer.writerow(export.columns)
+    pending = 0
+    for row in export.rows:
+        writer.writerow([_csv_value(value) for value in row])
+        pending += 1
+        if pending >= CHUNK_ROWS:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue().encode('utf-8')
+
+
+# ===== XLSX =====
+
+EXCEL_EPOCH = datetime(1899, 12, 30)
+STYLE_DATE, STYLE_DATETIME, STYLE_HEADER = 1, 2, 3
+INVALID_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+MAIN_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+REL_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+XML_HEADER = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+
+CONTENT_TYPES_XML = XML_HEADER + (
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+ROOT_RELS_XML = XML_HEADER + (
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    f'<Relationship Id="rId1" Type="{REL_NS}/officeDocument" Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+WORKBOOK_RELS_XML = XML_HEADER + (
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    f'<Relationship Id="rId1" Type="{REL_NS}/worksheet" Target="worksheets/sheet1.xml"/>'
+    f'<Relationship Id="rId2" Type="{REL_NS}/styles" Target="styles.xml"/>'
+    '</Relationships>'
+)
+# Стили ячеек: 0 - обычный, 1 - дата, 2 - дата и время, 3 - жирный заголовок
+STYLES_XML = XML_HEADER + (
+    f'<styleSheet xmlns="{MAIN_NS}">'
+    '<numFmts count="1"><numFmt numFmtId="164" formatCode="yyyy-mm-dd hh:mm"/></numFmts>'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="4">'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="14" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/>'
+    '</cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+SHEET_HEADER_XML = XML_HEADER + (
+    f'<worksheet xmlns="{MAIN_NS}">'
+    '<sheetViews><sheetView workbookViewId="0">'
+    '<pane ySplit="1" topLeftCell="A2" activePane="bottomLeft" state="frozen"/>'
+    '</sheetView></sheetViews><sheetData>'
+)
+SHEET_FOOTER_XML = '</sheetData></worksheet>'
+
+
+def _workbook_xml(sheet_name):
+    return XML_HEADER + (
+        f'<workbook xmlns="{MAIN_NS}" xmlns:r="{REL_NS}">'
+        f'<sheets><sheet name={quoteattr(sheet_name)} sheetId="1" r:id="rId1"/></sheets></workbook>'
+    )
+
+
+def column_letter(index):
+    """Буквенное имя колонки по индексу с нуля: 0 -> A, 26 -> AA"""
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _xlsx_cell(ref, value, style=0):
+    if value is None or value == '':
+        return ''
+    if isinstance(value, bool):
+        value = _yes_no(value)
+    if isinstance(value, datetime):
+        serial = (value - EXCEL_EPOCH) / timedelta(days=1)
+        return f'<c r="{ref}" s="{STYLE_DATETIME}"><v>{serial:.6f}</v></c>'
+    if isinstance(value, date):
+        return f'<c r="{ref}" s="{STYLE_DATE}"><v>{(value - EXCEL_EPOCH.date()).days}</v></c>'
+    if isinstance(value, time):
+        value = value.strftime('%H:%M')
+    if isinstance(value, (int, float, Decimal)):
+        return f'<c r="{ref}"><v>{value}</v></c>'
+    style_attr = f' s="{style}"' if style else ''
+    text = escape(INVALID_XML_CHARS.sub('', str(value)))
+    return f'<c r="{ref}" t="inlineStr"{style_attr}><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _xlsx_row(number, letters, values, style=0):
+    cells = ''.join(_xlsx_cell(f'{letter}{number}', value, style) for letter, value in zip(letters, values))
+    return f'<row r="{number}">{cells}</row>'
+
+
+class _ChunkWriter:
+    """Файлоподобный приемник для zipfile без seek: накапливает байты до выдачи"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_xlsx(export):
+    """Куски XLSX-файла с одним листом"""
+    output = _ChunkWriter()
+    letters = [column_letter(index) for index in range(len(export.columns))]
+    with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', CONTENT_TYPES_XML)
+        archive.writestr('_rels/.rels', ROOT_RELS_XML)
+        archive.writestr('xl/workbook.xml', _workbook_xml(export.name))
+        archive.writestr('xl/_rels/workbook.xml.rels', WORKBOOK_RELS_XML)
+        archive.writestr('xl/styles.xml', STYLES_XML)
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write((SHEET_HEADER_XML + _xlsx_row(1, letters, export.columns, STYLE_HEADER)).encode('utf-8'))
+            parts = []
+            for number, row in enumerate(export.rows, start=2):
+                parts.append(_xlsx_row(number, letters, row))
+                if len(parts) >= CHUNK_ROWS:
+                    sheet.write(''.join(parts).encode('utf-8'))
+                    parts = []
+                    yield output.drain()
+            sheet.write((''.join(parts) + SHEET_FOOTER_XML).encode('utf-8'))
+    yield output.drain()
+
+
+def export_chunks(export, export_format):
+    """Куски файла выгрузки в формате csv или xlsx"""
+    return iter_xlsx(export) if export_format == 'xlsx' else iter_csv(export)
+
+
+def export_mimetype(export_format):
+    return XLSX_MIMETYPE if export_format == 'xlsx' else CSV_MIMETYPE
@@ -0,0 +1,108 @@
+"""
+JSON-ответы API.
+
+Провайдер JSON приложения выбирается настройкой JSON_PROVIDER: orjson
+(если пакет установлен; по умолчанию при auto) или стандартный json.
+Оба кодируют даты, время и дату-время сами, в форматах, которые ожидает
+фронтенд: 'YYYY-MM-DD', 'HH:MM' и 'YYYY-MM-DD HH:MM'. Поэтому обработчики
+кладут в ответ значения из базы как есть, без strftime в цикле по строкам.
+Ключи не сортируются, не-ASCII символы пишутся как UTF-8.
+
+rows_to_dicts превращает строки SQLAlchemy (Row) в словари через zip с
+именами колонок, вычисленными один раз на результат.
+"""
+
+import dataclasses
+import decimal
+import logging
+import uuid
+from datetime import date, datetime, time
+
+from flask.json.provider import JSONProvider, DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # Без orjson используется стандартный json
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+
+def encode_value(value):
+    """Значения, которых нет в JSON: даты, время, Decimal, UUID, dataclass"""
+    if isinstance(value, datetime):
+        return value.isoformat(' ', 'minutes')
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, time):
+        return value.isoformat('minutes')
+    if isinstance(value, (decimal.Decimal, uuid.UUID)):
+        return str(value)
+    if dataclasses.is_dataclass(value):
+        return dataclasses.asdict(value)
+    if hasattr(value, '__html__'):
+        return str(value.__html__())
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class StdlibJSONProvider(DefaultJSONProvider):
+    """Стандартный json с форматами дат приложения"""
+    default = staticmethod(encode_value)
+    ensure_ascii = False
+    sort_keys = False
+
+
+class OrjsonProvider(JSONProvider):
+    """orjson: сериализация в байты без промежуточной строки в response()"""
+    mimetype = 'application/json'
+
+    def _options(self):
+        options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self._app.debug:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=encode_value, option=self._options()).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        data = orjson.dumps(obj, default=encode_value, option=self._options() | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(data, mimetype=self.mimetype)
+
+
+PROVIDERS = {'orjson': OrjsonProvider, 'stdlib': StdlibJSONProvider}
+
+
+def provider_class(name):
+    """Класс провайдера по имени: orjson, stdlib или auto (orjson, если установлен)"""
+    if name == 'auto':
+        name = 'orjson' if orjson is not None else 'stdlib'
+    if name not in PROVIDERS:
+        raise ValueError(f'Неизвестный JSON_PROVIDER: {name}')
+    if name == 'orjson' and orjson is None:
+        logger.warning("JSON_PROVIDER=orjson, but orjson is not installed; using stdlib json")
+        name = 'stdlib'
+    return PROVIDERS[name]
+
+
+def init_json(app):
+    """Устанавливает провайдер JSON приложения из JSON_PROVIDER"""
+    app.json = provider_class(app.config.get('JSON_PROVIDER', 'auto'))(app)
+    return app.json
+
+
+def rows_to_dicts(rows, renames=None):
+    """
+    Строки SQLAlchemy (Row) -> словари. Имена ключей берутся из колонок
+    первой строки, renames переименовывает их: {'full_name': 'participant_name'}.
+    """
+    rows = rows if isinstance(rows, list) else list(rows)
+    if not rows:
+        return []
+    renames = renames or {}
+    keys = tuple(renames.get(name, name) for name in rows[0]._fields)
+    return [dict(zip(keys, row)) for row in rows]
@@ -0,0 +1,215 @@
+"""
+Журнал баланса подписок.
+
+Каждое изменение баланса подписки - подтвержденный платеж, списание или
+возврат занятия, ручная корректировка - добавляется строкой в
+subscription_ledger; строки журнала не изменяются. Текущие значения
+хранятся в самой подписке (Subscription.paid_total и
+Subscription.remaining_lessons) и обновляются в той же транзакции, что и
+запись журнала, поэтому чтение баланса не требует агрегатов по платежам.
+
+Инвариант: paid_total = SUM(amount), remaining_lessons = total_lessons +
+SUM(lessons). Сверка и пересчет - `flask --app app rebuild-balances`.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import select, update, insert, func, and_, or_, exists, literal
+
+from models import db, Payment, Subscription, SubscriptionLedgerEntry
+
+ENTRY_PAYMENT_APPROVED = 'payment_approved'
+ENTRY_LESSON_DEBITED = 'lesson_debited'
+ENTRY_LESSON_REFUNDED = 'lesson_refunded'
+ENTRY_ADJUSTMENT = 'adjustment'
+OPENING_BALANCE_NOTE = 'Остаток занятий до ведения журнала'
+
+
+def post_entries(entries):
+    """Добавляет записи журнала одним пакетным INSERT"""
+    if not entries:
+        return
+    now = datetime.utcnow()
+    rows = [{
+        'subscription_id': entry['subscription_id'],
+        'entry_type': entry['entry_type'],
+        'amount': entry.get('amount', 0),
+        'lessons': entry.get('lessons', 0),
+        'payment_id': entry.get('payment_id'),
+        'attendance_id': entry.get('attendance_id'),
+        'created_by_user_id': entry.get('created_by_user_id'),
+        'note': entry.get('note'),
+        'created_at': now
+    } for entry in entries]
+    db.session.execute(insert(SubscriptionLedgerEntry), rows)
+
+
+def settle_payment(payment, status, admin_notes=None, user_id=None):
+    """
+    Переводит платеж из pending в approved или rejected условным UPDATE:
+    из двух параллельных решений по одному платежу проходит только одно.
+    Подтверждение добавляет запись журнала и увеличивает paid_total.
+    Возвращает False, если платеж уже обработан. Коммит выполняет вызывающий код.
+    """
+    values = {'status': status, 'is_paid': status == 'approved', 'admin_notes': admin_notes}
+    if status == 'approved':
+        values['payment_date'] = datetime.utcnow()
+    result = db.session.execute(update(Payment).where(
+        Payment.id == payment.id,
+        Payment.status == 'pending'
+    ).values(**values).execution_options(synchronize_session=False))
+    if result.rowcount == 0:
+        return False
+
+    if status == 'approved':
+        post_entries([{
+            'subscription_id': payment.subscription_id,
+            'entry_type': ENTRY_PAYMENT_APPROVED,
+            'amount': payment.amount,
+            'payment_id': payment.id,
+            'created_by_user_id': user_id
+        }])
+        db.session.execute(update(Subscription).where(Subscription.id == payment.subscription_id).values(
+            paid_total=Subscription.paid_total + payment.amount
+        ).execution_options(synchronize_session=False))
+    db.session.expire(payment)
+    return True
+
+
+def record_lesson_entries(attendance_id, subscription_ids, entry_type, lessons):
+    """Записи о списании (lessons=-1) или возврате (+1) занятия; остаток уже изменен вызывающим кодом"""
+    post_entries([{
+        'subscription_id': subscription_id,
+        'entry_type': entry_type,
+        'lessons': lessons,
+        'attendance_id': attendance_id
+    } for subscription_id in sorted(subscription_ids)])
+
+
+def adjust_balance(subscription_id, amount=0, lessons=0, note=None, user_id=None):
+    """Ручная корректировка суммы оплат и/или остатка занятий"""
+    if not amount and not lessons:
+        raise ValueError('Укажите изменение суммы (amount) или занятий (lessons)')
+    post_entries([{
+        'subscription_id': subscription_id,
+        'entry_type': ENTRY_ADJUSTMENT,
+        'amount': amount,
+        'lessons': lessons,
+        'note': note,
+        'created_by_user_id': user_id
+    }])
+    db.session.execute(update(Subscription).where(Subscription.id == subscription_id).values(
+        paid_total=Subscription.paid_total + amount,
+        remaining_lessons=Subscription.remaining_lessons + lessons
+    ).execution_options(synchronize_session=False))
+
+
+def load_ledger(subscription_id):
+    """Журнал подписки от старых записей к новым"""
+    entries = SubscriptionLedgerEntry.query.filter_by(subscription_id=subscription_id).order_by(SubscriptionLedgerEntry.id)
+    return [{
+        'id': entry.id,
+        'entry_type': entry.entry_type,
+        'amount': entry.amount,
+        'lessons': entry.lessons,
+        'payment_id': entry.payment_id,
+        'attendance_id': entry.attendance_id,
+        'created_by_user_id': entry.created_by_user_id,
+        'note': entry.note,
+        'created_at': entry.created_at.strftime('%Y-%m-%d %H:%M')
+    } for entry in entries]
+
+
+def _ledger_totals():
+    """Подзапрос: суммы журнала по подпискам"""
+    return select(
+        SubscriptionLedgerEntry.subscription_id.label('subscription_id'),
+        func.sum(SubscriptionLedgerEntry.amount).label('amount'),
+        func.sum(SubscriptionLedgerEntry.lessons).label('lessons')
+    ).group_by(SubscriptionLedgerEntry.subscription_id).subquery()
+
+
+def find_balance_mismatches():
+    """Подписки, у которых сохраненный баланс расходится с журналом"""
+    totals = _ledger_totals()
+    ledger_paid = func.coalesce(totals.c.amount, 0)
+    ledger_remaining = Subscription.total_lessons + func.coalesce(totals.c.lessons, 0)
+    rows = db.session.execute(select(
+        Subscription.id, Subscription.paid_total, ledger_paid, Subscription.remaining_lessons, ledger_remaining
+    ).outerjoin(totals, totals.c.subscription_id == Subscription.id).where(or_(
+        Subscription.paid_total != ledger_paid,
+        Subscription.remaining_lessons != ledger_remaining
+    )).order_by(Subscription.id))
+    return [{
+        'subscription_id': subscription_id,
+        'paid_total': paid_total,
+        'ledger_paid_total': expected_paid,
+        'remaining_lessons': remaining,
+        'ledger_remaining_lessons': expected_remaining
+    } for subscription_id, paid_total, expected_paid, remaining, expected_remaining in rows]
+
+
+def backfill_ledger():
+    """
+    Заводит журнал для данных, созданных до его появления: запись на каждый
+    подтвержденный платеж без записи и начальную корректировку остатка для
+    подписок, у которых еще нет движений по занятиям. Повторный запуск
+    ничего не добавляет. Возвращает (платежей, корректировок).
+    """
+    payment_source = select(
+        Payment.subscription_id,
+        literal(ENTRY_PAYMENT_APPROVED),
+        Payment.amount,
+        literal(0),
+        Payment.id,
+        func.coalesce(Payment.payment_date, Payment.created_at)
+    ).where(
+        Payment.status == 'approved',
+        ~exists().where(SubscriptionLedgerEntry.payment_id == Payment.id)
+    )
+    payments = db.session.execute(insert(SubscriptionLedgerEntry).from_select(
+        ['subscription_id', 'entry_type', 'amount', 'lessons', 'payment_id', 'created_at'], payment_source
+    )).rowcount
+
+    opening_source = select(
+        Subscription.id,
+        literal(ENTRY_ADJUSTMENT),
+        literal(0),
+        Subscription.remaining_lessons - Subscription.total_lessons,
+        literal(OPENING_BALANCE_NOTE),
+        literal(datetime.utcnow())
+    ).where(
+        Subscription.remaining_lessons != Subscription.total_lessons,
+        ~exists().where(and_(
+            SubscriptionLedgerEntry.subscription_id == Subscription.id,
+            SubscriptionLedgerEntry.lessons != 0
+        ))
+    )
+    openings = db.session.execute(insert(SubscriptionLedgerEntry).from_select(
+        ['subscription_id', 'entry_type', 'amount', 'lessons', 'note', 'created_at'], opening_source
+    )).rowcount
+    return payments, openings
+
+
+def rebuild_balances():
+    """
+    Дополняет журнал (backfill_ledger) и пересчитывает paid_total и
+    remaining_lessons из журнала. Возвращает (исправленные расхождения,
+    записей добавлено). Коммит выполняет вызывающий код.
+    """
+    payments, openings = backfill_ledger()
+    mismatches = find_balance_mismatches()
+    if mismatches:
+        amount_total = select(func.coalesce(func.sum(SubscriptionLedgerEntry.amount), 0)).where(
+            SubscriptionLedgerEntry.subscription_id == Subscription.id).scalar_subquery()
+        lessons_total = select(func.coalesce(func.sum(SubscriptionLedgerEntry.lessons), 0)).where(
+            SubscriptionLedgerEntry.subscription_id == Subscription.id).scalar_subquery()
+        db.session.execute(update(Subscription).where(or_(
+            Subscription.paid_total != amount_total,
+            Subscription.remaining_lessons != Subscription.total_lessons + lessons_total
+        )).values(
+            paid_total=amount_total,
+            remaining_lessons=Subscription.total_lessons + lessons_total
+        ).execution_options(synchronize_session=False))
+        db.session.expire_all()
+    return mismatches, payments + openings
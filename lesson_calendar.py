@@ -0,0 +1,97 @@
+"""
+Календарь занятий группы.
+
+Расписание (Schedule) разворачивается в конкретные даты для произвольного
+окна прямо в памяти, а уже созданные занятия (Attendance) загружаются
+одним запросом lesson_date BETWEEN и накладываются на календарь. Число
+SQL-запросов не зависит от ширины окна.
+"""
+
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+
+from models import Schedule, Attendance
+from catalog import DAY_NAMES
+
+DEFAULT_WINDOW_DAYS = 28
+MAX_WINDOW_DAYS = 366
+
+
+@dataclass
+class Lesson:
+    """Занятие календаря: по расписанию и/или уже созданное в учете посещаемости"""
+    lesson_date: date
+    start_time: object
+    end_time: object
+    attendance: Attendance = None
+
+    def to_dict(self):
+        # Дата и время кодируются JSON-провайдером (json_provider.py); month - название месяца
+        return {
+            'date': self.lesson_date,
+            'day_name': DAY_NAMES[self.lesson_date.weekday()],
+            'day_number': self.lesson_date.day,
+            'month': self.lesson_date.strftime('%B'),
+            'year': self.lesson_date.year,
+            'start_time': self.start_time,
+            'end_time': self.end_time,
+            'has_attendance': self.attendance is not None,
+            'is_completed': bool(self.attendance.is_completed) if self.attendance else False
+        }
+
+
+def parse_window(args, today=None):
+    """Окно календаря из параметров from/to (YYYY-MM-DD, включительно)"""
+    today = today or date.today()
+    try:
+        start = datetime.strptime(args['from'], '%Y-%m-%d').date() if args.get('from') else today
+        end = datetime.strptime(args['to'], '%Y-%m-%d').date() if args.get('to') else start + timedelta(days=DEFAULT_WINDOW_DAYS - 1)
+    except ValueError:
+        raise ValueError('Некорректная дата (ожидается YYYY-MM-DD)')
+    if end < start:
+        raise ValueError('Дата окончания раньше даты начала')
+    if (end - start).days >= MAX_WINDOW_DAYS:
+        raise ValueError(f'Окно календаря не больше {MAX_WINDOW_DAYS} дней')
+    return start, end
+
+
+def expand_schedule(schedules, start, end):
+    """
+    Даты занятий в окне [start, end] по расписанию. В день берется первое
+    занятие дня недели - учет посещаемости ведется по одной записи на дату.
+    """
+    by_day = {}
+    for schedule in schedules:
+        by_day.setdefault(schedule.day_of_week, schedule)
+    if not by_day:
+        return
+
+    current = start
+    while current <= end:
+        schedule = by_day.get(current.weekday())
+        if schedule is not None:
+            yield current, schedule
+        current += timedelta(days=1)
+
+
+def build_lesson_calendar(group_id, start, end):
+    """Занятия группы в окне: два запроса (расписание и занятия за окно)"""
+    schedules = Schedule.query.filter_by(sport_group_id=group_id).order_by(Schedule.id).all()
+    attendances = {
+        attendance.lesson_date: attendance
+        for attendance in Attendance.query.filter(
+            Attendance.sport_group_id == group_id,
+            Attendance.lesson_date.between(start, end)
+        )
+    }
+
+    lessons = {
+        lesson_date: Lesson(lesson_date, schedule.start_time, schedule.end_time, attendances.get(lesson_date))
+        for lesson_date, schedule in expand_schedule(schedules, start, end)
+    }
+    # Занятия, проведенные вне текущего расписания (например, до его изменения)
+    for lesson_date, attendance in attendances.items():
+        if lesson_date not in lessons:
+            lessons[lesson_date] = Lesson(lesson_date, attendance.start_time, attendance.end_time, attendance)
+
+    return [lessons[lesson_date] for lesson_date in sorted(lessons)]
@@ -0,0 +1,133 @@
+"""
+Настройка логирования.
+
+Обработчик корневого логгера только подставляет аргументы в сообщение и
+кладет запись в очередь (QueueHandler), а форматирует и пишет в поток
+вывода отдельный поток QueueListener, поэтому запрос не ждет ввода-вывода
+логов. Уровни задаются
+в Config: общий LOG_LEVEL и уровни отдельных модулей LOG_LEVELS. Перед
+постановкой в очередь из текста записи вырезаются секреты (токен бота).
+Для горячих циклов есть LogSampler: пишет только каждую N-ю запись.
+Сообщения логов форматируются лениво (%-подстановка), только если запись
+действительно будет выведена.
+"""
+
+import atexit
+import copy
+import logging
+import queue
+import sys
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+DEFAULT_FORMAT = '%(asctime)s %(levelname)s %(name)s: %(message)s'
+REDACTED = '***'
+
+_listener = None
+_formatter = logging.Formatter()
+
+
+class RedactingQueueHandler(QueueHandler):
+    """
+    QueueHandler, который подставляет аргументы в сообщение и вырезает из
+    него секреты. Форматирование по LOG_FORMAT (время, уровень, имя) выполняет
+    поток записи.
+    """
+
+    def __init__(self, log_queue, secrets=()):
+        super().__init__(log_queue)
+        self.secrets = [secret for secret in secrets if secret]
+
+    def redact(self, text):
+        for secret in self.secrets:
+            if secret in text:
+                text = text.replace(secret, REDACTED)
+        return text
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = self.redact(record.getMessage())
+        record.args = None
+        if record.exc_info:
+            # Трассировку нельзя передать в другой поток: сохраняется ее текст
+            record.exc_text = self.redact(_formatter.formatException(record.exc_info))
+            record.exc_info = None
+        if record.stack_info:
+            record.stack_info = self.redact(record.stack_info)
+        return record
+
+
+class LogSampler:
+    """
+    Пишет первую и затем каждую every-ю запись с одним и тем же шаблоном
+    сообщения (с числом увиденных). Если уровень отключен, вызов ничего не
+    стоит, кроме проверки уровня.
+    """
+
+    def __init__(self, logger, every=100):
+        self.logger = logger
+        self.every = max(1, every)
+        self._counts = {}  # Шаблон сообщения -> число вызовов
+        self._lock = threading.Lock()
+
+    def log(self, level, msg, *args):
+        if not self.logger.isEnabledFor(level):
+            return
+        with self._lock:
+            count = self._counts[msg] = self._counts.get(msg, 0) + 1
+        if count == 1 or count % self.every == 0:
+            self.logger.log(level, msg + ' [sampled 1/%d, seen %d]', *args, self.every, count)
+
+    def debug(self, msg, *args):
+        self.log(logging.DEBUG, msg, *args)
+
+    def warning(self, msg, *args):
+        self.log(logging.WARNING, msg, *args)
+
+
+def parse_levels(value):
+    """'sqlalchemy.engine=WARNING,notifications=DEBUG' -> {'sqlalchemy.engine': 'WARNING', ...}"""
+    levels = {}
+    for item in (value or '').split(','):
+        if '=' in item:
+            name, level = item.split('=', 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging(config, stream=None):
+    """
+    Настраивает корневой логгер по Config: уровни, очередь и поток записи
+    (stream, по умолчанию stderr). Повторный вызов заменяет прежнюю настройку.
+    """
+    global _listener
+    stop_logging()
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.setLevel(getattr(config, 'LOG_LEVEL', 'INFO'))
+    for name, level in (getattr(config, 'LOG_LEVELS', None) or {}).items():
+        logging.getLogger(name).setLevel(level)
+
+    formatter = logging.Formatter(getattr(config, 'LOG_FORMAT', DEFAULT_FORMAT))
+    output = logging.StreamHandler(stream or sys.stderr)
+    secrets = [getattr(config, 'TELEGRAM_BOT_TOKEN', None)]
+
+    handler = RedactingQueueHandler(queue.SimpleQueue(), secrets)
+    output.setFormatter(formatter)
+    _listener = QueueListener(handler.queue, output)
+    _listener.start()
+    root.addHandler(handler)
+    return handler
+
+
+def stop_logging():
+    """Дописывает очередь и останавливает поток записи"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_logging)
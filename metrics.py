@@ -0,0 +1,207 @@
+"""
+Метрики запросов: число SQL-запросов, время в базе и время обработчика.
+
+Слушатели SQLAlchemy (before/after_cursor_execute) накапливают статистику
+текущего HTTP-запроса во flask.g, а хуки Flask после ответа добавляют
+заголовок Server-Timing и сохраняют значения в реестр по маршрутам с
+гистограммами. Снимок реестра отдает /api/admin/metrics.
+"""
+
+import bisect
+import threading
+import time
+from dataclasses import dataclass, field
+
+from flask import g, request, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Верхние границы корзин гистограмм (последняя корзина - «больше»)
+DURATION_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+STATEMENT_PREVIEW_LENGTH = 300
+
+
+@dataclass
+class RequestMetrics:
+    """Статистика одного HTTP-запроса"""
+    started: float = field(default_factory=time.perf_counter)
+    query_count: int = 0
+    db_time: float = 0.0
+    slowest_time: float = 0.0
+    slowest_statement: str = None
+    recorded: bool = False
+
+    def add_query(self, statement, elapsed):
+        self.query_count += 1
+        self.db_time += elapsed
+        if elapsed > self.slowest_time:
+            self.slowest_time = elapsed
+            self.slowest_statement = statement
+
+
+class Histogram:
+    """Счетчики по фиксированным корзинам"""
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+
+    def snapshot(self):
+        # counts[i] - значения <= bounds[i]; последний элемент counts - больше bounds[-1]
+        return {'bounds': list(self.bounds), 'counts': list(self.counts)}
+
+
+class RouteMetrics:
+    """Накопленные метрики маршрута"""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.db_total_ms = 0.0
+        self.queries_total = 0
+        self.queries_max = 0
+        self.slowest_ms = 0.0
+        self.slowest_statement = None
+        self.duration_ms = Histogram(DURATION_BUCKETS_MS)
+        self.queries = Histogram(QUERY_COUNT_BUCKETS)
+
+    def observe(self, metrics, duration_ms, status_code):
+        self.requests += 1
+        if status_code >= 500:
+            self.errors += 1
+        self.total_ms += duration_ms
+        self.max_ms = max(self.max_ms, duration_ms)
+        self.db_total_ms += metrics.db_time * 1000
+        self.queries_total += metrics.query_count
+        self.queries_max = max(self.queries_max, metrics.query_count)
+        if metrics.slowest_time * 1000 > self.slowest_ms:
+            self.slowest_ms = metrics.slowest_time * 1000
+            self.slowest_statement = (metrics.slowest_statement or '')[:STATEMENT_PREVIEW_LENGTH]
+        self.duration_ms.observe(duration_ms)
+        self.queries.observe(metrics.query_count)
+
+    def snapshot(self):
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'avg_ms': round(self.total_ms / self.requests, 3) if self.requests else 0,
+            'max_ms': round(self.max_ms, 3),
+            'avg_db_ms': round(self.db_total_ms / self.requests, 3) if self.requests else 0,
+            'avg_queries': round(self.queries_total / self.requests, 2) if self.requests else 0,
+            'max_queries': self.queries_max,
+            'slowest_statement_ms': round(self.slowest_ms, 3),
+            'slowest_statement': self.slowest_statement,
+            'duration_ms_histogram': self.duration_ms.snapshot(),
+            'queries_histogram': self.queries.snapshot()
+        }
+
+
+class MetricsRegistry:
+    """Метрики маршрутов процесса"""
+
+    def __init__(self):
+        self.started_at = time.time()
+        self._routes = {}
+        self._lock = threading.Lock()
+
+    def observe(self, route, metrics, duration_ms, status_code):
+        with self._lock:
+            route_metrics = self._routes.get(route)
+            if route_metrics is None:
+                route_metrics = self._routes[route] = RouteMetrics()
+            route_metrics.observe(metrics, duration_ms, status_code)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'uptime_seconds': round(time.time() - self.started_at, 1),
+                'routes': {route: metrics.snapshot() for route, metrics in sorted(self._routes.items())}
+            }
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+            self.started_at = time.time()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('metrics_query_start')
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    # Запросы фоновых потоков (очередь уведомлений и т. п.) не относятся к HTTP-запросу
+    if has_request_context():
+        metrics = g.get('request_metrics')
+        if metrics is not None:
+            metrics.add_query(statement, elapsed)
+
+
+def _handle_error(exception_context):
+    # Запрос завершился ошибкой: after_cursor_execute не будет вызван
+    conn = exception_context.connection
+    if conn is not None and conn.info.get('metrics_query_start'):
+        conn.info['metrics_query_start'].pop()
+
+
+def _route_name():
+    rule = request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+    return f'{request.method} {rule}'
+
+
+def init_metrics(app):
+    """Подключает сбор метрик к приложению"""
+    registry = MetricsRegistry()
+    app.extensions['metrics'] = registry
+    if not app.config.get('METRICS_ENABLED', True):
+        return registry
+
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(Engine, 'handle_error', _handle_error)
+    server_timing = app.config.get('METRICS_SERVER_TIMING', True)
+
+    @app.before_request
+    def start_request_metrics():
+        g.request_metrics = RequestMetrics()
+
+    @app.after_request
+    def record_request_metrics(response):
+        metrics = g.get('request_metrics')
+        if metrics is None:
+            return response
+        duration_ms = (time.perf_counter() - metrics.started) * 1000
+        registry.observe(_route_name(), metrics, duration_ms, response.status_code)
+        metrics.recorded = True
+        if server_timing:
+            response.headers.add('Server-Timing', f'db;dur={metrics.db_time * 1000:.1f};desc="{metrics.query_count} queries"')
+            response.headers.add('Server-Timing', f'app;dur={duration_ms:.1f}')
+        return response
+
+    @app.teardown_request
+    def record_failed_request(exc):
+        # Необработанное исключение: after_request не вызывался
+        metrics = g.get('request_metrics')
+        if metrics is not None and not metrics.recorded and exc is not None:
+            registry.observe(_route_name(), metrics, (time.perf_counter() - metrics.started) * 1000, 500)
+
+    return registry
+
+
+def metrics_snapshot(app, reset=False):
+    """Снимок метрик маршрутов приложения; reset - начать накопление заново"""
+    registry = app.extensions['metrics']
+    snapshot = registry.snapshot()
+    if reset:
+        registry.reset()
+    return snapshot
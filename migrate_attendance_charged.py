@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Скрипт миграции для добавления поля is_charged в таблицу attendance_record
+"""
+
+import sqlite3
+import os
+
+def migrate_attendance_charged():
+    """Миграция таблицы attendance_record"""
+
+    # Путь к базе данных
+    db_path = 'instance/sportclub.db'
+
+    if not os.path.exists(db_path):
+        print("❌ База данных не найдена. Создайте базу данных через Flask.")
+        return
+
+    try:
+        # Подключаемся к базе данных
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+
+        # Проверяем, существует ли уже поле is_charged
+        cursor.execute("PRAGMA table_info(attendance_record)")
+        columns = [column[1] for column in cursor.fetchall()]
+
+        if 'is_charged' not in columns:
+            print("➕ Добавляем поле 'is_charged'...")
+            # Прежняя версия сохранения посещаемости занятия не списывала,
+            # поэтому существующие записи помечаются как несписанные
+            cursor.execute("ALTER TABLE attendance_record ADD COLUMN is_charged BOOLEAN NOT NULL DEFAULT 0")
+
+        # Сохраняем изменения
+        conn.commit()
+        print("✅ Миграция завершена успешно!")
+
+        # Показываем статистику
+        cursor.execute("SELECT is_charged, COUNT(*) FROM attendance_record GROUP BY is_charged")
+        charged_counts = cursor.fetchall()
+
+        print("\n📊 Статистика списаний:")
+        for is_charged, count in charged_counts:
+            print(f"   {'Списано' if is_charged else 'Не списано'}: {count}")
+
+    except Exception as e:
+        print(f"❌ Ошибка миграции: {e}")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    print("🔄 Начинаем миграцию таблицы attendance_record...")
+    migrate_attendance_charged()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Скрипт миграции для создания индексов по внешним ключам и часто
+используемым фильтрам (см. __table_args__ в models.py).
+Перед этим заполняет пустой payment.created_at - ключ постраничной выдачи
+платежей (payments.py) - и в PostgreSQL делает колонку NOT NULL.
+Таблицы, которых еще нет в базе, пропускаются: их индексы создаст
+db.create_all() вместе с таблицей.
+Работает с SQLite и PostgreSQL через строку подключения из Config.
+"""
+
+from datetime import datetime
+
+from flask import Flask
+from sqlalchemy import bindparam, func, inspect, text, update
+from sqlalchemy.schema import CreateIndex, DropIndex
+
+from config import Config
+from models import db, Payment
+
+# Платежи без даты создания считаются самыми старыми: в списке они идут последними
+UNKNOWN_CREATED_AT = datetime(1970, 1, 1)
+
+
+def model_indexes():
+    """Все индексы, объявленные в моделях"""
+    return [index for table in db.metadata.sorted_tables for index in sorted(table.indexes, key=lambda i: i.name)]
+
+
+def missing_tables(engine):
+    """Таблицы моделей, которых нет в базе"""
+    existing = set(inspect(engine).get_table_names())
+    return [table.name for table in db.metadata.sorted_tables if table.name not in existing]
+
+
+def invalid_indexes(engine):
+    """
+    Индексы моделей, оставшиеся INVALID после неудачного CREATE INDEX
+    CONCURRENTLY (только PostgreSQL). IF NOT EXISTS такие индексы не
+    пересоздает: их нужно удалить (DROP INDEX CONCURRENTLY) и повторить миграцию.
+    """
+    if engine.dialect.name != 'postgresql':
+        return []
+    query = text(
+        'SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid '
+        'WHERE NOT i.indisvalid AND c.relname IN :names ORDER BY c.relname'
+    ).bindparams(bindparam('names', expanding=True))
+    with engine.connect() as conn:
+        return list(conn.execute(query, {'names': [index.name for index in model_indexes()]}).scalars())
+
+
+def fill_payment_created_at(engine):
+    """
+    Заполняет пустой created_at платежей датой оплаты (или UNKNOWN_CREATED_AT)
+    и запрещает NULL в PostgreSQL; возвращает число заполненных строк.
+    В SQLite ограничение NOT NULL без пересоздания таблицы не добавить -
+    новые строки получают created_at по умолчанию из модели.
+    """
+    payment = Payment.__table__
+    if payment.name in missing_tables(engine):
+        return 0
+    with engine.begin() as conn:
+        filled = conn.execute(
+            update(payment)
+            .where(payment.c.created_at.is_(None))
+            .values(created_at=func.coalesce(payment.c.payment_date, UNKNOWN_CREATED_AT))
+        ).rowcount
+        if engine.dialect.name == 'postgresql':
+            conn.execute(text('ALTER TABLE payment ALTER COLUMN created_at SET NOT NULL'))
+    return filled
+
+
+def create_indexes(engine):
+    """Создает недостающие индексы существующих таблиц; возвращает список их имен"""
+    names = []
+    is_postgres = engine.dialect.name == 'postgresql'
+    skipped = set(missing_tables(engine))
+    # В PostgreSQL индексы строятся CONCURRENTLY, чтобы не блокировать запись в таблицы
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        for index in model_indexes():
+            if index.table.name in skipped:
+                continue
+            statement = str(CreateIndex(index, if_not_exists=True).compile(dialect=engine.dialect))
+            if is_postgres:
+                statement = statement.replace('CREATE INDEX', 'CREATE INDEX CONCURRENTLY', 1)
+            conn.execute(text(statement))
+            names.append(index.name)
+        conn.execute(text('ANALYZE'))
+    return names
+
+
+def drop_indexes(engine):
+    """Удаляет индексы моделей (используется для сравнения в бенчмарке)"""
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        for index in model_indexes():
+            conn.execute(text(str(DropIndex(index, if_exists=True).compile(dialect=engine.dialect))))
+
+
+def migrate_indexes():
+    """Миграция индексов"""
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    db.init_app(app)
+
+    try:
+        with app.app_context():
+            skipped = missing_tables(db.engine)
+            filled = fill_payment_created_at(db.engine)
+            names = create_indexes(db.engine)
+        print("✅ Миграция завершена успешно!")
+        if skipped:
+            print(f"\n⏭️  Таблиц нет в базе, индексы пропущены: {', '.join(skipped)}")
+        if filled:
+            print(f"\n🕓 Заполнена дата создания у платежей: {filled}")
+        print("\n📊 Индексы:")
+        for name in names:
+            print(f"   {name}")
+    except Exception as e:
+        print(f"❌ Ошибка миграции: {e}")
+
+    # Неудачный CREATE INDEX CONCURRENTLY оставляет индекс INVALID: запросы его не используют
+    try:
+        with app.app_context():
+            invalid = invalid_indexes(db.engine)
+    except Exception as e:
+        print(f"❌ Не удалось проверить индексы: {e}")
+        return
+    if invalid:
+        print("\n⚠️  Индексы INVALID (удалите через DROP INDEX CONCURRENTLY и повторите миграцию):")
+        for name in invalid:
+            print(f"   {name}")
+
+
+if __name__ == "__main__":
+    print("🔄 Начинаем миграцию индексов...")
+    migrate_indexes()
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Скрипт миграции для журнала баланса подписок: добавляет поле paid_total в
+таблицу subscription, создает таблицу subscription_ledger и заводит журнал
+по существующим платежам и остаткам (см. ledger.py).
+Работает с SQLite и PostgreSQL через строку подключения из Config.
+"""
+
+from flask import Flask
+from sqlalchemy import inspect, text
+
+from config import Config
+from models import db, SubscriptionLedgerEntry
+from ledger import rebuild_balances
+
+
+def migrate_subscription_ledger():
+    """Миграция баланса подписок"""
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    db.init_app(app)
+
+    try:
+        with app.app_context():
+            columns = [column['name'] for column in inspect(db.engine).get_columns('subscription')]
+            if 'paid_total' not in columns:
+                print("➕ Добавляем поле 'paid_total'...")
+                with db.engine.begin() as conn:
+                    conn.execute(text("ALTER TABLE subscription ADD COLUMN paid_total INTEGER NOT NULL DEFAULT 0"))
+
+            SubscriptionLedgerEntry.__table__.create(db.engine, checkfirst=True)
+            mismatches, entries = rebuild_balances()
+            db.session.commit()
+
+        print("✅ Миграция завершена успешно!")
+        print("\n📊 Журнал баланса:")
+        print(f"   Добавлено записей: {entries}")
+        print(f"   Пересчитано подписок: {len(mismatches)}")
+    except Exception as e:
+        print(f"❌ Ошибка миграции: {e}")
+
+
+if __name__ == "__main__":
+    print("🔄 Начинаем миграцию баланса подписок...")
+    migrate_subscription_ledger()
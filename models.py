@@ -1,7 +1,10 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 
-db = SQLAlchemy()
+from replica import RoutingSession
+
+# Сессия читает с реплики на маршрутах, отмеченных replica.read_replica
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -16,6 +19,12 @@ class User(db.Model):
     participants = db.relationship('Participant', backref='user', lazy=True)
     payments = db.relationship('Payment', backref='user', lazy=True)
 
+class AppState(db.Model):
+    """Служебные значения приложения (версии данных, состояние фоновых задач)"""
+    key = db.Column(db.String(100), primary_key=True)
+    value = db.Column(db.Text)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
 class Participant(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -30,6 +39,8 @@ class Participant(db.Model):
     # Relationships
     subscriptions = db.relationship('Subscription', backref='participant', lazy=True)
     attendance_records = db.relationship('AttendanceRecord', backref='participant', lazy=True)
+    
+    __table_args__ = (db.Index('ix_participant_user_id', 'user_id'),)
 
 class SportGroup(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -58,6 +69,8 @@ class Schedule(db.Model):
     start_time = db.Column(db.Time, nullable=False)
     end_time = db.Column(db.Time, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (db.Index('ix_schedule_group_day', 'sport_group_id', 'day_of_week'),)
 
 class Subscription(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -66,6 +79,7 @@ class Subscription(db.Model):
     subscription_type = db.Column(db.String(20), nullable=False)  # '8 занятий', '12 занятий', 'Разовые занятия'
     total_lessons = db.Column(db.Integer, nullable=False)
     remaining_lessons = db.Column(db.Integer, nullable=False)
+    paid_total = db.Column(db.Integer, default=0, server_default='0', nullable=False)  # Сумма подтвержденных платежей (см. ledger.py)
     start_date = db.Column(db.Date, nullable=False)
     end_date = db.Column(db.Date, nullable=False)
     is_active = db.Column(db.Boolean, default=True)
@@ -73,6 +87,12 @@ class Subscription(db.Model):
     
     # Relationships
     payments = db.relationship('Payment', backref='subscription', lazy=True)
+    
+    __table_args__ = (
+        db.Index('ix_subscription_participant_group_active', 'participant_id', 'sport_group_id', 'is_active'),
+        db.Index('ix_subscription_group_active', 'sport_group_id', 'is_active'),
+        db.Index('ix_subscription_active_end_date', 'is_active', 'end_date'),
+    )
 
 class Payment(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -84,7 +104,46 @@ class Payment(db.Model):
     is_paid = db.Column(db.Boolean, default=False)
     payment_date = db.Column(db.DateTime)
     admin_notes = db.Column(db.Text)  # Заметки администратора
+    # Ключ курсора постраничной выдачи (payments.py), поэтому без NULL
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_payment_subscription_status', 'subscription_id', 'status'),
+        db.Index('ix_payment_user_id', 'user_id'),
+        db.Index('ix_payment_created_at_id', 'created_at', 'id'),
+        db.Index('ix_payment_status_created_at', 'status', 'created_at'),
+    )
+
+class SubscriptionLedgerEntry(db.Model):
+    """Запись журнала баланса подписки (только добавляется, не изменяется)"""
+    __tablename__ = 'subscription_ledger'
+    id = db.Column(db.Integer, primary_key=True)
+    subscription_id = db.Column(db.Integer, db.ForeignKey('subscription.id'), nullable=False)
+    entry_type = db.Column(db.String(30), nullable=False)  # 'payment_approved', 'lesson_debited', 'lesson_refunded', 'adjustment'
+    amount = db.Column(db.Integer, default=0, nullable=False)  # Изменение paid_total
+    lessons = db.Column(db.Integer, default=0, nullable=False)  # Изменение remaining_lessons
+    payment_id = db.Column(db.Integer, db.ForeignKey('payment.id'), nullable=True)
+    attendance_id = db.Column(db.Integer, db.ForeignKey('attendance.id'), nullable=True)
+    created_by_user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    note = db.Column(db.String(200))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_subscription_ledger_subscription_id', 'subscription_id', 'id'),
+        db.Index('ux_subscription_ledger_payment_id', 'payment_id', unique=True),
+    )
+
+class LowBalanceNotice(db.Model):
+    """Отправленное уведомление о низком балансе: не больше одного на подписку и порог"""
+    __tablename__ = 'low_balance_notice'
+    id = db.Column(db.Integer, primary_key=True)
+    subscription_id = db.Column(db.Integer, db.ForeignKey('subscription.id'), nullable=False)
+    threshold = db.Column(db.Integer, nullable=False)  # Порог остатка занятий, на котором отправлено уведомление
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ux_low_balance_notice_subscription_threshold', 'subscription_id', 'threshold', unique=True),
+    )
 
 class Discount(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -105,6 +164,8 @@ class LessonTransfer(db.Model):
     reason = db.Column(db.String(200), nullable=False)
     status = db.Column(db.String(20), default='pending')  # 'pending', 'approved', 'rejected'
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (db.Index('ix_lesson_transfer_subscription_id', 'subscription_id'),)
 
 class Attendance(db.Model):
     """Модель для учета посещаемости по дням"""
@@ -129,9 +190,38 @@ class AttendanceRecord(db.Model):
     participant_id = db.Column(db.Integer, db.ForeignKey('participant.id'), nullable=False)
     is_present = db.Column(db.Boolean, default=False)  # Присутствовал ли участник
     absence_reason = db.Column(db.String(50), nullable=True)  # Причина отсутствия: 'excused', 'unexcused', None
+    is_charged = db.Column(db.Boolean, default=False, nullable=False)  # Занятие списано с подписки
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
-    __table_args__ = (db.UniqueConstraint('attendance_id', 'participant_id', name='unique_attendance_record'),)
+    __table_args__ = (
+        db.UniqueConstraint('attendance_id', 'participant_id', name='unique_attendance_record'),
+        db.Index('ix_attendance_record_participant_id', 'participant_id'),
+    )
+
+class AttendanceLessonStats(db.Model):
+    """Сводка посещаемости по занятию (пересчитывается при сохранении отметок)"""
+    attendance_id = db.Column(db.Integer, db.ForeignKey('attendance.id'), primary_key=True)
+    sport_group_id = db.Column(db.Integer, db.ForeignKey('sport_group.id'), nullable=False)
+    lesson_date = db.Column(db.Date, nullable=False)
+    day_of_week = db.Column(db.Integer, nullable=False)
+    present_count = db.Column(db.Integer, default=0, nullable=False)
+    excused_count = db.Column(db.Integer, default=0, nullable=False)  # Отсутствовал по уважительной причине
+    unexcused_count = db.Column(db.Integer, default=0, nullable=False)  # Отсутствовал без уважительной причины
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_attendance_lesson_stats_group_date', 'sport_group_id', 'lesson_date'),
+    )
+
+class ParticipantMonthlyAttendance(db.Model):
+    """Сводка посещаемости участника по группе за месяц"""
+    participant_id = db.Column(db.Integer, db.ForeignKey('participant.id'), primary_key=True)
+    sport_group_id = db.Column(db.Integer, db.ForeignKey('sport_group.id'), primary_key=True)
+    month = db.Column(db.Date, primary_key=True)  # Первый день месяца
+    present_count = db.Column(db.Integer, default=0, nullable=False)
+    excused_count = db.Column(db.Integer, default=0, nullable=False)
+    unexcused_count = db.Column(db.Integer, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 class AuthorizationCode(db.Model):
     """Модель для кодов авторизации родителей"""
@@ -147,12 +237,13 @@ class AuthorizationCode(db.Model):
     participant = db.relationship('Participant', backref='authorization_codes')
     used_by_user = db.relationship('User', backref='used_authorization_codes')
     
+    __table_args__ = (
+        db.Index('ix_authorization_code_participant_created', 'participant_id', 'created_at'),
+        db.Index('ix_authorization_code_user_used', 'used_by_user_id', 'is_used'),
+    )
+    
     @staticmethod
     def generate_code():
-        """Генерация уникального 6-значного кода"""
-        import random
-        import string
-        while True:
-            code = ''.join(random.choices(string.digits, k=6))
-            if not AuthorizationCode.query.filter_by(code=code).first():
-                return code
+        """Генерация уникального 6-значного кода (см. auth_codes.py)"""
+        from auth_codes import allocate_code
+        return allocate_code()
@@ -0,0 +1,262 @@
+"""
+Очередь доставки Telegram-уведомлений.
+
+Сообщения складываются в очередь в памяти процесса и отправляются пулом
+фоновых потоков через одну HTTP-сессию с пулом соединений. Учитываются
+ограничения Bot API (глобальное и на один чат), временные ошибки
+повторяются с экспоненциальной задержкой, а HTTP-обработчик
+возвращает ответ сразу после постановки сообщения в очередь.
+"""
+
+import atexit
+import heapq
+import itertools
+import logging
+import threading
+import time
+from dataclasses import dataclass
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class OutgoingMessage:
+    """Сообщение в очереди доставки"""
+    chat_id: object
+    text: str
+    parse_mode: str = 'HTML'
+    attempts: int = 0
+    slot: float = None  # Зарезервированное время отправки
+
+
+class RateLimiter:
+    """
+    Резервирует время отправки с учетом глобального лимита
+    (сообщений в секунду) и минимального интервала для одного чата.
+    """
+
+    def __init__(self, global_per_second=30, per_chat_interval=1.0):
+        self._global_interval = 1.0 / global_per_second if global_per_second else 0.0
+        self._per_chat_interval = per_chat_interval
+        self._next_global = 0.0
+        self._next_chat = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, chat_id):
+        """Возвращает момент (time.monotonic), когда сообщение можно отправить"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_global, self._next_chat.get(chat_id, 0.0))
+            self._next_global = slot + self._global_interval
+            self._next_chat[chat_id] = slot + self._per_chat_interval
+            if len(self._next_chat) > 10000:
+                # Забываем чаты, для которых ограничение уже истекло
+                self._next_chat = {key: value for key, value in self._next_chat.items() if value > now}
+            return slot
+
+
+class TelegramOutbox:
+    """Очередь сообщений с пулом потоков доставки"""
+
+    def __init__(self, bot_token, api_url='https://api.telegram.org', workers=4,
+                 global_per_second=30, per_chat_interval=1.0, max_retries=5,
+                 backoff_base=1.0, backoff_max=60.0, timeout=10):
+        self.bot_token = bot_token
+        self.api_url = api_url.rstrip('/')
+        self.workers = workers
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.limiter = RateLimiter(global_per_second, per_chat_interval)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._heap = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._pending = 0
+        self._threads = []
+        self._stopping = False
+
+        self.sent_count = 0
+        self.failed_count = 0
+
+    @property
+    def send_url(self):
+        return f"{self.api_url}/bot{self.bot_token}/sendMessage"
+
+    def start(self):
+        """Запускает потоки доставки (повторный вызов ничего не делает)"""
+        with self._condition:
+            if self._threads:
+                return
+            self._stopping = False
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._worker, name=f'telegram-outbox-{index}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self, timeout=5.0):
+        """Дожидается отправки очереди (не дольше timeout) и останавливает потоки"""
+        self.flush(timeout)
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def enqueue(self, chat_id, text, parse_mode='HTML'):
+        """Ставит сообщение в очередь и сразу возвращает управление"""
+        self.enqueue_many([OutgoingMessage(chat_id, text, parse_mode)])
+
+    def enqueue_many(self, messages):
+        """Ставит пачку сообщений в очередь одной операцией"""
+        messages = list(messages)
+        if not messages:
+            return
+        if not self.bot_token:
+            logger.warning("Telegram bot token not configured, %s messages dropped", len(messages))
+            return
+        self.start()
+        now = time.monotonic()
+        with self._condition:
+            for message in messages:
+                heapq.heappush(self._heap, (now, next(self._sequence), message))
+            self._pending += len(messages)
+            self._condition.notify(len(messages))
+
+    def flush(self, timeout=None):
+        """Ждет, пока все сообщения будут доставлены или отброшены"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self._pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def _schedule(self, message, due):
+        with self._condition:
+            heapq.heappush(self._heap, (due, next(self._sequence), message))
+            self._condition.notify()
+
+    def _done(self, sent):
+        with self._condition:
+            if sent:
+                self.sent_count += 1
+            else:
+                self.failed_count += 1
+            self._pending -= 1
+            self._condition.notify_all()
+
+    def _next_message(self):
+        """Берет из очереди сообщение, время отправки которого наступило"""
+        with self._condition:
+            while True:
+                if self._heap:
+                    due = self._heap[0][0]
+                    now = time.monotonic()
+                    if due <= now:
+                        return heapq.heappop(self._heap)[2]
+                    self._condition.wait(due - now)
+                elif self._stopping:
+                    return None
+                else:
+                    self._condition.wait()
+
+    def _worker(self):
+        while True:
+            message = self._next_message()
+            if message is None:
+                return
+
+            try:
+                # Резервируем время отправки один раз, чтобы не терять очередность в чате
+                if message.slot is None:
+                    message.slot = self.limiter.reserve(message.chat_id)
+                    if message.slot > time.monotonic():
+                        self._schedule(message, message.slot)
+                        continue
+
+                self._deliver(message)
+            except Exception:
+                # Поток не должен завершаться: иначе сообщение не учтется и flush() не дождется очереди
+                logger.exception("Unexpected error delivering Telegram message to %s", message.chat_id)
+                self._done(sent=False)
+
+    def _deliver(self, message):
+        """Отправляет сообщение и решает, повторять ли попытку"""
+        message.attempts += 1
+        retry_after = None
+        try:
+            response = self.session.post(self.send_url, json={
+                'chat_id': message.chat_id,
+                'text': message.text,
+                'parse_mode': message.parse_mode
+            }, timeout=self.timeout)
+
+            if response.status_code == 200:
+                self._done(sent=True)
+                return
+
+            if response.status_code == 429:
+                retry_after = self._retry_after(response) or self._backoff(message.attempts)
+            elif response.status_code >= 500:
+                retry_after = self._backoff(message.attempts)
+            else:
+                logger.error("Telegram API rejected message to %s: %s %s", message.chat_id, response.status_code, response.text)
+        except requests.RequestException as e:
+            logger.warning("Telegram API request failed for %s: %s", message.chat_id, e)
+            retry_after = self._backoff(message.attempts)
+
+        if retry_after is not None and message.attempts <= self.max_retries:
+            # Повторная попытка резервирует новое время отправки
+            message.slot = None
+            self._schedule(message, time.monotonic() + retry_after)
+            return
+
+        if retry_after is not None:
+            logger.error("Giving up on Telegram message to %s after %s attempts", message.chat_id, message.attempts)
+        self._done(sent=False)
+
+    @staticmethod
+    def _retry_after(response):
+        """Пауза из ответа 429 (parameters.retry_after, секунды) или None, если ее нет или она некорректна"""
+        try:
+            payload = response.json()
+        except ValueError:
+            return None
+        parameters = payload.get('parameters') if isinstance(payload, dict) else None
+        retry_after = parameters.get('retry_after') if isinstance(parameters, dict) else None
+        if isinstance(retry_after, bool) or not isinstance(retry_after, (int, float)) or not 0 < retry_after < float('inf'):
+            return None
+        return float(retry_after)
+
+    def _backoff(self, attempts):
+        return min(self.backoff_base * (2 ** (attempts - 1)), self.backoff_max)
+
+
+def init_outbox(app):
+    """Создает очередь доставки для приложения (потоки стартуют при первой отправке)"""
+    config = app.config
+    outbox = TelegramOutbox(
+        bot_token=config.get('TELEGRAM_BOT_TOKEN'),
+        api_url=config.get('TELEGRAM_API_URL', 'https://api.telegram.org'),
+        workers=config.get('TELEGRAM_WORKERS', 4),
+        global_per_second=config.get('TELEGRAM_GLOBAL_RATE', 30),
+        per_chat_interval=config.get('TELEGRAM_CHAT_INTERVAL', 1.0),
+        max_retries=config.get('TELEGRAM_MAX_RETRIES', 5),
+        timeout=config.get('TELEGRAM_TIMEOUT', 10)
+    )
+    app.extensions['telegram_outbox'] = outbox
+    atexit.register(outbox.stop, config.get('TELEGRAM_SHUTDOWN_TIMEOUT', 5.0))
+    return outbox
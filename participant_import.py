@@ -0,0 +1,361 @@
+"""
+Массовый импорт участников из CSV/XLSX.
+
+Файл читается построчно, строки проверяются и накапливаются пакетами по
+BATCH_SIZE. Каждый пакет - отдельная транзакция: участники, подписки и
+коды авторизации вставляются через executemany, без запросов на каждую
+строку. Ошибочные строки не прерывают импорт и попадают в отчет с номером
+строки файла (заголовок - строка 1). Если коды авторизации исчерпаны,
+пакет откатывается и импорт останавливается; уже записанные пакеты
+остаются в отчете.
+
+Формат: первая строка - заголовки. Обязательные колонки full_name,
+parent_phone, birth_date; необязательные medical_certificate,
+discount_type, discount_percent, sport_group_id или sport_group (название
+группы), subscription_type, total_lessons. Поддерживаются и русские
+заголовки (см. HEADER_ALIASES).
+"""
+
+import csv
+import io
+import logging
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import insert, func
+from sqlalchemy.exc import SQLAlchemyError
+
+from models import db, User, Participant, Subscription, SportGroup
+from auth_codes import create_authorization_codes, CodesExhausted
+
+try:
+    import openpyxl
+except ImportError:  # XLSX поддерживается, только если установлен openpyxl
+    openpyxl = None
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+MAX_ERRORS_LOGGED = 20
+REQUIRED_COLUMNS = ('full_name', 'parent_phone', 'birth_date')
+DATE_FORMATS = ('%Y-%m-%d', '%d.%m.%Y')
+TRUE_VALUES = {'1', 'true', 'yes', 'да', '+', 'есть'}
+SUBSCRIPTION_DAYS = 30
+
+# Количество занятий по типу абонемента (как getLessonsCount в app.js)
+LESSONS_BY_TYPE = {
+    '8 занятий': 8,
+    '12 занятий': 12,
+    'Разовые занятия': 1
+}
+
+HEADER_ALIASES = {
+    'фио': 'full_name',
+    'фио участника': 'full_name',
+    'телефон': 'parent_phone',
+    'телефон родителя': 'parent_phone',
+    'дата рождения': 'birth_date',
+    'справка': 'medical_certificate',
+    'медицинская справка': 'medical_certificate',
+    'скидка': 'discount_type',
+    'тип скидки': 'discount_type',
+    'скидка, %': 'discount_percent',
+    'процент скидки': 'discount_percent',
+    'группа': 'sport_group',
+    'id группы': 'sport_group_id',
+    'абонемент': 'subscription_type',
+    'тип абонемента': 'subscription_type',
+    'занятий': 'total_lessons',
+    'количество занятий': 'total_lessons'
+}
+
+
+@dataclass
+class ImportReport:
+    """Результат импорта"""
+    dry_run: bool = False
+    total_rows: int = 0
+    imported: int = 0
+    subscriptions: int = 0
+    errors: list = field(default_factory=list)
+    participants: list = field(default_factory=list)
+    stopped: str = None  # Причина остановки импорта до конца файла
+
+    def add_error(self, row_number, message):
+        self.errors.append({'row': row_number, 'error': message})
+
+    def to_dict(self):
+        return {
+            'dry_run': self.dry_run,
+            'total_rows': self.total_rows,
+            'imported': self.imported,
+            'subscriptions': self.subscriptions,
+            'failed': len(self.errors),
+            'errors': self.errors,
+            'participants': self.participants,
+            'stopped': self.stopped
+        }
+
+
+def detect_format(filename, content_type=None):
+    """'xlsx' или 'csv' по имени файла и типу содержимого"""
+    if (filename or '').lower().endswith('.xlsx') or 'spreadsheetml' in (content_type or ''):
+        return 'xlsx'
+    return 'csv'
+
+
+def normalize_header(name):
+    name = str(name or '').strip().lstrip('﻿')
+    return HEADER_ALIASES.get(name.lower(), name.lower())
+
+
+def _rows_with_numbers(header, rows):
+    columns = [normalize_header(name) for name in header]
+    missing = [name for name in REQUIRED_COLUMNS if name not in columns]
+    if missing:
+        raise ValueError(f"В файле нет обязательных колонок: {', '.join(missing)}")
+    for row_number, values in rows:
+        if not any(value not in (None, '') for value in values):
+            continue
+        yield row_number, dict(zip(columns, values))
+
+
+def iter_csv_rows(stream):
+    """(номер строки, словарь значений) из бинарного потока CSV в UTF-8; разделитель , или ; определяется по заголовку"""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    first_line = text.readline()
+    if not first_line.strip():
+        raise ValueError('Файл пуст')
+    delimiter = ';' if first_line.count(';') > first_line.count(',') else ','
+    header = next(csv.reader([first_line], delimiter=delimiter))
+    reader = csv.reader(text, delimiter=delimiter)
+    # Номер строки считается по записям: поля с переводом строки внутри кавычек редки в таких файлах
+    yield from _rows_with_numbers(header, ((index, values) for index, values in enumerate(reader, start=2)))
+
+
+def iter_xlsx_rows(stream):
+    """(номер строки, словарь значений) из первого листа XLSX"""
+    if openpyxl is None:
+        raise ValueError('Для импорта XLSX установите пакет openpyxl или загрузите CSV')
+    workbook = openpyxl.load_workbook(stream, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            raise ValueError('Файл пуст')
+        yield from _rows_with_numbers(header, enumerate(rows, start=2))
+    finally:
+        workbook.close()
+
+
+def iter_rows(stream, file_format):
+    return iter_xlsx_rows(stream) if file_format == 'xlsx' else iter_csv_rows(stream)
+
+
+def _text(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _parse_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(_text(value), date_format).date()
+        except ValueError:
+            continue
+    raise ValueError(f'некорректная дата рождения: {_text(value)!r}')
+
+
+def _parse_int(value, name):
+    try:
+        return int(float(_text(value)))
+    except ValueError:
+        raise ValueError(f'{name} должно быть числом')
+
+
+class GroupDirectory:
+    """Группы по id и по названию, загруженные одним запросом"""
+
+    def __init__(self):
+        self.by_id = dict(db.session.query(SportGroup.id, SportGroup.name))
+        self.by_name = {name.strip().lower(): group_id for group_id, name in self.by_id.items()}
+
+    def resolve(self, record):
+        group_id = _text(record.get('sport_group_id'))
+        if group_id:
+            group_id = _parse_int(group_id, 'sport_group_id')
+            if group_id not in self.by_id:
+                raise ValueError(f'группа {group_id} не найдена')
+            return group_id
+        name = _text(record.get('sport_group'))
+        if name:
+            if name.lower() not in self.by_name:
+                raise ValueError(f'группа «{name}» не найдена')
+            return self.by_name[name.lower()]
+        return None
+
+
+def participant_key(full_name, birth_date):
+    return ' '.join(full_name.lower().split()), birth_date
+
+
+def validate_row(record, groups):
+    """Значения строки для вставки; ValueError с описанием ошибки"""
+    full_name = _text(record.get('full_name'))
+    parent_phone = _text(record.get('parent_phone'))
+    for name, value in (('full_name', full_name), ('parent_phone', parent_phone)):
+        if not value:
+            raise ValueError(f'не заполнено поле {name}')
+    if len(full_name) > 200:
+        raise ValueError('full_name длиннее 200 символов')
+    if len(parent_phone) > 20:
+        raise ValueError('parent_phone длиннее 20 символов')
+    if not _text(record.get('birth_date')):
+        raise ValueError('не заполнено поле birth_date')
+    birth_date = _parse_date(record.get('birth_date'))
+
+    discount_percent = _text(record.get('discount_percent'))
+    discount_percent = _parse_int(discount_percent, 'discount_percent') if discount_percent else 0
+    if not 0 <= discount_percent <= 100:
+        raise ValueError('discount_percent должно быть от 0 до 100')
+
+    participant = {
+        'full_name': full_name,
+        'parent_phone': parent_phone,
+        'birth_date': birth_date,
+        'medical_certificate': _text(record.get('medical_certificate')).lower() in TRUE_VALUES,
+        'discount_type': _text(record.get('discount_type')) or None,
+        'discount_percent': discount_percent
+    }
+
+    subscription = None
+    group_id = groups.resolve(record)
+    if group_id is not None:
+        subscription_type = _text(record.get('subscription_type')) or '8 занятий'
+        if subscription_type not in LESSONS_BY_TYPE:
+            raise ValueError(f'неизвестный тип абонемента: {subscription_type}')
+        total_lessons = _text(record.get('total_lessons'))
+        total_lessons = _parse_int(total_lessons, 'total_lessons') if total_lessons else LESSONS_BY_TYPE[subscription_type]
+        if total_lessons <= 0:
+            raise ValueError('total_lessons должно быть больше 0')
+        subscription = {'sport_group_id': group_id, 'subscription_type': subscription_type, 'total_lessons': total_lessons}
+    elif _text(record.get('subscription_type')):
+        raise ValueError('для абонемента укажите группу')
+
+    return participant, subscription
+
+
+def _insert_batch(batch, user_id, report):
+    """Вставляет пакет проверенных строк одной транзакцией"""
+    now = datetime.utcnow()
+    today = now.date()
+    participant_rows = [dict(participant, user_id=user_id, created_at=now) for _, participant, _ in batch]
+    # RETURNING без sort_by_parameter_order остается одним пакетным INSERT;
+    # строки сопоставляются по ключу ФИО + дата рождения, уникальному в пакете
+    returned = db.session.execute(
+        insert(Participant).returning(Participant.id, Participant.full_name, Participant.birth_date), participant_rows
+    )
+    ids_by_key = {participant_key(full_name, birth_date): participant_id for participant_id, full_name, birth_date in returned}
+    participant_ids = [ids_by_key[participant_key(participant['full_name'], participant['birth_date'])]
+                       for _, participant, _ in batch]
+
+    subscription_rows = [{
+        'participant_id': participant_id,
+        'sport_group_id': subscription['sport_group_id'],
+        'subscription_type': subscription['subscription_type'],
+        'total_lessons': subscription['total_lessons'],
+        'remaining_lessons': subscription['total_lessons'],
+        'start_date': today,
+        'end_date': today + timedelta(days=SUBSCRIPTION_DAYS),
+        'is_active': True,
+        'created_at': now
+    } for participant_id, (_, _, subscription) in zip(participant_ids, batch) if subscription]
+    if subscription_rows:
+        db.session.execute(insert(Subscription), subscription_rows)
+
+    codes = create_authorization_codes(participant_ids)
+    db.session.commit()
+
+    report.imported += len(participant_ids)
+    report.subscriptions += len(subscription_rows)
+    report.participants.extend({
+        'row': row_number,
+        'participant_id': participant_id,
+        'full_name': participant['full_name'],
+        'authorization_code': codes[participant_id]
+    } for participant_id, (row_number, participant, _) in zip(participant_ids, batch))
+
+
+def _flush(batch, user_id, report):
+    """Записывает пакет; False, если импорт нужно остановить"""
+    try:
+        _insert_batch(batch, user_id, report)
+    except CodesExhausted as e:
+        db.session.rollback()
+        logger.error("Participant import stopped at rows %s-%s: %s", batch[0][0], batch[-1][0], e)
+        for row_number, _, _ in batch:
+            report.add_error(row_number, f'не выдан код авторизации: {e}')
+        report.stopped = str(e)
+        return False
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        logger.error("Participant import batch failed (rows %s-%s): %s", batch[0][0], batch[-1][0], e)
+        for row_number, _, _ in batch:
+            report.add_error(row_number, f'ошибка записи в базу: {e.__class__.__name__}')
+    return True
+
+
+def import_participants(rows, user_id, dry_run=False, batch_size=BATCH_SIZE):
+    """
+    Импортирует строки (номер строки, словарь значений) от имени user_id.
+    Участник с теми же ФИО и датой рождения, что уже есть в базе или выше
+    в файле, считается дублем и не создается. dry_run - только проверка.
+    """
+    report = ImportReport(dry_run=dry_run)
+    groups = GroupDirectory()
+    seen = {participant_key(full_name, birth_date)
+            for full_name, birth_date in db.session.query(Participant.full_name, Participant.birth_date)}
+
+    batch = []
+    for row_number, record in rows:
+        report.total_rows += 1
+        try:
+            participant, subscription = validate_row(record, groups)
+        except ValueError as e:
+            report.add_error(row_number, str(e))
+            continue
+
+        key = participant_key(participant['full_name'], participant['birth_date'])
+        if key in seen:
+            report.add_error(row_number, 'участник с такими ФИО и датой рождения уже есть')
+            continue
+        seen.add(key)
+
+        if dry_run:
+            continue
+        batch.append((row_number, participant, subscription))
+        if len(batch) >= batch_size:
+            flushed = _flush(batch, user_id, report)
+            batch = []
+            if not flushed:
+                break
+
+    if batch:
+        _flush(batch, user_id, report)
+
+    logger.info("Participant import: %s of %s rows imported, %s failed%s", report.imported, report.total_rows, len(report.errors), ' (dry run)' if dry_run else '')
+    for error in report.errors[:MAX_ERRORS_LOGGED]:
+        logger.info("Participant import row %s: %s", error['row'], error['error'])
+    return report
+
+
+def default_import_user_id():
+    """Владелец импортированных участников для CLI: первый администратор"""
+    return db.session.query(func.min(User.id)).filter(User.role == 'admin').scalar()
@@ -0,0 +1,156 @@
+"""
+Постраничный список платежей для админ-панели.
+
+Платежи отдаются от новых к старым страницами фиксированного размера.
+Следующая страница выбирается по курсору (created_at, id) последней строки
+(keyset-пагинация), поэтому стоимость запроса не зависит от номера
+страницы; created_at у платежей не бывает NULL (для старых баз его заполняет
+migrate_indexes.py). Фильтры применяются в SQL, а сам список строится одним запросом
+с JOIN и только нужными колонками.
+"""
+
+import base64
+import json
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, or_
+
+from models import db, Payment, Subscription, Participant, SportGroup
+from json_provider import rows_to_dicts
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+PAYMENT_STATUSES = ('pending', 'approved', 'rejected')
+# Колонки payments_query, которые в ответе API называются иначе
+PAYMENT_FIELD_NAMES = {'full_name': 'participant_name', 'parent_phone': 'participant_phone', 'group_name': 'sport_group'}
+
+
+@dataclass
+class PaymentFilters:
+    """Фильтры списка платежей"""
+    status: str = None
+    sport_group_id: int = None
+    participant_id: int = None
+    date_from: datetime = None  # включительно
+    date_to: datetime = None  # не включительно (начало следующего дня)
+
+
+def _parse_int(args, name):
+    value = args.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f'Некорректный параметр {name}: {value}')
+
+
+def _parse_date(args, name):
+    value = args.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        raise ValueError(f'Некорректная дата {name}: {value} (ожидается YYYY-MM-DD)')
+
+
+def parse_payment_filters(args):
+    """Фильтры из параметров запроса; ValueError при некорректных значениях"""
+    status = args.get('status') or None
+    if status is not None and status not in PAYMENT_STATUSES:
+        raise ValueError(f'Некорректный статус: {status}')
+
+    date_to = _parse_date(args, 'date_to')
+    return PaymentFilters(
+        status=status,
+        sport_group_id=_parse_int(args, 'group_id'),
+        participant_id=_parse_int(args, 'participant_id'),
+        date_from=_parse_date(args, 'date_from'),
+        date_to=date_to + timedelta(days=1) if date_to else None
+    )
+
+
+def parse_page_size(args):
+    limit = _parse_int(args, 'limit')
+    if limit is None:
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def encode_cursor(created_at, payment_id):
+    """Непрозрачный курсор из ключа сортировки последней строки"""
+    raw = json.dumps([created_at.isoformat(), payment_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """(created_at, id) из курсора; ValueError при поврежденном курсоре"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        created_at, payment_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(payment_id)
+    except (ValueError, TypeError):
+        raise ValueError('Некорректный курсор')
+
+
+def payments_query(filters=None):
+    """Платежи с участником и группой (JOIN, только нужные колонки) с примененными фильтрами"""
+    filters = filters or PaymentFilters()
+    query = db.session.query(
+        Payment.id,
+        Payment.amount,
+        Payment.payment_method,
+        Payment.status,
+        Payment.is_paid,
+        Payment.payment_date,
+        Payment.created_at,
+        Payment.admin_notes,
+        Subscription.subscription_type,
+        Participant.id.label('participant_id'),
+        Participant.full_name,
+        Participant.parent_phone,
+        SportGroup.id.label('group_id'),
+        SportGroup.name.label('group_name')
+    ).join(Subscription, Subscription.id == Payment.subscription_id) \
+        .join(Participant, Participant.id == Subscription.participant_id) \
+        .join(SportGroup, SportGroup.id == Subscription.sport_group_id)
+
+    if filters.status:
+        query = query.filter(Payment.status == filters.status)
+    if filters.sport_group_id is not None:
+        query = query.filter(Subscription.sport_group_id == filters.sport_group_id)
+    if filters.participant_id is not None:
+        query = query.filter(Subscription.participant_id == filters.participant_id)
+    if filters.date_from:
+        query = query.filter(Payment.created_at >= filters.date_from)
+    if filters.date_to:
+        query = query.filter(Payment.created_at < filters.date_to)
+    return query
+
+
+def load_payments_page(filters=None, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    Одна страница платежей и курсор следующей страницы (None - страниц больше нет).
+    Запрашивается limit + 1 строка, чтобы узнать о наличии продолжения без COUNT.
+    """
+    query = payments_query(filters)
+    if cursor:
+        created_at, payment_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            Payment.created_at < created_at,
+            and_(Payment.created_at == created_at, Payment.id < payment_id)
+        ))
+
+    rows = query.order_by(Payment.created_at.desc(), Payment.id.desc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+    return rows, next_cursor
+
+
+def serialize_payments(rows):
+    """Строки payments_query -> словари для списка платежей (даты форматирует провайдер JSON)"""
+    return rows_to_dicts(rows, PAYMENT_FIELD_NAMES)
@@ -0,0 +1,210 @@
+"""
+Сэмплирующий профайлер для работающих воркеров.
+
+Администратор включает профилирование для маршрутов, подходящих под шаблон,
+на следующие N запросов и/или T секунд. Пока сессия активна, фоновый поток
+с заданным интервалом снимает стеки только тех потоков, которые сейчас
+обрабатывают отобранные запросы (sys._current_frames), и накапливает их в
+формате collapsed stacks («кадр;кадр;кадр число»), который понимают
+flamegraph.pl, speedscope и аналоги. Обработчики запросов не
+инструментируются, поэтому накладные расходы ограничены частотой выборки.
+Профиль собирается в памяти текущего процесса (воркера).
+"""
+
+import fnmatch
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+from flask import request
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL_MS = 10
+MIN_INTERVAL_MS = 1
+MAX_SECONDS = 600
+MAX_REQUESTS = 10000
+MAX_STACK_DEPTH = 200
+EXCLUDED_PATH_PREFIX = '/api/admin/profiler'
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+@dataclass
+class ProfilingSession:
+    """Параметры и состояние профилирования"""
+    pattern: str
+    max_requests: int = None
+    seconds: float = None
+    interval: float = DEFAULT_INTERVAL_MS / 1000
+    started_at: float = field(default_factory=time.time)
+    requests_started: int = 0
+    requests_finished: int = 0
+    samples: int = 0
+    stopped_reason: str = None
+
+    @property
+    def deadline(self):
+        return self.started_at + self.seconds if self.seconds else None
+
+    def matches(self, path):
+        return fnmatch.fnmatchcase(path, self.pattern)
+
+    def to_dict(self):
+        return {
+            'pattern': self.pattern,
+            'max_requests': self.max_requests,
+            'seconds': self.seconds,
+            'interval_ms': round(self.interval * 1000, 3),
+            'started_at': self.started_at,
+            'requests_profiled': self.requests_finished,
+            'samples': self.samples,
+            'active': self.stopped_reason is None,
+            'stopped_reason': self.stopped_reason
+        }
+
+
+@lru_cache(maxsize=8192)
+def code_label(code):
+    """Имя кадра: файл относительно проекта, функция и строка ее объявления"""
+    filename = code.co_filename
+    if filename.startswith(BASE_DIR):
+        filename = os.path.relpath(filename, BASE_DIR)
+    else:
+        filename = os.path.basename(filename)
+    return f'{filename}:{code.co_name}:{code.co_firstlineno}'.replace(';', ',')
+
+
+def collapse_stack(frame, root):
+    """Стек потока в виде «корень;...;вершина»"""
+    labels = []
+    while frame is not None and len(labels) < MAX_STACK_DEPTH:
+        labels.append(code_label(frame.f_code))
+        frame = frame.f_back
+    labels.append(root)
+    return ';'.join(reversed(labels))
+
+
+class SamplingProfiler:
+    """Профайлер процесса: одна активная сессия, стеки копятся до сброса"""
+
+    def __init__(self):
+        self.session = None
+        self.stacks = Counter()
+        self._threads = {}  # ident потока -> маршрут запроса
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._sampler = None
+
+    def start(self, pattern, max_requests=None, seconds=None, interval_ms=DEFAULT_INTERVAL_MS):
+        """Начинает новую сессию; накопленные стеки сбрасываются"""
+        if not max_requests and not seconds:
+            raise ValueError('Укажите число запросов (requests) или длительность (seconds)')
+        if max_requests is not None and not 0 < max_requests <= MAX_REQUESTS:
+            raise ValueError(f'requests должно быть от 1 до {MAX_REQUESTS}')
+        if seconds is not None and not 0 < seconds <= MAX_SECONDS:
+            raise ValueError(f'seconds должно быть от 0 до {MAX_SECONDS}')
+        if interval_ms < MIN_INTERVAL_MS:
+            raise ValueError(f'interval_ms должно быть не меньше {MIN_INTERVAL_MS}')
+
+        self.stop('replaced')
+        with self._lock:
+            self.session = ProfilingSession(pattern=pattern or '*', max_requests=max_requests, seconds=seconds,
+                                            interval=interval_ms / 1000)
+            self.stacks = Counter()
+            self._threads = {}
+            self._wakeup.clear()
+            self._sampler = threading.Thread(target=self._run, args=(self.session,), name='sampling-profiler', daemon=True)
+            self._sampler.start()
+        logger.info("Profiling started: %s", self.session.to_dict())
+        return self.session
+
+    def stop(self, reason='stopped', expected=None):
+        """Останавливает текущую сессию (или только expected, если она еще текущая)"""
+        with self._lock:
+            session = self.session
+            if expected is not None and session is not expected:
+                return expected
+            if session is None or session.stopped_reason is not None:
+                return session
+            session.stopped_reason = reason
+            self._threads = {}
+            self._wakeup.set()
+        logger.info("Profiling stopped (%s): %s requests, %s samples", reason, session.requests_finished, session.samples)
+        return session
+
+    def status(self):
+        with self._lock:
+            return self.session.to_dict() if self.session else None
+
+    def collapsed(self):
+        """Профиль в формате collapsed stacks"""
+        with self._lock:
+            return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+    def request_started(self, path, route):
+        """Отбирает текущий запрос для профилирования; True, если отобран"""
+        with self._lock:
+            session = self.session
+            if session is None or session.stopped_reason is not None:
+                return False
+            if path.startswith(EXCLUDED_PATH_PREFIX) or not session.matches(path):
+                return False
+            if session.max_requests and session.requests_started >= session.max_requests:
+                return False
+            session.requests_started += 1
+            self._threads[threading.get_ident()] = route
+            return True
+
+    def request_finished(self):
+        with self._lock:
+            session = self.session
+            if self._threads.pop(threading.get_ident(), None) is None or session is None:
+                return
+            session.requests_finished += 1
+            done = session.max_requests and session.requests_finished >= session.max_requests
+        if done:
+            self.stop('requests limit reached', expected=session)
+
+    def _run(self, session):
+        while not self._wakeup.wait(session.interval):
+            if session.stopped_reason is not None:
+                return
+            if session.deadline and time.time() >= session.deadline:
+                self.stop('time limit reached', expected=session)
+                return
+            frames = sys._current_frames()
+            with self._lock:
+                if session.stopped_reason is not None:
+                    return
+                for ident, route in self._threads.items():
+                    frame = frames.get(ident)
+                    if frame is not None:
+                        self.stacks[collapse_stack(frame, route)] += 1
+                        session.samples += 1
+
+
+def init_profiler(app):
+    """Подключает профайлер к приложению (неактивен, пока его не включат)"""
+    profiler = SamplingProfiler()
+    app.extensions['profiler'] = profiler
+
+    @app.before_request
+    def profile_request():
+        if profiler.session is not None and profiler.session.stopped_reason is None:
+            rule = request.url_rule.rule if request.url_rule is not None else request.path
+            profiler.request_started(request.path, f'{request.method} {rule}')
+
+    @app.teardown_request
+    def finish_profiled_request(exc):
+        profiler.request_finished()
+
+    return profiler
+
+
+def get_profiler(app):
+    return app.extensions['profiler']
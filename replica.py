@@ -0,0 +1,69 @@
+"""
+Чтение с реплики базы данных.
+
+Если задан DATABASE_REPLICA_URL, реплика подключается как bind `replica`
+(SQLALCHEMY_BINDS). Маршруты, отмеченные декоратором read_replica, читают
+с нее, а все записи идут в основную базу. RoutingSession переходит на
+основную базу до конца запроса, как только выполнит запись (flush или
+INSERT/UPDATE/DELETE). После запроса с записью сессия пользователя
+READ_YOUR_WRITES_SECONDS секунд читает только основную базу и сразу видит
+свои изменения, пока реплика их догоняет.
+"""
+
+import time
+
+from flask import request, session
+from flask_sqlalchemy.session import Session
+
+REPLICA_BIND = 'replica'
+WRITTEN_AT_KEY = 'db_written_at'
+
+
+class RoutingSession(Session):
+    """Сессия, которая по флагу info['use_replica'] читает с реплики"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            if self._flushing or getattr(clause, 'is_dml', False):
+                self.info['wrote'] = True
+            elif self.info.get('use_replica') and not self.info.get('wrote'):
+                replica = self._db.engines.get(REPLICA_BIND)
+                if replica is not None:
+                    return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def read_replica(view):
+    """Отмечает маршрут только для чтения: его GET-запросы читают с реплики"""
+    view.read_replica = True
+    return view
+
+
+def replica_configured(app):
+    return REPLICA_BIND in (app.config.get('SQLALCHEMY_BINDS') or {})
+
+
+def init_replica(app):
+    """Включает маршрутизацию чтения на реплику (ничего не делает без DATABASE_REPLICA_URL)"""
+    if not replica_configured(app):
+        return
+    db = app.extensions['sqlalchemy']
+    sticky_seconds = app.config.get('READ_YOUR_WRITES_SECONDS', 5.0)
+
+    @app.before_request
+    def route_reads_to_replica():
+        if request.method not in ('GET', 'HEAD'):
+            return
+        view = app.view_functions.get(request.endpoint)
+        if not getattr(view, 'read_replica', False):
+            return
+        written_at = session.get(WRITTEN_AT_KEY)
+        if written_at and time.time() - written_at < sticky_seconds:
+            return
+        db.session().info['use_replica'] = True
+
+    @app.after_request
+    def remember_write(response):
+        if db.session().info.get('wrote'):
+            session[WRITTEN_AT_KEY] = time.time()
+        return response
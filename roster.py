@@ -0,0 +1,158 @@
+"""
+Слой запросов для списка учеников админ-панели.
+
+Собирает данные об учениках, их активных подписках, оплатах и кодах
+авторизации фиксированным числом SQL-запросов, независимо от количества
+участников (без N+1 обращений к базе). Сумма оплат читается из
+Subscription.paid_total (см. ledger.py).
+"""
+
+from datetime import date
+
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload
+
+from models import db, Participant, Subscription, AuthorizationCode
+
+
+def calculate_age(birth_date, today=None):
+    """Возраст в полных годах на указанную дату"""
+    today = today or date.today()
+    return today.year - birth_date.year - ((today.month, today.day) < (birth_date.month, birth_date.day))
+
+
+def load_active_subscriptions(sport_group_id=None):
+    """Активные подписки вместе с группой одним запросом (JOIN)"""
+    query = Subscription.query.options(joinedload(Subscription.sport_group)).filter(Subscription.is_active == True)
+    if sport_group_id is not None:
+        query = query.filter(Subscription.sport_group_id == sport_group_id)
+    return query.order_by(Subscription.id).all()
+
+
+def load_latest_auth_codes(sport_group_id=None):
+    """Последний код авторизации для каждого участника (оконная функция)"""
+    query = db.session.query(
+        AuthorizationCode.participant_id.label('participant_id'),
+        AuthorizationCode.code.label('code'),
+        func.row_number().over(
+            partition_by=AuthorizationCode.participant_id,
+            order_by=(AuthorizationCode.created_at.desc(), AuthorizationCode.id.desc())
+        ).label('rn')
+    )
+    if sport_group_id is not None:
+        group_participants = db.session.query(Subscription.participant_id).filter(
+            Subscription.sport_group_id == sport_group_id,
+            Subscription.is_active == True
+        )
+        query = query.filter(AuthorizationCode.participant_id.in_(group_participants))
+    ranked = query.subquery()
+    rows = db.session.query(ranked.c.participant_id, ranked.c.code).filter(ranked.c.rn == 1)
+    return {participant_id: code for participant_id, code in rows}
+
+
+def serialize_subscription(subscription):
+    """Данные подписки для списка учеников"""
+    return {
+        'subscription_id': subscription.id,
+        'sport_group_name': subscription.sport_group.name,
+        'subscription_type': subscription.subscription_type,
+        'total_lessons': subscription.total_lessons,
+        'remaining_lessons': subscription.remaining_lessons,
+        'total_paid': subscription.paid_total,
+        'start_date': subscription.start_date,
+        'end_date': subscription.end_date
+    }
+
+
+def serialize_participant(participant, auth_code, today):
+    """Общие поля участника для списков учеников"""
+    return {
+        'participant_id': participant.id,
+        'participant_name': participant.full_name,
+        'parent_phone': participant.parent_phone,
+        'birth_date': participant.birth_date,
+        'age': calculate_age(participant.birth_date, today),
+        'medical_certificate': participant.medical_certificate,
+        'discount_type': participant.discount_type,
+        'discount_percent': participant.discount_percent,
+        'authorization_code': auth_code
+    }
+
+
+def build_students_roster():
+    """
+    Список всех учеников с финансовой информацией.
+    Выполняет 3 запроса: участники, активные подписки с группами
+    и последние коды авторизации.
+    """
+    participants = Participant.query.all()
+
+    subscriptions_by_participant = {}
+    for subscription in load_active_subscriptions():
+        subscriptions_by_participant.setdefault(subscription.participant_id, []).append(subscription)
+
+    auth_codes = load_latest_auth_codes()
+    today = date.today()
+
+    students_data = []
+    for participant in participants:
+        participant_subscriptions = []
+        total_paid_all = 0
+        total_remaining_all = 0
+
+        for subscription in subscriptions_by_participant.get(participant.id, []):
+            total_paid_all += subscription.paid_total
+            total_remaining_all += subscription.remaining_lessons
+            participant_subscriptions.append(serialize_subscription(subscription))
+
+        student = serialize_participant(participant, auth_codes.get(participant.id), today)
+        student.update({
+            'subscriptions': participant_subscriptions,
+            'total_paid_all': total_paid_all,
+            'total_remaining_all': total_remaining_all,
+            'subscription_count': len(participant_subscriptions),
+            'has_payments': total_paid_all > 0
+        })
+        students_data.append(student)
+
+    # Сортируем по имени участника
+    students_data.sort(key=lambda x: x['participant_name'])
+    return students_data
+
+
+def build_group_roster(group_id):
+    """
+    Список учеников группы (по одной строке на активную подписку).
+    Выполняет 2 запроса независимо от размера группы.
+    """
+    subscriptions = Subscription.query.options(
+        joinedload(Subscription.participant)
+    ).filter(
+        Subscription.sport_group_id == group_id,
+        Subscription.is_active == True
+    ).order_by(Subscription.id).all()
+
+    auth_codes = load_latest_auth_codes(sport_group_id=group_id)
+    today = date.today()
+
+    students_data = []
+    for subscription in subscriptions:
+        participant = subscription.participant
+        total_paid = subscription.paid_total
+
+        student = serialize_participant(participant, auth_codes.get(participant.id), today)
+        student.update({
+            'subscription_id': subscription.id,
+            'subscription_type': subscription.subscription_type,
+            'total_lessons': subscription.total_lessons,
+            'remaining_lessons': subscription.remaining_lessons,
+            'total_paid': total_paid,
+            'start_date': subscription.start_date,
+            'end_date': subscription.end_date,
+            'has_payments': total_paid > 0
+        })
+        students_data.append(student)
+
+    # Сортируем по имени участника
+    students_data.sort(key=lambda x: x['participant_name'])
+    return students_data
@@ -0,0 +1,196 @@
+"""
+Планировщик периодических задач.
+
+Задачи (sweeps.py) выполняются фоновым потоком воркера, если включен
+SCHEDULER_ENABLED, или командой `flask --app app run-jobs` из cron либо
+отдельного процесса. Перед запуском задача захватывает свою строку в
+AppState условным UPDATE по времени последнего запуска, поэтому при
+нескольких воркерах и процессах задачу за интервал выполняет только один.
+В той же строке сохраняется результат последнего запуска.
+"""
+
+import atexit
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from functools import partial
+from typing import Callable
+
+from sqlalchemy import select, update, or_
+from sqlalchemy.exc import IntegrityError
+
+from models import db, AppState
+from sweeps import expire_subscriptions, send_low_balance_notices
+
+logger = logging.getLogger(__name__)
+
+STATE_PREFIX = 'job:'
+
+
+@dataclass
+class Job:
+    """Периодическая задача: func выполняется в контексте приложения"""
+    name: str
+    interval: float  # Секунды между запусками
+    func: Callable
+
+    @property
+    def state_key(self):
+        return STATE_PREFIX + self.name
+
+
+def claim_job(job, force=False):
+    """
+    Захватывает задачу: время последнего запуска (AppState.updated_at)
+    сдвигается на текущее, только если интервал уже прошел. Возвращает
+    время запуска или None, если задачу недавно запускал другой процесс.
+    """
+    now = datetime.utcnow()
+    conditions = [AppState.key == job.state_key]
+    if not force:
+        conditions.append(or_(
+            AppState.updated_at.is_(None),
+            AppState.updated_at <= now - timedelta(seconds=job.interval)
+        ))
+    claimed = db.session.execute(update(AppState).where(*conditions).values(
+        updated_at=now
+    ).execution_options(synchronize_session=False)).rowcount
+    if not claimed and db.session.get(AppState, job.state_key) is None:
+        try:
+            with db.session.begin_nested():
+                db.session.add(AppState(key=job.state_key, value='{}', updated_at=now))
+            claimed = True
+        except IntegrityError:
+            claimed = False
+    db.session.commit()
+    return now if claimed else None
+
+
+def run_job(job, force=False):
+    """Выполняет задачу, если ее время пришло; возвращает состояние запуска или None"""
+    started_at = claim_job(job, force)
+    if started_at is None:
+        return None
+
+    started = time.perf_counter()
+    state = {'started_at': started_at.isoformat(timespec='seconds')}
+    try:
+        state['result'] = job.func()
+        state['status'] = 'ok'
+    except Exception as e:
+        db.session.rollback()
+        logger.error("Job %s failed: %s", job.name, e)
+        state['status'] = 'error'
+        state['error'] = str(e)
+    state['finished_at'] = datetime.utcnow().isoformat(timespec='seconds')
+    state['duration_ms'] = round((time.perf_counter() - started) * 1000, 1)
+
+    # updated_at остается временем запуска: по нему считается следующий интервал
+    db.session.execute(update(AppState).where(AppState.key == job.state_key).values(
+        value=json.dumps(state, ensure_ascii=False),
+        updated_at=started_at
+    ).execution_options(synchronize_session=False))
+    db.session.commit()
+    return state
+
+
+def load_job_states(jobs):
+    """Последний запуск каждой задачи: name -> состояние"""
+    rows = dict(db.session.execute(select(AppState.key, AppState.value).where(
+        AppState.key.in_([job.state_key for job in jobs])
+    )).all())
+    return {job.name: {
+        'interval': job.interval,
+        'last_run': json.loads(rows[job.state_key] or '{}') if job.state_key in rows else None
+    } for job in jobs}
+
+
+class JobScheduler:
+    """Фоновый поток, который раз в tick секунд запускает задачи, чье время пришло"""
+
+    def __init__(self, app, jobs, tick=30.0):
+        self.app = app
+        self.jobs = {job.name: job for job in jobs}
+        self.tick = tick
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Запускает поток (повторный вызов ничего не делает; после fork поток создается заново)"""
+        with self._lock:
+            if self.running:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='job-scheduler', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+
+    def run_pending(self, names=None, force=False):
+        """Запускает задачи (все или names); возвращает name -> состояние для выполненных"""
+        results = {}
+        with self.app.app_context():
+            for name in names or self.jobs:
+                state = run_job(self.jobs[name], force)
+                if state is not None:
+                    results[name] = state
+        return results
+
+    def states(self):
+        with self.app.app_context():
+            return load_job_states(list(self.jobs.values()))
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_pending()
+            except Exception as e:
+                logger.error("Job scheduler tick failed: %s", e)
+            self._stop.wait(self.tick)
+
+
+def default_jobs(app):
+    """Задачи приложения с интервалами из конфигурации"""
+    config = app.config
+    batch_size = config.get('JOBS_BATCH_SIZE', 500)
+    return [
+        Job('expire_subscriptions', config.get('EXPIRY_SWEEP_INTERVAL', 3600),
+            partial(expire_subscriptions, batch_size=batch_size)),
+        Job('low_balance_notices', config.get('LOW_BALANCE_INTERVAL', 3600),
+            lambda: send_low_balance_notices(app.extensions['telegram_outbox'],
+                                             config.get('LOW_BALANCE_THRESHOLDS', (1,)), batch_size)),
+    ]
+
+
+def init_scheduler(app):
+    """
+    Регистрирует планировщик. При SCHEDULER_ENABLED поток стартует с первым
+    запросом в каждом процессе воркера (потоки не переживают fork).
+    """
+    scheduler = JobScheduler(app, default_jobs(app), tick=app.config.get('SCHEDULER_TICK', 30.0))
+    app.extensions['scheduler'] = scheduler
+
+    if app.config.get('SCHEDULER_ENABLED'):
+        @app.before_request
+        def start_scheduler():
+            if not scheduler.running:
+                scheduler.start()
+
+        atexit.register(scheduler.stop)
+    return scheduler
+
+
+def get_scheduler(app):
+    return app.extensions['scheduler']
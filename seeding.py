@@ -0,0 +1,258 @@
+"""
+Начальные данные спортивных групп и их загрузка в базу.
+
+Загрузка выполняется явной командой `flask --app app seed-groups`, а не при
+импорте приложения. Контрольная сумма данных хранится в таблице AppState,
+поэтому повторный запуск без изменений данных ничего не записывает.
+"""
+
+import hashlib
+import json
+import re
+from datetime import datetime
+
+from models import db, SportGroup, Schedule, AppState
+from catalog import bump_catalog_version
+
+# Увеличьте при изменении логики загрузки, чтобы перезаписать данные в базе
+SEED_VERSION = 1
+SEED_STATE_KEY = 'sport_groups_seed'
+NO_SCHEDULE = 'Расписание в проработке'
+
+SPORT_GROUPS = [
+    {
+        'name': 'Дзюдо младшая группа А',
+        'description': 'Группа для детей 4-6 лет',
+        'detailed_description': 'Дзюдо для самых маленьких! Наши занятия направлены на развитие координации, гибкости и дисциплины у детей дошкольного возраста. В игровой форме дети изучают основы дзюдо, учатся работать в команде и развивают уверенность в себе. Продолжительность занятия 50 минут. Форма одежды кимано (если нет - шорты, футболка), с собой негазированную питьевую воду 0.5 л объёмом, сменная обувь. Занятия проходят босиком.',
+        'schedule': 'Понедельник, Среда, Пятница с 19:30 до 20:20',
+        'price_8': 4000, 
+        'price_12': 5000,
+        'price_single': 700,
+        'trainer_name': 'Галоян Пайлак Араратович',
+        'trainer_info': 'Является мастером спорта международного класса по дзюдо. Многократный призёр и чемпион чемпионатов России, 8 кратный медалист кубков Европы, бронзовый призер первенства Европы. Имеет педагогическое, юридическое образование. В основу ставит спортивную дисциплину, уважение к старшим. Опыт работы более 4 лет.',
+        'category': 'judo',
+        'age_group': '4-6 лет'
+    },
+    {
+        'name': 'Дзюдо младшая группа Б',
+        'description': 'Группа для детей 4-6 лет',
+        'detailed_description': 'Дзюдо для самых маленьких! Наши занятия направлены на развитие координации, гибкости и дисциплины у детей дошкольного возраста. В игровой форме дети изучают основы дзюдо, учатся работать в команде и развивают уверенность в себе. Продолжительность занятия 50 минут. Форма одежды кимано (если нет - шорты, футболка), с собой негазированную питьевую воду 0.5 л объёмом, сменная обувь. Занятия проходят босиком.',
+        'schedule': 'Вторник, Четверг с 18:30 до 19:20, Суббота с 10:00 до 10:50',
+        'price_8': 4000, 
+        'price_12': 5000,
+        'price_single': 700,
+        'trainer_name': 'Галоян Пайлак Араратович',
+        'trainer_info': 'Является мастером спорта международного класса по дзюдо. Многократный призёр и чемпион чемпионатов России, 8 кратный медалист кубков Европы, бронзовый призер первенства Европы. Имеет педагогическое, юридическое образование. В основу ставит спортивную дисциплину, уважение к старшим. Опыт работы более 4 лет.',
+        'category': 'judo',
+        'age_group': '4-6 лет'
+    },
+    {
+        'name': 'Дзюдо старшая группа А',
+        'description': 'Группа для детей 7 лет и старше',
+        'detailed_description': 'Серьезные тренировки по дзюдо для детей школьного возраста. Программа включает изучение техники, участие в соревнованиях, развитие физических качеств и спортивного характера. Продолжительность занятия 50 минут. Форма одежды кимано (если нет - шорты, футболка), с собой негазированную питьевую воду 0.5 л объёмом, сменная обувь. Занятия проходят босиком.',
+        'schedule': 'Понедельник, Среда, Пятница с 20:30 до 21:20',
+        'price_8': 4000,
+        'price_12': 5000,
+        'price_single': 700,
+        'trainer_name': 'Галоян Пайлак Араратович',
+        'trainer_info': 'Является мастером спорта международного класса по дзюдо. Многократный призёр и чемпион чемпионатов России, 8 кратный медалист кубков Европы, бронзовый призер первенства Европы. Имеет педагогическое, юридическое образование. В основу ставит спортивную дисциплину, уважение к старшим. Опыт работы более 4 лет.',
+        'category': 'judo',
+        'age_group': '7+ лет'
+    },
+    {
+        'name': 'Дзюдо старшая группа Б',
+        'description': 'Группа для детей 7 лет и старше',
+        'detailed_description': 'Серьезные тренировки по дзюдо для детей школьного возраста. Программа включает изучение техники, участие в соревнованиях, развитие физических качеств и спортивного характера. Продолжительность занятия 50 минут. Форма одежды кимано (если нет - шорты, футболка), с собой негазированную питьевую воду 0.5 л объёмом, сменная обувь. Занятия проходят босиком.',
+        'schedule': 'Понедельник, Среда, Пятница с 10:00 до 10:50',
+        'price_8': 4000,
+        'price_12': 5000,
+        'price_single': 700,
+        'trainer_name': 'Галоян Пайлак Араратович',
+        'trainer_info': 'Является мастером спорта международного класса по дзюдо. Многократный призёр и чемпион чемпионатов России, 8 кратный медалист кубков Европы, бронзовый призер первенства Европы. Имеет педагогическое, юридическое образование. В основу ставит спортивную дисциплину, уважение к старшим. Опыт работы более 4 лет.',
+        'category': 'judo',
+        'age_group': '7+ лет'
+    },
+    {
+        'name': 'Дзюдо старшая группа В',
+        'description': 'Группа для детей 7 лет и старше',
+        'detailed_description': 'Серьезные тренировки по дзюдо для детей школьного возраста. Программа включает изучение техники, участие в соревнованиях, развитие физических качеств и спортивного характера. Продолжительность занятия 50 минут. Форма одежды кимано (если нет - шорты, футболка), с собой негазированную питьевую воду 0.5 л объёмом, сменная обувь. Занятия проходят босиком.',
+        'schedule': 'Вторник, Четверг с 19:30 до 20:20, Суббота с 11:00 до 11:50',
+        'price_8': 4000,
+        'price_12': 5000,
+        'price_single': 700,
+        'trainer_name': 'Галоян Пайлак Араратович',
+        'trainer_info': 'Является мастером спорта международного класса по дзюдо. Многократный призёр и чемпион чемпионатов России, 8 кратный медалист кубков Европы, бронзовый призер первенства Европы. Имеет педагогическое, юридическое образование. В основу ставит спортивную дисциплину, уважение к старшим. Опыт работы более 4 лет.',
+        'category': 'judo',
+        'age_group': '7+ лет'
+    },
+    {
+        'name': 'Гимнастика',
+        'description': 'Гимнастика для детей от 3х до 5 лет',
+        'detailed_description': 'Гимнастика - отлично подойдёт для мальчиков и девочек, включающие в общеразвивающие упражнения, с уклоном на растяжку, координацию, статические упражнения. Весь тренировочный процесс контролируется спортивной дисциплиной. Занятия продолжительностью 50 минут, форма одежды (шорты, футболка), с собой теплую воду негазированную и сменную обувь.',
+        'schedule': 'Понедельник, Среда, Пятница с 18:30 до 19:20',
+        'price_8': 4000,
+        'price_12': 5000,
+        'price_single': 700,
+        'trainer_name': 'Галоян Пайлак Араратович',
+        'trainer_info': 'Является мастером спорта международного класса по дзюдо. Многократный призёр и чемпион чемпионатов России, 8 кратный медалист кубков Европы, бронзовый призер первенства Европы. Имеет педагогическое, юридическое образование. В основу ставит спортивную дисциплину, уважение к старшим. Опыт работы более 4 лет.',
+        'category': 'gymnastics',
+        'age_group': '3-5 лет'
+    },
+    {
+        'name': 'ММА',
+        'description': 'Смешанные единоборства для подростков от 14+ и взрослых',
+        'detailed_description': 'Отлично подойдёт для подростков, которые хотят научится самообороне, принимать участие в соревнованиях и прогрессировать с каждой тренировкой. Для взрослых отлично подойдут занятия для тех, кто всегда мечтал попробовать для себя что-то новое, тренировки в удовольствие, под присмотром грамотного тренерского состава, обучение техническому арсеналу единоборств, развитие выносливости, работа над физической формой.',
+        'schedule': 'Вторник, Четверг с 21:30 до 22:30',
+        'price_8': 4000,
+        'price_12': 5000,
+        'price_single': 900,
+        'trainer_name': 'Галоян Пайлак Араратович',
+        'trainer_info': 'Является мастером спорта международного класса по дзюдо. Многократный призёр и чемпион чемпионатов России, 8 кратный медалист кубков Европы, бронзовый призер первенства Европы. Имеет педагогическое, юридическое образование. В основу ставит спортивную дисциплину, уважение к старшим. Опыт работы более 4 лет.',
+        'category': 'mma',
+        'age_group': '14+ лет'
+    },
+    {
+        'name': 'Женский фитнес',
+        'description': 'Фитнес программы для женщин', 
+        'detailed_description': 'Специально разработанные программы фитнеса для женщин всех возрастов. Включают кардио-тренировки, силовые упражнения, растяжку и функциональный тренинг.',
+        'schedule': 'Расписание в проработке',
+        'price_8': 4000,
+        'price_single': 700,
+        'trainer_name': 'Анна Морозова',
+        'trainer_info': 'Сертифицированный тренер по фитнесу, специалист по женскому здоровью и питанию. Опыт работы в фитнес-индустрии 12 лет.',
+        'category': 'fitness',
+        'age_group': '18+ лет'
+    }
+]
+
+
+def seed_checksum():
+    """Контрольная сумма данных групп с учетом версии загрузки"""
+    payload = json.dumps({'version': SEED_VERSION, 'groups': SPORT_GROUPS}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def store_seed_checksum():
+    """Запоминает контрольную сумму загруженных данных"""
+    state = db.session.get(AppState, SEED_STATE_KEY)
+    if state is None:
+        state = AppState(key=SEED_STATE_KEY)
+        db.session.add(state)
+    state.value = seed_checksum()
+    db.session.commit()
+
+
+def create_schedule_from_text(sport_group_id, schedule_text):
+    """Создает записи расписания на основе текстового описания"""
+    try:
+        # Парсим текстовое расписание и создаем записи в таблице Schedule
+        schedule_mapping = {
+            'Понедельник': 0,
+            'Вторник': 1,
+            'Среда': 2,
+            'Четверг': 3,
+            'Пятница': 4,
+            'Суббота': 5,
+            'Воскресенье': 6
+        }
+        
+        # Простой парсинг времени (формат: "19:30 до 20:20")
+        time_pattern = r'(\d{1,2}):(\d{2})\s+до\s+(\d{1,2}):(\d{2})'
+        
+        # Разбиваем по дням недели
+        for day_name, day_number in schedule_mapping.items():
+            if day_name in schedule_text:
+                # Ищем время для этого дня
+                times = re.findall(time_pattern, schedule_text)
+                for time_match in times:
+                    start_hour, start_minute, end_hour, end_minute = map(int, time_match)
+                    
+                    # Создаем запись расписания
+                    schedule = Schedule(
+                        sport_group_id=sport_group_id,
+                        day_of_week=day_number,
+                        start_time=datetime.strptime(f"{start_hour:02d}:{start_minute:02d}", "%H:%M").time(),
+                        end_time=datetime.strptime(f"{end_hour:02d}:{end_minute:02d}", "%H:%M").time()
+                    )
+                    db.session.add(schedule)
+        
+        db.session.commit()
+        print(f"Расписание создано для группы {sport_group_id}")
+        
+    except Exception as e:
+        print(f"Ошибка создания расписания для группы {sport_group_id}: {e}")
+        db.session.rollback()
+
+def create_sport_groups():
+    """Создание новых спортивных групп"""
+    for group_data in SPORT_GROUPS:
+        group = SportGroup(**group_data)
+        db.session.add(group)
+        db.session.flush()  # Получаем ID группы
+        
+        # Создаем расписание для группы
+        if group_data['schedule'] != NO_SCHEDULE:
+            create_schedule_from_text(group.id, group_data['schedule'])
+    
+    bump_catalog_version()
+    db.session.commit()
+    store_seed_checksum()
+    print("Спортивные группы созданы успешно!")
+
+def update_sport_groups():
+    """Обновление существующих спортивных групп"""
+    # Получаем все существующие группы
+    existing_groups = SportGroup.query.all()
+    
+    # Создаем словарь для быстрого поиска по имени
+    existing_groups_dict = {group.name: group for group in existing_groups}
+    
+    updated_count = 0
+    created_count = 0
+    
+    for group_data in SPORT_GROUPS:
+        if group_data['name'] in existing_groups_dict:
+            # Обновляем существующую группу
+            group = existing_groups_dict[group_data['name']]
+            for key, value in group_data.items():
+                setattr(group, key, value)
+            
+            # Обновляем расписание
+            if group_data['schedule'] != NO_SCHEDULE:
+                # Удаляем старое расписание
+                Schedule.query.filter_by(sport_group_id=group.id).delete()
+                # Создаем новое расписание
+                create_schedule_from_text(group.id, group_data['schedule'])
+            
+            updated_count += 1
+        else:
+            # Создаем новую группу
+            group = SportGroup(**group_data)
+            db.session.add(group)
+            db.session.flush()  # Получаем ID группы
+            
+            # Создаем расписание для новой группы
+            if group_data['schedule'] != NO_SCHEDULE:
+                create_schedule_from_text(group.id, group_data['schedule'])
+            
+            created_count += 1
+    
+    bump_catalog_version()
+    db.session.commit()
+    store_seed_checksum()
+    print(f"Спортивные группы обновлены: {updated_count} обновлено, {created_count} создано!")
+
+def seed_sport_groups(force=False):
+    """
+    Загружает группы, если данные изменились с прошлой загрузки.
+    Возвращает 'created', 'updated' или 'unchanged'.
+    """
+    state = db.session.get(AppState, SEED_STATE_KEY)
+    if not force and state is not None and state.value == seed_checksum():
+        return 'unchanged'
+    
+    if SportGroup.query.count() == 0:
+        create_sport_groups()
+        return 'created'
+    update_sport_groups()
+    return 'updated'
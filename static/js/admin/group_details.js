@@ -0,0 +1,143 @@
+// Получаем ID группы из URL
+const pathParts = window.location.pathname.split('/');
+const groupId = pathParts[pathParts.length - 1];
+
+if (!groupId || isNaN(groupId)) {
+    showError('Не указан ID группы');
+} else {
+    loadGroupDetails();
+    loadGroupStudents();
+}
+
+async function loadGroupDetails() {
+    try {
+        const response = await fetch(`/api/sport-group/${groupId}`);
+        const result = await response.json();
+
+        if (result.success) {
+            renderGroupInfo(result.group);
+        } else {
+            showError('Ошибка загрузки информации о группе: ' + result.error);
+        }
+    } catch (error) {
+        console.error('Ошибка загрузки информации о группе:', error);
+        showError('Ошибка подключения к серверу');
+    }
+}
+
+function renderGroupInfo(group) {
+    document.getElementById('groupTitle').textContent = group.name;
+    document.getElementById('groupName').textContent = group.name;
+    document.getElementById('groupDesc').textContent = group.description;
+}
+
+async function loadGroupStudents() {
+    try {
+        const response = await fetch(`/api/admin/group/${groupId}/students`);
+        const result = await response.json();
+
+        if (result.success) {
+            renderStudentsList(result.students);
+            updateStats(result.students);
+        } else {
+            showError('Ошибка загрузки учеников: ' + result.error);
+        }
+    } catch (error) {
+        console.error('Ошибка загрузки учеников:', error);
+        showError('Ошибка подключения к серверу');
+    }
+}
+
+function renderStudentsList(students) {
+    const studentsList = document.getElementById('studentsList');
+
+    if (students.length === 0) {
+        studentsList.innerHTML = '<div class="no-students">В группе пока нет учеников</div>';
+        return;
+    }
+
+    const studentsHtml = students.map(student => {
+        const hasPayments = student.has_payments;
+        const paymentStatus = hasPayments ? '✅ Оплачено' : '⏳ Ожидает оплаты';
+        const paymentColor = hasPayments ? 'rgba(16, 185, 129, 0.2)' : 'rgba(245, 158, 11, 0.2)';
+
+        return `
+            <div class="student-item">
+                <div class="student-header">
+                    <div class="student-name">${student.participant_name}</div>
+                    <div class="student-age">${student.age} лет</div>
+                </div>
+                <div class="student-info">
+                    <div class="info-item">
+                        <strong>📱 Телефон:</strong> ${student.parent_phone}
+                    </div>
+                    <div class="info-item">
+                        <strong>📅 Дата рождения:</strong> ${formatDate(student.birth_date)}
+                    </div>
+                    <div class="info-item">
+                        <strong>🎫 Абонемент:</strong> ${student.subscription_type}
+                    </div>
+                    <div class="info-item">
+                        <strong>🔐 Код авторизации:</strong> ${student.authorization_code || 'Не создан'}
+                    </div>
+                </div>
+                <div class="student-financial">
+                    <div class="financial-summary">
+                        <div class="financial-item">
+                            <div class="financial-value">${student.total_lessons}</div>
+                            <div class="financial-label">Всего занятий</div>
+                        </div>
+                        <div class="financial-item">
+                            <div class="financial-value balance-remaining ${getBalanceClass(student.remaining_lessons)}">${student.remaining_lessons}</div>
+                            <div class="financial-label">Осталось</div>
+                        </div>
+                        <div class="financial-item">
+                            <div class="financial-value">${student.total_paid} ₽</div>
+                            <div class="financial-label">Оплачено</div>
+                        </div>
+                        <div class="financial-item">
+                            <div class="financial-value" style="color: ${hasPayments ? '#10b981' : '#fbbf24'}">${paymentStatus}</div>
+                            <div class="financial-label">Статус</div>
+                        </div>
+                    </div>
+                </div>
+            </div>
+        `;
+    }).join('');
+
+    studentsList.innerHTML = studentsHtml;
+}
+
+function updateStats(students) {
+    const totalStudents = students.length;
+    const activeStudents = students.filter(s => s.is_active).length;
+    const lowBalance = students.filter(s => s.remaining_lessons <= 1).length;
+
+    document.getElementById('totalStudents').textContent = totalStudents;
+    document.getElementById('activeStudents').textContent = activeStudents;
+    document.getElementById('lowBalance').textContent = lowBalance;
+}
+
+function formatDate(dateString) {
+    const date = new Date(dateString);
+    return date.toLocaleDateString('ru-RU');
+}
+
+function getBalanceClass(remaining) {
+    if (remaining <= 1) return 'low';
+    if (remaining <= 3) return 'medium';
+    return 'high';
+}
+
+function showAddStudentModal() {
+    // Здесь можно добавить логику для показа модального окна добавления ученика
+    alert('Функция добавления ученика будет доступна в ближайшее время!');
+}
+
+function showError(message) {
+    document.getElementById('studentsList').innerHTML = `<div class="error">${message}</div>`;
+}
+
+function goBack() {
+    window.history.back();
+}
@@ -0,0 +1,290 @@
+// Загружаем группы при загрузке страницы
+console.log('=== Скрипт загружен ===');
+console.log('Страница загружена, вызываем loadGroups()');
+
+// Проверяем, что все функции определены
+console.log('testButton определена:', typeof testButton);
+
+// Инициализируем логи
+logToTestOutput('Страница загружена, начинаем инициализацию...');
+
+loadGroups();
+
+async function loadGroups() {
+    logToTestOutput('loadGroups() вызвана');
+    console.log('loadGroups() вызвана');
+    try {
+        logToTestOutput('Делаем запрос к /api/sport-groups');
+        console.log('Делаем запрос к /api/sport-groups');
+        const response = await fetch('/api/sport-groups');
+        console.log('Получен ответ:', response);
+        console.log('Статус ответа:', response.status);
+        console.log('OK:', response.ok);
+
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+
+        const result = await response.json();
+        console.log('Результат:', result);
+
+        if (result.success) {
+            const successMsg = `Успешно загружено групп: ${result.groups.length}`;
+            logToTestOutput(successMsg);
+            console.log(successMsg);
+            console.log('Первая группа:', result.groups[0]);
+            renderGroups(result.groups);
+        } else {
+            const errorMsg = 'Ошибка API: ' + result.error;
+            logToTestOutput(errorMsg);
+            console.error('Ошибка API:', result.error);
+            showError('Ошибка загрузки групп: ' + result.error);
+        }
+    } catch (error) {
+        const errorMsg = 'Ошибка загрузки групп: ' + error.message;
+        logToTestOutput(errorMsg);
+        console.error('Ошибка загрузки групп:', error);
+        showError('Ошибка подключения к серверу: ' + error.message);
+    }
+}
+
+async function renderGroups(groups) {
+    logToTestOutput(`renderGroups вызвана с ${groups.length} группами`);
+    console.log('renderGroups вызвана с группами:', groups);
+    const groupsList = document.getElementById('groupsList');
+    console.log('groupsList элемент:', groupsList);
+
+    if (!groupsList) {
+        const errorMsg = 'Элемент groupsList не найден!';
+        logToTestOutput(errorMsg);
+        console.error('Элемент groupsList не найден!');
+        return;
+    }
+
+    if (groups.length === 0) {
+        logToTestOutput('Нет групп для отображения');
+        console.log('Нет групп для отображения');
+        groupsList.innerHTML = '<div class="error">Нет доступных групп</div>';
+        return;
+    }
+
+    logToTestOutput('Начинаем загрузку статистики для групп...');
+    console.log('Начинаем загрузку статистики для групп...');
+    // Загружаем статистику для каждой группы
+    const groupsWithStats = await Promise.all(groups.map(async (group) => {
+        try {
+            const statsResponse = await fetch(`/api/admin/group/${group.id}/students`);
+            if (statsResponse.ok) {
+                const statsResult = await statsResponse.json();
+                if (statsResult.success) {
+                    return {
+                        ...group,
+                        studentCount: statsResult.students.length,
+                        activeStudents: statsResult.students.length, // Все подписки активны по умолчанию
+                        lowBalance: statsResult.students.filter(s => s.remaining_lessons <= 1).length
+                    };
+                }
+            }
+        } catch (error) {
+            console.error(`Ошибка загрузки статистики для группы ${group.id}:`, error);
+        }
+
+        return {
+            ...group,
+            studentCount: 0,
+            activeStudents: 0,
+            lowBalance: 0
+        };
+    }));
+
+    console.log('Начинаем рендеринг групп:', groupsWithStats.length);
+    const groupsHtml = groupsWithStats.map(group => {
+        console.log(`Рендерим группу: ${group.name} (ID: ${group.id})`);
+        console.log(`Полные данные группы:`, group);
+
+        // Проверяем, что у группы есть ID
+        if (!group.id) {
+            console.error(`Группа ${group.name} не имеет ID!`);
+            return '';
+        }
+
+        // Проверяем тип ID
+        if (typeof group.id !== 'number') {
+            console.error(`Группа ${group.name} имеет неправильный тип ID: ${typeof group.id}, значение: ${group.id}`);
+            return '';
+        }
+
+        logToTestOutput(`Рендерим группу: ${group.name} (ID: ${group.id}, тип: ${typeof group.id})`);
+
+        return `
+        <div class="group-card" onclick="openGroupAdmin(${group.id})">
+            <div class="group-header">
+                <div>
+                    <div class="group-name">${group.name}</div>
+                    <div class="group-category">${getCategoryName(group.category)}</div>
+                </div>
+            </div>
+
+            <div class="group-info">
+                <div class="info-item">
+                    <strong>👨‍🏫 Тренер:</strong> ${group.trainer_name}
+                </div>
+                <div class="info-item">
+                    <strong>👶 Возраст:</strong> ${group.age_group}
+                </div>
+                <div class="info-item">
+                    <strong>📅 Расписание:</strong> ${group.schedule || 'Расписания пока нет'}
+                </div>
+                <div class="info-item">
+                    <strong>💰 Цена (8 занятий):</strong> ${group.price_8} ₽
+                </div>
+            </div>
+            <div class="group-stats">
+                <div class="stat-item">
+                    <div class="stat-number">${group.studentCount}</div>
+                    <div class="stat-label">Учеников</div>
+                </div>
+                <div class="stat-item">
+                    <div class="stat-number">${group.activeStudents}</div>
+                    <div class="stat-label">Активных</div>
+                </div>
+                <div class="stat-item">
+                    <div class="stat-number">${group.lowBalance}</div>
+                    <div class="stat-label">Низкий баланс</div>
+                </div>
+            </div>
+            <div class="group-actions">
+                <button class="btn btn-primary" onclick="event.stopPropagation(); openAllStudents();">
+                    👥 Ученики
+                </button>
+            </div>
+        </div>
+    `;
+    }).join('');
+
+    groupsList.innerHTML = groupsHtml;
+
+    logToTestOutput('renderGroups завершена');
+    console.log('renderGroups завершена');
+}
+
+function getCategoryName(category) {
+    const categories = {
+        'judo': 'Дзюдо',
+        'gymnastics': 'Гимнастика',
+        'mma': 'ММА',
+        'fitness': 'Фитнес'
+    };
+    return categories[category] || category;
+}
+
+function openGroupAdmin(groupId) {
+    window.location.href = `/admin/group/${groupId}`;
+}
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+function showError(message) {
+    document.getElementById('groupsList').innerHTML = `<div class="error">${message}</div>`;
+}
+
+function goBack() {
+    window.history.back();
+}
+
+async function updateGroups() {
+    logToTestOutput('Обновление групп...');
+    try {
+        const response = await fetch('/api/admin/update-sport-groups', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            }
+        });
+
+        const result = await response.json();
+        if (result.success) {
+            logToTestOutput('Группы успешно обновлены!');
+            loadGroups(); // Перезагружаем список групп
+        } else {
+            logToTestOutput('Ошибка обновления: ' + result.error);
+        }
+    } catch (error) {
+        console.error('Ошибка обновления групп:', error);
+        logToTestOutput('Ошибка подключения к серверу');
+    }
+}
+
+async function resetGroups() {
+    logToTestOutput('Сброс групп...');
+    try {
+        const response = await fetch('/api/admin/reset-sport-groups', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            }
+        });
+
+        const result = await response.json();
+        if (result.success) {
+            logToTestOutput('Группы успешно сброшены и пересозданы!');
+            loadGroups(); // Перезагружаем список групп
+        } else {
+            logToTestOutput('Ошибка сброса: ' + result.error);
+        }
+    } catch (error) {
+        console.error('Ошибка сброса групп:', error);
+        logToTestOutput('Ошибка подключения к серверу');
+    }
+}
+
+function testButton() {
+    logToTestOutput('Тестовая кнопка нажата!');
+    console.log('Тестовая кнопка работает!');
+}
+
+
+
+function clearLogs() {
+    const testOutput = document.getElementById('testOutput');
+    if (testOutput) {
+        testOutput.innerHTML = ''; // Очищаем содержимое
+        logToTestOutput('Логи очищены');
+    }
+}
+
+function logToTestOutput(message) {
+    const testOutput = document.getElementById('testOutput');
+    if (testOutput) {
+        const timestamp = new Date().toLocaleTimeString();
+        const logEntry = document.createElement('div');
+        logEntry.style.cssText = 'margin: 5px 0; padding: 5px; background: rgba(255,255,255,0.1); border-radius: 3px; font-family: monospace; font-size: 12px;';
+        logEntry.textContent = `[${timestamp}] ${message}`;
+        testOutput.appendChild(logEntry);
+
+        // Автоматически прокручиваем к последнему сообщению
+        testOutput.scrollTop = testOutput.scrollHeight;
+
+        console.log(message);
+    }
+}
+
+function openAllStudents() {
+    logToTestOutput('Открываем список всех учеников...');
+    console.log('Открываем список всех учеников...');
+    // Переходим на страницу управления всеми учениками
+    window.location.href = '/admin/students';
+}
@@ -412,52 +412,100 @@ async function loadContactData() {
 }
 
 // ===== Платежи (админ список) =====
-async function loadPaymentsData() {
+let paymentsNextCursor = null;
+
+function paymentsQuery(cursor) {
+    const params = new URLSearchParams();
+    const filters = {
+        status: 'paymentsStatusFilter',
+        group_id: 'paymentsGroupFilter',
+        date_from: 'paymentsDateFrom',
+        date_to: 'paymentsDateTo'
+    };
+    Object.entries(filters).forEach(([name, id]) => {
+        const el = document.getElementById(id);
+        if (el && el.value) params.set(name, el.value);
+    });
+    if (cursor) params.set('cursor', cursor);
+    return params.toString();
+}
+
+function exportPayments(format) {
+    // Файл формируется потоково на сервере с теми же фильтрами, что и список
+    const query = paymentsQuery();
+    window.location.href = `/api/admin/export/payments?format=${format}${query ? '&' + query : ''}`;
+}
+
+function renderPaymentItem(p) {
+    return `
+        <div class="schedule-item payment-item ${p.status}">
+            <div class="payment-header">
+                <div class="payment-participant">${p.participant_name}</div>
+                <div class="payment-status ${p.status}">${getStatusText(p.status)}</div>
+            </div>
+            <div class="payment-details">
+                <div>📱 ${p.participant_phone || ''}</div>
+                <div>🏃‍♂️ ${p.sport_group} — ${p.subscription_type}</div>
+                <div>💰 ${p.amount} ₽ (${p.payment_method})</div>
+                <div>📅 Создан: ${p.created_at}</div>
+                ${p.payment_date ? `<div>✅ Подтвержден: ${p.payment_date}</div>` : ''}
+                ${p.admin_notes ? `<div>📝 Заметка: ${p.admin_notes}</div>` : ''}
+            </div>
+            ${p.status === 'pending' ? `
+                <div class="payment-actions">
+                    <button class="btn btn-success" onclick="approvePayment(${p.id})">✅ Подтвердить</button>
+                    <button class="btn btn-danger" onclick="rejectPayment(${p.id})">❌ Отклонить</button>
+                </div>
+            ` : ''}
+        </div>
+    `;
+}
+
+function fillPaymentsGroupFilter() {
+    const select = document.getElementById('paymentsGroupFilter');
+    if (!select || select.options.length > 1) return;
+    sportGroups.forEach(g => {
+        const option = document.createElement('option');
+        option.value = g.id;
+        option.textContent = g.name;
+        select.appendChild(option);
+    });
+}
+
+async function loadPaymentsData(append = false) {
+    const list = document.getElementById('paymentsList');
+    const moreBtn = document.getElementById('paymentsMoreBtn');
     try {
-        const resp = await fetch('/api/admin/payments');
+        if (!append) fillPaymentsGroupFilter();
+        const resp = await fetch('/api/admin/payments?' + paymentsQuery(append ? paymentsNextCursor : null));
         const data = await resp.json();
-        const list = document.getElementById('paymentsList');
         if (!list) return;
         if (data.success) {
+            paymentsNextCursor = data.next_cursor;
+            if (moreBtn) moreBtn.style.display = paymentsNextCursor ? 'block' : 'none';
+            const items = data.payments.map(renderPaymentItem).join('');
+            if (append) {
+                list.insertAdjacentHTML('beforeend', items);
+                return;
+            }
             if (data.payments.length === 0) {
                 list.innerHTML = '<p>Платежей пока нет</p>';
                 return;
             }
-            list.innerHTML = `
-                <h4>Список платежей:</h4>
-                ${data.payments.map(p => `
-                    <div class="schedule-item payment-item ${p.status}">
-                        <div class="payment-header">
-                            <div class="payment-participant">${p.participant_name}</div>
-                            <div class="payment-status ${p.status}">${getStatusText(p.status)}</div>
-                        </div>
-                        <div class="payment-details">
-                            <div>📱 ${p.participant_phone}</div>
-                            <div>🏃‍♂️ ${p.sport_group} — ${p.subscription_type}</div>
-                            <div>💰 ${p.amount} ₽ (${p.payment_method})</div>
-                            <div>📅 Создан: ${p.created_at}</div>
-                            ${p.payment_date ? `<div>✅ Подтвержден: ${p.payment_date}</div>` : ''}
-                            ${p.admin_notes ? `<div>📝 Заметка: ${p.admin_notes}</div>` : ''}
-                        </div>
-                        ${p.status === 'pending' ? `
-                            <div class="payment-actions">
-                                <button class="btn btn-success" onclick="approvePayment(${p.id})">✅ Подтвердить</button>
-                                <button class="btn btn-danger" onclick="rejectPayment(${p.id})">❌ Отклонить</button>
-                            </div>
-                        ` : ''}
-                    </div>
-                `).join('')}
-            `;
+            list.innerHTML = `<h4>Список платежей:</h4>${items}`;
         } else {
             list.innerHTML = '<div class="error">Ошибка загрузки платежей</div>';
         }
     } catch (e) {
         console.error('Ошибка загрузки платежей', e);
-        const list = document.getElementById('paymentsList');
         if (list) list.innerHTML = '<div class="error">Ошибка загрузки платежей</div>';
     }
 }
 
+function loadMorePayments() {
+    if (paymentsNextCursor) loadPaymentsData(true);
+}
+
 function getStatusText(status) {
     switch (status) {
         case 'pending': return '⏳ Ожидает подтверждения';
@@ -657,26 +705,38 @@ async function loadAttendanceGroups() {
     }
 }
 
-async function selectAttendanceGroup(groupId, groupName) {
+function shiftIsoDate(isoDate, days) {
+    const d = new Date(isoDate + 'T00:00:00Z');
+    d.setUTCDate(d.getUTCDate() + days);
+    return d.toISOString().slice(0, 10);
+}
+
+async function selectAttendanceGroup(groupId, groupName, from = null) {
     window.currentAttendanceGroup = { id: groupId, name: groupName };
     try {
-        const resp = await fetch(`/api/admin/attendance/schedule/${groupId}`);
+        const params = from ? `?from=${from}&to=${shiftIsoDate(from, 27)}` : '';
+        const resp = await fetch(`/api/admin/attendance/schedule/${groupId}${params}`);
         const data = await resp.json();
         if (data.success) {
-            renderAttendanceDates(data.dates, groupName);
+            window.currentAttendanceWindow = { from: data.from, to: data.to };
             closeModal('attendanceModal');
-            // Создаем модалку дат
-            const html = `
-                <div class="modal" id="attendanceDateModal" style="display:block;">
-                    <div class="modal-content">
-                        <div class="modal-header">
-                            <h3 class="modal-title">Выбор даты</h3>
-                            <button class="close-btn" onclick="closeModal('attendanceDateModal')">&times;</button>
+            const dateModal = document.getElementById('attendanceDateModal');
+            if (dateModal) {
+                dateModal.style.display = 'block';
+            } else {
+                // Создаем модалку дат
+                const html = `
+                    <div class="modal" id="attendanceDateModal" style="display:block;">
+                        <div class="modal-content">
+                            <div class="modal-header">
+                                <h3 class="modal-title">Выбор даты</h3>
+                                <button class="close-btn" onclick="closeModal('attendanceDateModal')">&times;</button>
+                            </div>
+                            <div class="modal-body" id="attendanceDatesList"></div>
                         </div>
-                        <div class="modal-body" id="attendanceDatesList"></div>
-                    </div>
-                </div>`;
-            document.body.insertAdjacentHTML('beforeend', html);
+                    </div>`;
+                document.body.insertAdjacentHTML('beforeend', html);
+            }
             renderAttendanceDates(data.dates, groupName);
         } else {
             showError('Ошибка загрузки расписания: ' + data.error);
@@ -687,11 +747,25 @@ async function selectAttendanceGroup(groupId, groupName) {
     }
 }
 
+function shiftAttendanceWindow(days) {
+    const group = window.currentAttendanceGroup;
+    const current = window.currentAttendanceWindow;
+    if (!group || !current) return;
+    selectAttendanceGroup(group.id, group.name, shiftIsoDate(current.from, days));
+}
+
 function renderAttendanceDates(dates, groupName) {
     const container = document.getElementById('attendanceDatesList');
     if (!container) return;
+    const range = window.currentAttendanceWindow;
+    const pager = range ? `
+        <div style="display:flex; justify-content:space-between; align-items:center; margin-bottom:12px;">
+            <button class="btn btn-small" onclick="shiftAttendanceWindow(-28)">← Раньше</button>
+            <span style="color:#9ca3af; font-size:13px;">${range.from} — ${range.to}</span>
+            <button class="btn btn-small" onclick="shiftAttendanceWindow(28)">Позже →</button>
+        </div>` : '';
     if (!dates || dates.length === 0) {
-        container.innerHTML = '<div class="error">Нет запланированных занятий</div>';
+        container.innerHTML = `${pager}<div class="error">Нет запланированных занятий</div>`;
         return;
     }
     container.innerHTML = `
@@ -699,6 +773,7 @@ function renderAttendanceDates(dates, groupName) {
             <h4 style="margin-bottom: 8px; color: #ffffff;">${groupName}</h4>
             <p style="color:#9ca3af; font-size:13px; margin-bottom:12px;">Выберите дату занятия:</p>
         </div>
+        ${pager}
         ${dates.map(date => `
             <div class="attendance-date ${date.has_attendance ? (date.is_completed ? 'completed' : 'pending') : ''}"
                  onclick="selectAttendanceDate('${date.date}', '${date.day_name} ${date.day_number} ${date.month} ${date.year}')">
@@ -1237,10 +1312,10 @@ function openGroupAttendance(groupId, groupName) {
 
 async function openPaymentsForGroup(groupId, groupName) {
     try {
-        const resp = await fetch('/api/admin/payments');
+        const resp = await fetch(`/api/admin/payments?group_id=${encodeURIComponent(groupId)}&limit=200`);
         const data = await resp.json();
         if (!data.success) { showError('Не удалось загрузить платежи'); return; }
-        const groupPayments = (data.payments || []).filter(p => String(p.group_id) === String(groupId) || p.sport_group === groupName);
+        const groupPayments = data.payments || [];
         const html = `
             <div class="modal" id="groupPaymentsModal" style="display:block;">
                 <div class="modal-content">
@@ -1249,28 +1324,8 @@ async function openPaymentsForGroup(groupId, groupName) {
                         <button class="close-btn" onclick="closeModal('groupPaymentsModal')">&times;</button>
                     </div>
                     <div class="modal-body">
-                        ${groupPayments.length === 0 ? '<p>Платежей пока нет</p>' : groupPayments.map(p => `
-                            <div class="schedule-item payment-item ${p.status}">
-                                <div class="payment-header">
-                                    <div class="payment-participant">${p.participant_name}</div>
-                                    <div class="payment-status ${p.status}">${getStatusText(p.status)}</div>
-                                </div>
-                                <div class="payment-details">
-                                    <div>📱 ${p.participant_phone || ''}</div>
-                                    <div>🏃‍♂️ ${p.sport_group} — ${p.subscription_type}</div>
-                                    <div>💰 ${p.amount} ₽ (${p.payment_method})</div>
-                                    <div>📅 Создан: ${p.created_at}</div>
-                                    ${p.payment_date ? `<div>✅ Подтвержден: ${p.payment_date}</div>` : ''}
-                                    ${p.admin_notes ? `<div>📝 Заметка: ${p.admin_notes}</div>` : ''}
-                                </div>
-                                ${p.status === 'pending' ? `
-                                    <div class="payment-actions">
-                                        <button class="btn btn-success" onclick="approvePayment(${p.id})">✅ Подтвердить</button>
-                                        <button class="btn btn-danger" onclick="rejectPayment(${p.id})">❌ Отклонить</button>
-                                    </div>
-                                ` : ''}
-                            </div>
-                        `).join('')}
+                        ${groupPayments.length === 0 ? '<p>Платежей пока нет</p>' : groupPayments.map(renderPaymentItem).join('')}
+                        ${data.next_cursor ? '<p>Показаны последние 200 платежей. Полный список — в разделе «Система учета оплаты».</p>' : ''}
                     </div>
                 </div>
             </div>`;
@@ -0,0 +1,119 @@
+"""
+Периодические проверки подписок.
+
+expire_subscriptions снимает флаг is_active с подписок, срок которых
+истек, пакетами с коммитом после каждого, чтобы не держать долгих
+блокировок. send_low_balance_notices ставит в очередь доставки
+уведомления о низком остатке занятий: на каждую подписку и порог
+отправляется не больше одного уведомления (таблица low_balance_notice),
+а после пополнения баланса выше порога отметка снимается. Запускаются
+планировщиком (scheduler.py).
+"""
+
+import logging
+from datetime import date, datetime
+from html import escape
+
+from sqlalchemy import select, update, delete, insert, exists, and_
+
+from models import db, Subscription, Participant, SportGroup, LowBalanceNotice
+from notifications import OutgoingMessage
+from attendance import load_parent_chat_ids
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 500
+
+
+def expire_subscriptions(today=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Деактивирует подписки с end_date раньше today; возвращает их число"""
+    today = today or date.today()
+    expired = 0
+    while True:
+        batch = select(Subscription.id).where(
+            Subscription.is_active == True,
+            Subscription.end_date < today
+        ).limit(batch_size)
+        count = db.session.execute(update(Subscription).where(Subscription.id.in_(batch)).values(
+            is_active=False
+        ).execution_options(synchronize_session=False)).rowcount
+        db.session.commit()
+        expired += count
+        if count < batch_size:
+            break
+    if expired:
+        logger.info("Deactivated %s expired subscriptions", expired)
+    return expired
+
+
+def low_balance_message(full_name, remaining_lessons, group_name):
+    """Текст уведомления; имена экранируются, сообщения отправляются с parse_mode=HTML"""
+    return (f"⚠️ Внимание! У {escape(full_name)} осталось {remaining_lessons} оплаченных занятий в группе "
+            f"'{escape(group_name)}'. Пожалуйста, пополните баланс.")
+
+
+def release_notices():
+    """Снимает отметки об уведомлениях, если остаток снова выше порога"""
+    return db.session.execute(delete(LowBalanceNotice).where(exists().where(and_(
+        Subscription.id == LowBalanceNotice.subscription_id,
+        Subscription.remaining_lessons > LowBalanceNotice.threshold
+    ))).execution_options(synchronize_session=False)).rowcount
+
+
+def _pending_notices(threshold, lower, batch_size):
+    """Активные подписки с остатком в (lower, threshold] без уведомления на этом пороге"""
+    conditions = [
+        Subscription.is_active == True,
+        Subscription.remaining_lessons <= threshold,
+        ~exists().where(and_(
+            LowBalanceNotice.subscription_id == Subscription.id,
+            LowBalanceNotice.threshold == threshold
+        ))
+    ]
+    if lower is not None:
+        conditions.append(Subscription.remaining_lessons > lower)
+    return db.session.execute(select(
+        Subscription.id, Subscription.participant_id, Subscription.remaining_lessons,
+        Participant.full_name, SportGroup.name
+    ).join(Participant, Participant.id == Subscription.participant_id).join(
+        SportGroup, SportGroup.id == Subscription.sport_group_id
+    ).where(*conditions).order_by(Subscription.id).limit(batch_size)).all()
+
+
+def send_low_balance_notices(outbox, thresholds=(1,), batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Уведомляет родителей о низком остатке занятий. Подписка получает
+    уведомление для наименьшего порога, которого достиг ее остаток.
+    Отметки коммитятся до постановки сообщений в очередь, поэтому
+    повторный запуск не отправит их еще раз.
+    """
+    thresholds = sorted(set(thresholds))
+    released = release_notices()
+    notices = 0
+    messages = 0
+    for index, threshold in enumerate(thresholds):
+        lower = thresholds[index - 1] if index else None
+        while True:
+            rows = _pending_notices(threshold, lower, batch_size)
+            if not rows:
+                break
+            now = datetime.utcnow()
+            db.session.execute(insert(LowBalanceNotice), [
+                {'subscription_id': row[0], 'threshold': threshold, 'created_at': now} for row in rows
+            ])
+            chat_ids = load_parent_chat_ids({row[1] for row in rows})
+            db.session.commit()
+            notices += len(rows)
+
+            batch = [
+                OutgoingMessage(chat_id, low_balance_message(full_name, remaining_lessons, group_name))
+                for _, participant_id, remaining_lessons, full_name, group_name in rows
+                for chat_id in chat_ids.get(participant_id, [])
+            ]
+            outbox.enqueue_many(batch)
+            messages += len(batch)
+    if released:
+        db.session.commit()
+    if notices:
+        logger.info("Queued %s low balance messages for %s subscriptions", messages, notices)
+    return {'notices': notices, 'messages': messages, 'released': released}
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Тест кэша доступа родителей: проверка доступа без запросов к базе,
+сброс после подтверждения кода и вытеснение давно не использованных карт
+"""
+
+from datetime import date, datetime
+
+from flask import jsonify
+
+from models import db, User, Participant, AuthorizationCode
+from access import init_access_cache, parent_access, bump_access_version
+from json_provider import init_json
+import testing
+
+
+def make_app():
+    app = testing.make_app(SECRET_KEY='test', ACCESS_VERSION_CHECK_INTERVAL=3600, ACCESS_CACHE_MAX_USERS=2)
+    init_json(app)
+    init_access_cache(app)
+
+    @app.route('/participants/<int:participant_id>')
+    @parent_access
+    def participant(participant_id, access):
+        if participant_id not in access:
+            return jsonify({'success': False}), 403
+        return jsonify(access[participant_id].to_dict())
+
+    @app.route('/participants')
+    @parent_access
+    def participants(access):
+        return jsonify(sorted(access))
+
+    return app
+
+
+def add_participant(user_id, name, used_by=None):
+    participant = Participant(user_id=user_id, full_name=name, parent_phone='+7', birth_date=date(2015, 1, 1))
+    db.session.add(participant)
+    db.session.flush()
+    db.session.add(AuthorizationCode(participant_id=participant.id, code=f'{participant.id:06d}', is_used=used_by is not None,
+                                     used_by_user_id=used_by, used_at=datetime.utcnow() if used_by else None))
+    return participant.id
+
+
+def client_for(app, user_id):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = user_id
+    return client
+
+
+def test_access_map_is_cached_and_invalidated():
+    app = make_app()
+    with app.app_context():
+        db.create_all()
+        users = [User(telegram_id=100 + i, role='parent') for i in range(3)]
+        db.session.add_all(users)
+        db.session.flush()
+        parent, other, third = (user.id for user in users)
+        own = add_participant(parent, 'Свой', used_by=parent)
+        foreign = add_participant(other, 'Чужой', used_by=other)
+        pending = add_participant(parent, 'Без кода')
+        db.session.commit()
+        engine = db.engine
+
+    client = client_for(app, parent)
+    with testing.count_statements(engine) as queries:
+        participant = client.get(f'/participants/{own}').get_json()
+        assert participant['full_name'] == 'Свой' and participant['birth_date'] == '2015-01-01'
+        loaded = len(queries)
+        assert client.get(f'/participants/{foreign}').status_code == 403
+        assert client.get(f'/participants/{own}').status_code == 200
+        assert len(queries) == loaded  # Повторные проверки без запросов к базе
+    assert app.test_client().get('/participants').status_code == 403
+
+    # Подтверждение кода сбрасывает кэш после коммита
+    with app.app_context():
+        code = AuthorizationCode.query.filter_by(participant_id=pending).one()
+        code.is_used, code.used_by_user_id, code.used_at = True, parent, datetime.utcnow()
+        bump_access_version()
+        db.session.commit()
+    assert client.get('/participants').get_json() == [own, pending]
+
+    # В кэше не больше двух пользователей: самый давний вытесняется
+    cache = app.extensions['access_cache']
+    client_for(app, other).get('/participants')
+    client_for(app, third).get('/participants')
+    assert list(cache._entries) == [other, third]
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Тест сборки статики: минификация без изменения строк и регулярных
+выражений, имена с хэшем, манифест и адреса из asset_url
+"""
+
+import json
+import os
+import tempfile
+
+from flask import Flask, render_template_string
+
+from asset_manifest import minify_js, minify_css, build_assets, init_assets
+
+
+def test_minify_js_keeps_strings_regexes_and_line_breaks():
+    source = (
+        "// Комментарий\n"
+        "function load(url) {\n"
+        "    /* блок */\n"
+        "    var full = 'https://example.org/' + url;  // адрес\n"
+        "    var html = `<div>  ${ {a: 1}.a }  // не комментарий</div>`;\n"
+        "    var ratio = total / count, re = /a\\/b[/]c/g;\n"
+        "    return /x/.test(full) ? a - -b : html\n"
+        "}\n"
+        "\n"
+        "load('x')\n"
+    )
+    assert minify_js(source) == (
+        "function load(url){var full='https://example.org/' + url;"
+        "var html=`<div>  ${{a:1}.a}  // не комментарий</div>`;"
+        "var ratio=total / count,re=/a\\/b[/]c/g;"
+        "return /x/.test(full)?a - -b:html\n"
+        "}\n"
+        "load('x')\n"
+    )
+
+
+def test_minify_css():
+    source = "/* тема */\n.card > .title ,\na:hover {\n    color : red;\n    margin: calc(1px + 2px);\n}\n@media (max-width: 600px) { .card { content: ' a  b ' } }\n"
+    assert minify_css(source) == ".card>.title,a:hover{color :red;margin:calc(1px + 2px)}@media (max-width:600px){.card{content:' a  b '}}"
+
+
+def test_build_assets_writes_manifest_used_by_asset_url():
+    with tempfile.TemporaryDirectory() as folder:
+        os.makedirs(os.path.join(folder, 'js'))
+        with open(os.path.join(folder, 'js', 'app.js'), 'w', encoding='utf-8') as f:
+            f.write("// app\nvar a = 1;\n")
+
+        report = build_assets(folder)
+        built, size, minified = report['js/app.js']
+        assert built.startswith('dist/js/app.') and built.endswith('.js') and minified < size
+        with open(os.path.join(folder, built), encoding='utf-8') as f:
+            assert f.read() == "var a=1;"
+        with open(os.path.join(folder, 'dist', 'manifest.json'), encoding='utf-8') as f:
+            assert json.load(f) == {'js/app.js': built}
+
+        app = Flask(__name__, static_folder=folder, static_url_path='/static')
+        init_assets(app)
+        with app.test_request_context():
+            assert render_template_string("{{ asset_url('js/app.js') }}") == f'/static/{built}'
+            assert render_template_string("{{ asset_url('img/logo.png') }}") == '/static/img/logo.png'
+
+        # Повторная сборка удаляет прежние файлы
+        with open(os.path.join(folder, 'js', 'app.js'), 'w', encoding='utf-8') as f:
+            f.write("var b = 2;\n")
+        rebuilt = build_assets(folder)['js/app.js'][0]
+        assert rebuilt != built and not os.path.exists(os.path.join(folder, built))
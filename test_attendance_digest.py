@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Тест сводки по сохранению посещаемости: одно сообщение на чат родителя
+со всеми детьми и предупреждениями, без повторов при пересохранении
+"""
+
+from datetime import date
+
+from models import db, User, AuthorizationCode
+from attendance_digest import compose_attendance_digest
+from testing import make_app, seed_lesson, save
+
+
+def test_digest_merges_siblings_into_one_message_per_chat():
+    app = make_app()
+    with app.app_context():
+        db.create_all()
+        # Участник 0 и 1 - дети одного родителя, участник 2 - еще и второго
+        attendance, (first, second, third) = seed_lesson([5, 1, None])
+        other = User(telegram_id=200, role='parent')
+        db.session.add(other)
+        db.session.flush()
+        db.session.add(AuthorizationCode(participant_id=third, code='900000', is_used=True, used_by_user_id=other.id))
+        db.session.commit()
+
+        events = save(attendance, [
+            {'id': first, 'is_present': True},
+            {'id': second, 'is_present': False, 'absence_reason': 'unexcused'},
+            {'id': third, 'is_present': False, 'absence_reason': 'excused'},
+        ])
+        messages = {message.chat_id: message.text for message in compose_attendance_digest(attendance, events.values())}
+
+        assert sorted(messages) == [100, 200]
+        family = messages[100].split('\n')
+        assert family[0] == f"📋 Занятие {date.today().strftime('%d.%m.%Y')} в группе 'Дзюдо'"
+        assert family[1:4] == [
+            "✅ Участник 0 посетил тренировку. Осталось: 4 занятий.",
+            "❌ Участник 1 отсутствовал без уважительной причины. Занятие списано. Осталось: 0 занятий.",
+            "ℹ️ Участник 2 отсутствовал по уважительной причине. Занятие не списано.",
+        ]
+        assert family[-1].startswith("⚠️ Внимание! У Участник 1 осталось 0")
+        assert 'Участник 0' not in messages[200] and 'Участник 2' in messages[200]
+
+        # Повторное сохранение тех же отметок ничего не отправляет
+        events = save(attendance, [
+            {'id': first, 'is_present': True},
+            {'id': second, 'is_present': False, 'absence_reason': 'unexcused'},
+            {'id': third, 'is_present': False, 'absence_reason': 'excused'},
+        ])
+        assert compose_attendance_digest(attendance, events.values()) == []
+
+        # Исправление отметки: возврат занятия попадает в сводку
+        events = save(attendance, [{'id': second, 'is_present': False, 'absence_reason': 'excused'}])
+        [message] = compose_attendance_digest(attendance, events.values())
+        assert message.text.split('\n')[1] == (
+            "ℹ️ Участник 1 отсутствовал по уважительной причине. Занятие не списано. "
+            "Занятие возвращено на абонемент. Осталось: 1 занятий."
+        )
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Тест сохранения посещаемости: пакетное списание занятий и идемпотентность
+повторного сохранения
+"""
+
+from datetime import date, timedelta
+
+from models import db, Subscription, Attendance, AttendanceRecord
+from attendance import load_parent_chat_ids
+from testing import make_app, count_statements, seed_lesson, save
+
+
+def remaining_by_participant():
+    return {s.participant_id: s.remaining_lessons for s in Subscription.query.all()}
+
+
+def test_save_is_idempotent_and_refunds():
+    app = make_app()
+    with app.app_context():
+        db.create_all()
+        attendance, (present, unexcused, excused, empty, no_subscription) = seed_lesson([3, 3, 3, 0, None])
+        marks = [
+            {'id': present, 'is_present': True},
+            {'id': unexcused, 'is_present': False, 'absence_reason': 'unexcused'},
+            {'id': excused, 'is_present': False, 'absence_reason': 'excused'},
+            {'id': empty, 'is_present': True},
+            {'id': no_subscription, 'is_present': True}
+        ]
+
+        events = save(attendance, marks)
+        assert remaining_by_participant() == {present: 2, unexcused: 2, excused: 3, empty: 0}
+        assert events[present].charged and events[unexcused].charged
+        assert not events[excused].charged and not events[empty].charged and not events[no_subscription].charged
+        assert events[present].remaining_lessons == 2
+        assert events[no_subscription].remaining_lessons is None
+        assert db.session.get(Attendance, attendance.id).is_completed
+
+        # Повторное сохранение тех же отметок ничего не списывает
+        events = save(attendance, marks)
+        assert remaining_by_participant() == {present: 2, unexcused: 2, excused: 3, empty: 0}
+        assert not any(event.charged or event.changed for event in events.values())
+        assert AttendanceRecord.query.count() == 5
+
+        # Смена отметки на уважительную причину возвращает занятие
+        marks[0] = {'id': present, 'is_present': False, 'absence_reason': 'excused'}
+        events = save(attendance, marks)
+        assert events[present].refunded and events[present].changed
+        assert remaining_by_participant()[present] == 3
+
+        assert load_parent_chat_ids([present, empty]) == {present: [100], empty: [100]}
+        db.drop_all()
+
+
+def test_refund_returns_lesson_to_debited_subscription():
+    app = make_app()
+    with app.app_context():
+        db.create_all()
+        attendance, (participant, other) = seed_lesson([0, 5])
+        exhausted = Subscription.query.filter_by(participant_id=participant).one()
+        funded = Subscription(participant_id=participant, sport_group_id=attendance.sport_group_id, subscription_type='8 занятий',
+                              total_lessons=8, remaining_lessons=5, start_date=date.today(),
+                              end_date=date.today() + timedelta(days=30))
+        db.session.add(funded)
+        db.session.commit()
+        exhausted_id, funded_id = exhausted.id, funded.id
+
+        save(attendance, [{'id': participant, 'is_present': True}, {'id': other, 'is_present': True}])
+        assert (db.session.get(Subscription, exhausted_id).remaining_lessons, db.session.get(Subscription, funded_id).remaining_lessons) == (0, 4)
+
+        # Возврат идет на подписку, с которой списано, а не на первую активную
+        events = save(attendance, [{'id': participant, 'is_present': False, 'absence_reason': 'excused'}])
+        assert events[participant].refunded
+        assert (db.session.get(Subscription, exhausted_id).remaining_lessons, db.session.get(Subscription, funded_id).remaining_lessons) == (0, 5)
+
+        # Подписка деактивирована до исправления отметки: вернуть некуда, отметка остается списанной
+        Subscription.query.filter_by(participant_id=other).update({'is_active': False})
+        db.session.commit()
+        events = save(attendance, [{'id': other, 'is_present': False, 'absence_reason': 'excused'}])
+        assert not events[other].refunded
+        assert Subscription.query.filter_by(participant_id=other).one().remaining_lessons == 4
+        assert AttendanceRecord.query.filter_by(participant_id=other).one().is_charged
+        db.drop_all()
+
+
+def count_save_statements(participant_count):
+    app = make_app()
+    with app.app_context():
+        db.create_all()
+        attendance, participant_ids = seed_lesson([5] * participant_count)
+        with count_statements() as statements:
+            save(attendance, [{'id': participant_id, 'is_present': True} for participant_id in participant_ids])
+        assert set(remaining_by_participant().values()) == {4}
+        db.drop_all()
+    return len(statements)
+
+
+def test_save_statement_count_is_constant():
+    """Количество SQL-запросов не зависит от размера группы"""
+    assert count_save_statements(3) == count_save_statements(40)
+
+
+if __name__ == '__main__':
+    test_save_is_idempotent_and_refunds()
+    test_refund_returns_lesson_to_debited_subscription()
+    test_save_statement_count_is_constant()
+    print("✅ Сохранение посещаемости работает")
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Тест сводок посещаемости: обновление при сохранении отметок, совпадение
+с полной перестройкой и чтение статистики одним запросом
+"""
+
+from datetime import date, time, timedelta
+
+from models import db, Attendance, AttendanceLessonStats, ParticipantMonthlyAttendance
+from attendance_stats import rebuild_attendance_stats, load_group_lesson_stats, load_participant_monthly_stats
+from testing import make_app, count_statements, seed_lesson, save
+
+
+def snapshot():
+    lessons = [(s.attendance_id, s.present_count, s.excused_count, s.unexcused_count) for s in AttendanceLessonStats.query]
+    months = sorted((m.participant_id, m.sport_group_id, m.month, m.present_count, m.excused_count, m.unexcused_count)
+                    for m in ParticipantMonthlyAttendance.query)
+    return lessons, months
+
+
+def test_rollup_follows_saves():
+    app = make_app()
+    with app.app_context():
+        db.create_all()
+        attendance, (first, second, third) = seed_lesson([3, 3, 3])
+        group_id = attendance.sport_group_id
+
+        save(attendance, [
+            {'id': first, 'is_present': True},
+            {'id': second, 'is_present': False, 'absence_reason': 'excused'},
+            {'id': third, 'is_present': False}
+        ])
+        stats = load_group_lesson_stats(group_id)
+        assert len(stats) == 1
+        assert (stats[0]['present'], stats[0]['absent_excused'], stats[0]['absent_unexcused'], stats[0]['total']) == (1, 1, 1, 3)
+
+        # Исправление отметки пересчитывает сводки, а не добавляет к ним
+        save(attendance, [{'id': second, 'is_present': True}])
+        stats = load_group_lesson_stats(group_id)
+        assert (stats[0]['present'], stats[0]['absent_excused'], stats[0]['absent_unexcused']) == (2, 0, 1)
+        monthly = load_participant_monthly_stats(second)
+        assert len(monthly) == 1 and monthly[0]['present'] == 1 and monthly[0]['absent_excused'] == 0
+
+        incremental = snapshot()
+        rebuild_attendance_stats()
+        db.session.commit()
+        assert snapshot() == incremental
+
+        with count_statements() as statements:
+            load_group_lesson_stats(group_id)
+        assert len(statements) == 1
+        db.drop_all()
+
+
+def test_lesson_without_records_is_listed():
+    app = make_app()
+    with app.app_context():
+        db.create_all()
+        attendance, (first,) = seed_lesson([3])
+        group_id = attendance.sport_group_id
+        empty = Attendance(sport_group_id=group_id, lesson_date=date.today() + timedelta(days=1),
+                           day_of_week=(date.today() + timedelta(days=1)).weekday(), start_time=time(18, 0), end_time=time(19, 0))
+        db.session.add(empty)
+        db.session.commit()
+
+        save(attendance, [{'id': first, 'is_present': True}])
+        save(empty, [])
+        stats = load_group_lesson_stats(group_id)
+        assert [(row['date'], row['total'], row['present'], row['absent_unexcused'], row['percentage']) for row in stats] == [
+            (date.today(), 1, 1, 0, 100.0),
+            (empty.lesson_date, 0, 0, 0, 0)
+        ]
+
+        incremental = snapshot()
+        rebuild_attendance_stats()
+        db.session.commit()
+        assert snapshot() == incremental
+        db.drop_all()
+
+
+if __name__ == '__main__':
+    test_rollup_follows_saves()
+    test_lesson_without_records_is_listed()
+    print("✅ Сводки посещаемости работают")
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Тест выдачи кодов авторизации: перестановка без совпадений, пакетная
+выдача, замена совпавших со старыми кодами и исчерпание счетчика
+"""
+
+from models import db, AppState, AuthorizationCode
+from auth_codes import (CODE_SPACE, COUNTER_KEY, CodesExhausted, permute, format_code, load_secret,
+                        reserve_codes, allocate_code, create_authorization_codes)
+from testing import make_app
+
+
+def test_permute_is_bijection():
+    key = bytes(range(16))
+    # Полный перебор 10^6 значений занимает секунды; проверяем два блока
+    values = list(range(50000)) + list(range(CODE_SPACE - 50000, CODE_SPACE))
+    codes = {permute(value, key) for value in values}
+    assert len(codes) == len(values)
+    assert all(0 <= code < CODE_SPACE for code in codes)
+    assert permute(12345, key) != permute(12345, bytes(16))
+
+
+def test_bulk_allocation_and_legacy_collision():
+    app = make_app()
+    with app.app_context():
+        db.create_all()
+        first = allocate_code()
+        batch = reserve_codes(500)
+        db.session.commit()
+        assert len(set(batch) | {first}) == 501
+        assert all(len(code) == 6 and code.isdigit() for code in batch)
+        assert db.session.get(AppState, COUNTER_KEY).value == '501'
+
+        # Старый случайный код совпадает со следующим значением счетчика
+        legacy = format_code(permute(501, load_secret()))
+        db.session.add(AuthorizationCode(participant_id=1, code=legacy))
+        db.session.commit()
+
+        codes = create_authorization_codes([10, 11, 12])
+        db.session.commit()
+        assert legacy not in codes.values()
+        # Заменен только совпавший код: 3 значения и одно на замену
+        assert db.session.get(AppState, COUNTER_KEY).value == '505'
+        assert AuthorizationCode.query.count() == 4
+        assert {row.participant_id: row.code for row in AuthorizationCode.query.filter(
+            AuthorizationCode.participant_id != 1)} == codes
+        db.drop_all()
+
+
+def test_counter_exhausted():
+    app = make_app()
+    with app.app_context():
+        db.create_all()
+        db.session.add(AppState(key=COUNTER_KEY, value=str(CODE_SPACE - 1)))
+        db.session.commit()
+        assert len(reserve_codes(1)) == 1
+        db.session.commit()
+        try:
+            allocate_code()
+            assert False, 'ожидалось CodesExhausted'
+        except CodesExhausted:
+            db.session.rollback()
+        db.drop_all()
+
+
+if __name__ == '__main__':
+    test_permute_is_bijection()
+    test_bulk_allocation_and_legacy_collision()
+    test_counter_exhausted()
+    print("✅ Выдача кодов авторизации работает")
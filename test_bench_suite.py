@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Тест набора бенчмарков: прогон на маленьком наборе данных проходит все
+маршруты без ошибочных ответов и пишет результаты в JSON
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_bench_suite_smoke():
+    with tempfile.TemporaryDirectory() as workdir:
+        output = os.path.join(workdir, 'results.json')
+        completed = subprocess.run(
+            [sys.executable, os.path.join(BASE_DIR, 'bench_suite.py'), '--participants', '50', '--groups', '2',
+             '--lessons', '2', '--repeat', '2', '--warmup', '1', '--no-baseline', '--output', output],
+            cwd=workdir, capture_output=True, text=True, timeout=300
+        )
+        assert completed.returncode == 0, completed.stdout + completed.stderr
+
+        with open(output, encoding='utf-8') as f:
+            results = json.load(f)
+        assert results['meta']['dataset']['participants'] == 50
+        assert 'GET /api/admin/payments' in results['routes']
+        for name, route in results['routes'].items():
+            assert route['status'] < 400, name
+            assert route['p50_ms'] <= route['p95_ms']
+
+
+if __name__ == '__main__':
+    test_bench_suite_smoke()
+    print("✅ Набор бенчмарков работает")
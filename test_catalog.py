@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Тест кэша каталога групп: повторные запросы не обращаются к базе,
+изменение расписания сбрасывает кэш после коммита
+"""
+
+from datetime import time
+
+from models import db, SportGroup, Schedule
+from catalog import init_catalog, get_catalog, bump_catalog_version
+from testing import make_app, count_statements
+
+
+def test_catalog_cache_and_invalidation():
+    app = make_app(CATALOG_VERSION_CHECK_INTERVAL=60)
+    init_catalog(app)
+    with app.app_context():
+        db.create_all()
+        group = SportGroup(name='Дзюдо', trainer_name='Тренер')
+        db.session.add(group)
+        db.session.flush()
+        schedule = Schedule(sport_group_id=group.id, day_of_week=0, start_time=time(18, 0), end_time=time(19, 0))
+        db.session.add(schedule)
+        bump_catalog_version()
+        db.session.commit()
+
+        catalog = get_catalog()
+        assert catalog.version == 1
+        assert catalog.groups[0]['schedule'] == 'Понедельник 18:00-19:00'
+
+        with count_statements() as statements:
+            for _ in range(5):
+                assert get_catalog() is catalog
+        assert statements == []
+
+        # Откат не сбрасывает кэш
+        bump_catalog_version()
+        db.session.rollback()
+        assert get_catalog() is catalog
+
+        schedule.start_time = time(17, 0)
+        bump_catalog_version()
+        db.session.commit()
+        updated = get_catalog()
+        assert updated.version == 2
+        assert updated.groups[0]['schedule'] == 'Понедельник 17:00-19:00'
+        assert updated.groups_etag != catalog.groups_etag
+        db.drop_all()
+
+
+if __name__ == '__main__':
+    test_catalog_cache_and_invalidation()
+    print("✅ Кэш каталога работает")
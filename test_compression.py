@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Тест сжатия и условных GET: статика из памяти с отпечатком в адресе,
+ETag и 304 для JSON, сжатие только больших текстовых ответов
+"""
+
+import gzip
+import os
+import tempfile
+
+from flask import Flask, jsonify, url_for
+
+from compression import init_compression
+
+
+def make_app(static_folder):
+    app = Flask(__name__, static_folder=static_folder, static_url_path='/static')
+    app.config['COMPRESS_MIN_SIZE'] = 100
+    init_compression(app)
+
+    @app.route('/items')
+    def items():
+        return jsonify([{'id': i, 'name': f'Участник {i}'} for i in range(50)])
+
+    @app.route('/small')
+    def small():
+        return jsonify({'ok': True})
+
+    return app
+
+
+def test_static_assets_are_fingerprinted_and_precompressed():
+    with tempfile.TemporaryDirectory() as folder:
+        script = b'console.log("sportclub");\n' * 100
+        with open(os.path.join(folder, 'app.js'), 'wb') as f:
+            f.write(script)
+        app = make_app(folder)
+        client = app.test_client()
+
+        with app.test_request_context():
+            url = url_for('static', filename='app.js')
+        assert '?v=' in url
+
+        response = client.get(url, headers={'Accept-Encoding': 'gzip'})
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'immutable' in response.headers['Cache-Control']
+        assert gzip.decompress(response.data) == script
+
+        # Без отпечатка - проверка по ETag при каждой загрузке
+        plain = client.get('/static/app.js')
+        assert plain.headers['Cache-Control'] == 'public, no-cache'
+        assert 'Content-Encoding' not in plain.headers and plain.data == script
+        assert client.get('/static/app.js', headers={'If-None-Match': plain.headers['ETag']}).status_code == 304
+        assert client.get('/static/missing.js').status_code == 404
+
+
+def test_json_gets_etag_and_large_bodies_are_compressed():
+    app = make_app(None)
+    client = app.test_client()
+
+    response = client.get('/items', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert len(gzip.decompress(response.data)) > len(response.data)
+
+    repeat = client.get('/items', headers={'Accept-Encoding': 'gzip', 'If-None-Match': response.headers['ETag']})
+    assert repeat.status_code == 304 and repeat.data == b''
+
+    small = client.get('/small', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in small.headers and small.get_json() == {'ok': True}
+    assert client.get('/small', headers={'If-None-Match': small.headers['ETag']}).status_code == 304
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Тест профилей подключения к БД: выбор профиля, параметры пула для
+PostgreSQL и PRAGMA SQLite на каждом новом соединении
+"""
+
+import os
+import tempfile
+
+from flask import Flask
+
+from config import database_profile_name, database_engine_options, sqlite_pragmas
+from database import init_database
+from models import db
+
+
+def test_profiles():
+    assert database_profile_name('postgresql://user:secret@db/sportclub') == 'postgres'
+    assert database_profile_name('sqlite:///sportclub.db') == 'sqlite-dev'
+    assert database_profile_name('sqlite:///sportclub.db', 'sqlite-prod') == 'sqlite-prod'
+    try:
+        database_profile_name('sqlite://', 'mysql')
+        assert False, 'неизвестный профиль принят'
+    except ValueError:
+        pass
+
+    options = database_engine_options('postgres')
+    assert options['pool_pre_ping'] and options['pool_size'] > 0 and options['pool_recycle'] > 0
+    assert database_engine_options('sqlite-prod') == {}
+    assert sqlite_pragmas('postgres') == {}
+    assert sqlite_pragmas('sqlite-prod')['journal_mode'] == 'WAL'
+
+
+def test_sqlite_prod_pragmas_apply_to_every_connection():
+    with tempfile.TemporaryDirectory() as workdir:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(workdir, 'prod.db')}"
+        app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        app.config['DB_PROFILE'] = 'sqlite-prod'
+        app.config['SQLITE_PRAGMAS'] = sqlite_pragmas('sqlite-prod')
+        db.init_app(app)
+
+        settings = init_database(app)
+        assert settings['journal_mode'] == 'wal'
+        assert settings['synchronous'] == 1  # NORMAL
+        assert settings['busy_timeout'] == app.config['SQLITE_PRAGMAS']['busy_timeout']
+
+        with app.app_context():
+            engine = db.engine
+            # Второе одновременное соединение тоже получает PRAGMA
+            with engine.connect() as first, engine.connect() as second:
+                for conn in (first, second):
+                    assert conn.exec_driver_sql('PRAGMA synchronous').scalar() == 1
+            engine.dispose()
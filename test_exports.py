@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Тест потоковых выгрузок: CSV и XLSX по частям, фильтры и защита от
+формул в CSV
+"""
+
+import csv
+import io
+import zipfile
+from datetime import date, datetime
+from xml.etree import ElementTree
+
+from models import db, Participant, Attendance, AttendanceRecord
+import exports
+from exports import build_export, export_chunks
+from ledger import rebuild_balances
+from testing import make_app, seed_payments
+
+SHEET_NS = {'x': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'}
+
+
+def read_csv(chunks):
+    text = b''.join(chunks).decode('utf-8-sig')
+    return list(csv.reader(io.StringIO(text), delimiter=';'))
+
+
+def read_xlsx(chunks):
+    archive = zipfile.ZipFile(io.BytesIO(b''.join(chunks)))
+    assert archive.testzip() is None
+    assert '[Content_Types].xml' in archive.namelist()
+    sheet = ElementTree.fromstring(archive.read('xl/worksheets/sheet1.xml'))
+    return sheet.findall('.//x:sheetData/x:row', SHEET_NS)
+
+
+def test_payments_csv_and_xlsx():
+    app = make_app()
+    with app.app_context():
+        db.create_all()
+        groups = seed_payments()
+        participant = Participant.query.first()
+        participant.full_name = '=HYPERLINK("x")'
+        db.session.commit()
+
+        original_chunk_rows = exports.CHUNK_ROWS
+        exports.CHUNK_ROWS = 10
+        try:
+            chunks = list(export_chunks(build_export('payments', {}), 'csv'))
+            rows = read_csv(chunks)
+            assert len(chunks) == 3 and len(rows) == 26
+            assert rows[0][:3] == ['ID', 'Создан', 'Участник']
+            assert rows[1][1] == '2024-09-13 12:00'
+            assert {row[2] for row in rows[1:]} == {"'=HYPERLINK(\"x\")", 'Участник 1'}
+            assert {row[3] for row in rows[1:]} == {'+7'}
+
+            filtered = read_csv(export_chunks(build_export('payments', {'status': 'pending', 'group_id': str(groups[0].id)}), 'csv'))
+            assert len(filtered) > 1 and all(row[8] == 'pending' and row[4] == 'Дзюдо' for row in filtered[1:])
+
+            xlsx_chunks = list(export_chunks(build_export('payments', {}), 'xlsx'))
+            assert len(xlsx_chunks) > 1
+            sheet_rows = read_xlsx(xlsx_chunks)
+            assert len(sheet_rows) == 26
+            created = sheet_rows[1].findall('x:c', SHEET_NS)[1]
+            assert created.get('s') == str(exports.STYLE_DATETIME)
+            assert float(created.find('x:v', SHEET_NS).text) == (datetime(2024, 9, 13, 12) - exports.EXCEL_EPOCH).total_seconds() / 86400
+        finally:
+            exports.CHUNK_ROWS = original_chunk_rows
+        db.drop_all()
+
+
+def test_students_and_attendance():
+    app = make_app()
+    with app.app_context():
+        db.create_all()
+        groups = seed_payments()
+        participants = Participant.query.order_by(Participant.id).all()
+        db.session.add(Participant(user_id=participants[0].user_id, full_name='Без абонемента', parent_phone='+7',
+                                   birth_date=date(2016, 1, 1)))
+        lesson = Attendance(sport_group_id=groups[0].id, lesson_date=date(2024, 9, 2), day_of_week=0,
+                            start_time=datetime(2024, 9, 2, 18).time(), end_time=datetime(2024, 9, 2, 19).time())
+        db.session.add(lesson)
+        db.session.flush()
+        db.session.add_all([
+            AttendanceRecord(attendance_id=lesson.id, participant_id=participants[0].id, is_present=True, is_charged=True),
+            AttendanceRecord(attendance_id=lesson.id, participant_id=participants[1].id, absence_reason='excused')
+        ])
+        # Платежи созданы напрямую: суммы оплат заводятся из журнала
+        rebuild_balances()
+        db.session.commit()
+
+        students = read_csv(export_chunks(build_export('students', {}), 'csv'))
+        assert [row[1] for row in students[1:]] == ['Без абонемента', 'Участник 0', 'Участник 1']
+        assert students[1][7] == '' and students[2][7] == 'Дзюдо'
+        # Сумма подтвержденных платежей по подписке (Subscription.paid_total)
+        assert students[2][14] == str(4000 * 8) and students[3][14] == str(4000 * 8)
+
+        attendance = read_csv(export_chunks(build_export('attendance', {'date_from': '2024-09-02', 'date_to': '2024-09-02'}), 'csv'))
+        assert [row[4:] for row in attendance[1:]] == [
+            ['Участник 0', 'Присутствовал', 'да'],
+            ['Участник 1', 'Уважительная причина', 'нет']
+        ]
+        assert len(read_csv(export_chunks(build_export('attendance', {'date_from': '2024-09-03'}), 'csv'))) == 1
+        db.drop_all()
+
+
+if __name__ == '__main__':
+    test_payments_csv_and_xlsx()
+    test_students_and_attendance()
+    print("✅ Выгрузки работают")
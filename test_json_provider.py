@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Тест провайдеров JSON: одинаковые форматы дат у orjson и стандартного
+json, строки SQLAlchemy в словари с переименованием колонок
+"""
+
+from datetime import date, datetime, time
+from decimal import Decimal
+
+from flask import jsonify
+from sqlalchemy import select, literal
+
+from models import db
+from json_provider import StdlibJSONProvider, OrjsonProvider, orjson, provider_class, init_json, rows_to_dicts
+import testing
+
+PAYLOAD = {
+    'name': 'Иван',
+    'birth_date': date(2015, 3, 7),
+    'start_time': time(18, 30, 15),
+    'created_at': datetime(2024, 9, 2, 8, 5, 59),
+    'amount': Decimal('4000.50'),
+    'empty': None
+}
+EXPECTED = {
+    'name': 'Иван',
+    'birth_date': '2015-03-07',
+    'start_time': '18:30',
+    'created_at': '2024-09-02 08:05',
+    'amount': '4000.50',
+    'empty': None
+}
+
+
+def make_app(provider):
+    app = testing.make_app(JSON_PROVIDER=provider)
+    init_json(app)
+
+    @app.route('/payload')
+    def payload():
+        return jsonify(PAYLOAD)
+
+    return app
+
+
+def test_providers_encode_dates_in_api_formats():
+    providers = ['stdlib'] + (['orjson'] if orjson is not None else [])
+    for name in providers:
+        app = make_app(name)
+        assert isinstance(app.json, provider_class(name))
+        response = app.test_client().get('/payload')
+        assert response.get_json() == EXPECTED
+        assert 'Иван' in response.get_data(as_text=True)  # UTF-8 без \u-экранирования
+        with app.app_context():
+            assert app.json.loads(app.json.dumps(PAYLOAD)) == EXPECTED
+
+    assert provider_class('auto') is (OrjsonProvider if orjson is not None else StdlibJSONProvider)
+    try:
+        provider_class('simplejson')
+        assert False, 'ожидалась ошибка'
+    except ValueError:
+        pass
+
+
+def test_rows_to_dicts_renames_columns():
+    app = make_app('auto')
+    with app.app_context():
+        rows = db.session.execute(select(
+            literal(1).label('id'), literal('Иван').label('full_name'), literal(date(2024, 1, 2)).label('created')
+        )).all()
+        assert rows_to_dicts(rows, {'full_name': 'participant_name'}) == [
+            {'id': 1, 'participant_name': 'Иван', 'created': date(2024, 1, 2)}
+        ]
+        assert rows_to_dicts([]) == []
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Тест журнала баланса подписок: подтверждение платежей, списание и возврат
+занятий, ручные корректировки, заведение журнала для старых данных и сверка
+"""
+
+from models import db, Payment, Subscription, SubscriptionLedgerEntry
+from ledger import settle_payment, adjust_balance, find_balance_mismatches, rebuild_balances
+from testing import make_app, seed_lesson, save
+
+
+def entry_types(subscription_id):
+    return [(entry.entry_type, entry.amount, entry.lessons) for entry in
+            SubscriptionLedgerEntry.query.filter_by(subscription_id=subscription_id).order_by(SubscriptionLedgerEntry.id)]
+
+
+def test_ledger_tracks_payments_and_lessons():
+    app = make_app()
+    with app.app_context():
+        db.create_all()
+        # Остатки равны total_lessons: журнал начинается с пустого баланса
+        attendance, (first, second) = seed_lesson([8, 8])
+        subscription = Subscription.query.filter_by(participant_id=first).one()
+        user_id = subscription.participant.user_id
+        approved = Payment(user_id=user_id, subscription_id=subscription.id, amount=4000, status='pending')
+        rejected = Payment(user_id=user_id, subscription_id=subscription.id, amount=700, status='pending')
+        db.session.add_all([approved, rejected])
+        db.session.commit()
+
+        assert settle_payment(approved, 'approved', 'ok')
+        assert settle_payment(rejected, 'rejected')
+        db.session.commit()
+        # Повторное решение по обработанному платежу не проходит
+        assert not settle_payment(approved, 'approved')
+        assert approved.status == 'approved' and approved.is_paid and rejected.status == 'rejected'
+
+        save(attendance, [{'id': first, 'is_present': True}, {'id': second, 'is_present': True}])
+        save(attendance, [{'id': first, 'is_present': False, 'absence_reason': 'excused'}, {'id': second, 'is_present': True}])
+        adjust_balance(subscription.id, amount=-500, lessons=2, note='Перерасчет')
+        db.session.commit()
+
+        subscription = db.session.get(Subscription, subscription.id)
+        assert subscription.paid_total == 3500 and subscription.remaining_lessons == 10
+        assert entry_types(subscription.id) == [
+            ('payment_approved', 4000, 0),
+            ('lesson_debited', 0, -1),
+            ('lesson_refunded', 0, 1),
+            ('adjustment', -500, 2)
+        ]
+        assert find_balance_mismatches() == []
+        db.drop_all()
+
+
+def test_rebuild_backfills_and_repairs():
+    app = make_app()
+    with app.app_context():
+        db.create_all()
+        attendance, (first, second) = seed_lesson([5, 8])
+        subscriptions = {s.participant_id: s for s in Subscription.query}
+        user_id = subscriptions[first].participant.user_id
+        # Данные до появления журнала: подтвержденный платеж без записи и paid_total = 0
+        db.session.add(Payment(user_id=user_id, subscription_id=subscriptions[first].id, amount=4000, status='approved'))
+        db.session.commit()
+        assert {m['subscription_id'] for m in find_balance_mismatches()} == {subscriptions[first].id}
+
+        mismatches, entries = rebuild_balances()
+        db.session.commit()
+        assert len(mismatches) == 1 and entries == 2
+        assert entry_types(subscriptions[first].id) == [('payment_approved', 4000, 0), ('adjustment', 0, -3)]
+        assert db.session.get(Subscription, subscriptions[first].id).paid_total == 4000
+        assert db.session.get(Subscription, subscriptions[first].id).remaining_lessons == 5
+
+        # Повторный запуск ничего не добавляет; ручная правка остатка откатывается к журналу
+        db.session.get(Subscription, subscriptions[second].id).remaining_lessons = 1
+        db.session.commit()
+        mismatches, entries = rebuild_balances()
+        db.session.commit()
+        assert entries == 1  # у второй подписки еще не было движений: правка заводится как начальный остаток
+        save(attendance, [{'id': second, 'is_present': True}])
+        db.session.get(Subscription, subscriptions[second].id).remaining_lessons = 7
+        db.session.commit()
+        mismatches, entries = rebuild_balances()
+        db.session.commit()
+        assert entries == 0 and [m['subscription_id'] for m in mismatches] == [subscriptions[second].id]
+        assert db.session.get(Subscription, subscriptions[second].id).remaining_lessons == 0
+        assert find_balance_mismatches() == []
+        db.drop_all()
+
+
+if __name__ == '__main__':
+    test_ledger_tracks_payments_and_lessons()
+    test_rebuild_backfills_and_repairs()
+    print("✅ Журнал баланса подписок работает")
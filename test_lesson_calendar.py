@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Тест календаря занятий: развертывание расписания в даты, наложение
+созданных занятий и постоянное число запросов для любого окна
+"""
+
+import json
+from datetime import date, time, timedelta
+
+from models import db, SportGroup, Schedule, Attendance
+from lesson_calendar import build_lesson_calendar, parse_window
+from json_provider import init_json
+from testing import make_app, count_statements
+
+
+def test_calendar_window():
+    app = make_app()
+    init_json(app)
+    with app.app_context():
+        db.create_all()
+        group = SportGroup(name='Дзюдо')
+        db.session.add(group)
+        db.session.flush()
+        # Пн и Ср; во вторник - занятие вне расписания
+        for day in (0, 2):
+            db.session.add(Schedule(sport_group_id=group.id, day_of_week=day, start_time=time(18, 0), end_time=time(19, 0)))
+        monday = date(2024, 9, 2)
+        db.session.add(Attendance(sport_group_id=group.id, lesson_date=monday, day_of_week=0,
+                                  start_time=time(18, 0), end_time=time(19, 0), is_completed=True))
+        db.session.add(Attendance(sport_group_id=group.id, lesson_date=monday + timedelta(days=1), day_of_week=1,
+                                  start_time=time(10, 0), end_time=time(11, 0)))
+        db.session.commit()
+        group_id = group.id
+
+        with count_statements() as short_statements:
+            lessons = build_lesson_calendar(group_id, monday, monday + timedelta(days=6))
+        assert [lesson.to_dict()['date'] for lesson in lessons] == [monday + timedelta(days=i) for i in range(3)]
+        first, extra, plain = json.loads(app.json.dumps([lesson.to_dict() for lesson in lessons]))
+        assert [first['date'], extra['date']] == ['2024-09-02', '2024-09-03']
+        assert first['has_attendance'] and first['is_completed']
+        assert extra['start_time'] == '10:00' and extra['end_time'] == '11:00' and not extra['is_completed']
+        assert not plain['has_attendance']
+
+        with count_statements() as long_statements:
+            lessons = build_lesson_calendar(group_id, monday, monday + timedelta(days=364))
+        assert len(lessons) == 52 * 2 + 1 + 1  # Пн и Ср за 52 недели, последний Пн и вторник вне расписания
+        assert len(short_statements) == len(long_statements) == 2
+        db.drop_all()
+
+
+def test_parse_window():
+    today = date(2024, 9, 2)
+    assert parse_window({}, today) == (today, today + timedelta(days=27))
+    assert parse_window({'from': '2024-10-01', 'to': '2024-10-31'}, today) == (date(2024, 10, 1), date(2024, 10, 31))
+    for args in ({'from': '2024-10-31', 'to': '2024-10-01'}, {'from': '01.10.2024'}, {'from': '2024-01-01', 'to': '2025-06-01'}):
+        try:
+            parse_window(args, today)
+        except ValueError:
+            continue
+        raise AssertionError(f'{args} должен вызывать ValueError')
+
+
+if __name__ == '__main__':
+    test_calendar_window()
+    test_parse_window()
+    print("✅ Календарь занятий работает")
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Тест настройки логирования: запись через очередь с вырезанием токена,
+уровни модулей из конфигурации и выборочные сообщения LogSampler
+"""
+
+import io
+import logging
+
+from logging_setup import configure_logging, stop_logging, LogSampler, parse_levels
+
+
+class LogConfig:
+    LOG_LEVEL = 'INFO'
+    LOG_LEVELS = parse_levels('test.quiet=WARNING, test.verbose=debug')
+    LOG_FORMAT = '%(levelname)s %(name)s: %(message)s'
+    TELEGRAM_BOT_TOKEN = '123:secret-token'
+
+
+def test_queue_logging_redacts_token_and_applies_levels():
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    stream = io.StringIO()
+    try:
+        configure_logging(LogConfig, stream)
+        logging.getLogger('test.app').info("Request to %s", 'https://api.telegram.org/bot123:secret-token/sendMessage')
+        logging.getLogger('test.quiet').info("Скрыто")
+        logging.getLogger('test.verbose').debug("Отладка %d", 1)
+        try:
+            raise RuntimeError('token 123:secret-token rejected')
+        except RuntimeError:
+            logging.getLogger('test.app').exception("Ошибка")
+        stop_logging()
+    finally:
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        for handler in handlers:
+            root.addHandler(handler)
+        root.setLevel(level)
+        for name in LogConfig.LOG_LEVELS:
+            logging.getLogger(name).setLevel(logging.NOTSET)
+
+    output = stream.getvalue()
+    assert 'INFO test.app: Request to https://api.telegram.org/bot***/sendMessage' in output
+    assert 'DEBUG test.verbose: Отладка 1' in output
+    assert 'Скрыто' not in output
+    assert 'RuntimeError: token *** rejected' in output
+    assert 'secret-token' not in output
+
+
+def test_sampler_logs_first_and_every_nth_record():
+    logger = logging.getLogger('test.sampler')
+    records = []
+    handler = logging.Handler()
+    handler.emit = records.append
+    logger.addHandler(handler)
+    logger.setLevel(logging.DEBUG)
+    try:
+        sampler = LogSampler(logger, every=10)
+        for index in range(25):
+            sampler.debug("Сообщение %s", index)
+        sampler.warning("Другое")
+        logger.setLevel(logging.INFO)
+        sampler.debug("Сообщение %s", 99)  # Уровень отключен: не считается
+    finally:
+        logger.removeHandler(handler)
+        logger.setLevel(logging.NOTSET)
+
+    assert [record.getMessage() for record in records] == [
+        'Сообщение 0 [sampled 1/10, seen 1]',
+        'Сообщение 9 [sampled 1/10, seen 10]',
+        'Сообщение 19 [sampled 1/10, seen 20]',
+        'Другое [sampled 1/10, seen 1]',
+    ]
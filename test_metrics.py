@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Тест метрик запросов: подсчет SQL-запросов по маршрутам, заголовок
+Server-Timing и гистограммы
+"""
+
+from flask import jsonify
+
+from models import db, SportGroup
+from metrics import init_metrics, metrics_snapshot
+import testing
+
+
+def make_app():
+    """Приложение с базой в памяти и двумя маршрутами"""
+    app = testing.make_app()
+    init_metrics(app)
+
+    @app.route('/groups/<int:count>')
+    def groups(count):
+        # Намеренный N+1: count одинаковых запросов
+        names = [SportGroup.query.filter_by(id=1).first().name for _ in range(count)]
+        return jsonify(names)
+
+    @app.route('/fail')
+    def fail():
+        raise RuntimeError('boom')
+
+    return app
+
+
+def test_request_metrics():
+    app = make_app()
+    with app.app_context():
+        db.create_all()
+        db.session.add(SportGroup(name='Дзюдо'))
+        db.session.commit()
+
+    client = app.test_client()
+    response = client.get('/groups/3')
+    timing = response.headers.getlist('Server-Timing')
+    assert any(value.startswith('db;') and '"3 queries"' in value for value in timing)
+    assert any(value.startswith('app;dur=') for value in timing)
+    client.get('/groups/7')
+    assert client.get('/fail').status_code == 500
+
+    routes = metrics_snapshot(app)['routes']
+    groups = routes['GET /groups/<int:count>']
+    assert groups['requests'] == 2 and groups['max_queries'] == 7 and groups['avg_queries'] == 5
+    assert groups['slowest_statement'].startswith('SELECT sport_group.')
+    assert sum(groups['queries_histogram']['counts']) == 2
+    assert groups['queries_histogram']['counts'][groups['queries_histogram']['bounds'].index(5)] == 1
+    assert routes['GET /fail']['errors'] == 1
+
+    metrics_snapshot(app, reset=True)
+    assert metrics_snapshot(app)['routes'] == {}
+    with app.app_context():
+        db.drop_all()
+
+
+if __name__ == '__main__':
+    test_request_metrics()
+    print("✅ Метрики запросов работают")
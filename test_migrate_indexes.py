@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Тест миграции индексов: таблицы, которых еще нет в базе, пропускаются
+"""
+
+from sqlalchemy import inspect
+
+from models import db, Participant, Payment
+from migrate_indexes import create_indexes, fill_payment_created_at, invalid_indexes, missing_tables
+from testing import make_app
+
+
+def test_missing_tables_are_skipped():
+    app = make_app()
+    with app.app_context():
+        db.create_all()
+        Payment.__table__.drop(db.engine)
+        Participant.__table__.drop(db.engine)
+        assert missing_tables(db.engine) == ['participant', 'payment']
+
+        names = create_indexes(db.engine)
+        assert names and not any(name.startswith(('ix_payment_', 'ix_participant_')) for name in names)
+        indexes = {index['name'] for index in inspect(db.engine).get_indexes('subscription')}
+        assert {index.name for index in db.metadata.tables['subscription'].indexes} <= indexes
+        assert fill_payment_created_at(db.engine) == 0
+        # В SQLite индексы не бывают INVALID
+        assert invalid_indexes(db.engine) == []
+        db.drop_all()
+
+
+if __name__ == '__main__':
+    test_missing_tables_are_skipped()
+    print("✅ Миграция индексов работает")
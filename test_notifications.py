@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Тест очереди Telegram-уведомлений против локальной заглушки Bot API
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from notifications import TelegramOutbox
+
+
+class StubBotAPI:
+    """Локальная заглушка Bot API: записывает запросы, первые ответы могут быть ошибками"""
+
+    def __init__(self, failures=0, delay=0.0, failure_status=500, failure_payload=None):
+        self.requests = []
+        self.failures = failures
+        self.delay = delay
+        self.failure_status = failure_status
+        self.failure_payload = failure_payload or {'ok': False, 'description': 'Internal Server Error'}
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                time.sleep(stub.delay)
+                with stub.lock:
+                    if stub.failures > 0:
+                        stub.failures -= 1
+                        status, payload = stub.failure_status, stub.failure_payload
+                    else:
+                        stub.requests.append((time.monotonic(), self.path, body))
+                        status, payload = 200, {'ok': True, 'result': {}}
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def test_enqueue_returns_immediately_and_delivers():
+    """Постановка в очередь не ждет API, все сообщения доставляются"""
+    stub = StubBotAPI(delay=0.2)
+    outbox = TelegramOutbox('TOKEN', api_url=stub.url, workers=4, per_chat_interval=0.0, global_per_second=1000)
+    try:
+        started = time.monotonic()
+        for chat_id in range(8):
+            outbox.enqueue(chat_id, f'Сообщение {chat_id}')
+        assert time.monotonic() - started < 0.1
+
+        assert outbox.flush(timeout=5)
+        assert outbox.sent_count == 8
+        assert {body['chat_id'] for _, _, body in stub.requests} == set(range(8))
+        assert all(path == '/botTOKEN/sendMessage' for _, path, _ in stub.requests)
+    finally:
+        outbox.stop()
+        stub.close()
+
+
+def test_per_chat_rate_limit_and_retry():
+    """Сообщения в один чат разнесены по времени, ошибки 5xx повторяются"""
+    stub = StubBotAPI(failures=2)
+    outbox = TelegramOutbox('TOKEN', api_url=stub.url, workers=3, per_chat_interval=0.2,
+                            global_per_second=1000, backoff_base=0.05)
+    try:
+        outbox.enqueue_many([])
+        outbox.enqueue(42, 'Первое')
+        outbox.enqueue(42, 'Второе')
+        outbox.enqueue(42, 'Третье')
+
+        assert outbox.flush(timeout=5)
+        assert outbox.sent_count == 3
+        assert outbox.failed_count == 0
+        times = sorted(sent_at for sent_at, _, _ in stub.requests)
+        assert all(later - earlier >= 0.15 for earlier, later in zip(times, times[1:]))
+    finally:
+        outbox.stop()
+        stub.close()
+
+
+def test_malformed_429_and_unexpected_errors():
+    """Некорректный ответ 429 повторяется с задержкой, неожиданная ошибка не останавливает поток"""
+    stub = StubBotAPI(failures=2, failure_status=429, failure_payload=['not', 'a', 'dict'])
+    outbox = TelegramOutbox('TOKEN', api_url=stub.url, workers=1, per_chat_interval=0.0,
+                            global_per_second=1000, backoff_base=0.05)
+    try:
+        outbox.enqueue(1, 'После 429')
+        assert outbox.flush(timeout=5)
+        assert outbox.sent_count == 1 and outbox.failed_count == 0
+
+        def broken_post(*args, **kwargs):
+            raise TypeError('boom')
+
+        post = outbox.session.post
+        outbox.session.post = broken_post
+        outbox.enqueue(2, 'Ошибка')
+        assert outbox.flush(timeout=5)
+        assert outbox.failed_count == 1
+
+        # Единственный поток жив и доставляет следующее сообщение
+        outbox.session.post = post
+        outbox.enqueue(3, 'Дальше')
+        assert outbox.flush(timeout=5)
+        assert outbox.sent_count == 2
+    finally:
+        outbox.stop()
+        stub.close()
+
+
+if __name__ == '__main__':
+    test_enqueue_returns_immediately_and_delivers()
+    test_per_chat_rate_limit_and_retry()
+    test_malformed_429_and_unexpected_errors()
+    print("✅ Очередь уведомлений работает")
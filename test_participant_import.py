@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Тест массового импорта участников: отчет об ошибках по строкам, подписки
+и коды авторизации, число SQL-запросов не зависит от числа строк
+"""
+
+import io
+
+from models import db, User, AppState, Participant, SportGroup, Subscription, AuthorizationCode
+from participant_import import iter_csv_rows, import_participants
+from auth_codes import CODE_SPACE, COUNTER_KEY, permute, format_code, load_secret
+from testing import make_app, count_statements
+
+CSV = """ФИО;Телефон родителя;Дата рождения;Группа;Абонемент;Справка
+Иванов Иван;+79000000001;2015-03-01;Дзюдо;12 занятий;да
+Петров Петр;+79000000002;01.02.2014;;;
+;+79000000003;2014-01-01;;;
+Сидоров Сидор;+79000000004;2014-13-01;;;
+Козлов Олег;+79000000005;2016-05-05;Бокс;;
+иванов  иван;+79000000006;2015-03-01;;;
+
+Орлов Илья;+79000000007;2013-07-07;Дзюдо;;нет
+"""
+
+
+def seed():
+    admin = User(telegram_id=1, role='admin')
+    db.session.add_all([admin, SportGroup(name='Дзюдо')])
+    db.session.commit()
+    return admin.id
+
+
+def rows_csv(start, count):
+    lines = ['full_name,parent_phone,birth_date,sport_group_id']
+    lines += [f'Участник {i},+7900{i:07d},2015-01-01,1' for i in range(start, start + count)]
+    return io.BytesIO('\n'.join(lines).encode())
+
+
+def test_import_report():
+    app = make_app()
+    with app.app_context():
+        db.create_all()
+        admin_id = seed()
+
+        report = import_participants(iter_csv_rows(io.BytesIO(CSV.encode('utf-8-sig'))), admin_id)
+        assert report.total_rows == 7 and report.imported == 3 and report.subscriptions == 2
+        assert [error['row'] for error in report.errors] == [4, 5, 6, 7]
+        assert 'full_name' in report.errors[0]['error']
+        assert 'Бокс' in report.errors[2]['error']
+
+        imported = {p.full_name: p for p in Participant.query}
+        assert set(imported) == {'Иванов Иван', 'Петров Петр', 'Орлов Илья'}
+        assert imported['Иванов Иван'].medical_certificate and not imported['Орлов Илья'].medical_certificate
+        subscription = Subscription.query.filter_by(participant_id=imported['Иванов Иван'].id).one()
+        assert subscription.total_lessons == subscription.remaining_lessons == 12
+        codes = {row.participant_id: row.code for row in AuthorizationCode.query}
+        assert codes == {entry['participant_id']: entry['authorization_code'] for entry in report.participants}
+
+        # Повторный импорт того же файла ничего не создает
+        again = import_participants(iter_csv_rows(io.BytesIO(CSV.encode())), admin_id, dry_run=True)
+        assert again.imported == 0 and len(again.errors) == 7
+        db.drop_all()
+
+
+def test_import_batches_queries():
+    app = make_app()
+    with app.app_context():
+        db.create_all()
+        admin_id = seed()
+
+        counts = []
+        for start, size in ((0, 100), (100, 1000)):
+            with count_statements() as statements:
+                report = import_participants(iter_csv_rows(rows_csv(start, size)), admin_id, batch_size=100)
+            assert report.imported == size and not report.errors
+            counts.append(len(statements))
+        assert Participant.query.count() == 1100
+        assert Subscription.query.count() == AuthorizationCode.query.count() == 1100
+        assert len({code for (code,) in db.session.query(AuthorizationCode.code)}) == 1100
+        # Запросы на пакет, а не на строку
+        assert counts[1] <= counts[0] * 10
+        db.drop_all()
+
+
+def test_import_skips_legacy_codes():
+    app = make_app()
+    with app.app_context():
+        db.create_all()
+        admin_id = seed()
+        # 3000 старых случайных кодов совпадают с каждым вторым из ближайших значений счетчика
+        key = load_secret()
+        legacy = {format_code(permute(value, key)) for value in range(0, 6000, 2)}
+        db.session.execute(AuthorizationCode.__table__.insert(), [
+            {'participant_id': 1, 'code': code, 'is_used': False} for code in sorted(legacy)])
+        db.session.commit()
+
+        report = import_participants(iter_csv_rows(rows_csv(0, 1000)), admin_id)
+        assert report.imported == 1000 and not report.errors
+        codes = {entry['authorization_code'] for entry in report.participants}
+        assert len(codes) == 1000 and not codes & legacy
+        assert AuthorizationCode.query.count() == 4000
+        db.drop_all()
+
+
+def test_import_stops_when_codes_run_out():
+    app = make_app()
+    with app.app_context():
+        db.create_all()
+        admin_id = seed()
+        # Кодов хватает на первый пакет, но не на второй
+        db.session.add(AppState(key=COUNTER_KEY, value=str(CODE_SPACE - 150)))
+        db.session.commit()
+
+        report = import_participants(iter_csv_rows(rows_csv(0, 300)), admin_id, batch_size=100)
+        assert report.imported == 100 and len(report.participants) == 100
+        assert report.stopped and report.total_rows == 200
+        assert [error['row'] for error in report.errors] == list(range(102, 202))
+        assert Participant.query.count() == AuthorizationCode.query.count() == 100
+        db.drop_all()
+
+
+if __name__ == '__main__':
+    test_import_report()
+    test_import_batches_queries()
+    test_import_skips_legacy_codes()
+    test_import_stops_when_codes_run_out()
+    print("✅ Импорт участников работает")
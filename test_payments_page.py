@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Тест постраничного списка платежей: обход курсором без пропусков и
+повторов, фильтры, один SQL-запрос на страницу и заполнение пустой даты
+создания в старой базе
+"""
+
+from datetime import date, datetime
+
+from sqlalchemy import Column, MetaData, Table, insert
+
+from models import db, Payment
+from migrate_indexes import fill_payment_created_at, UNKNOWN_CREATED_AT
+from payments import PaymentFilters, load_payments_page, parse_payment_filters, decode_cursor
+from testing import make_app, count_statements, seed_payments
+
+
+def test_keyset_pages_and_filters():
+    app = make_app()
+    with app.app_context():
+        db.create_all()
+        groups = seed_payments()
+        expected = [p.id for p in Payment.query.order_by(Payment.created_at.desc(), Payment.id.desc())]
+
+        seen, cursor, pages = [], None, 0
+        with count_statements() as statements:
+            while True:
+                rows, cursor = load_payments_page(cursor=cursor, limit=7)
+                seen.extend(row.id for row in rows)
+                pages += 1
+                if cursor is None:
+                    break
+        assert seen == expected
+        assert pages == 4 and len(statements) == pages
+
+        rows, _ = load_payments_page(PaymentFilters(status='pending', sport_group_id=groups[0].id), limit=100)
+        assert rows and all(row.status == 'pending' and row.group_id == groups[0].id for row in rows)
+
+        filters = parse_payment_filters({'date_from': '2024-09-02', 'date_to': '2024-09-03'})
+        rows, _ = load_payments_page(filters, limit=100)
+        assert {row.created_at.date() for row in rows} == {date(2024, 9, 2), date(2024, 9, 3)}
+        db.drop_all()
+
+
+def test_migration_fills_missing_created_at():
+    app = make_app()
+    with app.app_context():
+        db.create_all()
+        groups = seed_payments()
+        # Таблица из старой схемы, где created_at допускал NULL
+        rows = [dict(row._mapping) for row in db.session.execute(Payment.__table__.select())]
+        db.session.commit()
+        Payment.__table__.drop(db.engine)
+        legacy = Table('payment', MetaData(), *(Column(c.name, c.type, primary_key=c.primary_key) for c in Payment.__table__.columns))
+        legacy.create(db.engine)
+        paid_at = datetime(2024, 8, 1, 9, 30)
+        with db.engine.begin() as conn:
+            conn.execute(insert(legacy), rows)
+            subscription_id, user_id = rows[0]['subscription_id'], rows[0]['user_id']
+            conn.execute(insert(legacy), [
+                {'id': 100, 'user_id': user_id, 'subscription_id': subscription_id, 'amount': 4000, 'payment_date': paid_at},
+                {'id': 101, 'user_id': user_id, 'subscription_id': subscription_id, 'amount': 4000, 'payment_date': None}
+            ])
+
+        assert fill_payment_created_at(db.engine) == 2
+        assert fill_payment_created_at(db.engine) == 0
+        assert db.session.get(Payment, 100).created_at == paid_at
+        assert db.session.get(Payment, 101).created_at == UNKNOWN_CREATED_AT
+
+        seen, cursor = [], None
+        while True:
+            page, cursor = load_payments_page(cursor=cursor, limit=10)
+            seen.extend(row.id for row in page)
+            if cursor is None:
+                break
+        assert len(seen) == len(set(seen)) == 27 and seen[-2:] == [100, 101]
+        assert {row.group_id for row in load_payments_page(limit=100)[0]} == {group.id for group in groups}
+        db.session.remove()
+        db.drop_all()
+
+
+def test_invalid_input_is_rejected():
+    for args in ({'status': 'paid'}, {'group_id': 'x'}, {'date_from': '01.09.2024'}):
+        try:
+            parse_payment_filters(args)
+        except ValueError:
+            continue
+        raise AssertionError(f'{args} должен вызывать ValueError')
+
+    try:
+        decode_cursor('не-курсор')
+    except ValueError:
+        pass
+    else:
+        raise AssertionError('Поврежденный курсор должен вызывать ValueError')
+
+
+if __name__ == '__main__':
+    test_keyset_pages_and_filters()
+    test_migration_fills_missing_created_at()
+    test_invalid_input_is_rejected()
+    print("✅ Постраничный список платежей работает")
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Тест сэмплирующего профайлера: отбор запросов по шаблону, остановка по
+лимиту запросов и времени, профиль в формате collapsed stacks
+"""
+
+import time
+
+from flask import Flask
+
+from profiler import init_profiler, get_profiler
+
+
+def busy_handler():
+    """Нагрузка, которую должен увидеть профайлер"""
+    deadline = time.perf_counter() + 0.03
+    total = 0
+    while time.perf_counter() < deadline:
+        total += sum(range(100))
+    return str(total)
+
+
+def make_app():
+    app = Flask(__name__)
+    init_profiler(app)
+    app.add_url_rule('/slow', 'slow', busy_handler)
+    app.add_url_rule('/other', 'other', busy_handler)
+    return app
+
+
+def test_profiles_matching_requests():
+    app = make_app()
+    profiler = get_profiler(app)
+    client = app.test_client()
+
+    profiler.start('/slow', max_requests=2, interval_ms=1)
+    for _ in range(3):
+        client.get('/slow')
+        client.get('/other')
+    status = profiler.status()
+    assert status['requests_profiled'] == 2
+    assert status['stopped_reason'] == 'requests limit reached'
+
+    lines = profiler.collapsed().splitlines()
+    assert lines
+    for line in lines:
+        stack, count = line.rsplit(' ', 1)
+        assert stack.startswith('GET /slow;') and int(count) > 0
+    assert any('test_profiler.py:busy_handler' in line for line in lines)
+
+
+def test_time_limit_and_validation():
+    app = make_app()
+    profiler = get_profiler(app)
+    profiler.start('*', seconds=0.05)
+    time.sleep(0.2)
+    assert profiler.status()['stopped_reason'] == 'time limit reached'
+
+    for kwargs in ({}, {'max_requests': 0, 'seconds': None}, {'seconds': 10 ** 6}, {'seconds': 1, 'interval_ms': 0}):
+        try:
+            profiler.start('*', **kwargs)
+        except ValueError:
+            continue
+        raise AssertionError(f'{kwargs} должен вызывать ValueError')
+
+
+if __name__ == '__main__':
+    test_profiles_matching_requests()
+    test_time_limit_and_validation()
+    print("✅ Профайлер работает")
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Тест чтения с реплики на двух файлах SQLite: маршруты read_replica читают
+реплику, записи идут в основную базу, после записи сессия читает основную
+базу (read-your-writes)
+"""
+
+import os
+import tempfile
+import time
+
+from flask import Flask, jsonify
+
+from models import db, SportGroup
+from replica import init_replica, read_replica, WRITTEN_AT_KEY
+
+
+def make_app(workdir):
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = 'test'
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(workdir, 'primary.db')}"
+    app.config['SQLALCHEMY_BINDS'] = {'replica': f"sqlite:///{os.path.join(workdir, 'replica.db')}"}
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    init_replica(app)
+
+    @app.route('/groups')
+    @read_replica
+    def list_groups():
+        return jsonify(sorted(group.name for group in SportGroup.query))
+
+    @app.route('/groups/all')
+    def list_groups_primary():
+        return jsonify(sorted(group.name for group in SportGroup.query))
+
+    @app.route('/groups/touch')
+    @read_replica
+    def touch_group():
+        # Маршрут для чтения, который все же пишет: чтение после записи идет в основную базу
+        db.session.add(SportGroup(name='Новая'))
+        db.session.flush()
+        return jsonify(sorted(group.name for group in SportGroup.query))
+
+    @app.route('/groups', methods=['POST'])
+    def add_group():
+        db.session.add(SportGroup(name='Дзюдо'))
+        db.session.commit()
+        return jsonify({'success': True})
+
+    with app.app_context():
+        db.create_all()
+        db.metadata.create_all(db.engines['replica'])
+        db.session.add(SportGroup(name='Основная'))
+        db.session.commit()
+        with db.engines['replica'].begin() as conn:
+            conn.execute(SportGroup.__table__.insert(), [{'name': 'Реплика'}])
+    return app
+
+
+def test_reads_go_to_replica_until_session_writes():
+    with tempfile.TemporaryDirectory() as workdir:
+        try:
+            check_routing(make_app(workdir))
+        finally:
+            # init_app с bind заводит общие для db метаданные replica; другим тестовым приложениям они не нужны
+            db.metadatas.pop('replica', None)
+
+
+def check_routing(app):
+    """Сценарий маршрутизации на приложении с двумя базами"""
+    client = app.test_client()
+
+    assert client.get('/groups').get_json() == ['Реплика']
+    assert client.get('/groups/all').get_json() == ['Основная']
+
+    assert client.post('/groups').status_code == 200
+    # Сессия, которая только что писала, читает основную базу
+    assert client.get('/groups').get_json() == ['Дзюдо', 'Основная']
+    # Другие пользователи по-прежнему читают реплику
+    assert app.test_client().get('/groups').get_json() == ['Реплика']
+
+    # По истечении окна read-your-writes сессия возвращается на реплику
+    with client.session_transaction() as session:
+        session[WRITTEN_AT_KEY] = time.time() - 60
+    assert client.get('/groups').get_json() == ['Реплика']
+
+    other = app.test_client()
+    assert other.get('/groups/touch').get_json() == ['Дзюдо', 'Новая', 'Основная']
+    with app.app_context():
+        db.engines['replica'].dispose()
+        db.engine.dispose()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Тест слоя запросов списка учеников: количество SQL-запросов
+не должно зависеть от количества участников
+"""
+
+from datetime import date, datetime, timedelta
+
+from models import db, User, Participant, SportGroup, Subscription, Payment, AuthorizationCode
+from roster import build_students_roster, build_group_roster
+from ledger import rebuild_balances
+from testing import make_app, count_statements
+
+
+def seed(participant_count):
+    """Создает участников с двумя подписками, платежами и кодами"""
+    user = User(telegram_id=1, role='admin')
+    groups = [SportGroup(name='Дзюдо'), SportGroup(name='ММА')]
+    db.session.add(user)
+    db.session.add_all(groups)
+    db.session.flush()
+
+    for i in range(participant_count):
+        participant = Participant(
+            user_id=user.id,
+            full_name=f'Участник {i:04d}',
+            parent_phone='+70000000000',
+            birth_date=date(2015, 1, 1)
+        )
+        db.session.add(participant)
+        db.session.flush()
+        for group in groups:
+            subscription = Subscription(
+                participant_id=participant.id,
+                sport_group_id=group.id,
+                subscription_type='8 занятий',
+                total_lessons=8,
+                remaining_lessons=5,
+                start_date=date.today(),
+                end_date=date.today() + timedelta(days=30)
+            )
+            db.session.add(subscription)
+            db.session.flush()
+            db.session.add(Payment(user_id=user.id, subscription_id=subscription.id, amount=4000, status='approved'))
+            db.session.add(Payment(user_id=user.id, subscription_id=subscription.id, amount=1000, status='rejected'))
+        db.session.add(AuthorizationCode(participant_id=participant.id, code=f'1{i:05d}', created_at=datetime(2024, 1, 1)))
+        db.session.add(AuthorizationCode(participant_id=participant.id, code=f'2{i:05d}', created_at=datetime(2024, 2, 1)))
+    # Платежи созданы напрямую: журнал и суммы оплат заводятся как при миграции
+    rebuild_balances()
+    db.session.commit()
+
+
+def roster_query_counts(participant_count):
+    app = make_app()
+    with app.app_context():
+        db.create_all()
+        seed(participant_count)
+        db.session.expire_all()
+        with count_statements() as students_statements:
+            students = build_students_roster()
+        db.session.expire_all()
+        with count_statements() as group_statements:
+            group_students = build_group_roster(1)
+        db.drop_all()
+    return students, len(students_statements), group_students, len(group_statements)
+
+
+def test_roster_query_count_is_constant():
+    """Количество запросов одинаково для 5 и 50 участников"""
+    _, small_queries, _, small_group_queries = roster_query_counts(5)
+    students, large_queries, group_students, large_group_queries = roster_query_counts(50)
+
+    assert small_queries == large_queries
+    assert small_group_queries == large_group_queries
+    assert large_queries <= 3
+    assert large_group_queries <= 2
+
+    assert len(students) == 50
+    student = students[0]
+    assert student['participant_name'] == 'Участник 0000'
+    assert student['authorization_code'] == '200000'
+    assert student['subscription_count'] == 2
+    assert student['total_paid_all'] == 8000
+    assert student['total_remaining_all'] == 10
+    assert {s['sport_group_name'] for s in student['subscriptions']} == {'Дзюдо', 'ММА'}
+
+    assert len(group_students) == 50
+    assert group_students[0]['total_paid'] == 4000
+    assert group_students[0]['authorization_code'] == '200000'
+
+
+if __name__ == '__main__':
+    test_roster_query_count_is_constant()
+    print("✅ Количество запросов не зависит от числа участников")
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Тест фоновых задач: истечение подписок пакетами, уведомления о низком
+балансе без повторов и захват задачи по интервалу в AppState
+"""
+
+from datetime import date, timedelta
+
+from models import db, Subscription, LowBalanceNotice
+from ledger import adjust_balance
+from sweeps import expire_subscriptions, send_low_balance_notices, low_balance_message
+from scheduler import Job, JobScheduler
+from testing import make_app, seed_lesson
+
+
+class RecordingOutbox:
+    """Очередь доставки, которая только запоминает сообщения"""
+
+    def __init__(self):
+        self.messages = []
+
+    def enqueue_many(self, messages):
+        self.messages.extend(messages)
+
+
+def test_expiry_and_low_balance_notices():
+    app = make_app()
+    with app.app_context():
+        db.create_all()
+        _, (healthy, low, empty, expired_a, expired_b) = seed_lesson([3, 1, 0, 1, 5])
+        for participant_id in (expired_a, expired_b):
+            Subscription.query.filter_by(participant_id=participant_id).update({'end_date': date.today() - timedelta(days=1)})
+        db.session.commit()
+
+        assert expire_subscriptions(batch_size=1) == 2
+        assert expire_subscriptions() == 0
+        active = {s.participant_id for s in Subscription.query.filter_by(is_active=True)}
+        assert active == {healthy, low, empty}
+
+        outbox = RecordingOutbox()
+        result = send_low_balance_notices(outbox, thresholds=(1, 0), batch_size=1)
+        assert result == {'notices': 2, 'messages': 2, 'released': 0}
+        notices = db.session.query(LowBalanceNotice.threshold, Subscription.participant_id).join(
+            Subscription, Subscription.id == LowBalanceNotice.subscription_id)
+        assert sorted(notices) == [(0, empty), (1, low)]
+        assert all(message.chat_id == 100 for message in outbox.messages)
+        assert [message.text.split()[3:5] for message in outbox.messages] == [['Участник', '2'], ['Участник', '1']]
+
+        # Повторный запуск ничего не отправляет
+        assert send_low_balance_notices(outbox, thresholds=(1, 0))['messages'] == 0
+
+        # После пополнения отметка снимается, и следующее снижение снова уведомляет
+        subscription = Subscription.query.filter_by(participant_id=low).one()
+        adjust_balance(subscription.id, lessons=4)
+        db.session.commit()
+        assert send_low_balance_notices(outbox, thresholds=(1, 0)) == {'notices': 0, 'messages': 0, 'released': 1}
+        adjust_balance(subscription.id, lessons=-4)
+        db.session.commit()
+        assert send_low_balance_notices(outbox, thresholds=(1, 0))['messages'] == 1
+        assert len(outbox.messages) == 3
+
+
+def test_low_balance_message_escapes_html():
+    text = low_balance_message('Аня <3 & Ко', 1, 'Дзюдо & Самбо')
+    assert 'Аня &lt;3 &amp; Ко' in text and "'Дзюдо &amp; Самбо'" in text
+
+
+def test_jobs_run_once_per_interval():
+    app = make_app()
+    calls = []
+
+    def failing():
+        raise RuntimeError('boom')
+
+    jobs = [Job('counter', 3600, lambda: calls.append(1) or len(calls)), Job('failing', 3600, failing)]
+    scheduler = JobScheduler(app, jobs)
+    with app.app_context():
+        db.create_all()
+
+    first = scheduler.run_pending()
+    assert first['counter']['status'] == 'ok' and first['counter']['result'] == 1
+    assert first['failing']['status'] == 'error' and first['failing']['error'] == 'boom'
+
+    # Интервал не прошел: задачи не запускаются ни здесь, ни в другом планировщике
+    assert scheduler.run_pending() == {}
+    assert JobScheduler(app, jobs).run_pending() == {}
+    assert scheduler.run_pending(['counter'], force=True)['counter']['result'] == 2
+    assert calls == [1, 1]
+
+    states = scheduler.states()
+    assert states['counter']['last_run']['result'] == 2
+    assert states['failing']['last_run']['status'] == 'error'
@@ -0,0 +1,113 @@
+"""
+Общие заготовки для тестов: приложение с базой SQLite в памяти, типовые
+наборы данных и подсчет SQL-запросов.
+"""
+
+from contextlib import contextmanager
+from datetime import date, datetime, time, timedelta
+
+from flask import Flask
+from sqlalchemy import event
+
+from models import db, User, Participant, SportGroup, Subscription, Payment, Attendance, AuthorizationCode
+from attendance import save_attendance
+
+
+def make_app(**config):
+    """Отдельное приложение с базой в памяти; config дополняет настройки"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config.update(config)
+    db.init_app(app)
+    return app
+
+
+@contextmanager
+def count_statements(engine=None):
+    """
+    Собирает SQL-запросы, выполненные внутри блока:
+    with count_statements() as statements: ...
+    """
+    engine = engine or db.engine
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def seed_lesson(remaining_lessons):
+    """Группа, занятие и участники с заданными остатками (None - без подписки)"""
+    user = User(telegram_id=100, role='parent')
+    group = SportGroup(name='Дзюдо')
+    db.session.add_all([user, group])
+    db.session.flush()
+
+    participant_ids = []
+    for i, remaining in enumerate(remaining_lessons):
+        participant = Participant(user_id=user.id, full_name=f'Участник {i}', parent_phone='+7', birth_date=date(2015, 1, 1))
+        db.session.add(participant)
+        db.session.flush()
+        participant_ids.append(participant.id)
+        if remaining is not None:
+            db.session.add(Subscription(
+                participant_id=participant.id,
+                sport_group_id=group.id,
+                subscription_type='8 занятий',
+                total_lessons=8,
+                remaining_lessons=remaining,
+                start_date=date.today(),
+                end_date=date.today() + timedelta(days=30)
+            ))
+        db.session.add(AuthorizationCode(participant_id=participant.id, code=f'{i:06d}', is_used=True, used_by_user_id=user.id))
+
+    attendance = Attendance(sport_group_id=group.id, lesson_date=date.today(), day_of_week=date.today().weekday(),
+                            start_time=time(18, 0), end_time=time(19, 0))
+    db.session.add(attendance)
+    db.session.commit()
+    return attendance, participant_ids
+
+
+def save(attendance, marks):
+    """Сохраняет отметки с коммитом; participant_id -> событие"""
+    events = save_attendance(attendance, marks)
+    db.session.commit()
+    return {event.participant_id: event for event in events}
+
+
+def seed_payments():
+    """Две группы и 25 платежей; у части платежей одинаковое время создания"""
+    user = User(telegram_id=100, role='parent')
+    groups = [SportGroup(name='Дзюдо'), SportGroup(name='Самбо')]
+    db.session.add_all([user, *groups])
+    db.session.flush()
+
+    subscriptions = []
+    for i, group in enumerate(groups):
+        participant = Participant(user_id=user.id, full_name=f'Участник {i}', parent_phone='+7', birth_date=date(2015, 1, 1))
+        db.session.add(participant)
+        db.session.flush()
+        subscription = Subscription(participant_id=participant.id, sport_group_id=group.id, subscription_type='8 занятий',
+                                    total_lessons=8, remaining_lessons=8, start_date=date.today(),
+                                    end_date=date.today() + timedelta(days=30))
+        db.session.add(subscription)
+        subscriptions.append(subscription)
+    db.session.flush()
+
+    base = datetime(2024, 9, 1, 12, 0)
+    for i in range(25):
+        db.session.add(Payment(
+            user_id=user.id,
+            subscription_id=subscriptions[i % 2].id,
+            amount=4000,
+            status='approved' if i % 3 else 'pending',
+            created_at=base + timedelta(days=i // 2)
+        ))
+    db.session.commit()
+    return groups